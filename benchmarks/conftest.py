@@ -0,0 +1,80 @@
+"""
+Microbenchmarks of the request path and the startup, run with pytest-benchmark
+(pip install specific[benchmarks]):
+
+    $ pytest benchmarks --benchmark-autosave
+    $ pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+The results are stored as JSON in .benchmarks/, to compare commits, or in a
+given file with --benchmark-json=results.json.
+
+The operations are those of the test fixtures, whose handlers are in
+tests/fakeapi.
+"""
+import json
+import pathlib
+import sys
+
+import pytest
+import specific
+from specific.resolver import Resolver
+
+TESTS_FOLDER = pathlib.Path(__file__).absolute().parent.parent / 'tests'
+FIXTURES_FOLDER = TESTS_FOLDER / 'fixtures'
+
+sys.path.insert(0, str(TESTS_FOLDER))
+
+
+class FakeResponse(object):
+    status_code = 200
+    ok = True
+
+    def __init__(self, token_info):
+        self.token_info = token_info
+
+    def json(self):
+        return self.token_info
+
+
+def fake_tokeninfo(url, headers=None, timeout=None):
+    token = headers['Authorization'].split()[-1]
+    return FakeResponse({'uid': 'test-user', 'scope': ['myscope'] if token == 'has_myscope' else []})
+
+
+def post_greeting(name):
+    return {'greeting': 'Hello {}'.format(name)}
+
+
+def build_app(specification, validate_responses=False, **kwargs):
+    app = specific.FlaskApp(__name__, specification_dir=FIXTURES_FOLDER)
+    app.add_api(specification, validate_responses=validate_responses, **kwargs)
+    return app
+
+
+@pytest.fixture(scope='session')
+def simple_app():
+    return build_app('simple/openapi.yaml')
+
+
+@pytest.fixture(scope='session')
+def validated_app():
+    return build_app('simple/openapi.yaml', validate_responses=True)
+
+
+@pytest.fixture(scope='session')
+def secure_app():
+    app = build_app('secure_endpoint/openapi.yaml')
+    # the basic scheme of the fixtures is only in an aiohttp API
+    app.add_api('aiohttp/openapi_secure.yaml', base_path='/basic',
+                resolver=Resolver(lambda operation_id: post_greeting))
+    return app
+
+
+@pytest.fixture
+def tokeninfo(monkeypatch):
+    monkeypatch.setattr('specific.decorators.security.session.get', fake_tokeninfo)
+
+
+@pytest.fixture(scope='session')
+def large_body():
+    return json.dumps({'body{}'.format(index): 'value {}'.format(index) for index in range(1000)})
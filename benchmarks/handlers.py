@@ -0,0 +1,10 @@
+def get_greeting(name, count=1):
+    return {'greeting': ' '.join(['Hello {}'.format(name)] * count)}
+
+
+async def async_get_greeting(name):
+    return {'greeting': 'Hello {}'.format(name)}
+
+
+def post_echo(body):
+    return body
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Generator of synthetic OpenAPI 3 and Swagger 2 specifications, to measure how
+the startup and the memory scale with the size of an API.
+
+    $ python benchmarks/spec_generator.py --operations 1000 --ref-depth 3 > spec.yaml
+    $ python benchmarks/spec_generator.py --operations 1000 --swagger --security-schemes 2 > spec.yaml
+
+The operation ids are `op0`, `op1`..., to resolve with e.g.
+`Resolver(lambda operation_id: handler)`.
+"""
+import argparse
+import sys
+
+import yaml
+
+METHODS = ('get', 'post', 'put', 'patch', 'delete')
+TOKENINFO_URL = 'https://example.com/oauth2/tokeninfo'
+
+
+def generate_spec(operations=100, methods_per_path=2, schemas=None, ref_depth=2, enum_size=10,
+                  security_schemes=1, swagger=False):
+    """
+    :param operations: number of operations
+    :type operations: int
+    :param methods_per_path: number of operations of each path, at most 5
+    :type methods_per_path: int
+    :param schemas: number of chains of component schemas referenced by the
+        operations, one per operation by default. The fewer, the more they are
+        reused
+    :type schemas: int | None
+    :param ref_depth: number of schemas of each chain, each one referencing the next
+    :type ref_depth: int
+    :param enum_size: number of values of the enums of the parameters and the schemas
+    :type enum_size: int
+    :param security_schemes: number of OAuth2 schemes, used by the operations in turn
+    :type security_schemes: int
+    :param swagger: whether to generate a Swagger 2 specification instead of OpenAPI 3
+    :type swagger: bool
+    :rtype: dict
+    """
+    if not 1 <= methods_per_path <= len(METHODS):
+        raise ValueError('methods_per_path must be between 1 and {}'.format(len(METHODS)))
+    schemas = schemas or operations
+    enum = ['value{}'.format(index) for index in range(enum_size)]
+    definitions = {}
+    for chain in range(schemas):
+        for level in range(ref_depth):
+            definitions['Schema{}_{}'.format(chain, level)] = object_schema(
+                enum, 'Schema{}_{}'.format(chain, level + 1) if level + 1 < ref_depth else None, swagger)
+
+    paths = {}
+    for index in range(operations):
+        path = '/resources{}/{{id}}'.format(index // methods_per_path)
+        method = METHODS[index % methods_per_path]
+        schema = {'$ref': ref(swagger, 'Schema{}_0'.format(index % schemas))} if ref_depth else {'type': 'object'}
+        operation = {
+            'operationId': 'op{}'.format(index),
+            'parameters': [
+                parameter('id', 'path', {'type': 'integer'}, swagger, required=True),
+                parameter('kind', 'query', {'type': 'string', 'enum': enum}, swagger),
+                parameter('limit', 'query', {'type': 'integer', 'minimum': 1, 'default': 10}, swagger),
+            ],
+            'responses': {'200': response(schema, swagger)},
+        }
+        if method in ('post', 'put', 'patch'):
+            if swagger:
+                operation['parameters'].append({'name': 'body', 'in': 'body', 'required': True, 'schema': schema})
+            else:
+                operation['requestBody'] = {'required': True, 'content': {'application/json': {'schema': schema}}}
+        if security_schemes:
+            operation['security'] = [{'oauth{}'.format(index % security_schemes): ['read']}]
+        paths.setdefault(path, {})[method] = operation
+
+    info = {'title': 'Synthetic API of {} operations'.format(operations), 'version': '1.0'}
+    schemes = {'oauth{}'.format(index): oauth_scheme(swagger) for index in range(security_schemes)}
+    if swagger:
+        spec = {'swagger': '2.0', 'info': info, 'basePath': '/v1.0', 'paths': paths, 'definitions': definitions}
+        if schemes:
+            spec['securityDefinitions'] = schemes
+        return spec
+    components = {'schemas': definitions}
+    if schemes:
+        components['securitySchemes'] = schemes
+    return {'openapi': '3.0.0', 'info': info, 'servers': [{'url': '/v1.0'}], 'paths': paths,
+            'components': components}
+
+
+def ref(swagger, name):
+    return '#/definitions/{}'.format(name) if swagger else '#/components/schemas/{}'.format(name)
+
+
+def object_schema(enum, child, swagger):
+    schema = {
+        'type': 'object',
+        'required': ['name'],
+        'properties': {
+            'name': {'type': 'string', 'maxLength': 100},
+            'kind': {'type': 'string', 'enum': enum},
+            'tags': {'type': 'array', 'items': {'type': 'string'}},
+        },
+    }
+    if child:
+        schema['properties']['child'] = {'$ref': ref(swagger, child)}
+    return schema
+
+
+def parameter(name, location, schema, swagger, required=False):
+    if swagger:
+        return dict(schema, name=name, required=required, **{'in': location})
+    return {'name': name, 'in': location, 'required': required, 'schema': schema}
+
+
+def response(schema, swagger):
+    if swagger:
+        return {'description': 'resource', 'schema': schema}
+    return {'description': 'resource', 'content': {'application/json': {'schema': schema}}}
+
+
+def oauth_scheme(swagger):
+    if swagger:
+        return {'type': 'oauth2', 'flow': 'implicit', 'authorizationUrl': 'https://example.com/oauth2/dialog',
+                'scopes': {'read': 'read the resources'}, 'x-tokenInfoUrl': TOKENINFO_URL}
+    return {'type': 'oauth2', 'x-tokenInfoUrl': TOKENINFO_URL, 'flows': {'implicit': {
+        'authorizationUrl': 'https://example.com/oauth2/dialog', 'scopes': {'read': 'read the resources'}}}}
+
+
+def add_arguments(parser):
+    parser.add_argument('--operations', type=int, default=100)
+    parser.add_argument('--methods-per-path', type=int, default=2)
+    parser.add_argument('--schemas', type=int, help='number of chains of schemas, one per operation by default')
+    parser.add_argument('--ref-depth', type=int, default=2)
+    parser.add_argument('--enum-size', type=int, default=10)
+    parser.add_argument('--security-schemes', type=int, default=1)
+    parser.add_argument('--swagger', action='store_true', help='generate a Swagger 2 specification')
+
+
+def spec_from_arguments(args):
+    return generate_spec(args.operations, args.methods_per_path, args.schemas, args.ref_depth, args.enum_size,
+                         args.security_schemes, args.swagger)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    yaml.safe_dump(spec_from_arguments(args), sys.stdout, default_flow_style=False)
+
+
+if __name__ == '__main__':
+    main()
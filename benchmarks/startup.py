@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Startup and memory benchmark of APIs of growing sizes, generated by
+spec_generator.py.
+
+Each size is measured in a new process: the time of `add_api`, the peak RSS of
+the process, and the memory retained per operation, traced by tracemalloc in
+a second `add_api`.
+
+    $ python benchmarks/startup.py --sizes 100 1000 10000
+    $ python benchmarks/startup.py --swagger --ref-depth 5 --schemas 10 --json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import specific
+from specific.resolver import Resolver
+
+BENCHMARKS_FOLDER = pathlib.Path(__file__).absolute().parent
+
+sys.path.insert(0, str(BENCHMARKS_FOLDER))
+
+from spec_generator import add_arguments, spec_from_arguments  # NOQA: E402 isort:skip
+
+
+def handler(**kwargs):
+    return {}
+
+
+def add_api(spec):
+    app = specific.FlaskApp(__name__)
+    app.add_api(spec, resolver=Resolver(lambda operation_id: handler))
+    return app
+
+
+def current_rss():
+    """
+    :return: the resident memory of the process in bytes, None when unknown
+    :rtype: int | None
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        return None
+
+
+def peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(args):
+    spec = spec_from_arguments(args)
+    gc.collect()
+    rss_before = current_rss()
+    start = time.perf_counter()
+    app = add_api(spec)
+    add_api_seconds = time.perf_counter() - start
+    gc.collect()
+    rss_after = current_rss()
+    result = {
+        'operations': args.operations,
+        'add_api_seconds': add_api_seconds,
+        'peak_rss_bytes': peak_rss(),
+        'rss_growth_bytes': rss_after - rss_before if rss_before is not None else None,
+    }
+    del app
+
+    gc.collect()
+    tracemalloc.start()
+    traced = tracemalloc.get_traced_memory()[0]
+    app = add_api(spec)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - traced
+    tracemalloc.stop()
+    del app
+    result['retained_bytes'] = retained
+    result['retained_bytes_per_operation'] = retained // args.operations
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='numbers of operations, each measured in a new process')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.measure:
+        print(json.dumps(measure(args)))
+        return
+
+    results = []
+    for size in args.sizes:
+        # the last --operations wins
+        output = subprocess.check_output([sys.executable, __file__, '--measure'] + argv +
+                                         ['--operations', str(size)])
+        results.append(json.loads(output.decode()))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print('{:>10} {:>12} {:>14} {:>14} {:>12}'.format(
+        'operations', 'add_api s', 'peak RSS MiB', 'retained MiB', 'bytes/op'))
+    for result in results:
+        print('{operations:>10} {add_api_seconds:>12.2f} {peak:>14.1f} {retained:>14.1f} '
+              '{retained_bytes_per_operation:>12}'.format(peak=result['peak_rss_bytes'] / 2 ** 20,
+                                                          retained=result['retained_bytes'] / 2 ** 20, **result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Full in-process requests through the FlaskApp, with the werkzeug test client.
+"""
+import base64
+
+import pytest
+from conftest import build_app
+from specific.tracing import StageListener
+
+pytest.importorskip('pytest_benchmark')
+
+
+def request(benchmark, app, method, path, status=200, **kwargs):
+    client = app.app.test_client()
+    open_request = getattr(client, method)
+    response = open_request(path, **kwargs)
+    assert response.status_code == status, response.data
+    benchmark(open_request, path, **kwargs)
+
+
+@pytest.mark.parametrize('validated', [False, True], ids=['no_response_validation', 'response_validation'])
+def test_simple_get(benchmark, simple_app, validated_app, validated):
+    request(benchmark, validated_app if validated else simple_app, 'get', '/v1.0/greetings/jsantos')
+
+
+@pytest.mark.parametrize('validated', [False, True], ids=['no_response_validation', 'response_validation'])
+def test_query_params(benchmark, simple_app, validated_app, validated):
+    query = {'date': '2015-08-26', 'int': '123', 'bool': 'true'}
+    query.update(('extra{}'.format(index), str(index)) for index in range(20))
+    request(benchmark, validated_app if validated else simple_app, 'get', '/v1.0/test_parameter_validation',
+            query_string=query)
+
+
+@pytest.mark.parametrize('path, query_string', [
+    ('/v1.0/test_array_csv_query_param', 'items=' + ','.join(str(index) for index in range(50))),
+    ('/v1.0/test_array_multi_query_param', '&'.join('items={}'.format(index) for index in range(50))),
+], ids=['csv', 'multi'])
+def test_array_query_param(benchmark, simple_app, path, query_string):
+    request(benchmark, simple_app, 'get', path, query_string=query_string)
+
+
+@pytest.mark.parametrize('validated', [False, True], ids=['no_response_validation', 'response_validation'])
+def test_large_json_body(benchmark, simple_app, validated_app, validated, large_body):
+    request(benchmark, validated_app if validated else simple_app, 'post',
+            '/v1.0/body-sanitization-additional-properties-defined', data=large_body,
+            content_type='application/json')
+
+
+def test_form_data(benchmark, simple_app):
+    request(benchmark, simple_app, 'post', '/v1.0/test-formData-param', data={'formData': 'test'},
+            content_type='multipart/form-data')
+
+
+def test_array_form_data(benchmark, simple_app):
+    request(benchmark, simple_app, 'post', '/v1.0/test_array_csv_form_param',
+            data={'items': ','.join(str(index) for index in range(50))},
+            content_type='application/x-www-form-urlencoded')
+
+
+@pytest.mark.parametrize('path, headers', [
+    ('/v1.0/byesecure/jsantos', {'Authorization': 'Bearer has_myscope'}),
+    ('/v1.0/more-than-one-security-definition', {'X-Auth': 'mykey'}),
+    ('/v1.0/byesecure-jwt/jsantos', {'Authorization': 'Bearer 100'}),
+    ('/basic/greeting/jsantos', {'Authorization': 'Basic ' + base64.b64encode(b'user:user').decode()}),
+], ids=['oauth2', 'apiKey', 'bearer', 'basic'])
+def test_security_scheme(benchmark, secure_app, tokeninfo, path, headers):
+    method = 'post' if path.startswith('/basic') else 'get'
+    request(benchmark, secure_app, method, path, headers=headers)
+
+
+def test_security_rejected(benchmark, secure_app):
+    request(benchmark, secure_app, 'get', '/v1.0/byesecure-jwt/jsantos', status=401,
+            headers={'Authorization': 'Bearer invalid'})
+
+
+@pytest.mark.parametrize('listeners', [None, [], [StageListener()]], ids=['baseline', 'no_listener', 'noop_listener'])
+def test_stage_listeners(benchmark, simple_app, listeners):
+    # the pipeline is only timed with listeners, an empty list is the baseline pipeline
+    app = simple_app if listeners is None else build_app('simple/openapi.yaml',
+                                                         options={'stage_listeners': listeners})
+    request(benchmark, app, 'get', '/v1.0/greetings/jsantos')
@@ -0,0 +1,95 @@
+"""
+The stages of the request pipeline alone, on the requests of the operations
+of the simple fixture as they reach each stage.
+"""
+import contextlib
+
+import pytest
+from specific.apis.flask_api import FlaskApi
+from specific.decorators.parameter import parameter_to_arg
+from specific.decorators.validation import ParameterValidator, RequestBodyValidator
+
+pytest.importorskip('pytest_benchmark')
+
+QUERY = dict([('date', '2015-08-26'), ('int', '123'), ('bool', 'true')] +
+             [('extra{}'.format(index), str(index)) for index in range(20)])
+CSV_ITEMS = 'items=' + ','.join(str(index) for index in range(50))
+
+
+def get_operation(app, operation_id):
+    """
+    :rtype: specific.operations.AbstractOperation
+    """
+    for api in app.apis:
+        for operation in api.operations:
+            if operation.operation_id == operation_id:
+                return operation
+    raise KeyError(operation_id)
+
+
+def passed(request):
+    return request
+
+
+@contextlib.contextmanager
+def stage_requests(app, operation_id, path, **kwargs):
+    """
+    Pushes the context of a Flask request, and yields the operation and a
+    function returning the SpecificRequest after the parsing of its arrays,
+    as the validators and the handler get it.
+    """
+    operation = get_operation(app, operation_id)
+    parse = operation._array_parsing_decorator(passed)
+    with app.app.test_request_context(path, **kwargs):
+        yield operation, lambda: parse(FlaskApi.get_request())
+
+
+def test_parameter_validator(benchmark, simple_app):
+    with stage_requests(simple_app, 'fakeapi.hello.test_parameter_validation', '/v1.0/test_parameter_validation',
+                        query_string=QUERY) as (operation, make_request):
+        validate = ParameterValidator(operation.parameters, operation.api)(passed)
+        request = make_request()
+        assert validate(request) is request
+        benchmark(validate, request)
+
+
+def test_request_body_validator(benchmark, simple_app, large_body):
+    with stage_requests(simple_app, 'fakeapi.hello.test_body_sanitization_additional_properties_defined',
+                        '/v1.0/body-sanitization-additional-properties-defined', method='POST', data=large_body,
+                        content_type='application/json') as (operation, make_request):
+        validate = RequestBodyValidator(operation.body_schema, operation.consumes, operation.api)(passed)
+        request = make_request()
+        assert validate(request) is request
+        benchmark(validate, request)
+
+
+@pytest.mark.parametrize('operation_id, path, query_string', [
+    ('fakeapi.hello.test_array_csv_query_param', '/v1.0/test_array_csv_query_param', CSV_ITEMS),
+    ('fakeapi.hello.test_array_multi_query_param', '/v1.0/test_array_multi_query_param',
+     '&'.join('items={}'.format(index) for index in range(50))),
+], ids=['csv', 'multi'])
+def test_array_parser(benchmark, simple_app, operation_id, path, query_string):
+    with stage_requests(simple_app, operation_id, path, query_string=query_string) as (operation, _):
+        parse = operation._array_parsing_decorator(passed)
+        assert len(parse(FlaskApi.get_request()).query['items']) == 50
+        # the parser replaces the parameters of the request, a new one is needed at each round
+        benchmark.pedantic(parse, setup=lambda: ((FlaskApi.get_request(),), {}), rounds=2000)
+
+
+def test_parameter_to_arg(benchmark, simple_app):
+    with stage_requests(simple_app, 'fakeapi.hello.test_parameter_validation', '/v1.0/test_parameter_validation',
+                        query_string=QUERY) as (operation, make_request):
+        function = parameter_to_arg(operation, lambda **kwargs: kwargs)
+        request = make_request()
+        assert set(function(request)) == {'date', 'int', 'bool'}
+        benchmark(function, request)
+
+
+@pytest.mark.parametrize('response', [
+    {'greeting': 'Hello jsantos'},
+    ({'items': list(range(1000))}, 201, {'X-Header': 'value'}),
+], ids=['dict', 'tuple'])
+def test_get_response(benchmark, simple_app, response):
+    with simple_app.app.test_request_context('/v1.0/greetings/jsantos', method='POST'):
+        assert FlaskApi.get_response(response, mimetype='application/json').status_code in (200, 201)
+        benchmark(FlaskApi.get_response, response, mimetype='application/json')
@@ -0,0 +1,32 @@
+"""
+`add_api` of the synthetic specifications of spec_generator.py, see
+startup.py for the peak and retained memory at larger sizes.
+"""
+import pytest
+import specific
+from specific.resolver import Resolver
+
+from spec_generator import generate_spec
+
+pytest.importorskip('pytest_benchmark')
+
+
+def handler(**kwargs):
+    return {}
+
+
+def add_api(spec):
+    app = specific.FlaskApp(__name__)
+    app.add_api(spec, resolver=Resolver(lambda operation_id: handler))
+    return app
+
+
+@pytest.mark.parametrize('swagger', [False, True], ids=['openapi', 'swagger'])
+@pytest.mark.parametrize('ref_depth, schemas', [(1, None), (5, 10)], ids=['flat', 'deep_reused'])
+def test_add_api(benchmark, swagger, ref_depth, schemas):
+    spec = generate_spec(operations=100, ref_depth=ref_depth, schemas=schemas, enum_size=50, security_schemes=2,
+                         swagger=swagger)
+    app = add_api(spec)
+    assert len(app.apis[0].operations) == 100
+    assert app.app.test_client().post('/v1.0/resources0/1', json={'name': 'x'}).status_code == 401
+    benchmark.pedantic(add_api, args=(spec,), rounds=5)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the same API served by the Flask and the aiohttp apps.
+
+Each app listens on a local port in a background thread, and is driven over
+keep-alive connections by concurrent aiohttp clients for a fixed duration.
+
+    $ python benchmarks/throughput.py --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import pathlib
+import socket
+import sys
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+from werkzeug.serving import make_server
+
+import specific
+
+BENCHMARKS_FOLDER = pathlib.Path(__file__).absolute().parent
+
+# framework -> (method, path, json body) of the benchmarked requests
+CASES = {
+    'flask': [
+        ('GET', '/v1.0/greeting/jsantos?count=2', None),
+        ('POST', '/v1.0/echo', {'greeting': 'Hello jsantos'}),
+    ],
+    'aiohttp': [
+        ('GET', '/v1.0/greeting/jsantos?count=2', None),
+        ('GET', '/v1.0/async_greeting/jsantos', None),
+        ('POST', '/v1.0/echo', {'greeting': 'Hello jsantos'}),
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def build_app(app_class):
+    app = app_class(__name__, specification_dir=BENCHMARKS_FOLDER)
+    app.add_api('throughput.yaml', validate_responses=True)
+    return app
+
+
+def serve_flask(port):
+    app = build_app(specific.FlaskApp)
+    server = make_server('127.0.0.1', port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def serve_aiohttp(port):
+    app = build_app(specific.AioHttpApp)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app.app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def shutdown():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return shutdown
+
+
+SERVERS = {
+    'flask': serve_flask,
+    'aiohttp': serve_aiohttp,
+}
+
+
+async def drive(url, method, body, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(session):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with session.request(method, url, json=body) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / duration,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per request case')
+    parser.add_argument('--framework', choices=sorted(SERVERS), action='append',
+                        help='framework to benchmark, all by default')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.path.insert(0, str(BENCHMARKS_FOLDER))
+
+    results = []
+    for framework in args.framework or sorted(SERVERS):
+        port = free_port()
+        shutdown = SERVERS[framework](port)
+        try:
+            for method, path, body in CASES[framework]:
+                url = 'http://127.0.0.1:{}{}'.format(port, path)
+                result = asyncio.get_event_loop().run_until_complete(
+                    drive(url, method, body, args.concurrency, args.duration))
+                result.update(framework=framework, method=method, path=path)
+                results.append(result)
+        finally:
+            shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print('{:<8} {:<6} {:<34} {:>10} {:>9} {:>9} {:>7}'.format(
+        'app', 'method', 'path', 'req/s', 'p50 ms', 'p99 ms', 'errors'))
+    for result in results:
+        print('{framework:<8} {method:<6} {path:<34} {rps:>10.1f} {p50_ms:>9.2f} '
+              '{p99_ms:>9.2f} {errors:>7}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,19 @@ install_requires = [
     'swagger-ui-bundle>=0.0.2'
 ]
 
+aiohttp_require = [
+    'aiohttp>=3.3.0'
+]
+
+jwt_require = [
+    'pyjwt[crypto]>=1.7.0'
+]
+
+benchmarks_require = [
+    'pytest',
+    'pytest-benchmark'
+]
+
 tests_require = [
     'decorator',
     'mock',
@@ -40,6 +53,11 @@ tests_require = [
     'pytest-cov',
     'testfixtures'
 ]
+tests_require.extend(jwt_require)
+
+if sys.version_info >= (3, 5, 3):
+    tests_require.extend(aiohttp_require)
+    tests_require.append('pytest-aiohttp')
 
 
 class PyTest(TestCommand):
@@ -54,6 +72,7 @@ class PyTest(TestCommand):
         if sys.version_info < (3, 5, 3):
             self.pytest_args.append('--cov-config=py2-coveragerc')
             self.pytest_args.append('--ignore=tests/aiohttp')
+            self.pytest_args.append('--ignore=tests/asgi')
         else:
             self.pytest_args.append('--cov-config=py3-coveragerc')
 
@@ -94,6 +113,9 @@ setup(
     tests_require=tests_require,
     extras_require={
         'tests': tests_require,
+        'aiohttp': aiohttp_require,
+        'jwt': jwt_require,
+        'benchmarks': benchmarks_require,
     },
     cmdclass={'test': PyTest},
     test_suite='tests',
@@ -30,5 +30,16 @@ except ImportError:  # pragma: no cover
 App = FlaskApp
 Api = FlaskApi
 
+if sys.version_info >= (3, 5, 3):  # pragma: 2.7 no cover
+    from .apis.asgi_api import AsgiApi  # NOQA
+    from .apps.asgi_app import AsgiApp  # NOQA
+    try:
+        from .apis.aiohttp_api import AioHttpApi  # NOQA
+        from .apps.aiohttp_app import AioHttpApp  # NOQA
+    except ImportError:  # pragma: no cover
+        _aiohttp_not_installed_error = not_installed_error()
+        AioHttpApi = _aiohttp_not_installed_error
+        AioHttpApp = _aiohttp_not_installed_error
+
 # This version is replaced during release process.
 __version__ = '2019.0.dev1'
@@ -0,0 +1,186 @@
+"""
+Memory accounting of the operations with `tracemalloc`: the heap is
+snapshotted before and after the pipeline of a sample of the requests, and the
+difference is attributed to their operation.
+
+The snapshots see the allocations of the whole process, the attribution is
+approximate while other requests run concurrently. A single request is
+sampled at a time.
+"""
+import collections
+import functools
+import random
+import threading
+
+from .exceptions import SpecificException
+from .utils import has_coroutine
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+# allocations of the snapshots themselves
+_IGNORED_FILES = ('<frozen importlib._bootstrap>', '<unknown>', tracemalloc.__file__ if tracemalloc else '')
+
+
+class AllocationTracker(object):
+    """
+    Bytes allocated and retained by the sampled requests, by operation and by
+    allocation site.
+    """
+
+    def __init__(self, sample_rate=0.01, frames=1, random=random.random):
+        """
+        :param sample_rate: share of the requests whose allocations are tracked
+        :type sample_rate: float
+        :param frames: number of frames of the tracebacks of the allocations
+        :type frames: int
+        :param random: returns a float in [0, 1), as `random.random`
+        """
+        if tracemalloc is None:  # pragma: no cover
+            raise SpecificException('The allocation tracking requires tracemalloc (Python 3)')
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.sample_rate = sample_rate
+        self.random = random
+        self.operations = collections.defaultdict(collections.Counter)
+        self.sites = collections.Counter()  # (operation, site) -> retained bytes
+        self._lock = threading.Lock()
+        self._sampling = threading.Lock()
+
+    def wrap(self, operation_id, function):
+        """
+        Tracks the allocations of the calls of a function taking the
+        SpecificRequest, e.g. the pipeline of an operation.
+
+        :type operation_id: str
+        :type function: types.FunctionType
+        :rtype: types.FunctionType
+        """
+        if has_coroutine(function):  # pragma: 2.7 no cover
+            from .decorators.coroutine_wrappers import get_allocation_wrapper
+            return get_allocation_wrapper(function, self, operation_id)
+
+        @functools.wraps(function)
+        def wrapper(request):
+            before = self.start()
+            if before is None:
+                return function(request)
+            try:
+                return function(request)
+            finally:
+                self.stop(operation_id, before)
+
+        return wrapper
+
+    def start(self):
+        """
+        :return: the snapshot of the heap and the traced bytes when the request
+            is sampled
+        :rtype: (tracemalloc.Snapshot, int) | None
+        """
+        if self.random() >= self.sample_rate or not self._sampling.acquire(False):
+            return None
+        snapshot = take_snapshot()
+        if hasattr(tracemalloc, 'reset_peak'):  # pragma: no cover
+            tracemalloc.reset_peak()
+        return snapshot, tracemalloc.get_traced_memory()[0]
+
+    def stop(self, operation_id, before):
+        """
+        Attributes the difference of the heap since `start` to an operation.
+
+        :type operation_id: str
+        :param before: the result of `start`
+        """
+        snapshot, traced = before
+        try:
+            peak = tracemalloc.get_traced_memory()[1]
+            after = take_snapshot()
+        finally:
+            self._sampling.release()
+
+        differences = after.compare_to(snapshot, 'lineno')
+        retained = sum(difference.size_diff for difference in differences)
+        if hasattr(tracemalloc, 'reset_peak'):  # pragma: no cover
+            allocated = max(peak - traced, 0)
+        else:
+            # the bytes allocated and still retained at the end of the request
+            allocated = sum(difference.size_diff for difference in differences if difference.size_diff > 0)
+
+        with self._lock:
+            totals = self.operations[operation_id]
+            totals['requests'] += 1
+            totals['allocated_bytes'] += allocated
+            totals['retained_bytes'] += retained
+            for difference in differences:
+                if difference.size_diff > 0:
+                    self.sites[(operation_id, format_site(difference.traceback))] += difference.size_diff
+
+    def report(self, limit=20):
+        """
+        :param limit: number of allocation sites
+        :type limit: int
+        :return: the totals of the operations, the sites where the sampled
+            requests retained the most, and the sites of the most memory now
+        :rtype: dict
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        statistics = take_snapshot().statistics('lineno')[:limit]
+        with self._lock:
+            operations = {operation_id: dict(totals) for operation_id, totals in self.operations.items()}
+            retained_sites = self.sites.most_common(limit)
+        for totals in operations.values():
+            totals['retained_bytes_per_request'] = totals['retained_bytes'] // totals['requests']
+        return {
+            'sample_rate': self.sample_rate,
+            'traced_memory': {'current_bytes': current, 'peak_bytes': peak},
+            'operations': operations,
+            'retained_sites': [{'operation_id': operation_id, 'site': site, 'size_bytes': size}
+                               for (operation_id, site), size in retained_sites],
+            'top_sites': [{'site': format_site(statistic.traceback), 'size_bytes': statistic.size,
+                           'count': statistic.count}
+                          for statistic in statistics],
+        }
+
+    def clear(self):
+        with self._lock:
+            self.operations.clear()
+            self.sites.clear()
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_allocation_tracker(sample_rate):
+    """
+    Allocation tracker shared by the APIs with the same sample rate.
+
+    :type sample_rate: float
+    :rtype: AllocationTracker
+    """
+    with _trackers_lock:
+        if sample_rate not in _trackers:
+            _trackers[sample_rate] = AllocationTracker(sample_rate)
+        return _trackers[sample_rate]
+
+
+def take_snapshot():
+    """
+    :return: a snapshot of the heap without the allocations of tracemalloc
+    :rtype: tracemalloc.Snapshot
+    """
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES])
+
+
+def format_site(traceback):
+    """
+    :type traceback: tracemalloc.Traceback
+    :return: the file and line of the allocation
+    :rtype: str
+    """
+    frame = traceback[0]
+    return '{}:{}'.format(frame.filename, frame.lineno)
@@ -5,12 +5,16 @@ import sys
 
 import six
 
+from ..allocations import get_allocation_tracker
 from ..exceptions import ResolverError
 from ..http_facts import METHODS
+from ..metrics import get_metrics_backend
 from ..operations import make_operation
 from ..options import SpecificOptions
 from ..resolver import Resolver
 from ..spec import Specification
+from ..token_cache import make_rejected_credentials, make_token_info_cache
+from ..traffic import get_traffic_recorder
 from ..utils import Jsonifier
 
 MODULE_PATH = pathlib.Path(__file__).absolute().parent.parent
@@ -99,6 +103,18 @@ class AbstractAPI(object):
         logger.debug('pass_context_arg_name: %s', pass_context_arg_name)
         self.pass_context_arg_name = pass_context_arg_name
 
+        self.operations = []
+
+        self.token_info_cache = make_token_info_cache(self.options)
+        self.rejected_credentials = make_rejected_credentials(self.options)
+        # security decorators by security requirements, and auth functions by
+        # security scheme, shared by the operations
+        self.security_pipelines = {}
+        self.auth_funcs = {}
+        self.metrics = get_metrics_backend(self.options)
+        self.stage_listeners = list(self.options.stage_listeners)
+        self.server_timing = self.options.server_timing
+
         if self.options.openapi_spec_available:
             self.add_openapi_json()
             self.add_openapi_yaml()
@@ -106,6 +122,17 @@ class AbstractAPI(object):
         if self.options.openapi_console_ui_available:
             self.add_swagger_ui()
 
+        self.allocation_tracker = None
+        if self.options.allocation_tracking:
+            self.allocation_tracker = get_allocation_tracker(self.options.allocation_sample_rate)
+            self.add_allocations_endpoint()
+        if self.options.profiler:
+            self.add_profiler_endpoint()
+        self.traffic_recorder = None
+        if self.options.traffic_record_path:
+            self.traffic_recorder = get_traffic_recorder(self.options.traffic_record_path,
+                                                         self.options.traffic_record_sample_rate)
+
         self.add_paths()
 
         if auth_all_paths:
@@ -141,6 +168,40 @@ class AbstractAPI(object):
         Adds a 404 error handler to authenticate and only expose the 404 status if the security validation pass.
         """
 
+    def add_profiler_endpoint(self):
+        """
+        Adds the sampling profiler endpoint to {base_path}/{profiler_path}.
+        """
+        from ..handlers import ProfilerHandler
+
+        handler = ProfilerHandler(self, self.specification.security, self.specification.security_definitions,
+                                  self.options.profiler_max_seconds)
+        self._add_admin_endpoint(self.options.profiler_path, handler)
+
+    def add_allocations_endpoint(self):
+        """
+        Adds the allocation tracking endpoint to {base_path}/{allocations_path}.
+        """
+        from ..handlers import AllocationsHandler
+
+        handler = AllocationsHandler(self, self.specification.security, self.specification.security_definitions,
+                                     self.allocation_tracker)
+        self._add_admin_endpoint(self.options.allocations_path, handler)
+
+    def _add_admin_endpoint(self, path, handler):
+        """
+        Adds an admin endpoint guarded by the security requirements of the API.
+        Without security requirements, the endpoint is not added.
+
+        :type handler: specific.handlers.AdminHandler
+        """
+        if not any(self.specification.security or []):
+            logger.warning('The %s endpoint is not added, the API has no security requirements',
+                           handler.operation_id)
+            return
+        logger.debug('Adding the %s endpoint: %s%s', handler.operation_id, self.base_path, path)
+        self._add_operation_internal('get', path, handler)
+
     def add_operation(self, path, method):
         """
         Adds one operation to the api.
@@ -171,6 +232,7 @@ class AbstractAPI(object):
             pass_context_arg_name=self.pass_context_arg_name
         )
         self._add_operation_internal(method, path, operation)
+        self.operations.append(operation)
 
     @abc.abstractmethod
     def _add_operation_internal(self, method, path, operation):
@@ -227,6 +289,57 @@ class AbstractAPI(object):
             logger.error(error_msg)
             six.reraise(*exc_info)
 
+    def warmup(self):
+        """
+        Runs an example request through each operation, so that the one-off costs
+        of the first requests (lazy imports, compilation of the validators and of
+        the `pattern` regular expressions) are paid before serving.
+
+        :return: the number of operations which failed the warmup
+        :rtype: int
+        """
+        failures = 0
+        for operation in self.operations:
+            logger.debug('Warming up %s %s%s', operation.method.upper(),
+                         self.base_path, operation.path)
+            try:
+                operation.warmup()
+            except Exception:
+                failures += 1
+                logger.warning('Failed to warm up %s %s%s', operation.method.upper(),
+                               self.base_path, operation.path, exc_info=True)
+        return failures
+
+    @classmethod
+    def is_async(cls):
+        """
+        Whether the user framework awaits the operation functions. Operation
+        handlers of asynchronous APIs may be coroutine functions.
+
+        :rtype: bool
+        """
+        return False
+
+    @property
+    def executor(self):  # pragma: 2.7 no cover
+        """
+        Thread pool of asynchronous APIs, for the blocking operation handlers
+        and security functions.
+
+        :rtype: concurrent.futures.ThreadPoolExecutor
+        """
+        if not hasattr(self, '_executor'):
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.options.max_handler_threads)
+        return self._executor
+
+    def run_in_executor(self, function, *args, **kwargs):  # pragma: 2.7 no cover
+        """
+        Awaitable result of a blocking function run in the API thread pool.
+        """
+        from ..decorators.coroutine_wrappers import run_in_executor
+        return run_in_executor(self.executor, function, *args, **kwargs)
+
     @classmethod
     @abc.abstractmethod
     def get_request(self, *args, **kwargs):
@@ -0,0 +1,366 @@
+import io
+import logging
+import pathlib
+import re
+from collections.abc import AsyncIterable
+
+import jinja2
+import werkzeug.exceptions
+from aiohttp import web
+from multidict import CIMultiDict
+from werkzeug.datastructures import MultiDict
+
+from specific.apis.abstract import AbstractAPI
+from specific.decorators.produces import NoContent
+from specific.handlers import AuthErrorHandler
+from specific.lifecycle import SpecificRequest, SpecificResponse
+from specific.utils import (Jsonifier, has_coroutine, is_form_mimetype,
+                            is_json_mimetype, yamldumper)
+
+logger = logging.getLogger(__name__)
+
+PATH_PARAMETER = re.compile(r'\{([^}]*)\}')
+
+# map Swagger type to aiohttp path parameter pattern, mirroring the flask path converters
+PATH_PARAMETER_PATTERNS = {
+    'integer': r'\d+',
+    'number': r'\d+\.\d+',
+    'path': r'[^/].*'
+}
+
+
+def aiohttpify_path(swagger_path, types=None):
+    """
+    Convert swagger path templates to aiohttp path templates
+
+    :type swagger_path: str
+    :type types: dict
+    :rtype: str
+
+    >>> aiohttpify_path('/foo-bar/{my-param}')
+    '/foo-bar/{my_param}'
+
+    >>> aiohttpify_path('/foo/{someint}', {'someint': 'integer'})
+    '/foo/{someint:\\\\d+}'
+    """
+    if types is None:
+        types = {}
+
+    def convert_path_parameter(match):
+        name = match.group(1)
+        pattern = PATH_PARAMETER_PATTERNS.get(types.get(name))
+        return '{{{0}{1}{2}}}'.format(name.replace('-', '_'),
+                                      ':' if pattern else '',
+                                      pattern or '')
+
+    return PATH_PARAMETER.sub(convert_path_parameter, swagger_path)
+
+
+def is_streamed_body(data):
+    """
+    Whether the response data is streamed to the client by aiohttp instead
+    of being serialized, e.g. an async generator or a file object.
+
+    :rtype: bool
+    """
+    return isinstance(data, (AsyncIterable, io.IOBase))
+
+
+class AioHttpApi(AbstractAPI):
+    """
+    Asynchronous API for aiohttp.web. The operations are registered in the
+    `routes` table, which is added to the aiohttp application router.
+    """
+
+    def _set_base_path(self, base_path):
+        super(AioHttpApi, self)._set_base_path(base_path)
+        self._set_routes()
+
+    def _set_routes(self):
+        logger.debug('Creating API route table: %s', self.base_path)
+        self.routes = web.RouteTableDef()
+
+    @classmethod
+    def is_async(cls):
+        return True
+
+    def _base_path_for_prefix(self, request):
+        """
+        Returns the base path including the path prefix of the incoming request,
+        which is set by path-altering reverse proxies.
+        """
+        base_path = self.base_path
+        if base_path and not request.path.startswith(base_path):
+            prefix = request.path.split(base_path)[0]
+            base_path = prefix + base_path
+        return base_path
+
+    def _spec_for_prefix(self, request):
+        """
+        Modify base_path in the spec based on incoming url
+        This fixes problems with reverse proxies changing the path.
+        """
+        return self.specification.with_base_path(self._base_path_for_prefix(request)).raw
+
+    def add_openapi_json(self):
+        """
+        Adds spec json to {base_path}/swagger.json
+        or {base_path}/openapi.json (for oas3)
+        """
+        logger.debug('Adding spec json: %s/%s', self.base_path,
+                     self.options.openapi_spec_path)
+
+        async def get_json_spec(request):
+            return AioHttpApi._build_response(
+                status_code=200,
+                mimetype="application/json",
+                data=self._spec_for_prefix(request)
+            )
+
+        self.routes.get(self.base_path + self.options.openapi_spec_path)(get_json_spec)
+
+    def add_openapi_yaml(self):
+        """
+        Adds spec yaml to {base_path}/swagger.yaml
+        or {base_path}/openapi.yaml (for oas3)
+        """
+        if not self.options.openapi_spec_path.endswith("json"):
+            return
+
+        openapi_spec_path_yaml = \
+            self.options.openapi_spec_path[:-len("json")] + "yaml"
+        logger.debug('Adding spec yaml: %s/%s', self.base_path,
+                     openapi_spec_path_yaml)
+
+        async def get_yaml_spec(request):
+            return AioHttpApi._build_response(
+                status_code=200,
+                content_type="text/yaml",
+                data=yamldumper(self._spec_for_prefix(request))
+            )
+
+        self.routes.get(self.base_path + openapi_spec_path_yaml)(get_yaml_spec)
+
+    def add_swagger_ui(self):
+        """
+        Adds swagger ui to {base_path}/ui/
+        """
+        console_ui_path = self.options.openapi_console_ui_path.strip('/')
+        logger.debug('Adding swagger-ui: %s/%s/',
+                     self.base_path,
+                     console_ui_path)
+
+        console_ui_url = '{base_path}/{console_ui_path}'.format(
+            base_path=self.base_path,
+            console_ui_path=console_ui_path)
+
+        # the index is registered first, as the static route matches the whole directory
+        self.routes.get(console_ui_url + '/')(self._handlers.console_ui_home)
+        self.routes.static(console_ui_url, str(self.options.openapi_console_ui_from_dir))
+
+    def add_auth_on_not_found(self, security, security_definitions):
+        """
+        Adds a 404 error handler to authenticate and only expose the 404 status if the security validation pass.
+        """
+        logger.debug('Adding path not found authentication')
+        not_found_error = AuthErrorHandler(self, werkzeug.exceptions.NotFound(), security=security,
+                                           security_definitions=security_definitions)
+        self.routes.get(self.base_path + '/{invalid_path:.*}')(not_found_error.function)
+
+    def _add_operation_internal(self, method, path, operation):
+        operation_id = operation.operation_id
+        logger.debug('... Adding %s -> %s', method.upper(), operation_id,
+                     extra=vars(operation))
+
+        aiohttp_path = aiohttpify_path(self.base_path + path, operation.get_path_parameter_types())
+        function = operation.function
+        if not has_coroutine(function):
+            from specific.decorators.coroutine_wrappers import get_coroutine_wrapper
+            function = get_coroutine_wrapper(function)
+        self.routes.route(method.upper(), aiohttp_path)(function)
+
+    @property
+    def _handlers(self):
+        # type: () -> InternalHandlers
+        if not hasattr(self, '_internal_handlers'):
+            self._internal_handlers = InternalHandlers(self)
+        return self._internal_handlers
+
+    async def get_request(self, req):
+        """Creates the SpecificRequest instance for the operation handler
+        from the aiohttp request. The body is read once and shared, not copied.
+
+        The framework request is the request context, so that handlers can
+        access it with `pass_context_arg_name`.
+
+        :type req: aiohttp.web.Request
+        :rtype: SpecificRequest
+        """
+        body = await req.read()
+        form, files = MultiDict(), MultiDict()
+        if body and is_form_mimetype(req.content_type):
+            for key, value in (await req.post()).items():
+                if isinstance(value, web.FileField):
+                    files.add(key, value)
+                else:
+                    form.add(key, value)
+
+        def json_getter():
+            if not is_json_mimetype(req.content_type):
+                return None
+            try:
+                return self.jsonifier.loads(body)
+            except ValueError:
+                return None
+
+        request = SpecificRequest(
+            str(req.url),
+            req.method,
+            headers=req.headers,
+            form=form,
+            query=MultiDict(req.rel_url.query.items()),
+            body=body,
+            json_getter=json_getter,
+            files=files,
+            path_params=dict(req.match_info),
+            context=req
+        )
+        logger.debug('Getting data and status code',
+                     extra={
+                         'data': request.body,
+                         'data_type': type(request.body),
+                         'url': request.url
+                     })
+        return request
+
+    @classmethod
+    def get_response(cls, response, mimetype=None, request=None):
+        """Gets aiohttp response instance for the operation handler
+        result. Status Code and Headers for response.  If only body
+        data is returned by the endpoint function, then the status
+        code will be set to 200 and no headers will be added.
+
+        If the returned object is an aiohttp.web.StreamResponse then it will be
+        returned as is.
+
+        :type response: aiohttp.web.StreamResponse | SpecificResponse | (object, int) | (object, int, dict) | object
+        :rtype: aiohttp.web.StreamResponse
+        """
+        logger.debug('Getting data and status code',
+                     extra={
+                         'data': response,
+                         'data_type': type(response),
+                         'url': request.url if request else None
+                     })
+
+        if isinstance(response, web.StreamResponse):
+            aiohttp_response = response
+        elif isinstance(response, SpecificResponse):
+            aiohttp_response = cls._build_response(
+                mimetype=response.mimetype or mimetype,
+                content_type=response.content_type,
+                headers=response.headers,
+                status_code=response.status_code,
+                data=response.body)
+        elif isinstance(response, tuple) and len(response) == 3:
+            data, status_code, headers = response
+            aiohttp_response = cls._build_response(mimetype, None, headers, status_code, data)
+        elif isinstance(response, tuple) and len(response) == 2:
+            data, status_code = response
+            aiohttp_response = cls._build_response(mimetype, None, None, status_code, data)
+        else:
+            aiohttp_response = cls._build_response(mimetype=mimetype, data=response)
+
+        logger.debug('Got data and status code (%d)',
+                     aiohttp_response.status,
+                     extra={
+                         'data': response,
+                         'datatype': type(response),
+                         'url': request.url if request else None
+                     })
+
+        return aiohttp_response
+
+    @classmethod
+    def _build_response(cls, mimetype=None, content_type=None,
+                        headers=None, status_code=None, data=None):
+        if status_code is None:
+            status_code = 200
+        # If we got an enum instead of an int, extract the value.
+        if hasattr(status_code, "value"):
+            status_code = status_code.value
+
+        headers = CIMultiDict(headers or {})
+        if content_type is None and mimetype is not None:
+            content_type = mimetype
+            if mimetype.startswith('text/'):
+                content_type += '; charset=utf-8'
+        if content_type is not None:
+            headers['Content-Type'] = content_type
+
+        if data is None or data is NoContent:
+            body = None
+        elif is_streamed_body(data):
+            body = data
+        else:
+            body = cls._jsonify_data(data, mimetype)
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+
+        return web.Response(body=body, status=status_code, headers=headers)
+
+    @classmethod
+    def _jsonify_data(cls, data, mimetype):
+        if (isinstance(mimetype, str) and is_json_mimetype(mimetype)) \
+                or not isinstance(data, (bytes, str)):
+            return cls.jsonifier.dumps(data)
+
+        return data
+
+    @classmethod
+    def get_specific_response(cls, response, mimetype=None):
+        if isinstance(response, SpecificResponse):
+            return response
+
+        if not isinstance(response, web.StreamResponse):
+            response = cls.get_response(response, mimetype)
+
+        # streamed bodies are not available for validation
+        body = getattr(response, 'body', None)
+        if not isinstance(body, bytes):
+            body = None
+
+        return SpecificResponse(
+            status_code=response.status,
+            mimetype=response.content_type,
+            content_type=response.headers.get('Content-Type'),
+            headers=response.headers,
+            body=body,
+        )
+
+    @classmethod
+    def _set_jsonifier(cls):
+        import json
+        cls.jsonifier = Jsonifier(json)
+
+
+class InternalHandlers(object):
+    """
+    aiohttp handlers for internally registered endpoints.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.options = api.options
+
+    async def console_ui_home(self, request):
+        """
+        Home page of the OpenAPI Console UI.
+
+        :return:
+        """
+        openapi_json_url = self.api._base_path_for_prefix(request) + self.options.openapi_spec_path
+        template_path = pathlib.Path(self.options.openapi_console_ui_from_dir) / 'index.j2'
+        template = jinja2.Template(template_path.read_text())
+        return AioHttpApi._build_response(content_type='text/html; charset=utf-8',
+                                          data=template.render(openapi_spec_url=openapi_json_url))
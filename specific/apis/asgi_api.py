@@ -0,0 +1,411 @@
+import logging
+import mimetypes
+import pathlib
+from io import BytesIO
+from urllib.parse import parse_qsl
+
+import jinja2
+import werkzeug.exceptions
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_options_header
+from werkzeug.security import safe_join
+
+from specific.apis import asgi_utils
+from specific.apis.abstract import AbstractAPI
+from specific.decorators.produces import NoContent
+from specific.handlers import AuthErrorHandler
+from specific.lifecycle import SpecificRequest, SpecificResponse
+from specific.utils import (Jsonifier, is_form_mimetype, is_json_mimetype,
+                            yamldumper)
+
+logger = logging.getLogger(__name__)
+
+
+class AsgiResponse(object):
+    """
+    Response of the ASGI user framework, with an already serialized body.
+    """
+
+    def __init__(self, body=b'', status_code=200, headers=None, content_type=None):
+        """
+        :type body: bytes | str
+        :type status_code: int
+        :type headers: dict | list | werkzeug.datastructures.Headers | None
+        :type content_type: str | None
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.body = body
+        self.status_code = status_code
+        self.headers = Headers(headers)
+        if content_type is not None:
+            self.headers['Content-Type'] = content_type
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type')
+
+    @property
+    def mimetype(self):
+        return parse_options_header(self.content_type)[0] or None
+
+    async def send(self, send, send_body=True):
+        """
+        Sends the response through an ASGI ``send`` awaitable.
+        """
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                   for k, v in self.headers.items()
+                   if k.lower() != 'content-length']
+        headers.append((b'content-length', str(len(self.body)).encode('latin-1')))
+        await send({
+            'type': 'http.response.start',
+            'status': self.status_code,
+            'headers': headers
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': self.body if send_body else b''
+        })
+
+
+class AsgiApi(AbstractAPI):
+    """
+    Asynchronous API for ASGI servers. Operation handlers may be coroutine
+    functions, which are awaited; blocking handlers run in a bounded thread pool.
+    """
+
+    def _set_base_path(self, base_path):
+        super(AsgiApi, self)._set_base_path(base_path)
+        self._set_router()
+
+    def _set_router(self):
+        logger.debug('Creating API router: %s', self.base_path)
+        self.router = asgi_utils.Router(prefix=self.base_path)
+
+    @classmethod
+    def is_async(cls):
+        return True
+
+    def _spec_for_prefix(self, scope):
+        """
+        Modify base_path in the spec based on the ASGI root path.
+        This fixes problems with reverse proxies changing the path.
+        """
+        base_path = scope.get('root_path', '') + self.base_path
+        return self.specification.with_base_path(base_path).raw
+
+    def add_openapi_json(self):
+        """
+        Adds spec json to {base_path}/swagger.json
+        or {base_path}/openapi.json (for oas3)
+        """
+        logger.debug('Adding spec json: %s/%s', self.base_path,
+                     self.options.openapi_spec_path)
+        endpoint_name = "{name}_openapi_json".format(name=self.base_path)
+
+        def get_json_spec(scope, receive):
+            return AsgiApi._build_response(
+                status_code=200,
+                mimetype="application/json",
+                data=self._spec_for_prefix(scope)
+            )
+
+        self.router.add_url_rule(self.options.openapi_spec_path,
+                                 endpoint_name,
+                                 get_json_spec)
+
+    def add_openapi_yaml(self):
+        """
+        Adds spec yaml to {base_path}/swagger.yaml
+        or {base_path}/openapi.yaml (for oas3)
+        """
+        if not self.options.openapi_spec_path.endswith("json"):
+            return
+
+        openapi_spec_path_yaml = \
+            self.options.openapi_spec_path[:-len("json")] + "yaml"
+        logger.debug('Adding spec yaml: %s/%s', self.base_path,
+                     openapi_spec_path_yaml)
+        endpoint_name = "{name}_openapi_yaml".format(name=self.base_path)
+        self.router.add_url_rule(
+            openapi_spec_path_yaml,
+            endpoint_name,
+            lambda scope, receive: AsgiApi._build_response(
+                status_code=200,
+                content_type="text/yaml",
+                data=yamldumper(self._spec_for_prefix(scope))
+            )
+        )
+
+    def add_swagger_ui(self):
+        """
+        Adds swagger ui to {base_path}/ui/
+        """
+        console_ui_path = self.options.openapi_console_ui_path.strip('/')
+        logger.debug('Adding swagger-ui: %s/%s/',
+                     self.base_path,
+                     console_ui_path)
+
+        static_files_url = '/{console_ui_path}/{{filename}}'.format(
+            console_ui_path=console_ui_path)
+        self.router.add_url_rule(static_files_url,
+                                 "{name}_swagger_ui_static".format(name=self.base_path),
+                                 self._handlers.console_ui_static_files,
+                                 types={'filename': 'path'})
+
+        console_ui_url = '/{console_ui_path}/'.format(
+            console_ui_path=console_ui_path)
+        self.router.add_url_rule(console_ui_url,
+                                 "{name}_swagger_ui_index".format(name=self.base_path),
+                                 self._handlers.console_ui_home)
+
+    def add_auth_on_not_found(self, security, security_definitions):
+        """
+        Adds a 404 error handler to authenticate and only expose the 404 status if the security validation pass.
+        """
+        logger.debug('Adding path not found authentication')
+        not_found_error = AuthErrorHandler(self, werkzeug.exceptions.NotFound(), security=security,
+                                           security_definitions=security_definitions)
+        endpoint_name = "{name}_not_found".format(name=self.base_path)
+        self.router.add_url_rule('/{invalid_path}', endpoint_name, not_found_error.function,
+                                 methods=['GET'], types={'invalid_path': 'path'})
+
+    def _add_operation_internal(self, method, path, operation):
+        operation_id = operation.operation_id
+        logger.debug('... Adding %s -> %s', method.upper(), operation_id,
+                     extra=vars(operation))
+
+        self.router.add_url_rule(path, operation_id, operation.function,
+                                 methods=[method], types=operation.get_path_parameter_types())
+
+    @property
+    def _handlers(self):
+        # type: () -> InternalHandlers
+        if not hasattr(self, '_internal_handlers'):
+            self._internal_handlers = InternalHandlers(self)
+        return self._internal_handlers
+
+    async def get_request(self, scope, receive, **path_params):
+        """Reads the request body from the ASGI ``receive`` awaitable and
+        creates the SpecificRequest instance for the operation handler.
+
+        Large JSON and form bodies are parsed in the thread pool.
+
+        :rtype: SpecificRequest
+        """
+        body = await self._read_body(receive)
+        headers = Headers([(k.decode('latin-1'), v.decode('latin-1'))
+                           for k, v in scope.get('headers', [])])
+        query = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'),
+                                    keep_blank_values=True))
+        if len(body) > self.options.executor_body_size:
+            form, files, json_body = await self.run_in_executor(self._parse_body, headers, body)
+        else:
+            form, files, json_body = self._parse_body(headers, body)
+
+        request = SpecificRequest(
+            self._get_url(scope, headers),
+            scope['method'],
+            headers=headers,
+            form=form,
+            query=query,
+            body=body,
+            json_getter=lambda: json_body,
+            files=files,
+            path_params=path_params,
+            context={}
+        )
+        logger.debug('Getting data and status code',
+                     extra={
+                         'data': request.body,
+                         'data_type': type(request.body),
+                         'url': request.url
+                     })
+        return request
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        if len(chunks) == 1:
+            return chunks[0]
+        return b''.join(chunks)
+
+    @staticmethod
+    def _get_url(scope, headers):
+        host = headers.get('Host')
+        if host is None and scope.get('server'):
+            host = '{}:{}'.format(*scope['server'])
+        url = '{scheme}://{host}{root_path}{path}'.format(
+            scheme=scope.get('scheme', 'http'),
+            host=host or 'localhost',
+            root_path=scope.get('root_path', ''),
+            path=scope['path'])
+        query_string = scope.get('query_string', b'')
+        if query_string:
+            url += '?' + query_string.decode('latin-1')
+        return url
+
+    @classmethod
+    def _parse_body(cls, headers, body):
+        """
+        :return: the form, the files and the decoded JSON body
+        :rtype: (MultiDict, MultiDict, object)
+        """
+        mimetype, mimetype_options = parse_options_header(headers.get('Content-Type', ''))
+        form, files, json_body = MultiDict(), MultiDict(), None
+        if is_json_mimetype(mimetype):
+            try:
+                json_body = cls.jsonifier.json.loads(body.decode(mimetype_options.get('charset', 'utf-8')))
+            except ValueError:
+                pass
+        elif body and is_form_mimetype(mimetype):
+            _, form, files = FormDataParser().parse(BytesIO(body), mimetype, len(body), mimetype_options)
+        return form, files, json_body
+
+    @classmethod
+    def get_response(cls, response, mimetype=None, request=None):
+        """Gets AsgiResponse instance for the operation handler
+        result. Status Code and Headers for response.  If only body
+        data is returned by the endpoint function, then the status
+        code will be set to 200 and no headers will be added.
+
+        If the returned object is an AsgiResponse then it will just
+        pass the information needed to recreate it.
+
+        :type response: AsgiResponse | SpecificResponse | (object, int) | (object, int, dict) | object
+        :rtype: AsgiResponse
+        """
+        logger.debug('Getting data and status code',
+                     extra={
+                         'data': response,
+                         'data_type': type(response),
+                         'url': request.url if request else None
+                     })
+
+        if isinstance(response, AsgiResponse):
+            asgi_response = response
+        elif isinstance(response, SpecificResponse):
+            asgi_response = cls._build_response(
+                mimetype=response.mimetype or mimetype,
+                content_type=response.content_type,
+                headers=response.headers,
+                status_code=response.status_code,
+                data=response.body)
+        elif isinstance(response, tuple) and len(response) == 3:
+            data, status_code, headers = response
+            asgi_response = cls._build_response(mimetype, None, headers, status_code, data)
+        elif isinstance(response, tuple) and len(response) == 2:
+            data, status_code = response
+            asgi_response = cls._build_response(mimetype, None, None, status_code, data)
+        else:
+            asgi_response = cls._build_response(mimetype=mimetype, data=response)
+
+        logger.debug('Got data and status code (%d)',
+                     asgi_response.status_code,
+                     extra={
+                         'data': response,
+                         'datatype': type(response),
+                         'url': request.url if request else None
+                     })
+
+        return asgi_response
+
+    @classmethod
+    def _build_response(cls, mimetype=None, content_type=None,
+                        headers=None, status_code=None, data=None):
+        if status_code is None:
+            status_code = 200
+        # If we got an enum instead of an int, extract the value.
+        if hasattr(status_code, "value"):
+            status_code = status_code.value
+
+        if data is None or data is NoContent:
+            body = b''
+        else:
+            body = cls._jsonify_data(data, mimetype)
+
+        if content_type is None and mimetype is not None:
+            content_type = mimetype
+            if mimetype.startswith('text/'):
+                content_type += '; charset=utf-8'
+
+        return AsgiResponse(body=body, status_code=status_code, headers=headers,
+                            content_type=content_type)
+
+    @classmethod
+    def _jsonify_data(cls, data, mimetype):
+        if (isinstance(mimetype, str) and is_json_mimetype(mimetype)) \
+                or not isinstance(data, (bytes, str)):
+            return cls.jsonifier.dumps(data)
+
+        return data
+
+    @classmethod
+    def get_specific_response(cls, response, mimetype=None):
+        if isinstance(response, SpecificResponse):
+            return response
+
+        if not isinstance(response, AsgiResponse):
+            response = cls.get_response(response, mimetype)
+
+        return SpecificResponse(
+            status_code=response.status_code,
+            mimetype=response.mimetype,
+            content_type=response.content_type,
+            headers=response.headers,
+            body=response.body,
+        )
+
+    @classmethod
+    def _set_jsonifier(cls):
+        import json
+        cls.jsonifier = Jsonifier(json)
+
+
+class InternalHandlers(object):
+    """
+    ASGI handlers for internally registered endpoints.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.options = api.options
+
+    def console_ui_home(self, scope, receive):
+        """
+        Home page of the OpenAPI Console UI.
+
+        :return:
+        """
+        openapi_json_url = '{root_path}{base_path}{spec_path}'.format(
+            root_path=scope.get('root_path', ''),
+            base_path=self.api.base_path,
+            spec_path=self.options.openapi_spec_path)
+        template_path = pathlib.Path(self.options.openapi_console_ui_from_dir) / 'index.j2'
+        template = jinja2.Template(template_path.read_text())
+        return AsgiApi._build_response(content_type='text/html; charset=utf-8',
+                                       data=template.render(openapi_spec_url=openapi_json_url))
+
+    async def console_ui_static_files(self, scope, receive, filename):
+        """
+        Servers the static files for the OpenAPI Console UI.
+
+        :param filename: Requested file contents.
+        :return:
+        """
+        # convert PosixPath to str
+        static_dir = str(self.options.openapi_console_ui_from_dir)
+        path = safe_join(static_dir, filename)
+        if path is None or not pathlib.Path(path).is_file():
+            raise werkzeug.exceptions.NotFound()
+        body = await self.api.run_in_executor(pathlib.Path(path).read_bytes)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return AsgiResponse(body=body, content_type=content_type)
@@ -0,0 +1,133 @@
+import re
+
+import werkzeug.exceptions
+
+PATH_PARAMETER = re.compile(r'\{([^}]*)\}')
+
+# map Swagger type to the path parameter pattern and converter,
+# mirroring the flask path converters
+PATH_PARAMETER_CONVERTERS = {
+    'integer': (r'\d+', int),
+    'number': (r'\d+\.\d+', float),
+    'path': (r'[^/].*?', None)
+}
+DEFAULT_PATH_PARAMETER_PATTERN = r'[^/]+'
+
+
+def convert_path_parameter(match, types, names):
+    name = match.group(1)
+    pattern, converter = PATH_PARAMETER_CONVERTERS.get(
+        types.get(name), (DEFAULT_PATH_PARAMETER_PATTERN, None))
+    names.append((name.replace('-', '_'), converter))
+    return '({})'.format(pattern)
+
+
+def asgify_path(swagger_path, types=None):
+    """
+    Convert swagger path templates to a regular expression and the list
+    of the path parameter names and converters, in matching order.
+
+    :type swagger_path: str
+    :type types: dict
+    :rtype: (re.Pattern, list)
+
+    >>> asgify_path('/foo-bar/{my-param}')[1]
+    [('my_param', None)]
+    """
+    if types is None:
+        types = {}
+    names = []
+    pattern = []
+    position = 0
+    for match in PATH_PARAMETER.finditer(swagger_path):
+        pattern.append(re.escape(swagger_path[position:match.start()]))
+        pattern.append(convert_path_parameter(match, types, names))
+        position = match.end()
+    pattern.append(re.escape(swagger_path[position:]))
+    return re.compile('^{}$'.format(''.join(pattern))), names
+
+
+class Route(object):
+
+    def __init__(self, rule, endpoint, view_func, methods, types=None):
+        self.rule = rule
+        self.endpoint = endpoint
+        self.view_func = view_func
+        self.methods = set(method.upper() for method in methods)
+        self.regex, self.parameters = asgify_path(rule, types)
+        # like werkzeug, prefer static rules to dynamic ones, and catch-all
+        # path parameters last
+        names = PATH_PARAMETER.findall(rule)
+        self.weight = (sum((types or {}).get(name) == 'path' for name in names), len(names))
+
+    def match(self, path):
+        """
+        :return: path parameters if the path matches this route, else None
+        :rtype: dict | None
+        """
+        match = self.regex.match(path)
+        if match is None:
+            return None
+        path_params = {}
+        for (name, converter), value in zip(self.parameters, match.groups()):
+            path_params[name] = converter(value) if converter else value
+        return path_params
+
+
+class Router(object):
+    """
+    Minimal router for ASGI applications, with the role of the flask
+    blueprints and url map. Rules use the swagger path template syntax.
+    """
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.routes = []
+        self.routers = []
+
+    def add_url_rule(self, rule, endpoint=None, view_func=None, methods=None, types=None):
+        """
+        :param types: swagger types of the path parameters
+        :type types: dict | None
+        """
+        methods = methods or ['GET']
+        self.routes.append(Route(self.prefix + rule, endpoint, view_func, methods, types))
+        self.routes.sort(key=lambda route: route.weight)
+
+    def route(self, rule, **options):
+        def decorator(view_func):
+            self.add_url_rule(rule, options.pop('endpoint', view_func.__name__), view_func, **options)
+            return view_func
+        return decorator
+
+    def register_router(self, router):
+        self.routers.append(router)
+
+    def iter_routes(self):
+        for route in self.routes:
+            yield route
+        for router in self.routers:
+            for route in router.iter_routes():
+                yield route
+
+    def match(self, method, path):
+        """
+        Finds the view function for a request.
+
+        :raises werkzeug.exceptions.NotFound: no rule matches the path
+        :raises werkzeug.exceptions.MethodNotAllowed: the method is not allowed for the matching rules
+        :rtype: (types.FunctionType, dict)
+        """
+        method = method.upper()
+        allowed_methods = set()
+        for route in self.iter_routes():
+            path_params = route.match(path)
+            if path_params is None:
+                continue
+            if method in route.methods or (method == 'HEAD' and 'GET' in route.methods):
+                return route.view_func, path_params
+            allowed_methods.update(route.methods)
+
+        if allowed_methods:
+            raise werkzeug.exceptions.MethodNotAllowed(valid_methods=sorted(allowed_methods))
+        raise werkzeug.exceptions.NotFound()
@@ -1,9 +1,15 @@
 import abc
+import contextlib
+import functools
 import logging
 import pathlib
+import threading
 
 import six
 
+from ..exceptions import SpecificException
+from ..metrics import (PROMETHEUS_CONTENT_TYPE, get_metrics_backend,
+                       render_prometheus)
 from ..options import SpecificOptions
 from ..resolver import Resolver
 
@@ -12,6 +18,9 @@ logger = logging.getLogger(__name__)
 
 @six.add_metaclass(abc.ABCMeta)
 class AbstractApp(object):
+    # servers which can serve a bound socket in forked workers, see `serve_worker`
+    worker_servers = ()
+
     def __init__(self, import_name, api_cls, port=None, specification_dir='',
                  host=None, server=None, arguments=None, auth_all_paths=False, debug=False,
                  resolver=None, options=None):
@@ -47,6 +56,15 @@ class AbstractApp(object):
         self.auth_all_paths = auth_all_paths
 
         self.options = SpecificOptions(options)
+        self.metrics = get_metrics_backend(self.options)
+        if self.metrics is not None:
+            # the APIs of the application share its backend, e.g. the histograms kept in memory
+            self.options = self.options.extend({'metrics': self.metrics})
+        self.apis = []
+        # without warmup the application is ready as soon as it serves
+        self.ready = not self.options.warmup
+        self._warmup_thread = None
+        self._warmup_lock = threading.Lock()
 
         self.app = self.create_app()
         self.server = server
@@ -66,6 +84,11 @@ class AbstractApp(object):
         logger.debug('Setting error handlers')
         self.set_errors_handlers()
 
+        if self.options.warmup:
+            self.add_readiness_endpoint(self.options.readiness_path)
+        if self.options.metrics:
+            self.add_metrics_endpoint(self.options.metrics_path)
+
     @abc.abstractmethod
     def create_app(self):
         """
@@ -153,12 +176,94 @@ class AbstractApp(object):
                            pythonic_params=pythonic_params,
                            pass_context_arg_name=pass_context_arg_name,
                            options=api_options.as_dict())
+        self.apis.append(api)
         return api
 
     def _resolver_error_handler(self, *args, **kwargs):
         from specific.handlers import ResolverErrorHandler
         return ResolverErrorHandler(self.api_cls, self.resolver_error, *args, **kwargs)
 
+    def add_stage_listener(self, listener):
+        """
+        Adds a listener of the stages of the request pipeline to the APIs added
+        afterwards, see `specific.tracing.StageListener`.
+        :type listener: specific.tracing.StageListener
+        """
+        self.options = self.options.extend({'stage_listeners': self.options.stage_listeners + [listener]})
+
+    def add_readiness_endpoint(self, path):
+        """
+        Adds the readiness endpoint to the user framework application, it responds
+        with `readiness()`.
+        :type path: str
+        """
+        raise SpecificException('The warmup option requires a readiness endpoint, which {} does not support'.format(
+            type(self).__name__))
+
+    def readiness(self):
+        """
+        Response of the readiness endpoint, 503 until the warmup is done so that
+        load balancers do not send traffic to a cold application. The first
+        probe starts the warmup when the application is served by an external
+        server (gunicorn, uwsgi..), without `run`.
+        :rtype: (dict, int)
+        """
+        if self.ready:
+            return {'status': 'ready'}, 200
+        self.start_warmup()
+        return {'status': 'warming up'}, 503
+
+    def add_metrics_endpoint(self, path):
+        """
+        Adds the metrics endpoint to the user framework application, it responds
+        with `metrics_response()`.
+        :type path: str
+        """
+        raise SpecificException('The metrics option requires a metrics endpoint, which {} does not support'.format(
+            type(self).__name__))
+
+    def metrics_response(self):
+        """
+        Response of the metrics endpoint, the metrics of the APIs in the
+        Prometheus text exposition format.
+        :rtype: (str, int, dict)
+        """
+        backends = [self.metrics] + [api.metrics for api in self.apis]
+        return render_prometheus(backends), 200, {'Content-Type': PROMETHEUS_CONTENT_TYPE}
+
+    def warmup(self):
+        """
+        Runs an example request through each operation of the APIs, see
+        `AbstractAPI.warmup`, then reports the application as ready.
+        """
+        logger.info('Warming up the operations..')
+        with self._warmup_context():
+            failures = sum(api.warmup() for api in self.apis)
+        if failures:
+            logger.warning('%d operations failed the warmup', failures)
+        self.ready = True
+
+    def start_warmup(self):
+        """
+        Warms up in a background thread, while the application serves the
+        readiness endpoint. The warmup is started once, and not after a
+        warmup in the foreground.
+        :rtype: threading.Thread | None
+        """
+        with self._warmup_lock:
+            if self._warmup_thread is None and not self.ready:
+                self._warmup_thread = threading.Thread(target=self.warmup, name='specific-warmup')
+                self._warmup_thread.daemon = True
+                self._warmup_thread.start()
+        return self._warmup_thread
+
+    @contextlib.contextmanager
+    def _warmup_context(self):
+        """
+        Context of the user framework in which the operations are warmed up.
+        """
+        yield
+
     def add_url_rule(self, rule, endpoint=None, view_func=None, **options):
         """
         Connects a URL rule.  Works exactly like the `route` decorator.  If a view_func is provided it will be
@@ -238,6 +343,45 @@ class AbstractApp(object):
         :param options: options to be forwarded to the underlying server
         """
 
+    def run_workers(self, workers, max_worker_memory=None, reuse_port=False, **options):
+        """
+        Runs the application in worker processes forked from this one, which
+        share the loaded specifications.
+        :param workers: number of worker processes
+        :type workers: int
+        :param max_worker_memory: restart the workers using more megabytes of resident memory
+        :type max_worker_memory: int | None
+        :param reuse_port: bind a SO_REUSEPORT socket in each worker instead of sharing one socket
+        :type reuse_port: bool
+        :param options: options to be forwarded to the underlying server
+        """
+        from .prefork import PreforkServer
+
+        # fail in the master, the workers would be respawned in a loop
+        if self.server not in self.worker_servers:
+            raise Exception('Server {} does not support workers'.format(self.server))
+        logger.debug('Starting %d %s workers..', workers, self.server, extra=vars(self))
+        server = PreforkServer(functools.partial(self._serve_worker, **options),
+                               self.host, self.port, workers,
+                               max_worker_memory=max_worker_memory and max_worker_memory * 1024 * 1024,
+                               reuse_port=reuse_port)
+        server.run()
+
+    def _serve_worker(self, sock, **options):
+        if self.options.warmup:
+            # warm up before accepting connections, the workers which are
+            # ready take the connections of the shared socket meanwhile
+            self.warmup()
+        self.serve_worker(sock, **options)
+
+    def serve_worker(self, sock, **options):
+        """
+        Serves the application on a bound socket in a worker process, until SIGTERM.
+        :type sock: socket.socket
+        :param options: options to be forwarded to the underlying server
+        """
+        raise Exception('Server {} does not support workers'.format(self.server))
+
     def __call__(self, environ, start_response):  # pragma: no cover
         """
         Makes the class callable to be WSGI-compliant. As Flask is used to handle requests,
@@ -245,4 +389,6 @@ class AbstractApp(object):
         This is an abstraction to avoid directly referencing the app attribute from outside the
         class and protect it from unwanted modification.
         """
+        if not self.ready:
+            self.start_warmup()
         return self.app(environ, start_response)
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import pathlib
+import pkgutil
+import sys
+
+import werkzeug.exceptions
+from aiohttp import web
+
+from ..apis.aiohttp_api import AioHttpApi
+from ..exceptions import ProblemException
+from ..problem import problem
+from .abstract import AbstractApp
+
+logger = logging.getLogger(__name__)
+
+
+class AioHttpApp(AbstractApp):
+    """
+    aiohttp.web application, served by aiohttp's own server.
+    """
+    worker_servers = ('aiohttp',)
+
+    def __init__(self, import_name, server='aiohttp', **kwargs):
+        self.error_handlers = {}
+        super(AioHttpApp, self).__init__(import_name, AioHttpApi, server=server, **kwargs)
+
+    def create_app(self):
+        return web.Application(middlewares=[self._error_middleware])
+
+    def get_root_path(self):
+        mod = sys.modules.get(self.import_name)
+        if mod is not None and getattr(mod, '__file__', None):
+            return pathlib.Path(mod.__file__).resolve().parent
+        loader = pkgutil.get_loader(self.import_name)
+        filepath = None
+        if hasattr(loader, 'get_filename'):
+            filepath = loader.get_filename(self.import_name)
+        if filepath is None:
+            raise RuntimeError("Invalid import name '{}'".format(self.import_name))
+        return pathlib.Path(filepath).resolve().parent
+
+    def set_errors_handlers(self):
+        for error_code in werkzeug.exceptions.default_exceptions:
+            self.add_error_handler(error_code, self.common_error_handler)
+
+        self.add_error_handler(ProblemException, self.common_error_handler)
+
+    @staticmethod
+    def common_error_handler(exception):
+        """
+        :type exception: Exception
+        """
+        if isinstance(exception, ProblemException):
+            response = exception.to_problem()
+        else:
+            if not isinstance(exception, werkzeug.exceptions.HTTPException):
+                exception = werkzeug.exceptions.InternalServerError()
+
+            response = problem(title=exception.name, detail=exception.description,
+                               status=exception.code)
+
+        return AioHttpApi.get_response(response)
+
+    def add_api(self, specification, **kwargs):
+        api = super(AioHttpApp, self).add_api(specification, **kwargs)
+        self.app.router.add_routes(api.routes)
+        return api
+
+    def add_readiness_endpoint(self, path):
+        self.app.router.add_get(path, self._readiness_handler)
+        self.app.on_startup.append(self._start_warmup)
+
+    async def _start_warmup(self, app):
+        self.start_warmup()
+
+    async def _readiness_handler(self, request):
+        return AioHttpApi.get_response(self.readiness(), mimetype='application/json')
+
+    def add_metrics_endpoint(self, path):
+        self.app.router.add_get(path, self._metrics_handler)
+
+    async def _metrics_handler(self, request):
+        return AioHttpApi.get_response(self.metrics_response())
+
+    def add_error_handler(self, error_code, function):
+        """
+        :param error_code: HTTP status code or exception class
+        :type error_code: int | type
+        :param function: called with the exception, returns a response
+        :type function: types.FunctionType
+        """
+        self.error_handlers[error_code] = function
+
+    def _get_error_handler(self, exception):
+        if isinstance(exception, werkzeug.exceptions.HTTPException) \
+                and exception.code in self.error_handlers:
+            return self.error_handlers[exception.code]
+        for exception_class in type(exception).__mro__:
+            if exception_class in self.error_handlers:
+                return self.error_handlers[exception_class]
+        return self.error_handlers.get(500, self.common_error_handler)
+
+    @web.middleware
+    async def _error_middleware(self, request, handler):
+        try:
+            return await handler(request)
+        except web.HTTPException as exception:
+            # aiohttp raises routing errors, redirects are responses
+            if exception.status < 400:
+                raise
+            exception_class = werkzeug.exceptions.default_exceptions.get(exception.status)
+            if exception_class is None:
+                raise
+            if exception.status == 405:
+                exception = exception_class(valid_methods=sorted(exception.allowed_methods))
+            else:
+                exception = exception_class()
+            return await self._handle_error(exception)
+        except Exception as exception:
+            return await self._handle_error(exception)
+
+    async def _handle_error(self, exception):
+        if not isinstance(exception, (werkzeug.exceptions.HTTPException, ProblemException)):
+            logger.exception('Exception on request')
+        response = self._get_error_handler(exception)(exception)
+        while asyncio.iscoroutine(response):
+            response = await response
+        return AioHttpApi.get_response(response)
+
+    def run(self, port=None, server=None, debug=None, host=None, workers=1,
+            max_worker_memory=None, reuse_port=False, **options):  # pragma: no cover
+        """
+        Runs the application with the aiohttp server.
+        :param host: the host interface to bind on.
+        :type host: str
+        :param port: port to listen to
+        :type port: int
+        :param server: which server to use
+        :type server: str | None
+        :param debug: include debugging information
+        :type debug: bool
+        :param workers: number of worker processes, forked after the application is loaded
+        :type workers: int
+        :param max_worker_memory: restart the workers using more megabytes of resident memory
+        :type max_worker_memory: int | None
+        :param reuse_port: bind a SO_REUSEPORT socket in each worker instead of sharing one socket
+        :type reuse_port: bool
+        :param options: options to be forwarded to the underlying server
+        """
+        # this functions is not covered in unit tests because we would effectively testing the mocks
+
+        # overwrite constructor parameter
+        if port is not None:
+            self.port = port
+        elif self.port is None:
+            self.port = 5000
+
+        self.host = host or self.host or '0.0.0.0'
+
+        if server is not None:
+            self.server = server
+
+        if debug is not None:
+            self.debug = debug
+
+        if workers > 1:
+            self.run_workers(workers, max_worker_memory, reuse_port, **options)
+            return
+
+        if self.options.warmup:
+            self.start_warmup()
+
+        logger.debug('Starting %s HTTP server..', self.server, extra=vars(self))
+        if self.server == 'aiohttp':
+            logger.info('Listening on %s:%s..', self.host, self.port)
+            web.run_app(self.app, host=self.host, port=self.port, **options)
+        else:
+            raise Exception('Server {} not recognized'.format(self.server))
+
+    def serve_worker(self, sock, **options):
+        if self.server not in self.worker_servers:
+            return super(AioHttpApp, self).serve_worker(sock, **options)
+
+        web.run_app(self.app, sock=sock, **options)
@@ -6,17 +6,21 @@ from types import FunctionType  # NOQA
 
 import flask
 import werkzeug.exceptions
+import werkzeug.serving
 from flask import json
 
 from ..apis.flask_api import FlaskApi
 from ..exceptions import ProblemException
 from ..problem import problem
 from .abstract import AbstractApp
+from .prefork import handle_requests
 
 logger = logging.getLogger(__name__)
 
 
 class FlaskApp(AbstractApp):
+    worker_servers = ('flask',)
+
     def __init__(self, import_name, server='flask', **kwargs):
         super(FlaskApp, self).__init__(import_name, FlaskApi, server=server, **kwargs)
 
@@ -59,7 +63,24 @@ class FlaskApp(AbstractApp):
         # type: (int, FunctionType) -> None
         self.app.register_error_handler(error_code, function)
 
-    def run(self, port=None, server=None, debug=None, host=None, **options):  # pragma: no cover
+    def add_readiness_endpoint(self, path):
+        self.app.add_url_rule(path, 'specific_readiness', self._readiness_view)
+
+    def _readiness_view(self):
+        return FlaskApi.get_response(self.readiness(), mimetype='application/json')
+
+    def add_metrics_endpoint(self, path):
+        self.app.add_url_rule(path, 'specific_metrics', self._metrics_view)
+
+    def _metrics_view(self):
+        return FlaskApi.get_response(self.metrics_response())
+
+    def _warmup_context(self):
+        # the responses are built with the flask response class of the current app
+        return self.app.test_request_context()
+
+    def run(self, port=None, server=None, debug=None, host=None, workers=1,
+            max_worker_memory=None, reuse_port=False, **options):  # pragma: no cover
         """
         Runs the application on a local development server.
         :param host: the host interface to bind on.
@@ -70,6 +91,12 @@ class FlaskApp(AbstractApp):
         :type server: str | None
         :param debug: include debugging information
         :type debug: bool
+        :param workers: number of worker processes, forked after the application is loaded
+        :type workers: int
+        :param max_worker_memory: restart the workers using more megabytes of resident memory
+        :type max_worker_memory: int | None
+        :param reuse_port: bind a SO_REUSEPORT socket in each worker instead of sharing one socket
+        :type reuse_port: bool
         :param options: options to be forwarded to the underlying server
         """
         # this functions is not covered in unit tests because we would effectively testing the mocks
@@ -88,6 +115,15 @@ class FlaskApp(AbstractApp):
         if debug is not None:
             self.debug = debug
 
+        if workers > 1:
+            # compile the url map once, before the workers are forked
+            self.app.url_map.update()
+            self.run_workers(workers, max_worker_memory, reuse_port, **options)
+            return
+
+        if self.options.warmup:
+            self.start_warmup()
+
         logger.debug('Starting %s HTTP server..', self.server, extra=vars(self))
         if self.server == 'flask':
             self.app.run(self.host, port=self.port, debug=self.debug, **options)
@@ -114,6 +150,13 @@ class FlaskApp(AbstractApp):
         else:
             raise Exception('Server {} not recognized'.format(self.server))
 
+    def serve_worker(self, sock, **options):
+        if self.server not in self.worker_servers:
+            return super(FlaskApp, self).serve_worker(sock, **options)
+
+        server = werkzeug.serving.make_server(self.host, self.port, self.app, fd=sock.fileno(), **options)
+        handle_requests(server)
+
 
 class FlaskJSONEncoder(json.JSONEncoder):
     def default(self, o):
@@ -0,0 +1,253 @@
+import errno
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# the workers exiting sooner after their start failed to start
+MIN_WORKER_LIFETIME = 1.0
+MAX_SPAWN_DELAY = 60.0
+
+
+def get_rss(pid):
+    """
+    Resident set size of a process in bytes, read from procfs.
+
+    :type pid: int
+    :return: None where procfs is not available
+    :rtype: int | None
+    """
+    try:
+        with open('/proc/{}/statm'.format(pid)) as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def bind_socket(host, port, reuse_port=False, backlog=2048):
+    """
+    Creates a listening TCP socket.
+
+    :param reuse_port: set SO_REUSEPORT, so that several processes can bind the same
+        address and the kernel balances the connections between them
+    :type reuse_port: bool
+    :rtype: socket.socket
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise RuntimeError('SO_REUSEPORT is not supported on this platform')
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    if hasattr(sock, 'set_inheritable'):  # pragma: 2.7 no cover
+        sock.set_inheritable(True)
+    return sock
+
+
+def handle_requests(server):
+    """
+    Serves a `socketserver.BaseServer` until SIGTERM. The request in progress
+    is completed before returning.
+    """
+    stopped = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.append(signum))
+    server.timeout = 0.5
+    try:
+        while not stopped:
+            server.handle_request()
+    finally:
+        server.server_close()
+
+
+class PreforkServer(object):
+    """
+    Serves the application from several forked worker processes.
+
+    The application, and so the specification and its compiled validators, is
+    loaded once in the master process. The objects are frozen out of the garbage
+    collector before forking so that the workers share their memory pages
+    copy-on-write.
+    """
+
+    def __init__(self, serve, host, port, workers, max_worker_memory=None,
+                 reuse_port=False, poll_interval=1.0, graceful_timeout=30.0, max_failed_starts=10):
+        """
+        :param serve: called with the listening socket in each worker, serves until the worker is stopped
+        :type serve: types.FunctionType
+        :type host: str
+        :type port: int
+        :param workers: number of worker processes
+        :type workers: int
+        :param max_worker_memory: workers with a larger resident set size, in bytes, are restarted
+        :type max_worker_memory: int | None
+        :param reuse_port: each worker binds its own SO_REUSEPORT socket, instead of
+            inheriting the socket bound by the master
+        :type reuse_port: bool
+        :param poll_interval: seconds between the checks of the workers
+        :type poll_interval: float
+        :param graceful_timeout: seconds given to the workers to finish their requests on shutdown
+        :type graceful_timeout: float
+        :param max_failed_starts: number of workers in a row exiting right after their start
+            from which the server stops, the workers are respawned with an exponential delay
+            until then
+        :type max_failed_starts: int
+        """
+        self.serve = serve
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_worker_memory = max_worker_memory
+        self.reuse_port = reuse_port
+        self.poll_interval = poll_interval
+        self.graceful_timeout = graceful_timeout
+        self.max_failed_starts = max_failed_starts
+        self.socket = None
+        self.worker_pids = set()
+        self.worker_starts = {}
+        self.failed_starts = 0
+        self.next_spawn = 0
+        self.alive = True
+
+    def run(self):
+        """
+        Starts the workers and supervises them until SIGINT or SIGTERM.
+        """
+        if not self.reuse_port:
+            self.socket = bind_socket(self.host, self.port)
+        logger.info('Listening on %s:%s with %d workers..', self.host, self.port, self.workers)
+
+        # avoid freeing memory in the master, as it would unshare pages of the workers
+        gc.disable()
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        try:
+            while self.alive:
+                self.reap_workers()
+                if self.failed_starts >= self.max_failed_starts:
+                    raise RuntimeError('{} workers in a row exited right after their start'.format(
+                        self.failed_starts))
+                self.check_workers_memory()
+                while self.alive and len(self.worker_pids) < self.workers and time.time() >= self.next_spawn:
+                    self.spawn_worker()
+                time.sleep(self.poll_interval)
+        finally:
+            self.stop_workers()
+            if self.socket is not None:
+                self.socket.close()
+
+    def _handle_stop(self, signum, frame):
+        logger.info('Received signal %d, stopping the workers..', signum)
+        self.alive = False
+
+    def spawn_worker(self):
+        if hasattr(gc, 'freeze'):  # pragma: 2.7 no cover
+            gc.freeze()
+        pid = os.fork()
+        if pid:
+            self.worker_pids.add(pid)
+            self.worker_starts[pid] = time.time()
+            logger.debug('Started worker %d', pid)
+            return pid
+
+        # worker process
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            gc.enable()
+            sock = self.socket
+            if sock is None:
+                sock = bind_socket(self.host, self.port, reuse_port=True)
+            self.serve(sock)
+        except SystemExit as exception:
+            exit_code = exception.code if isinstance(exception.code, int) else 0
+        except BaseException:
+            logger.exception('Worker %d failed', os.getpid())
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    def reap_workers(self):
+        """
+        Collects the exited workers, they are replaced by the supervision loop.
+        """
+        while self.worker_pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as exception:
+                if exception.errno != errno.ECHILD:
+                    raise
+                self.worker_pids.clear()
+                self.worker_starts.clear()
+                return
+            if not pid:
+                return
+            if pid in self.worker_pids:
+                self.worker_pids.discard(pid)
+                logger.info('Worker %d exited with status %d', pid, status)
+                self._check_worker_start(time.time() - self.worker_starts.pop(pid, 0))
+
+    def _check_worker_start(self, lifetime):
+        """
+        Delays the next spawns exponentially while the workers exit right after their start.
+
+        :param lifetime: seconds between the start and the exit of a worker
+        :type lifetime: float
+        """
+        if lifetime >= MIN_WORKER_LIFETIME:
+            self.failed_starts = 0
+            self.next_spawn = 0
+            return
+        self.failed_starts += 1
+        delay = min(self.poll_interval * 2 ** self.failed_starts, MAX_SPAWN_DELAY)
+        logger.error('Worker exited %.2f seconds after its start, respawning in %.1f seconds',
+                     lifetime, delay)
+        self.next_spawn = time.time() + delay
+
+    def check_workers_memory(self):
+        """
+        Gracefully stops the workers exceeding the memory limit.
+        """
+        if not self.max_worker_memory:
+            return
+        for pid in list(self.worker_pids):
+            rss = get_rss(pid)
+            if rss is not None and rss > self.max_worker_memory:
+                logger.warning('Worker %d uses %d bytes, over the limit of %d bytes, restarting it',
+                               pid, rss, self.max_worker_memory)
+                self.kill_worker(pid, signal.SIGTERM)
+
+    def kill_worker(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except OSError as exception:
+            if exception.errno != errno.ESRCH:
+                raise
+
+    def stop_workers(self):
+        for pid in self.worker_pids:
+            self.kill_worker(pid, signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout
+        while self.worker_pids and time.time() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        for pid in list(self.worker_pids):
+            logger.warning('Worker %d did not stop in time, killing it', pid)
+            self.kill_worker(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except OSError as exception:
+                if exception.errno != errno.ECHILD:
+                    raise
+        self.worker_pids.clear()
+        self.worker_starts.clear()
@@ -0,0 +1,175 @@
+"""
+In-process benchmark of the operations of an API: example requests built from
+the specification (see `AbstractOperation.example_request`) are sent through
+the WSGI application with the werkzeug test client, and the latency of each
+operation is compared with the time spent in its handler.
+"""
+import collections
+import timeit
+
+import six
+from werkzeug.datastructures import FileStorage, MultiDict
+
+from .tracing import StageListener
+
+PERCENTILES = (50, 95, 99)
+
+
+class HandlerTimer(StageListener):
+    """
+    Sums the time spent in the "handler" stage of each operation.
+    """
+
+    def __init__(self):
+        self.durations = collections.defaultdict(float)
+
+    def stage_finished(self, stage, operation_id, request, duration, started):
+        if stage == 'handler':
+            self.durations[operation_id] += duration
+
+
+def example_request_arguments(operation, headers=None):
+    """
+    :param headers: sent on top of the example headers, e.g. credentials
+    :type headers: dict | None
+    :return: the arguments of `werkzeug.test.Client.open` for an example
+        request to the operation
+    :rtype: dict
+    """
+    request = operation.example_request()
+    request_headers = dict(request.headers)
+    request_headers.update(headers or {})
+    arguments = {
+        'path': six.moves.urllib.parse.urlsplit(request.url).path,
+        'method': request.method,
+        'query_string': request.query,
+        'content_type': request_headers.pop('Content-Type', None),
+        'headers': request_headers,
+    }
+    if request.form or request.files:
+        data = MultiDict(request.form)
+        for name, value in request.files.items(multi=True):
+            if isinstance(value, FileStorage):
+                value = (six.BytesIO(value.read()), value.filename)
+            data.add(name, value)
+        arguments['data'] = data
+    elif request.body:
+        arguments['data'] = request.body
+    return arguments
+
+
+def percentile(latencies, percent):
+    """
+    :param latencies: sorted latencies
+    :type latencies: list[float]
+    :type percent: int
+    :rtype: float
+    """
+    return latencies[min(len(latencies) * percent // 100, len(latencies) - 1)]
+
+
+def bench_operation(client, operation, handler_timer, requests=100, warmup=5, headers=None):
+    """
+    Sends example requests to an operation.
+
+    :type client: werkzeug.test.Client
+    :type operation: specific.operations.AbstractOperation
+    :param handler_timer: listener of the stages of the API
+    :type handler_timer: HandlerTimer
+    :param requests: number of timed requests
+    :type requests: int
+    :param warmup: number of requests sent before the timed ones
+    :type warmup: int
+    :type headers: dict | None
+    :return: the latencies in milliseconds, the requests per second, the time
+        spent in the handler and the responses with an error status
+    :rtype: dict
+    """
+    clock = timeit.default_timer
+    latencies = []
+    errors = collections.Counter()
+    for index in range(warmup + requests):
+        arguments = example_request_arguments(operation, headers)
+        if index == warmup:
+            handler_timer.durations.pop(operation.operation_id, None)
+        start = clock()
+        response = client.open(**arguments)
+        elapsed = clock() - start
+        response.close()
+        if index >= warmup:
+            latencies.append(elapsed)
+            if response.status_code >= 400:
+                errors[response.status_code] += 1
+
+    latencies.sort()
+    total = sum(latencies)
+    handler = handler_timer.durations.get(operation.operation_id, 0.0)
+    result = {
+        'operation_id': operation.operation_id,
+        'method': operation.method.upper(),
+        'path': operation.api.base_path + operation.path,
+        'requests': requests,
+        'rps': requests / total if total else 0.0,
+        'handler_ms': handler * 1000 / requests,
+        'handler_share': handler / total if total else 0.0,
+        'errors': dict(errors),
+    }
+    for percent in PERCENTILES:
+        result['p{}_ms'.format(percent)] = percentile(latencies, percent) * 1000
+    return result
+
+
+def bench_api(app, handler_timer, operation_ids=None, requests=100, warmup=5, headers=None):
+    """
+    Sends example requests to the operations of the APIs of an app, one
+    operation after the other.
+
+    :type app: specific.apps.flask_app.FlaskApp
+    :param handler_timer: stage listener added to the app before its APIs
+    :type handler_timer: HandlerTimer
+    :param operation_ids: operations to benchmark, all of them by default
+    :type operation_ids: list[str] | None
+    :return: the results of `bench_operation`
+    :rtype: list[dict]
+    """
+    client = app.app.test_client()
+    results = []
+    for api in app.apis:
+        for operation in api.operations:
+            if operation_ids and operation.operation_id not in operation_ids:
+                continue
+            results.append(bench_operation(client, operation, handler_timer, requests, warmup, headers))
+    return results
+
+
+def format_report(results, overhead_threshold=0.5):
+    """
+    :param overhead_threshold: share of the latency spent out of the handler
+        from which the framework overhead is flagged
+    :type overhead_threshold: float
+    :return: a table of the results, the operations where the framework
+        overhead dominates marked with a star
+    :rtype: str
+    """
+    names = ['{} {}'.format(result['method'], result['path']) for result in results]
+    width = max([len(name) for name in names] + [len('operation')])
+    lines = ['{:<{width}} {:>10} {:>9} {:>9} {:>9} {:>10} {:>9}  {}'.format(
+        'operation', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'handler %', 'overhead', 'errors', width=width)]
+    for name, result in zip(names, results):
+        statuses = ', '.join('{}x{}'.format(count, status) for status, count in sorted(result['errors'].items()))
+        lines.append('{name:<{width}} {rps:>10.1f} {p50_ms:>9.2f} {p95_ms:>9.2f} {p99_ms:>9.2f} {handler:>10.1f} '
+                     '{overhead:>9}  {statuses}'.format(
+                         name=name, width=width,
+                         handler=result['handler_share'] * 100,
+                         overhead='*' if overhead_dominates(result, overhead_threshold) else '',
+                         statuses=statuses, **result).rstrip())
+    return '\n'.join(lines)
+
+
+def overhead_dominates(result, overhead_threshold=0.5):
+    """
+    :type result: dict
+    :type overhead_threshold: float
+    :rtype: bool
+    """
+    return 1 - result['handler_share'] > overhead_threshold
@@ -1,3 +1,4 @@
+import json
 import logging
 import sys
 from os import path
@@ -5,10 +6,25 @@ from os import path
 import click
 
 import specific
+from specific import bench as benchmark
+from specific import lint as linter
+from specific import loadtest as load
+from specific import traffic
+from specific.exceptions import InvalidSpecification
 from specific.mock import MockResolver
+from specific.spec import Specification
 from specific import utils
 
 logger = logging.getLogger(__name__)
+
+FLASK_APP = 'flask'
+AIOHTTP_APP = 'aiohttp'
+ASGI_APP = 'asgi'
+AVAILABLE_APPS = {
+    FLASK_APP: 'specific.apps.flask_app.FlaskApp',
+    AIOHTTP_APP: 'specific.apps.aiohttp_app.AioHttpApp',
+    ASGI_APP: 'specific.apps.asgi_app.AsgiApp',
+}
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
@@ -61,6 +77,19 @@ def main():
 @click.option('--verbose', '-v', help='Show verbose information.', count=True)
 @click.option('--base-path', metavar='PATH',
               help='Override the basePath in the API spec.')
+@click.option('--workers', '-w', default=1, type=click.IntRange(min=1),
+              help='Number of worker processes, forked after the API is loaded.')
+@click.option('--max-worker-memory', metavar='MB', type=click.IntRange(min=1),
+              help='Restart the workers using more megabytes of resident memory.')
+@click.option('--reuse-port',
+              help='Bind a SO_REUSEPORT socket in each worker instead of sharing one socket.',
+              is_flag=True, default=False)
+@click.option('--warmup',
+              help='Warm up the operations with example requests before reporting ready on /ready.',
+              is_flag=True, default=False)
+@click.option('--app-framework', '-f', default=FLASK_APP,
+              type=click.Choice(sorted(AVAILABLE_APPS)),
+              help='The app framework used to run the server.')
 def run(spec_file,
         base_module_path,
         port,
@@ -76,7 +105,12 @@ def run(spec_file,
         strict_validation,
         debug,
         verbose,
-        base_path):
+        base_path,
+        workers,
+        max_worker_memory,
+        reuse_port,
+        warmup,
+        app_framework):
     """
     Runs a server compliant with a OpenAPI Specification file.
 
@@ -114,11 +148,12 @@ def run(spec_file,
         "serve_spec": not hide_spec,
         "swagger_path": console_ui_from or None,
         "swagger_ui": not hide_console_ui,
-        "swagger_url": console_ui_url or None
+        "swagger_url": console_ui_url or None,
+        "warmup": warmup
     }
 
     app_cls = utils.get_function_from_name(
-        'specific.apps.flask_app.FlaskApp')
+        AVAILABLE_APPS[app_framework])
     app = app_cls(__name__,
                   debug=debug,
                   auth_all_paths=auth_all_paths,
@@ -133,7 +168,340 @@ def run(spec_file,
 
     app.run(port=port,
             host=host,
-            debug=debug)
+            debug=debug,
+            workers=workers,
+            max_worker_memory=max_worker_memory,
+            reuse_port=reuse_port)
+
+
+def parse_header(ctx, param, value):
+    headers = {}
+    for header in value:
+        name, separator, header_value = header.partition(':')
+        if not separator:
+            raise click.BadParameter('{!r} is not of the form "Name: value"'.format(header))
+        headers[name.strip()] = header_value.strip()
+    return headers
+
+
+@main.command()
+@click.argument('spec_file')
+@click.argument('base_module_path', required=False)
+@click.option('--mock', metavar='MOCKMODE', type=click.Choice(['all', 'notimplemented']),
+              help='Returns example data for all endpoints or for which handlers are not found.')
+@click.option('--operation', '-o', 'operation_ids', metavar='OPERATION_ID', multiple=True,
+              help='Operation to benchmark, all of them by default. Can be repeated.')
+@click.option('--requests', '-n', default=100, type=click.IntRange(min=1),
+              help='Number of timed requests per operation.')
+@click.option('--warmup-requests', default=5, type=click.IntRange(min=0),
+              help='Number of requests per operation sent before the timed ones.')
+@click.option('--header', '-H', 'headers', metavar='"NAME: VALUE"', multiple=True, callback=parse_header,
+              help='Header added to every request, e.g. credentials. Can be repeated.')
+@click.option('--validate-responses',
+              help='Enable validation of response values from operation handlers.',
+              is_flag=True, default=False)
+@click.option('--strict-validation',
+              help='Enable strict validation of request payloads.',
+              is_flag=True, default=False)
+@click.option('--base-path', metavar='PATH',
+              help='Override the basePath in the API spec.')
+@click.option('--overhead-threshold', default=0.5, type=click.FloatRange(0, 1),
+              help='Share of the latency spent out of the handler from which the framework overhead is flagged.')
+@click.option('--json', 'as_json', help='Print the results as JSON.', is_flag=True, default=False)
+def bench(spec_file,
+          base_module_path,
+          mock,
+          operation_ids,
+          requests,
+          warmup_requests,
+          headers,
+          validate_responses,
+          strict_validation,
+          base_path,
+          overhead_threshold,
+          as_json):
+    """
+    Benchmarks the operations of an OpenAPI Specification file in process,
+    with requests built from the examples and schemas of the specification.
+
+    Reports the latency percentiles and the requests per second of each
+    operation, and flags with a star the operations spending most of their
+    latency out of their handler.
+
+    Arguments:
+
+    - SPEC_FILE: specification file that describes the server endpoints.
+
+    - BASE_MODULE_PATH (optional): filesystem path where the API endpoints handlers are going to be imported from.
+    """
+    # the errors of the handlers are counted in the report
+    logging.basicConfig(level=logging.CRITICAL)
+
+    spec_file_full_path = path.abspath(spec_file)
+    py_module_path = base_module_path or path.dirname(spec_file_full_path)
+    sys.path.insert(1, path.abspath(py_module_path))
+
+    api_extra_args = {}
+    if mock:
+        api_extra_args['resolver'] = MockResolver(mock_all=mock == 'all')
+
+    handler_timer = benchmark.HandlerTimer()
+    app = specific.FlaskApp(__name__, options={'swagger_ui': False})
+    app.add_stage_listener(handler_timer)
+    app.add_api(spec_file_full_path,
+                base_path=base_path,
+                validate_responses=validate_responses,
+                strict_validation=strict_validation,
+                **api_extra_args)
+
+    results = benchmark.bench_api(app, handler_timer, operation_ids=operation_ids, requests=requests,
+                                  warmup=warmup_requests, headers=headers)
+    for result in results:
+        result['overhead_dominates'] = benchmark.overhead_dominates(result, overhead_threshold)
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+    else:
+        click.echo(benchmark.format_report(results, overhead_threshold))
+
+
+class Duration(click.ParamType):
+    """
+    Duration in seconds, with an optional unit: 500ms, 60s, 5m or 1h.
+    """
+    name = 'duration'
+    units = (('ms', 0.001), ('s', 1), ('m', 60), ('h', 3600))
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, (int, float)):
+            return float(value)
+        number, factor = value, 1
+        for unit, unit_factor in self.units:
+            if value.endswith(unit) and value[:-len(unit)][-1:].isdigit():
+                number, factor = value[:-len(unit)], unit_factor
+                break
+        try:
+            seconds = float(number) * factor
+        except ValueError:
+            self.fail('{!r} is not a duration, e.g. 500ms, 60s, 5m or 1h'.format(value), param, ctx)
+        if seconds <= 0:
+            self.fail('{!r} is not a positive duration'.format(value), param, ctx)
+        return seconds
+
+
+def parse_weight(ctx, param, value):
+    weights = {}
+    for weight in value:
+        operation_id, separator, number = weight.rpartition('=')
+        try:
+            weights[operation_id] = float(number)
+        except ValueError:
+            separator = None
+        if not separator or weights[operation_id] < 0:
+            raise click.BadParameter('{!r} is not of the form "OPERATION_ID=WEIGHT"'.format(weight))
+    return weights
+
+
+@main.command()
+@click.argument('spec_file')
+@click.argument('base_module_path', required=False)
+@click.option('--url', '-u', default='http://localhost:5000', help='URL of the server to load.')
+@click.option('--concurrency', '-c', default=8, type=click.IntRange(min=1),
+              help='Number of concurrent workers, each one with a keep-alive connection.')
+@click.option('--duration', '-d', default='10s', type=Duration(), help='Duration of the load, e.g. 60s or 5m.')
+@click.option('--invalid-ratio', default=0.0, type=click.FloatRange(0, 1),
+              help='Share of the requests made invalid on purpose, e.g. with a parameter of the wrong type.')
+@click.option('--operation', '-o', 'operation_ids', metavar='OPERATION_ID', multiple=True,
+              help='Operation to load, all of them by default. Can be repeated.')
+@click.option('--weight', '-w', 'weights', metavar='OPERATION_ID=WEIGHT', multiple=True, callback=parse_weight,
+              help='Relative weight of an operation in the mix of requests, 1 by default. Can be repeated.')
+@click.option('--header', '-H', 'headers', metavar='"NAME: VALUE"', multiple=True, callback=parse_header,
+              help='Header added to every request, e.g. credentials. Can be repeated.')
+@click.option('--timeout', default='10s', type=Duration(), help='Timeout of the connections and the responses.')
+@click.option('--base-path', metavar='PATH',
+              help='Override the basePath in the API spec.')
+@click.option('--json', 'as_json', help='Print the results as JSON.', is_flag=True, default=False)
+def loadtest(spec_file,
+             base_module_path,
+             url,
+             concurrency,
+             duration,
+             invalid_ratio,
+             operation_ids,
+             weights,
+             headers,
+             timeout,
+             base_path,
+             as_json):
+    """
+    Loads a running server with requests built from the examples and schemas of
+    an OpenAPI Specification file, e.g. a local `specific run --mock all`.
+
+    Reports the throughput, the latency percentiles and the statuses of the
+    responses of each operation, the valid and the invalid requests apart.
+
+    Arguments:
+
+    - SPEC_FILE: specification file that describes the server endpoints.
+
+    - BASE_MODULE_PATH (optional): filesystem path where the security functions of the spec are imported from.
+    """
+    logging.basicConfig(level=logging.WARN)
+
+    spec_file_full_path = path.abspath(spec_file)
+    py_module_path = base_module_path or path.dirname(spec_file_full_path)
+    sys.path.insert(1, path.abspath(py_module_path))
+
+    # the handlers are not called, the API only builds the requests
+    app = specific.FlaskApp(__name__, options={'swagger_ui': False})
+    api = app.add_api(spec_file_full_path, base_path=base_path, resolver=MockResolver(mock_all=True))
+
+    operations = []
+    for operation in api.operations:
+        if operation_ids and operation.operation_id not in operation_ids:
+            continue
+        weight = weights.get(operation.operation_id, 1.0)
+        if weight:
+            operations.append((operation.operation_id, weight) + load.operation_templates(operation, headers))
+    if not operations:
+        raise click.UsageError('No operation to load')
+
+    results = load.LoadTest(url, operations, concurrency=concurrency, duration=duration,
+                            invalid_ratio=invalid_ratio, timeout=timeout).run()
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+    else:
+        click.echo(load.format_report(results))
+
+
+@main.command()
+@click.argument('traffic_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('spec_file', required=False)
+@click.argument('base_module_path', required=False)
+@click.option('--url', '-u',
+              help='URL of the server to replay the requests to, in process to the app of SPEC_FILE otherwise.')
+@click.option('--mock', metavar='MOCKMODE', type=click.Choice(['all', 'notimplemented']),
+              help='Returns example data for all endpoints or for which handlers are not found, in process.')
+@click.option('--speed', '-s', default=1.0, type=click.FloatRange(min=0),
+              help='Factor of the recorded rate of the requests, 0 to send them as fast as possible.')
+@click.option('--concurrency', '-c', default=8, type=click.IntRange(min=1),
+              help='Number of concurrent workers.')
+@click.option('--header', '-H', 'headers', metavar='"NAME: VALUE"', multiple=True, callback=parse_header,
+              help='Header added to every request, e.g. credentials, which are not recorded. Can be repeated.')
+@click.option('--timeout', default='10s', type=Duration(), help='Timeout of the connections and the responses.')
+@click.option('--base-path', metavar='PATH',
+              help='Override the basePath in the API spec.')
+@click.option('--json', 'as_json', help='Print the results as JSON.', is_flag=True, default=False)
+def replay(traffic_file,
+           spec_file,
+           base_module_path,
+           url,
+           mock,
+           speed,
+           concurrency,
+           headers,
+           timeout,
+           base_path,
+           as_json):
+    """
+    Replays the requests recorded to a file with the `traffic_record_path`
+    option, at their recorded rate or faster, to a running server or in
+    process to the app of an OpenAPI Specification file.
+
+    Reports the throughput, the latency percentiles and the statuses of the
+    responses of each operation, and the maximum delay of the requests sent
+    late because all the workers were busy.
+
+    Arguments:
+
+    - TRAFFIC_FILE: NDJSON file of the recorded requests.
+
+    - SPEC_FILE (optional): specification file of the app the requests are replayed to in process, without --url.
+
+    - BASE_MODULE_PATH (optional): filesystem path where the API endpoints handlers are going to be imported from.
+    """
+    if url:
+        target = traffic.HttpTarget(url, timeout=timeout)
+    elif spec_file:
+        # the errors of the handlers are counted in the report
+        logging.basicConfig(level=logging.CRITICAL)
+
+        spec_file_full_path = path.abspath(spec_file)
+        py_module_path = base_module_path or path.dirname(spec_file_full_path)
+        sys.path.insert(1, path.abspath(py_module_path))
+
+        api_extra_args = {}
+        if mock:
+            api_extra_args['resolver'] = MockResolver(mock_all=mock == 'all')
+        app = specific.FlaskApp(__name__, options={'swagger_ui': False})
+        app.add_api(spec_file_full_path, base_path=base_path, **api_extra_args)
+        target = traffic.AppTarget(app)
+    else:
+        raise click.UsageError('Either --url or SPEC_FILE is required')
+
+    entries = traffic.load_traffic(traffic_file)
+    if not entries:
+        raise click.UsageError('No request recorded in {}'.format(traffic_file))
+
+    results = traffic.Replay(entries, target, speed=speed, concurrency=concurrency, headers=headers).run()
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+    else:
+        click.echo(load.format_report(results))
+        click.echo('max lag ms: {:.2f}'.format(results[-1]['max_lag_ms']))
+
+
+@main.command()
+@click.argument('spec_file')
+@click.option('--perf', help='Report the performance hazards of the specification.', is_flag=True, default=False)
+@click.option('--max-enum', default=linter.MAX_ENUM, type=click.IntRange(min=0),
+              help='Number of values from which an enum is reported.')
+@click.option('--max-composition-depth', default=linter.MAX_COMPOSITION_DEPTH, type=click.IntRange(min=0),
+              help='Nesting of allOf, oneOf and anyOf from which a schema without a discriminator is reported.')
+@click.option('--max-example-size', default=linter.MAX_EXAMPLE_SIZE, type=click.IntRange(min=0),
+              help='Size of the JSON of an example, in bytes, from which it is reported.')
+@click.option('--fail-on', type=click.Choice(linter.SEVERITIES),
+              help='Exit with the status 1 when a problem of this severity, or a more severe one, is found.')
+@click.option('--json', 'as_json', help='Print the problems as JSON.', is_flag=True, default=False)
+def lint(spec_file,
+         perf,
+         max_enum,
+         max_composition_depth,
+         max_example_size,
+         fail_on,
+         as_json):
+    """
+    Validates an OpenAPI Specification file and, with --perf, reports its
+    performance hazards, the most severe first, at their JSON path: unbounded
+    arrays, strings and additionalProperties, regular expressions prone to
+    catastrophic backtracking, large enums, deep compositions without a
+    discriminator and large examples.
+
+    Arguments:
+
+    - SPEC_FILE: specification file to lint.
+    """
+    try:
+        specification = Specification.load(path.abspath(spec_file))
+    except InvalidSpecification as e:
+        raise click.ClickException('Invalid specification: {}'.format(e.message))
+    if not perf:
+        click.echo('{} is valid'.format(spec_file))
+        return
+
+    problems = linter.lint_performance(specification, max_enum=max_enum,
+                                       max_composition_depth=max_composition_depth,
+                                       max_example_size=max_example_size)
+    if as_json:
+        click.echo(json.dumps([problem._asdict() for problem in problems], indent=2))
+    else:
+        click.echo(linter.format_report(problems))
+
+    if fail_on and any(linter.SEVERITIES.index(problem.severity) <= linter.SEVERITIES.index(fail_on)
+                       for problem in problems):
+        sys.exit(1)
 
 
 if __name__ == '__main__':  # pragma: no cover
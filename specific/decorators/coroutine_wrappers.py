@@ -0,0 +1,213 @@
+# Coroutine variants of the operation decorators, used by asynchronous APIs.
+# This module is Python 3 only and must only be imported lazily.
+import asyncio
+import functools
+import threading
+
+from ..metrics import StageTimer, format_server_timing
+from .decorator import get_status, wants_server_timing
+
+_executor_state = threading.local()
+
+
+def _call_in_executor_thread(loop, function, args, kwargs):
+    _executor_state.loop = loop
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _executor_state.loop = None
+
+
+async def run_in_executor(executor, function, *args, **kwargs):
+    """
+    Runs a blocking function in the given executor and awaits its result.
+    Coroutine functions wrapped with `get_threadsafe_wrapper` and called from
+    the executor thread are scheduled back on the calling event loop.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, _call_in_executor_thread,
+                                      loop, function, args, kwargs)
+
+
+def run_until_complete(awaitable):
+    """
+    Runs an awaitable to completion in a new event loop, from blocking code
+    outside of the application event loop, e.g. the warmup.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(awaitable)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def get_threadsafe_wrapper(coroutine_function):
+    """
+    Makes a coroutine function callable from blocking code running in an
+    executor thread, e.g. an async x-tokenInfoFunc called by the security
+    decorators.
+    """
+    @functools.wraps(coroutine_function)
+    def wrapper(*args, **kwargs):
+        loop = getattr(_executor_state, 'loop', None)
+        if loop is None:
+            raise RuntimeError('{} must be called through run_in_executor'.format(
+                coroutine_function.__name__))
+        future = asyncio.run_coroutine_threadsafe(coroutine_function(*args, **kwargs), loop)
+        return future.result()
+
+    return wrapper
+
+
+def get_handler_wrapper(function, api):
+    """
+    Turns an operation handler into a coroutine function. Coroutine handlers
+    are used as is, blocking ones run in the API executor.
+    """
+    if asyncio.iscoroutinefunction(function):
+        return function
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        return await api.run_in_executor(function, *args, **kwargs)
+
+    return wrapper
+
+
+def get_coroutine_wrapper(function):
+    """
+    Turns a decorated function, whose result may be a coroutine, into a
+    coroutine function.
+    """
+    @functools.wraps(function)
+    async def wrapper(request):
+        response = function(request)
+        while asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+    return wrapper
+
+
+def get_parameter_to_arg_wrapper(function, get_arguments):
+    @functools.wraps(function)
+    async def wrapper(request):
+        kwargs = get_arguments(request)
+        return await function(**kwargs)
+
+    return wrapper
+
+
+def get_response_validator_wrapper(function, _wrapper):
+    @functools.wraps(function)
+    async def wrapper(request):
+        response = function(request)
+        while asyncio.iscoroutine(response):
+            response = await response
+        return _wrapper(request, response)
+
+    return wrapper
+
+
+def get_security_wrapper(function, api, get_authorization_info, _wrapper):
+    """
+    The authorization functions are blocking (e.g. the remote tokeninfo call)
+    so they run in the API executor.
+    """
+    @functools.wraps(function)
+    async def wrapper(request):
+        token_info = await api.run_in_executor(get_authorization_info, request)
+        response = _wrapper(request, token_info)
+        while asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+    return wrapper
+
+
+def get_stage_wrapper(function, before, after):
+    @functools.wraps(function)
+    async def wrapper(request):
+        timer = getattr(request, 'stage_timer', None)
+        if timer is None:
+            return await function(request)
+        if before is not None:
+            before(timer)
+        try:
+            return await function(request)
+        finally:
+            if after is not None:
+                after(timer)
+
+    return wrapper
+
+
+def get_allocation_wrapper(function, tracker, operation_id):
+    @functools.wraps(function)
+    async def wrapper(request):
+        before = tracker.start()
+        if before is None:
+            return await function(request)
+        try:
+            return await function(request)
+        finally:
+            tracker.stop(operation_id, before)
+
+    return wrapper
+
+
+def get_request_life_cycle_wrapper(function, api, mimetype, metrics=None, operation_id=None, listeners=(),
+                                   server_timing=False, slow_request_log=None):
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        specific_request = api.get_request(*args, **kwargs)
+        while asyncio.iscoroutine(specific_request):
+            specific_request = await specific_request
+        specific_response = function(specific_request)
+        while asyncio.iscoroutine(specific_response):
+            specific_response = await specific_response
+        framework_response = api.get_response(specific_response, mimetype, specific_request)
+        while asyncio.iscoroutine(framework_response):
+            framework_response = await framework_response
+        return framework_response
+
+    if metrics is None and not listeners and not server_timing and slow_request_log is None:
+        return wrapper
+
+    @functools.wraps(function)
+    async def metered_wrapper(*args, **kwargs):
+        timer = StageTimer(listeners, operation_id)
+        status = 500
+        try:
+            timer.start('request')
+            specific_request = api.get_request(*args, **kwargs)
+            while asyncio.iscoroutine(specific_request):
+                specific_request = await specific_request
+            timer.request = specific_request
+            timer.stop('request')
+            specific_request.stage_timer = timer
+            specific_response = function(specific_request)
+            while asyncio.iscoroutine(specific_response):
+                specific_response = await specific_response
+            timer.start('serialization')
+            framework_response = api.get_response(specific_response, mimetype, specific_request)
+            while asyncio.iscoroutine(framework_response):
+                framework_response = await framework_response
+            timer.stop('serialization')
+            if server_timing and wants_server_timing(server_timing, specific_request):
+                framework_response.headers['Server-Timing'] = format_server_timing(timer.durations, timer.elapsed())
+            status = get_status(framework_response)
+            return framework_response
+        except Exception as exception:
+            status = get_status(exception)
+            raise
+        finally:
+            if metrics is not None:
+                metrics.observe_request(operation_id, status, timer.elapsed(), timer.durations)
+            if slow_request_log is not None:
+                # the requests are not profiled, the profiler would see the other tasks of the loop
+                slow_request_log.finish(timer, timer.request, status)
+
+    return metered_wrapper
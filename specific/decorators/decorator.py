@@ -1,6 +1,10 @@
 import functools
 import logging
 
+import six
+
+from ..metrics import StageTimer, format_server_timing
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,15 +30,42 @@ class RequestResponseDecorator(BaseDecorator):
     framework specific object.
     """
 
-    def __init__(self, api, mimetype):
+    def __init__(self, api, mimetype, metrics=None, operation_id=None, listeners=(), server_timing=False,
+                 slow_request_log=None):
+        """
+        :param metrics: receives the duration of the requests and of their stages
+        :type metrics: specific.metrics.MetricsBackend | None
+        :param operation_id: label of the metrics and of the stage events
+        :type operation_id: str | None
+        :param listeners: receive the start and end of the stages, see `specific.tracing`
+        :type listeners: list
+        :param server_timing: the `server_timing` option
+        :type server_timing: bool | str
+        :param slow_request_log: logs and profiles the slow requests
+        :type slow_request_log: specific.slow_requests.SlowRequestLog | None
+        """
         self.api = api
         self.mimetype = mimetype
+        self.metrics = metrics
+        self.operation_id = operation_id
+        self.listeners = listeners
+        self.server_timing = server_timing
+        self.slow_request_log = slow_request_log
 
     def __call__(self, function):
         """
         :type function: types.FunctionType
         :rtype: types.FunctionType
         """
+        if self.api.is_async():  # pragma: 2.7 no cover
+            from .coroutine_wrappers import get_request_life_cycle_wrapper
+            return get_request_life_cycle_wrapper(function, self.api, self.mimetype,
+                                                  self.metrics, self.operation_id, self.listeners,
+                                                  self.server_timing, self.slow_request_log)
+
+        if self.metrics is not None or self.listeners or self.server_timing or self.slow_request_log is not None:
+            return self._metered(function)
+
         @functools.wraps(function)
         def wrapper(*args, **kwargs):
             request = self.api.get_request(*args, **kwargs)
@@ -42,3 +73,67 @@ class RequestResponseDecorator(BaseDecorator):
             return self.api.get_response(response, self.mimetype, request)
 
         return wrapper
+
+    def _metered(self, function):
+        """
+        Like the wrapper of `__call__`, also times the conversion of the framework
+        request (the "request" stage) and response ("serialization"), hands
+        the stage timer of the request to the metrics and to the slow request
+        log, and adds the Server-Timing header.
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = None
+            if self.slow_request_log is not None:
+                profiler = self.slow_request_log.start_profile()
+            timer = StageTimer(self.listeners, self.operation_id)
+            status = 500
+            try:
+                timer.start('request')
+                request = timer.request = self.api.get_request(*args, **kwargs)
+                timer.stop('request')
+                request.stage_timer = timer
+                response = function(request)
+                timer.start('serialization')
+                response = self.api.get_response(response, self.mimetype, request)
+                timer.stop('serialization')
+                if self.server_timing and wants_server_timing(self.server_timing, request):
+                    response.headers['Server-Timing'] = format_server_timing(timer.durations, timer.elapsed())
+                status = get_status(response)
+                return response
+            except Exception as exception:
+                status = get_status(exception)
+                raise
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe_request(self.operation_id, status, timer.elapsed(), timer.durations)
+                if self.slow_request_log is not None:
+                    self.slow_request_log.finish(timer, timer.request, status, profiler)
+
+        return wrapper
+
+
+def wants_server_timing(server_timing, request):
+    """
+    :param server_timing: True for all the requests, or the header of the requests
+    :type server_timing: bool | str
+    :type request: specific.lifecycle.SpecificRequest
+    :rtype: bool
+    """
+    if isinstance(server_timing, six.string_types):
+        return server_timing in request.headers
+    return True
+
+
+def get_status(response):
+    """
+    Status code of a framework response, or of an exception raised instead.
+
+    :rtype: int
+    """
+    # flask and the ASGI responses, aiohttp responses, werkzeug exceptions, ProblemException
+    for attribute in ('status_code', 'status', 'code'):
+        status = getattr(response, attribute, None)
+        if isinstance(status, int):
+            return status
+    return 500
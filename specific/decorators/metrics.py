@@ -1,9 +1,12 @@
 import functools
+import operator
 import os
 import time
 
 from werkzeug.exceptions import HTTPException
 
+from ..utils import has_coroutine
+
 try:
     import uwsgi_metrics
     HAS_UWSGI_METRICS = True  # pragma: no cover
@@ -19,6 +22,18 @@ class UWSGIMetricsCollector(object):
         swagger_path = path.strip('/').replace('/', '.').replace('<', '{').replace('>', '}')
         self.key_suffix = '{method}.{path}'.format(path=swagger_path, method=method.upper())
         self.prefix = os.getenv('HTTP_METRICS_PREFIX', 'specific.response')
+        self._keys = {}
+
+    def get_key(self, status):
+        """
+        :type status: int
+        :rtype: str
+        """
+        try:
+            return self._keys[status]
+        except KeyError:
+            key = self._keys[status] = '{status}.{suffix}'.format(status=status, suffix=self.key_suffix)
+            return key
 
     @staticmethod
     def is_available():
@@ -44,8 +59,62 @@ class UWSGIMetricsCollector(object):
                 end_time_s = time.time()
                 delta_s = end_time_s - start_time_s
                 delta_ms = delta_s * 1000
-                key = '{status}.{suffix}'.format(status=status, suffix=self.key_suffix)
-                uwsgi_metrics.timer(self.prefix, key, delta_ms)
+                uwsgi_metrics.timer(self.prefix, self.get_key(status), delta_ms)
             return response
 
         return wrapper
+
+
+def stage_wrapper(function, before=None, after=None):
+    """
+    Calls `before` and `after` with the stage timer of the request (see
+    `specific.metrics.StageTimer`), around the calls of a function taking the
+    SpecificRequest. Coroutine functions stay coroutine functions.
+
+    :type function: types.FunctionType
+    :rtype: types.FunctionType
+    """
+    if has_coroutine(function):  # pragma: 2.7 no cover
+        from .coroutine_wrappers import get_stage_wrapper
+        return get_stage_wrapper(function, before, after)
+
+    @functools.wraps(function)
+    def wrapper(request):
+        timer = getattr(request, 'stage_timer', None)
+        if timer is None:
+            return function(request)
+        if before is not None:
+            before(timer)
+        try:
+            return function(request)
+        finally:
+            if after is not None:
+                after(timer)
+
+    return wrapper
+
+
+def time_stage(stage, function):
+    """
+    Times the calls of a function, e.g. the handler.
+    """
+    return stage_wrapper(function, before=operator.methodcaller('start', stage),
+                         after=operator.methodcaller('stop', stage))
+
+
+def time_stage_before(stage, decorator, function):
+    """
+    Times the work of a decorator before it calls the decorated function, e.g. a
+    validation.
+    """
+    function = stage_wrapper(function, before=operator.methodcaller('stop', stage))
+    return time_stage(stage, decorator(function))
+
+
+def time_stage_after(stage, decorator, function):
+    """
+    Times the work of a decorator after the decorated function returned, e.g.
+    the response validation.
+    """
+    function = stage_wrapper(function, after=operator.methodcaller('start', stage))
+    return stage_wrapper(decorator(function), after=operator.methodcaller('stop', stage))
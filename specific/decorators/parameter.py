@@ -8,7 +8,7 @@ import six
 
 from ..http_facts import FORM_CONTENT_TYPES
 from ..lifecycle import SpecificRequest  # NOQA
-from ..utils import is_form_mimetype, is_json_mimetype
+from ..utils import has_coroutine, is_form_mimetype, is_json_mimetype
 
 try:
     import builtins
@@ -83,9 +83,8 @@ def parameter_to_arg(operation, function, pythonic_params=False,
     sanitize = pythonic if pythonic_params else sanitized
     arguments, has_kwargs = inspect_function_arguments(function)
 
-    @functools.wraps(function)
-    def wrapper(request):
-        # type: (SpecificRequest) -> Any
+    def get_arguments(request):
+        # type: (SpecificRequest) -> dict
         logger.debug('Function Arguments: %s', arguments)
         kwargs = {}
 
@@ -121,6 +120,16 @@ def parameter_to_arg(operation, function, pythonic_params=False,
         if pass_context_arg_name and (has_kwargs or pass_context_arg_name in arguments):
             kwargs[pass_context_arg_name] = request.context
 
+        return kwargs
+
+    if has_coroutine(function):  # pragma: 2.7 no cover
+        from .coroutine_wrappers import get_parameter_to_arg_wrapper
+        return get_parameter_to_arg_wrapper(function, get_arguments)
+
+    @functools.wraps(function)
+    def wrapper(request):
+        # type: (SpecificRequest) -> Any
+        kwargs = get_arguments(request)
         return function(**kwargs)
 
     return wrapper
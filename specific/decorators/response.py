@@ -7,7 +7,7 @@ from jsonschema import ValidationError
 from ..exceptions import (NonConformingResponseBody,
                           NonConformingResponseHeaders)
 from ..problem import problem
-from ..utils import all_json
+from ..utils import all_json, has_coroutine
 from .decorator import BaseDecorator
 from .validation import ResponseBodyValidator
 
@@ -43,7 +43,8 @@ class ResponseValidator(BaseDecorator):
         response_definition = self.operation.response_definition(str(status_code), content_type)
         response_schema = self.operation.response_schema(str(status_code), content_type)
 
-        if self.is_json_schema_compatible(response_schema):
+        # streamed response bodies (data is None) cannot be validated
+        if data is not None and self.is_json_schema_compatible(response_schema):
             v = ResponseBodyValidator(response_schema, validator=self.validator)
             try:
                 data = self.operation.json_loads(data)
@@ -99,6 +100,10 @@ class ResponseValidator(BaseDecorator):
 
             return response
 
+        if has_coroutine(function):  # pragma: 2.7 no cover
+            from .coroutine_wrappers import get_response_validator_wrapper
+            return get_response_validator_wrapper(function, _wrapper)
+
         @functools.wraps(function)
         def wrapper(request):
             response = function(request)
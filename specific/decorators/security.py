@@ -4,14 +4,19 @@ import functools
 import logging
 import os
 import textwrap
+import threading
 
 import requests
 from six.moves import http_cookies
 
-from specific.utils import get_function_from_name
+from specific.utils import get_function_from_name, has_coroutine
 
 from ..exceptions import (OAuthProblem, OAuthResponseProblem,
-                          OAuthScopeProblem, SpecificException)
+                          OAuthScopeProblem, SpecificException,
+                          TokenInfoUnavailable)
+from ..jwt_verifier import get_jwt_verifier
+from ..token_cache import InfoFuncCache
+from ..tokeninfo_client import get_tokeninfo_client, is_rejection
 
 logger = logging.getLogger(__name__)
 
@@ -21,24 +26,97 @@ session = requests.Session()
 session.mount('http://', adapter)
 session.mount('https://', adapter)
 
+# memoization caches of the security functions, by function name and configuration
+_info_func_caches = {}
+_info_func_caches_lock = threading.Lock()
 
-def get_tokeninfo_func(security_definition):
+
+def get_security_func(function_name):
+    """
+    Resolves a security function (e.g. x-tokenInfoFunc) by name. Coroutine
+    functions are wrapped so they can be called by the security decorators,
+    which run in an executor thread for asynchronous APIs.
+
+    :type function_name: str
+    :rtype: function
+    """
+    func = get_function_from_name(function_name)
+    if has_coroutine(func):  # pragma: 2.7 no cover
+        from .coroutine_wrappers import get_threadsafe_wrapper
+        return get_threadsafe_wrapper(func)
+    return func
+
+
+def memoize_info_func(function_name, func, security_definition):
+    """
+    Memoizes a security function when its security scheme has a `x-infoFuncCacheTtl`
+    (seconds), and optionally a `x-infoFuncCacheSize` (default 1024). The operations
+    using the same function with the same configuration share the cache.
+
+    :type function_name: str
+    :type func: types.FunctionType
+    :type security_definition: dict
+    :rtype: types.FunctionType
+    """
+    ttl = security_definition.get('x-infoFuncCacheTtl')
+    if not ttl:
+        return func
+    config = (function_name, ttl, security_definition.get('x-infoFuncCacheSize', 1024))
+    with _info_func_caches_lock:
+        if config not in _info_func_caches:
+            _info_func_caches[config] = InfoFuncCache(maxsize=config[2], ttl=ttl)
+        return _info_func_caches[config].memoize(func)
+
+
+def invalidate_info_func_cache(function_name, *credential):
+    """
+    Removes a credential from the memoization caches of a security function, e.g.
+    `invalidate_info_func_cache('app.basic_auth', 'jdoe')` after the password of
+    jdoe changed. Without credential, the caches are cleared.
+
+    :type function_name: str
+    """
+    with _info_func_caches_lock:
+        caches = [cache for config, cache in _info_func_caches.items() if config[0] == function_name]
+    for cache in caches:
+        if credential:
+            cache.invalidate(*credential)
+        else:
+            cache.clear()
+
+
+def get_tokeninfo_func(security_definition, token_info_cache=None):
     """
     :type security_definition: dict
+    :param token_info_cache: cache of the token info retrieved from `x-tokenInfoUrl`
+    :type token_info_cache: specific.token_cache.TokenInfoCache | None
     :rtype: function
 
+    The `x-tokenInfoUrl` is requested with the shared session, or with a client
+    configured by `x-tokenInfoClient` (see `specific.tokeninfo_client.TokenInfoClient`).
+
     >>> get_tokeninfo_url({'x-tokenInfoFunc': 'foo.bar'})
     '<function foo.bar>'
     """
     token_info_func = (security_definition.get("x-tokenInfoFunc") or
                        os.environ.get('TOKENINFO_FUNC'))
     if token_info_func:
-        return get_function_from_name(token_info_func)
+        return get_security_func(token_info_func)
+
+    jwt_verifier = get_jwt_verifier(security_definition)
+    if jwt_verifier is not None:
+        return jwt_verifier
 
     token_info_url = (security_definition.get('x-tokenInfoUrl') or
                       os.environ.get('TOKENINFO_URL'))
     if token_info_url:
-        return functools.partial(get_tokeninfo_remote, token_info_url)
+        if 'x-tokenInfoClient' in security_definition:
+            token_info_func = get_tokeninfo_client(token_info_url, security_definition)
+        else:
+            token_info_func = functools.partial(get_tokeninfo_remote, token_info_url)
+        if token_info_cache is not None:
+            return token_info_cache.cached(token_info_func, namespace=token_info_url)
+        return token_info_func
 
     return None
 
@@ -54,7 +132,7 @@ def get_scope_validate_func(security_definition):
     func = (security_definition.get("x-scopeValidateFunc") or
             os.environ.get('SCOPEVALIDATE_FUNC'))
     if func:
-        return get_function_from_name(func)
+        return get_security_func(func)
     return validate_scope
 
 
@@ -69,7 +147,7 @@ def get_basicinfo_func(security_definition):
     func = (security_definition.get("x-basicInfoFunc") or
             os.environ.get('BASICINFO_FUNC'))
     if func:
-        return get_function_from_name(func)
+        return memoize_info_func(func, get_security_func(func), security_definition)
     return None
 
 
@@ -84,7 +162,7 @@ def get_apikeyinfo_func(security_definition):
     func = (security_definition.get("x-apikeyInfoFunc") or
             os.environ.get('APIKEYINFO_FUNC'))
     if func:
-        return get_function_from_name(func)
+        return memoize_info_func(func, get_security_func(func), security_definition)
     return None
 
 
@@ -99,8 +177,8 @@ def get_bearerinfo_func(security_definition):
     func = (security_definition.get("x-bearerInfoFunc") or
             os.environ.get('BEARERINFO_FUNC'))
     if func:
-        return get_function_from_name(func)
-    return None
+        return memoize_info_func(func, get_security_func(func), security_definition)
+    return get_jwt_verifier(security_definition)
 
 
 def security_passthrough(function):
@@ -123,9 +201,125 @@ def security_deny(function):
     return deny
 
 
-def get_authorization_info(auth_funcs, request, required_scopes):
+_NOT_PARSED = object()
+_INVALID = object()
+
+
+class RequestCredentials(object):
+    """
+    The credentials of a request, extracted once for all the security schemes
+    of an operation: the Authorization header is split once, and the cookies
+    are parsed once.
+    """
+
+    def __init__(self, request):
+        """
+        :param request: SpecificRequest
+        """
+        self.request = request
+        self._authorization = _NOT_PARSED
+        self._basic_credentials = _NOT_PARSED
+        self._cookies = None
+
+    @property
+    def authorization(self):
+        """
+        :return: the lowercase type and the credentials of the Authorization
+            header, None without the header
+        :rtype: (str, str) | None
+        :raises OAuthProblem: the header is not valid
+        """
+        if self._authorization is _NOT_PARSED:
+            authorization = self.request.headers.get('Authorization')
+            if not authorization:
+                self._authorization = None
+            else:
+                try:
+                    auth_type, credentials = authorization.split(None, 1)
+                    self._authorization = auth_type.lower(), credentials
+                except ValueError:
+                    self._authorization = _INVALID
+        if self._authorization is _INVALID:
+            raise OAuthProblem(description='Invalid authorization header')
+        return self._authorization
+
+    @property
+    def basic_credentials(self):
+        """
+        :return: the username and password of a Basic Authorization header
+        :rtype: (str, str) | None
+        :raises OAuthProblem: the header is not valid
+        """
+        authorization = self.authorization
+        if authorization is None or authorization[0] != 'basic':
+            return None
+        if self._basic_credentials is _NOT_PARSED:
+            try:
+                username, password = base64.b64decode(authorization[1]).decode('latin1').split(':', 1)
+                self._basic_credentials = username, password
+            except Exception:
+                self._basic_credentials = _INVALID
+        if self._basic_credentials is _INVALID:
+            raise OAuthProblem(description='Invalid authorization header')
+        return self._basic_credentials
+
+    def bearer_token(self):
+        """
+        :rtype: str | None
+        :raises OAuthProblem: the Authorization header is not valid
+        """
+        authorization = self.authorization
+        if authorization is None or authorization[0] != 'bearer':
+            return None
+        return authorization[1]
+
+    def cookie(self, name):
+        """
+        :rtype: str | None
+        """
+        if self._cookies is None:
+            cookie_parser = http_cookies.SimpleCookie()
+            cookie_parser.load(str(self.request.headers.get('Cookie')))
+            self._cookies = {key: morsel.value for key, morsel in cookie_parser.items()}
+        return self._cookies.get(name)
+
+    def apikey(self, loc, name):
+        """
+        :param loc: query, header or cookie
+        :type loc: str
+        :type name: str
+        :rtype: str | None
+        """
+        if loc == 'query':
+            return self.request.query.get(name)
+        elif loc == 'header':
+            return self.request.headers.get(name)
+        elif loc == 'cookie':
+            return self.cookie(name)
+        return None
+
+
+def get_request_credentials(request):
+    """
+    :param request: SpecificRequest or its credentials
+    :rtype: RequestCredentials
+    """
+    if isinstance(request, RequestCredentials):
+        return request
+    return RequestCredentials(request)
+
+
+def get_authorization_info(auth_funcs, request, required_scopes, scope_set=None):
+    """
+    :param required_scopes: given to the security functions
+    :type required_scopes: list | None
+    :param scope_set: the required scopes precomputed for `validate_scope`
+    :type scope_set: frozenset | None
+    :rtype: dict
+    """
+    credentials = get_request_credentials(request)
     for func in auth_funcs:
-        token_info = func(request, required_scopes)
+        token_info = func(credentials, required_scopes, scope_set)
         if token_info is not None:
             return token_info
 
@@ -139,7 +333,8 @@ def validate_scope(required_scopes, token_scopes):
     :param token_scopes: Scopes granted by authorization server
     :rtype: bool
     """
-    required_scopes = set(required_scopes)
+    if not isinstance(required_scopes, (set, frozenset)):
+        required_scopes = set(required_scopes)
     if isinstance(token_scopes, list):
         token_scopes = set(token_scopes)
     else:
@@ -155,25 +350,19 @@ def validate_scope(required_scopes, token_scopes):
     return True
 
 
-def verify_authorization_token(request, token_info_func):
+def verify_authorization_token(request, token_info_func, rejected_credentials=None):
     """
     :param request: SpecificRequest
     :param token_info_func: types.FunctionType
+    :param rejected_credentials: cache of the rejected tokens
+    :type rejected_credentials: specific.token_cache.RejectedCredentials | None
     :rtype: dict
     """
-    authorization = request.headers.get('Authorization')
-    if not authorization:
+    token = get_request_credentials(request).bearer_token()
+    if token is None:
         return None
 
-    try:
-        auth_type, token = authorization.split(None, 1)
-    except ValueError:
-        raise OAuthProblem(description='Invalid authorization header')
-
-    if auth_type.lower() != 'bearer':
-        return None
-
-    token_info = token_info_func(token)
+    token_info = get_credential_info(rejected_credentials, token, token_info_func, token)
     if token_info is None:
         raise OAuthResponseProblem(
             description='Provided token is not valid',
@@ -183,16 +372,48 @@ def verify_authorization_token(request, token_info_func):
     return token_info
 
 
-def verify_oauth(token_info_func, scope_validate_func):
+def get_credential_info(rejected_credentials, credential, info_func, *args, **kwargs):
+    """
+    Calls a security function, unless the credential was recently rejected.
+    Only the credentials for which it returns None are rejected, its
+    exceptions, e.g. `TokenInfoUnavailable`, are raised without caching.
+
+    :type rejected_credentials: specific.token_cache.RejectedCredentials | None
+    :type credential: str
+    :param info_func: called with the remaining arguments
+    :type info_func: types.FunctionType
+    :return: None when the credential is not valid
+    :rtype: dict | None
+    """
+    if rejected_credentials is None:
+        return info_func(*args, **kwargs)
 
-    def wrapper(request, required_scopes):
-        token_info = verify_authorization_token(request, token_info_func)
+    # the functions given the required scopes may reject a credential for lacking them
+    required_scopes = kwargs.get('required_scopes')
+    if rejected_credentials.is_rejected(credential, required_scopes):
+        logger.info("... Recently rejected credential. Aborting with 401.")
+        return None
+    token_info = info_func(*args, **kwargs)
+    if token_info is None:
+        rejected_credentials.reject(credential, required_scopes)
+    return token_info
+
+
+def verify_oauth(token_info_func, scope_validate_func, rejected_credentials=None):
+
+    def wrapper(request, required_scopes, scope_set=None):
+        token_info = verify_authorization_token(request, token_info_func, rejected_credentials)
         if token_info is None:
             return None
 
         # Fallback to 'scopes' for backward compability
         token_scopes = token_info.get('scope', token_info.get('scopes', ''))
-        if not scope_validate_func(required_scopes, token_scopes):
+        # the user functions are given the list of the specification
+        if scope_set is not None and scope_validate_func is validate_scope:
+            valid = validate_scope(scope_set, token_scopes)
+        else:
+            valid = scope_validate_func(required_scopes, token_scopes)
+        if not valid:
             raise OAuthScopeProblem(
                 description='Provided token doesn\'t have the required scope',
                 required_scopes=required_scopes,
@@ -204,27 +425,17 @@ def verify_oauth(token_info_func, scope_validate_func):
     return wrapper
 
 
-def verify_basic(basic_info_func):
+def verify_basic(basic_info_func, rejected_credentials=None):
 
-    def wrapper(request, required_scopes):
-        authorization = request.headers.get('Authorization')
-        if not authorization:
+    def wrapper(request, required_scopes, scope_set=None):
+        basic_credentials = get_request_credentials(request).basic_credentials
+        if basic_credentials is None:
             return None
 
-        try:
-            auth_type, user_pass = authorization.split(None, 1)
-        except ValueError:
-            raise OAuthProblem(description='Invalid authorization header')
-
-        if auth_type.lower() != 'basic':
-            return None
-
-        try:
-            username, password = base64.b64decode(user_pass).decode('latin1').split(':', 1)
-        except Exception:
-            raise OAuthProblem(description='Invalid authorization header')
-
-        token_info = basic_info_func(username, password, required_scopes=required_scopes)
+        username, password = basic_credentials
+        token_info = get_credential_info(rejected_credentials, u'{}:{}'.format(username, password),
+                                         basic_info_func, username, password,
+                                         required_scopes=required_scopes)
         if token_info is None:
             raise OAuthResponseProblem(
                 description='Provided authorization is not valid',
@@ -235,37 +446,15 @@ def verify_basic(basic_info_func):
     return wrapper
 
 
-def get_cookie_value(cookies, name):
-    '''
-    Returns cookie value by its name. None if no such value.
-    :param cookies: str: cookies raw data
-    :param name: str: cookies key
-    '''
-    cookie_parser = http_cookies.SimpleCookie()
-    cookie_parser.load(str(cookies))
-    try:
-        return cookie_parser[name].value
-    except KeyError:
-        return None
-
-
-def verify_apikey(apikey_info_func, loc, name):
-
-    def wrapper(request, required_scopes):
-        if loc == 'query':
-            apikey = request.query.get(name)
-        elif loc == 'header':
-            apikey = request.headers.get(name)
-        elif loc == 'cookie':
-            cookieslist = request.headers.get('Cookie')
-            apikey = get_cookie_value(cookieslist, name)
-        else:
-            return None
+def verify_apikey(apikey_info_func, loc, name, rejected_credentials=None):
 
+    def wrapper(request, required_scopes, scope_set=None):
+        apikey = get_request_credentials(request).apikey(loc, name)
         if apikey is None:
             return None
 
-        token_info = apikey_info_func(apikey, required_scopes=required_scopes)
+        token_info = get_credential_info(rejected_credentials, apikey, apikey_info_func, apikey,
+                                         required_scopes=required_scopes)
         if token_info is None:
             raise OAuthResponseProblem(
                 description='Provided apikey is not valid',
@@ -276,29 +465,41 @@ def verify_apikey(apikey_info_func, loc, name):
     return wrapper
 
 
-def verify_bearer(bearer_info_func):
+def verify_bearer(bearer_info_func, rejected_credentials=None):
     """
     :param bearer_info_func: types.FunctionType
+    :param rejected_credentials: cache of the rejected tokens
+    :type rejected_credentials: specific.token_cache.RejectedCredentials | None
     :rtype: types.FunctionType
     """
 
-    def wrapper(request, required_scopes):
-        return verify_authorization_token(request, bearer_info_func)
+    def wrapper(request, required_scopes, scope_set=None):
+        return verify_authorization_token(request, bearer_info_func, rejected_credentials)
 
     return wrapper
 
 
-def verify_security(auth_funcs, required_scopes, function):
+def verify_security(auth_funcs, required_scopes, function, api=None):
+    scope_set = frozenset(required_scopes) if required_scopes is not None else None
 
-    @functools.wraps(function)
-    def wrapper(request):
-        token_info = get_authorization_info(auth_funcs, request, required_scopes)
+    def _get_authorization_info(request):
+        return get_authorization_info(auth_funcs, request, required_scopes, scope_set)
 
+    def _wrapper(request, token_info):
         # Fallback to 'uid' for backward compability
         request.context['user'] = token_info.get('sub', token_info.get('uid'))
         request.context['token_info'] = token_info
         return function(request)
 
+    if has_coroutine(function):  # pragma: 2.7 no cover
+        from .coroutine_wrappers import get_security_wrapper
+        return get_security_wrapper(function, api, _get_authorization_info, _wrapper)
+
+    @functools.wraps(function)
+    def wrapper(request):
+        token_info = _get_authorization_info(request)
+        return _wrapper(request, token_info)
+
     return wrapper
 
 
@@ -309,9 +510,19 @@ def get_tokeninfo_remote(token_info_url, token):
     :type token_info_url: str
     :param token: oauth token from authorization header
     :type token: str
-    :rtype: dict
+    :return: None when the token is not valid
+    :rtype: dict | None
+    :raises TokenInfoUnavailable: the endpoint failed, the token is neither accepted nor rejected
     """
-    token_request = session.get(token_info_url, headers={'Authorization': 'Bearer {}'.format(token)}, timeout=5)
-    if not token_request.ok:
+    try:
+        token_request = session.get(token_info_url, headers={'Authorization': 'Bearer {}'.format(token)},
+                                    timeout=5)
+    except requests.RequestException as exception:
+        logger.warning('... Tokeninfo request to %s failed: %s', token_info_url, exception)
+        raise TokenInfoUnavailable()
+    if is_rejection(token_request.status_code):
         return None
+    if not token_request.ok:
+        logger.warning('... Tokeninfo request to %s failed with %s', token_info_url, token_request.status_code)
+        raise TokenInfoUnavailable()
     return token_request.json()
@@ -0,0 +1,120 @@
+"""
+Synthesis of example values from the specification, e.g. to warm up the
+operations with requests that pass their validation.
+"""
+import datetime
+
+import six
+from werkzeug.datastructures import FileStorage
+
+MAX_DEPTH = 8
+
+FORMAT_EXAMPLES = {
+    'date': datetime.date(2019, 1, 1).isoformat(),
+    'date-time': datetime.datetime(2019, 1, 1).isoformat() + 'Z',
+    'email': 'user@example.com',
+    'hostname': 'example.com',
+    'ipv4': '127.0.0.1',
+    'ipv6': '::1',
+    'uri': 'https://example.com/',
+    'uuid': '6ba7b810-9dad-11d1-80b4-00c04fd430c8',
+    'byte': 'c3BlY2lmaWM=',
+    'password': 'secret',
+}
+
+
+def _number_example(schema, number_type):
+    minimum = schema.get('minimum')
+    maximum = schema.get('maximum')
+    if minimum is not None:
+        value = minimum + (1 if schema.get('exclusiveMinimum') else 0)
+    elif maximum is not None:
+        value = maximum - (1 if schema.get('exclusiveMaximum') else 0)
+    else:
+        value = 1
+    multiple_of = schema.get('multipleOf')
+    if multiple_of:
+        value = multiple_of * -(-value // multiple_of)
+    return number_type(value)
+
+
+def _string_example(schema):
+    value = FORMAT_EXAMPLES.get(schema.get('format'), 'string')
+    min_length = schema.get('minLength', 0)
+    max_length = schema.get('maxLength')
+    if len(value) < min_length:
+        value = value + 'x' * (min_length - len(value))
+    if max_length is not None:
+        value = value[:max_length]
+    return value
+
+
+def schema_example(schema, depth=0):
+    """
+    Builds a value of a JSON schema, from its examples and defaults when available.
+    The value is not guaranteed to be valid, e.g. for `pattern` keywords.
+
+    :type schema: dict
+    :rtype: object
+
+    >>> schema_example({'type': 'object', 'properties': {'id': {'type': 'integer', 'minimum': 5}}})
+    {'id': 5}
+    """
+    for keyword in ('example', 'x-example', 'default'):
+        if keyword in schema:
+            return schema[keyword]
+    if schema.get('enum'):
+        return schema['enum'][0]
+    for keyword in ('allOf', 'anyOf', 'oneOf'):
+        if schema.get(keyword) and depth < MAX_DEPTH:
+            if keyword == 'allOf':
+                merged = {}
+                for sub_schema in schema[keyword]:
+                    value = schema_example(sub_schema, depth + 1)
+                    if isinstance(value, dict):
+                        merged.update(value)
+                    else:
+                        return value
+                return merged
+            return schema_example(schema[keyword][0], depth + 1)
+
+    schema_type = schema.get('type')
+    if schema_type is None:
+        schema_type = 'object' if 'properties' in schema else 'string'
+
+    if schema_type == 'object':
+        if depth >= MAX_DEPTH:
+            return {}
+        properties = schema.get('properties', {})
+        # the required properties, or all of them when none is required
+        names = schema.get('required', []) or list(properties)
+        return {name: schema_example(properties.get(name, {}), depth + 1)
+                for name in names}
+    if schema_type == 'array':
+        if depth >= MAX_DEPTH:
+            return []
+        item = schema_example(schema.get('items', {}), depth + 1)
+        return [item] * max(schema.get('minItems', 1), 1)
+    if schema_type == 'integer':
+        return _number_example(schema, int)
+    if schema_type == 'number':
+        return _number_example(schema, float)
+    if schema_type == 'boolean':
+        return True
+    if schema_type == 'file':
+        return FileStorage(six.BytesIO(b'file'), filename='example')
+    return _string_example(schema)
+
+
+def example_to_string(value):
+    """
+    Serializes a scalar example as in a request.
+
+    :rtype: str
+
+    >>> example_to_string(True)
+    'true'
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return six.text_type(value)
@@ -88,6 +88,12 @@ class OAuthResponseProblem(OAuthProblem):
         super(OAuthResponseProblem, self).__init__(**kwargs)
 
 
+class TokenInfoUnavailable(ProblemException):
+    def __init__(self, detail='The authorization server is not available', **kwargs):
+        super(TokenInfoUnavailable, self).__init__(status=503, title='Service Unavailable',
+                                                   detail=detail, **kwargs)
+
+
 class OAuthScopeProblem(Forbidden):
     def __init__(self, token_scopes, required_scopes, **kwargs):
         self.required_scopes = required_scopes
@@ -2,6 +2,7 @@ import logging
 
 from .operations.secure import SecureOperation
 from .problem import problem
+from .profiler import SamplingProfiler, format_collapsed
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +38,9 @@ class AuthErrorHandler(SecureOperation):
         security_decorator = self.security_decorator
         logger.debug('... Adding security decorator (%r)', security_decorator, extra=vars(self))
         function = self.handle
+        if self.api.is_async():  # pragma: 2.7 no cover
+            from .decorators.coroutine_wrappers import get_coroutine_wrapper
+            function = get_coroutine_wrapper(function)
         function = security_decorator(function)
         function = self._request_response_decorator(function)
         return function
@@ -85,3 +89,104 @@ class ResolverErrorHandler(SecureOperation):
 
     def get_path_parameter_types(self):
         return {}
+
+
+class AdminHandler(SecureOperation):
+    """
+    Handler of an admin endpoint of the API, guarded by the security of the API.
+    Its `handle` blocks, it runs in the executor of the asynchronous APIs.
+    """
+
+    mimetype = 'application/json'
+
+    @property
+    def function(self):
+        function = self.handle
+        if self.api.is_async():  # pragma: 2.7 no cover
+            from .decorators.coroutine_wrappers import get_handler_wrapper
+            function = get_handler_wrapper(function, self.api)
+        function = self.security_decorator(function)
+        function = self._request_response_decorator(function)
+        return function
+
+    def handle(self, request):
+        """
+        :type request: specific.lifecycle.SpecificRequest
+        """
+        raise NotImplementedError()
+
+    def get_mimetype(self):
+        return self.mimetype
+
+    @property
+    def randomize_endpoint(self):
+        return None
+
+    def get_path_parameter_types(self):
+        return {}
+
+
+class ProfilerHandler(AdminHandler):
+    """
+    Handler of the sampling profiler endpoint.
+    """
+
+    mimetype = 'text/plain'
+
+    def __init__(self, api, security, security_definitions, max_seconds):
+        """
+        :param max_seconds: maximum duration of a profile
+        :type max_seconds: float
+        """
+        self.max_seconds = max_seconds
+        super(ProfilerHandler, self).__init__(api, security, security_definitions)
+
+    def handle(self, request):
+        """
+        Samples the request threads for `seconds` (default 10) at `rate` samples
+        per second (default 100), of all the threads with `all_threads=true`.
+        """
+        try:
+            seconds = float(request.query.get('seconds', 10))
+            rate = int(request.query.get('rate', 100))
+        except ValueError:
+            return problem(400, 'Bad Request', 'seconds and rate must be numbers')
+        if not 0 < seconds <= self.max_seconds or not 0 < rate <= 1000:
+            return problem(400, 'Bad Request', 'seconds must be at most {} and rate at most 1000'.format(
+                self.max_seconds))
+        all_threads = request.query.get('all_threads', 'false').lower() == 'true'
+
+        stacks = SamplingProfiler(rate, all_threads).sample(seconds)
+        return format_collapsed(stacks), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+    @property
+    def operation_id(self):
+        return 'specific_profile'
+
+
+class AllocationsHandler(AdminHandler):
+    """
+    Handler of the allocation tracking endpoint.
+    """
+
+    def __init__(self, api, security, security_definitions, tracker):
+        """
+        :type tracker: specific.allocations.AllocationTracker
+        """
+        self.tracker = tracker
+        super(AllocationsHandler, self).__init__(api, security, security_definitions)
+
+    def handle(self, request):
+        """
+        Reports the `limit` (default 20) top allocation sites and the totals of
+        the operations.
+        """
+        try:
+            limit = int(request.query.get('limit', 20))
+        except ValueError:
+            return problem(400, 'Bad Request', 'limit must be a number')
+        return self.tracker.report(limit), 200
+
+    @property
+    def operation_id(self):
+        return 'specific_allocations'
@@ -0,0 +1,177 @@
+"""
+Offline verification of JWT access tokens, an alternative to the remote
+tokeninfo endpoints configured in the security schemes with `x-jwks-file`
+(RS256, ES256) or `x-jwt-secret-env` (HS256), the name of the environment
+variable holding the shared secret: the specification is served, it must not
+hold the secret.
+"""
+import json
+import logging
+import os
+import threading
+
+from .exceptions import SpecificException
+from .token_cache import TokenInfoCache
+
+try:
+    import jwt
+    from jwt.algorithms import get_default_algorithms
+except ImportError:  # pragma: no cover
+    jwt = None
+
+logger = logging.getLogger(__name__)
+
+# algorithm of the JSON Web Keys which do not have an "alg" member, by key type
+DEFAULT_KEY_ALGORITHMS = {
+    'RSA': 'RS256',
+    'EC': 'ES256',
+    'oct': 'HS256',
+}
+
+_verifiers = {}
+_verifiers_lock = threading.Lock()
+
+
+def load_jwks(path):
+    """
+    Parses the keys of a JSON Web Key Set file.
+
+    :type path: str
+    :return: map of key id to (algorithm, key), the keys without id are mapped to None
+    :rtype: dict
+    """
+    with open(path) as jwks_file:
+        jwks = json.load(jwks_file)
+    algorithms = get_default_algorithms()
+    keys = {}
+    for jwk in jwks.get('keys', [jwks]):
+        if jwk.get('use', 'sig') != 'sig':
+            continue
+        algorithm = jwk.get('alg') or DEFAULT_KEY_ALGORITHMS.get(jwk.get('kty'))
+        if algorithm not in algorithms:
+            logger.warning('Ignoring JSON Web Key %s of %s with unsupported algorithm %s',
+                           jwk.get('kid'), path, algorithm)
+            continue
+        keys[jwk.get('kid')] = (algorithm, algorithms[algorithm].from_jwk(json.dumps(jwk)))
+    return keys
+
+
+class JWTVerifier(object):
+    """
+    Verifies the signature and claims of JWT access tokens and returns their
+    payload as token info. The `scope` claim falls back to `scp`.
+    """
+
+    def __init__(self, jwks_file=None, secret=None, algorithms=None, audience=None,
+                 issuer=None, leeway=0, cache_size=1024, cache_ttl=300):
+        """
+        :param jwks_file: JSON Web Key Set file of the public keys
+        :type jwks_file: str | None
+        :param secret: shared secret of HMAC signed tokens
+        :type secret: str | None
+        :param algorithms: accepted signature algorithms, by default those of the keys
+        :type algorithms: list | None
+        :param audience: expected `aud` claim
+        :type audience: str | None
+        :param issuer: expected `iss` claim
+        :type issuer: str | None
+        :param leeway: seconds of tolerance for the `exp` and `nbf` claims
+        :type leeway: float
+        :param cache_size: number of verified tokens whose payload is cached, until their expiry
+        :type cache_size: int
+        :param cache_ttl: maximum seconds a verified token is cached
+        :type cache_ttl: float
+        """
+        if jwt is None:
+            raise SpecificException('JWT verification requires PyJWT, '
+                                    'install it with: pip install specific[jwt]')
+        if not jwks_file and not secret:
+            raise SpecificException('JWT verification requires a JWKS file or a secret')
+
+        self.keys = load_jwks(jwks_file) if jwks_file else {}
+        if secret:
+            self.keys[None] = ('HS256', secret)
+        self.algorithms = list(algorithms or sorted({algorithm for algorithm, _ in self.keys.values()}))
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.cache = TokenInfoCache(maxsize=cache_size, ttl=cache_ttl,
+                                    refresh_ahead=None) if cache_size else None
+
+    def __call__(self, token):
+        """
+        :type token: str
+        :return: the token info, None when the token is not valid
+        :rtype: dict | None
+        """
+        if self.cache is not None:
+            return self.cache.get(token, self.verify)
+        return self.verify(token)
+
+    def get_key(self, token):
+        """
+        The key which signed a token, by the `kid` of its header.
+
+        :raises jwt.InvalidTokenError: the token has no known key
+        """
+        header = jwt.get_unverified_header(token)
+        key_id = header.get('kid')
+        if key_id not in self.keys and len(self.keys) == 1:
+            key_id = next(iter(self.keys))
+        try:
+            algorithm, key = self.keys[key_id]
+        except KeyError:
+            raise jwt.InvalidTokenError('Unknown key {}'.format(key_id))
+        if header.get('alg') != algorithm:
+            raise jwt.InvalidTokenError('The key {} is not used with {}'.format(key_id, header.get('alg')))
+        return key
+
+    def verify(self, token):
+        """
+        Verifies a token, without the cache.
+
+        :type token: str
+        :rtype: dict | None
+        """
+        try:
+            token_info = jwt.decode(token, self.get_key(token), algorithms=self.algorithms,
+                                    audience=self.audience, issuer=self.issuer,
+                                    leeway=self.leeway)
+        except jwt.InvalidTokenError as exception:
+            logger.info('... Invalid JWT: %s', exception)
+            return None
+        if 'scope' not in token_info and 'scp' in token_info:
+            token_info['scope'] = token_info['scp']
+        return token_info
+
+
+def get_jwt_verifier(security_definition):
+    """
+    JWT verifier of a security scheme, shared by the operations using it.
+
+    :type security_definition: dict
+    :return: None when the security scheme does not configure JWT verification
+    :rtype: JWTVerifier | None
+    """
+    if 'x-jwt-secret' in security_definition:
+        raise SpecificException('x-jwt-secret would publish the secret with the specification, '
+                                'name the environment variable holding it with x-jwt-secret-env')
+    jwks_file = security_definition.get('x-jwks-file')
+    secret_env = security_definition.get('x-jwt-secret-env')
+    secret = None
+    if secret_env:
+        secret = os.environ.get(secret_env)
+        if not secret:
+            raise SpecificException('The environment variable {} of x-jwt-secret-env is not set'.format(secret_env))
+    if not jwks_file and not secret:
+        return None
+
+    algorithms = security_definition.get('x-jwt-algorithms')
+    config = (jwks_file, secret, tuple(algorithms or ()),
+              security_definition.get('x-jwt-audience'),
+              security_definition.get('x-jwt-issuer'),
+              security_definition.get('x-jwt-leeway', 0))
+    with _verifiers_lock:
+        if config not in _verifiers:
+            _verifiers[config] = JWTVerifier(jwks_file, secret, algorithms, *config[3:])
+        return _verifiers[config]
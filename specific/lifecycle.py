@@ -21,6 +21,8 @@ class SpecificRequest(object):
         self.json_getter = json_getter
         self.files = files
         self.context = context if context is not None else {}
+        # times the stages of the pipeline when the metrics are enabled
+        self.stage_timer = None
 
     @property
     def content_type(self):
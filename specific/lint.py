@@ -0,0 +1,318 @@
+"""
+Static analysis of the performance hazards of a specification: the schemas
+letting a request grow without bound (arrays without `maxItems`, strings
+without `maxLength`, `additionalProperties` without `maxProperties`), the
+expensive validations (regular expressions prone to catastrophic
+backtracking, large enums, deep compositions without a discriminator), and
+the large examples kept in memory and served with the specification.
+
+The resolved specification is walked breadth first, each object once, so
+that a problem of a schema shared by references is reported at its shortest
+JSON path, usually its definition.
+"""
+import collections
+import json
+
+import six
+
+try:
+    from re import _parser as sre_parse  # python 3.11+
+except ImportError:
+    import sre_parse
+
+HIGH = 'high'
+MEDIUM = 'medium'
+LOW = 'low'
+SEVERITIES = (HIGH, MEDIUM, LOW)
+
+MAX_ENUM = 100
+MAX_COMPOSITION_DEPTH = 3
+MAX_EXAMPLE_SIZE = 10000
+
+JSON_TYPES = ('array', 'boolean', 'integer', 'number', 'object', 'string')
+# formats whose valid values have a bounded length
+BOUNDED_FORMATS = ('date', 'date-time', 'time', 'uuid', 'ipv4', 'ipv6', 'int32', 'int64', 'float', 'double')
+COMPOSITIONS = ('allOf', 'oneOf', 'anyOf')
+EXAMPLES = ('example', 'x-example')
+# the default of the responses is not an example
+SCHEMA_EXAMPLES = EXAMPLES + ('default', 'examples')
+# children of a schema which are schemas, or maps and lists of schemas
+SCHEMA_MAPS = ('properties', 'patternProperties', 'definitions')
+SCHEMA_CHILDREN = ('items', 'additionalProperties', 'additionalItems', 'not')
+
+Problem = collections.namedtuple('Problem', ['severity', 'rule', 'path', 'message'])
+
+
+def json_pointer(segments):
+    """
+    :type segments: tuple
+    :return: the JSON pointer of a location of the specification, e.g. #/paths/~1pets/get
+    :rtype: str
+    """
+    return '#/' + '/'.join(str(segment).replace('~', '~0').replace('/', '~1') for segment in segments)
+
+
+def _has_unbounded_repeat(parsed):
+    for op, av in parsed:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if av[1] == sre_parse.MAXREPEAT or _has_unbounded_repeat(av[2]):
+                return True
+        elif _has_nested_repeat(op, av, _has_unbounded_repeat):
+            return True
+    return False
+
+
+def _has_nested_repeat(op, av, check):
+    if op == sre_parse.SUBPATTERN:
+        return check(av[-1])
+    if op == sre_parse.BRANCH:
+        return any(check(branch) for branch in av[1])
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return check(av[1])
+    return False
+
+
+def _has_nested_quantifier(parsed):
+    for op, av in parsed:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if av[1] == sre_parse.MAXREPEAT and _has_unbounded_repeat(av[2]):
+                return True
+            if _has_nested_quantifier(av[2]):
+                return True
+        elif _has_nested_repeat(op, av, _has_nested_quantifier):
+            return True
+    return False
+
+
+def is_catastrophic_pattern(pattern):
+    """
+    Whether a regular expression nests an unbounded quantifier in another one,
+    e.g. (a+)+ or (\\w+\\s?)*, whose matching time is exponential in the length
+    of the strings failing to match.
+
+    :type pattern: str
+    :rtype: bool
+    """
+    try:
+        return _has_nested_quantifier(sre_parse.parse(pattern))
+    except Exception:  # invalid patterns are reported by the validation of the specification
+        return False
+
+
+def _fingerprint(node):
+    """
+    :return: the identity of the contents of a schema, the same for the copies
+        of a referenced schema made when resolving the references, which share
+        its children. The schemas without children are told apart by their
+        identity.
+    """
+    if not any(isinstance(value, (dict, list)) for value in node.values()):
+        return id(node)
+    # the scope of the references is added by the validation of the specification
+    return tuple(sorted((key, id(value) if isinstance(value, (dict, list)) else value)
+                        for key, value in node.items() if key != 'x-scope'))
+
+
+def _is_parameter_schema(node):
+    """
+    :return: whether a node out of a schema is a parameter or a header of Swagger 2, which are schemas
+    """
+    return isinstance(node, dict) and node.get('type') in JSON_TYPES
+
+
+def _is_path_parameter(node):
+    return isinstance(node, dict) and node.get('in') == 'path'
+
+
+def _types(node):
+    node_type = node.get('type')
+    return node_type if isinstance(node_type, list) else [node_type]
+
+
+class PerformanceLinter(object):
+    """
+    Finds the performance hazards of a resolved specification.
+    """
+
+    def __init__(self, max_enum=MAX_ENUM, max_composition_depth=MAX_COMPOSITION_DEPTH,
+                 max_example_size=MAX_EXAMPLE_SIZE):
+        """
+        :param max_enum: number of values from which an enum is reported
+        :type max_enum: int
+        :param max_composition_depth: nesting of allOf, oneOf and anyOf from which
+            a schema without a discriminator is reported
+        :type max_composition_depth: int
+        :param max_example_size: size of the JSON of an example, in bytes, from which it is reported
+        :type max_example_size: int
+        """
+        self.max_enum = max_enum
+        self.max_composition_depth = max_composition_depth
+        self.max_example_size = max_example_size
+        self._problems = collections.OrderedDict()
+        self._composition_depths = {}
+
+    def lint(self, spec):
+        """
+        :param spec: resolved specification, see `specific.spec.Specification`
+        :type spec: collections.Mapping
+        :return: the problems, the most severe first
+        :rtype: list[Problem]
+        """
+        self._problems = collections.OrderedDict()
+        self._composition_depths = {}
+        visited = set()
+        # node, JSON path segments, whether it is a schema, whether it is a
+        # branch of a composition, whether it is a path parameter
+        queue = collections.deque([(dict(spec), (), False, False, False)])
+        while queue:
+            node, segments, is_schema, in_composition, in_path = queue.popleft()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            if isinstance(node, list):
+                queue.extend((item, segments + (index,), is_schema or _is_parameter_schema(item), in_composition,
+                              in_path or _is_path_parameter(item))
+                             for index, item in enumerate(node) if isinstance(item, (dict, list)))
+            elif is_schema:
+                self._check_schema(node, segments, in_composition, in_path)
+                queue.extend(self._schema_children(node, segments, in_path))
+            else:
+                queue.extend(self._children(node, segments, in_path))
+
+        problems = list(self._problems.values())
+        problems.sort(key=lambda problem: SEVERITIES.index(problem.severity))
+        return problems
+
+    def _report(self, key, severity, rule, segments, message):
+        self._problems.setdefault((rule, key), Problem(severity, rule, json_pointer(segments), message))
+
+    def _children(self, node, segments, in_path):
+        in_path = in_path or _is_path_parameter(node)
+        for key, value in six.iteritems(node):
+            child = segments + (key,)
+            if key in EXAMPLES:
+                self._check_example(value, child)
+            elif key == 'examples' and isinstance(value, dict):
+                for name, example in six.iteritems(value):
+                    self._check_example(example, child + (name,))
+            elif not isinstance(value, (dict, list)):
+                continue
+            elif key == 'schema':
+                yield value, child, True, False, in_path
+            elif key in ('schemas', 'definitions') and isinstance(value, dict):
+                for name, schema in six.iteritems(value):
+                    yield schema, child + (name,), True, False, False
+            elif _is_parameter_schema(value):
+                yield value, child, True, False, in_path or _is_path_parameter(value)
+            else:
+                yield value, child, False, False, in_path
+
+    def _schema_children(self, node, segments, in_path):
+        for key, value in six.iteritems(node):
+            child = segments + (key,)
+            if key in SCHEMA_EXAMPLES:
+                self._check_example(value, child)
+            elif key in SCHEMA_MAPS and isinstance(value, dict):
+                for name, schema in six.iteritems(value):
+                    if key == 'patternProperties':
+                        self._check_pattern(name, child + (name,))
+                    if isinstance(schema, dict):
+                        yield schema, child + (name,), True, False, False
+            elif key in SCHEMA_CHILDREN and isinstance(value, (dict, list)):
+                yield value, child, True, False, in_path
+            elif key in COMPOSITIONS and isinstance(value, list):
+                for index, schema in enumerate(value):
+                    yield schema, child + (index,), True, True, in_path
+
+    def _check_schema(self, node, segments, in_composition, in_path):
+        types = _types(node)
+        key = _fingerprint(node)
+        # the size of the responses is up to the handlers
+        if 'responses' not in segments:
+            self._check_bounds(node, types, key, segments, in_path)
+        enum = node.get('enum')
+        if isinstance(enum, list) and len(enum) > self.max_enum:
+            self._report(key, MEDIUM, 'large-enum', segments + ('enum',),
+                         'enum of {} values, validated by a linear search'.format(len(enum)))
+        pattern = node.get('pattern')
+        if isinstance(pattern, six.string_types):
+            self._check_pattern(pattern, segments + ('pattern',))
+        if not in_composition and 'discriminator' not in node:
+            depth = self._composition_depth(node, set())
+            if depth > self.max_composition_depth:
+                self._report(key, HIGH, 'deep-composition', segments,
+                             'allOf/oneOf/anyOf nested {} deep without a discriminator, '
+                             'the branches are all validated'.format(depth))
+
+    def _check_bounds(self, node, types, key, segments, in_path):
+        if ('array' in types or 'items' in node) and 'maxItems' not in node:
+            self._report(key, MEDIUM, 'unbounded-array', segments,
+                         'array without maxItems, its items are all validated and converted')
+        # the length of the path parameters is bounded by the servers
+        if ('string' in types and 'maxLength' not in node and 'enum' not in node and not in_path and
+                node.get('format') not in BOUNDED_FORMATS):
+            self._report(key, LOW, 'unbounded-string', segments,
+                         'string without maxLength, its length is only bounded by the request size')
+        additional_properties = node.get('additionalProperties')
+        if (additional_properties is True or isinstance(additional_properties, dict)) and \
+                'maxProperties' not in node:
+            self._report(key, MEDIUM, 'unbounded-additional-properties', segments + ('additionalProperties',),
+                         'additionalProperties without maxProperties, any number of properties is validated')
+
+    def _check_pattern(self, pattern, segments):
+        if is_catastrophic_pattern(pattern):
+            self._report(pattern, HIGH, 'catastrophic-regex', segments,
+                         'pattern {!r} nests unbounded quantifiers, its matching time can be exponential'
+                         .format(pattern))
+
+    def _check_example(self, example, segments):
+        if not isinstance(example, (dict, list, six.string_types)):
+            return
+        size = len(json.dumps(example, default=str))
+        if size > self.max_example_size:
+            self._report(id(example), LOW, 'large-example', segments,
+                         'example of {} bytes, kept in memory and served with the specification'.format(size))
+
+    def _composition_depth(self, node, ancestors):
+        """
+        :param ancestors: the schemas being measured, to stop on recursive schemas
+        :type ancestors: set
+        :rtype: int
+        """
+        if not isinstance(node, dict) or id(node) in ancestors:
+            return 0
+        if id(node) not in self._composition_depths:
+            ancestors.add(id(node))
+            depth = 0
+            for key in COMPOSITIONS:
+                for branch in node.get(key) or []:
+                    depth = max(depth, 1 + self._composition_depth(branch, ancestors))
+            ancestors.discard(id(node))
+            self._composition_depths[id(node)] = depth
+        return self._composition_depths[id(node)]
+
+
+def lint_performance(specification, **thresholds):
+    """
+    :type specification: specific.spec.Specification
+    :param thresholds: see `PerformanceLinter`
+    :return: the performance hazards of a specification, the most severe first
+    :rtype: list[Problem]
+    """
+    return PerformanceLinter(**thresholds).lint(specification)
+
+
+def format_report(problems):
+    """
+    :type problems: list[Problem]
+    :return: a line per problem, its severity, rule, JSON path and description
+    :rtype: str
+    """
+    lines = []
+    for problem in problems:
+        lines.append('{:<6}  {}  {}'.format(problem.severity.upper(), problem.rule, problem.path))
+        lines.append('        {}'.format(problem.message))
+    counts = collections.Counter(problem.severity for problem in problems)
+    lines.append('{} problems: {}'.format(len(problems), ', '.join(
+        '{} {}'.format(counts[severity], severity) for severity in SEVERITIES)))
+    return '\n'.join(lines)
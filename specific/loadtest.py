@@ -0,0 +1,298 @@
+"""
+HTTP load generator driven by a specification: requests built from the
+examples and schemas of the operations (see `AbstractOperation.example_request`)
+are sent to a running server by concurrent workers, each one over its own
+keep-alive connection, and the latency, throughput and status codes are
+reported per operation. A share of the requests can be made invalid on
+purpose, to load the validation errors as well.
+"""
+import bisect
+import collections
+import random
+import threading
+import timeit
+
+from six.moves import http_client
+from six.moves.urllib.parse import quote, urlsplit
+from werkzeug.test import EnvironBuilder
+
+from .bench import PERCENTILES, example_request_arguments, percentile
+
+VALID = 'valid'
+INVALID = 'invalid'
+# operation and kind of the results of all the requests
+TOTAL = 'total'
+ALL = 'all'
+# status of the requests which failed without a valid response, e.g. timed
+# out, or with a malformed status line
+NO_RESPONSE = 'no response'
+
+RequestTemplate = collections.namedtuple('RequestTemplate', ['method', 'target', 'body', 'headers'])
+
+
+def build_template(arguments):
+    """
+    :param arguments: the arguments of `werkzeug.test.Client.open`
+    :type arguments: dict
+    :return: the encoded request
+    :rtype: RequestTemplate
+    """
+    builder = EnvironBuilder(**arguments)
+    environ = builder.get_environ()
+    body = environ['wsgi.input'].read()
+    headers = dict((name, value) for name, value in builder.headers.items()
+                   if name.lower() not in ('content-type', 'content-length'))
+    if environ.get('CONTENT_TYPE'):
+        headers['Content-Type'] = environ['CONTENT_TYPE']
+    target = quote(arguments['path'], safe="/:@!$&'()*+,;=-._~")
+    if environ['QUERY_STRING']:
+        target += '?' + environ['QUERY_STRING']
+    return RequestTemplate(arguments['method'], target, body, headers)
+
+
+def _parameter_type(param):
+    return param.get('schema', param).get('type')
+
+
+def invalid_arguments(operation, arguments):
+    """
+    Makes an example request invalid, failing the first applicable check of
+    the operation: a query parameter of the wrong type, a missing required
+    query parameter or header, a malformed JSON body or an unsupported
+    content type.
+
+    :type operation: specific.operations.AbstractOperation
+    :param arguments: the arguments of `werkzeug.test.Client.open` of a valid request
+    :type arguments: dict
+    :return: the arguments of an invalid request, None when there is no
+        parameter nor body to invalidate
+    :rtype: dict | None
+    """
+    arguments = dict(arguments, query_string=arguments['query_string'].copy(),
+                     headers=dict(arguments['headers']))
+    for param in operation.parameters:
+        if param['in'] == 'query' and _parameter_type(param) in ('integer', 'number', 'boolean'):
+            arguments['query_string'].setlist(param['name'], ['invalid'])
+            return arguments
+    for param in operation.parameters:
+        if param.get('required') and param['in'] == 'query':
+            arguments['query_string'].poplist(param['name'])
+            return arguments
+        if param.get('required') and param['in'] == 'header':
+            arguments['headers'].pop(param['name'], None)
+            return arguments
+    if arguments.get('data') is not None:
+        if arguments['content_type'] and 'json' in arguments['content_type']:
+            arguments['data'] = b'{"malformed": '
+        else:
+            arguments['data'] = b'invalid'
+            arguments['content_type'] = 'application/x-invalid'
+        return arguments
+    return None
+
+
+def operation_templates(operation, headers=None):
+    """
+    :type operation: specific.operations.AbstractOperation
+    :param headers: sent on top of the example headers, e.g. credentials
+    :type headers: dict | None
+    :return: the valid request of the operation, and an invalid one or None
+    :rtype: (RequestTemplate, RequestTemplate | None)
+    """
+    arguments = example_request_arguments(operation, headers)
+    invalid = invalid_arguments(operation, arguments)
+    return build_template(arguments), build_template(invalid) if invalid else None
+
+
+def connect(scheme, netloc, timeout):
+    """
+    :return: a keep-alive connection, opened by its first request
+    :rtype: http_client.HTTPConnection
+    """
+    connection_class = http_client.HTTPSConnection if scheme == 'https' else http_client.HTTPConnection
+    return connection_class(netloc, timeout=timeout)
+
+
+def send(connection, request, base_path=''):
+    """
+    :type connection: http_client.HTTPConnection
+    :type request: RequestTemplate
+    :param base_path: prefixed to the target of the request
+    :type base_path: str
+    :return: the status of the response, NO_RESPONSE when it failed
+    :rtype: int | str
+    """
+    try:
+        connection.request(request.method, base_path + request.target, request.body, request.headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except (http_client.HTTPException, IOError):
+        # the connection is reopened by the next request
+        connection.close()
+        return NO_RESPONSE
+
+
+class LoadTest(object):
+    """
+    Sends the requests of weighted operations to a server for a duration.
+    """
+
+    def __init__(self, url, operations, concurrency=8, duration=10.0, invalid_ratio=0.0, timeout=10.0,
+                 random=random.random):
+        """
+        :param url: of the server, e.g. http://localhost:5000, its path is
+            prefixed to the paths of the operations
+        :type url: str
+        :param operations: operation id, weight, valid and invalid request
+        :type operations: list[(str, float, RequestTemplate, RequestTemplate | None)]
+        :param concurrency: number of workers, each one with its connection
+        :type concurrency: int
+        :param duration: seconds
+        :type duration: float
+        :param invalid_ratio: share of the requests made invalid, for the operations which can be
+        :type invalid_ratio: float
+        :param timeout: seconds to connect and to wait for a response
+        :type timeout: float
+        :param random: returns a float in [0, 1), as `random.random`
+        """
+        if not operations:
+            raise ValueError('No operation to load')
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.operations = operations
+        self.cumulative_weights = []
+        total = 0.0
+        for _, weight, _, _ in operations:
+            total += weight
+            self.cumulative_weights.append(total)
+        self.concurrency = concurrency
+        self.duration = duration
+        self.invalid_ratio = invalid_ratio
+        self.timeout = timeout
+        self.random = random
+
+    def connect(self):
+        return connect(self.scheme, self.netloc, self.timeout)
+
+    def choose(self):
+        """
+        :return: the operation id, the kind of request and the request to send
+        :rtype: (str, str, RequestTemplate)
+        """
+        index = bisect.bisect(self.cumulative_weights, self.random() * self.cumulative_weights[-1])
+        operation_id, _, valid, invalid = self.operations[min(index, len(self.operations) - 1)]
+        if invalid is not None and self.random() < self.invalid_ratio:
+            return operation_id, INVALID, invalid
+        return operation_id, VALID, valid
+
+    def worker(self, deadline, samples):
+        """
+        Sends requests until the deadline, over a keep-alive connection.
+
+        :param samples: filled with the latency, the status and whether it is
+            expected of each request, by operation and kind of request
+        :type samples: dict
+        """
+        clock = timeit.default_timer
+        connection = self.connect()
+        try:
+            while clock() < deadline:
+                operation_id, kind, request = self.choose()
+                start = clock()
+                status = send(connection, request, self.base_path)
+                samples[(operation_id, kind)].append((clock() - start, status, is_expected(kind, status)))
+        finally:
+            connection.close()
+
+    def run(self):
+        """
+        :return: the results per operation and kind of request, then of all the
+            requests, see `summarize`
+        :rtype: list[dict]
+        """
+        deadline = timeit.default_timer() + self.duration
+        samples = [collections.defaultdict(list) for _ in range(self.concurrency)]
+        workers = [threading.Thread(target=self.worker, args=(deadline, worker_samples))
+                   for worker_samples in samples]
+        start = timeit.default_timer()
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = timeit.default_timer() - start
+
+        merged = collections.defaultdict(list)
+        for worker_samples in samples:
+            for key, values in worker_samples.items():
+                merged[key].extend(values)
+        results = [summarize(operation_id, kind, merged[(operation_id, kind)], elapsed)
+                   for operation_id, _, _, _ in self.operations
+                   for kind in (VALID, INVALID)
+                   if merged[(operation_id, kind)]]
+        if merged:
+            results.append(summarize(TOTAL, ALL, [sample for values in merged.values() for sample in values],
+                                     elapsed))
+        return results
+
+
+def is_expected(kind, status):
+    """
+    :return: whether a status is the expected one of a kind of request, below
+        400 for the valid ones and 4xx for the invalid ones
+    :rtype: bool
+    """
+    if status == NO_RESPONSE:
+        return False
+    if kind == INVALID:
+        return 400 <= status < 500
+    return status < 400
+
+
+def summarize(operation_id, kind, samples, elapsed):
+    """
+    :param samples: latency in seconds, status and whether it is expected of
+        each request
+    :type samples: list[(float, int | str, bool)]
+    :param elapsed: seconds of the load test
+    :type elapsed: float
+    :return: the number of requests, the throughput, the latency percentiles in
+        milliseconds, the number of responses per status and the share of the
+        unexpected statuses
+    :rtype: dict
+    """
+    latencies = sorted(latency for latency, _, _ in samples)
+    statuses = collections.Counter(status for _, status, _ in samples)
+    unexpected = sum(1 for _, _, expected in samples if not expected)
+    result = {
+        'operation_id': operation_id,
+        'kind': kind,
+        'requests': len(samples),
+        'rps': len(samples) / elapsed,
+        'statuses': dict((str(status), count) for status, count in statuses.items()),
+        'error_rate': unexpected / float(len(samples)),
+    }
+    for percent in PERCENTILES:
+        result['p{}_ms'.format(percent)] = percentile(latencies, percent) * 1000
+    return result
+
+
+def format_report(results):
+    """
+    :return: a table of the results
+    :rtype: str
+    """
+    names = ['{} ({})'.format(result['operation_id'], result['kind']) if result['kind'] else result['operation_id']
+             for result in results]
+    width = max([len(name) for name in names] + [len('operation')])
+    lines = ['{:<{width}} {:>9} {:>10} {:>9} {:>9} {:>9} {:>8}  {}'.format(
+        'operation', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors %', 'statuses', width=width)]
+    for name, result in zip(names, results):
+        counts = ', '.join('{}x{}'.format(count, status) for status, count in sorted(result['statuses'].items()))
+        lines.append('{name:<{width}} {requests:>9} {rps:>10.1f} {p50_ms:>9.2f} {p95_ms:>9.2f} {p99_ms:>9.2f} '
+                     '{errors:>8.1f}  {counts}'.format(name=name, width=width, errors=result['error_rate'] * 100,
+                                                       counts=counts, **result))
+    return '\n'.join(lines)
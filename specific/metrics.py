@@ -0,0 +1,650 @@
+"""
+Metrics of the operations: the latency of each stage of the request pipeline
+(security, array parsing, parameter validation, body validation, handler,
+response validation, serialization), by operation and status.
+"""
+import bisect
+import collections
+import errno
+import functools
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import timeit
+import weakref
+
+import six
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# upper bounds in seconds of the buckets of the latency histograms
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = 'specific_request_duration_seconds'
+STAGE_DURATION = 'specific_stage_duration_seconds'
+
+# metrics of the Server-Timing header, and the stages of the pipeline they sum
+SERVER_TIMING_STAGES = (
+    ('auth', ('security',)),
+    ('validate', ('array_parsing', 'parameter_validation', 'body_validation', 'response_validation')),
+    ('handler', ('handler',)),
+    ('serialize', ('serialization',)),
+)
+
+# the files of the metrics are not opened through symbolic links
+_OPEN_FLAGS = os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0)
+
+METRIC_HELP = {
+    REQUEST_DURATION: 'Duration of the requests, from the framework request to the framework response.',
+    STAGE_DURATION: 'Duration of each stage of the request pipeline.',
+}
+
+
+class MetricsBackend(object):
+    """
+    Receives the metrics of the operations. Subclasses forward them, e.g. to
+    statsd, or keep them, like `InMemoryMetrics`.
+    """
+
+    def observe(self, name, value, labels):
+        """
+        :param name: name of the metric
+        :type name: str
+        :param value: e.g. a duration in seconds
+        :type value: float
+        :param labels: e.g. the operation and the status
+        :type labels: dict
+        """
+        raise NotImplementedError()
+
+    def observe_request(self, operation_id, status, duration, stages):
+        """
+        :type operation_id: str
+        :param status: status code of the response
+        :type status: int
+        :param duration: seconds from the framework request to the framework response
+        :type duration: float
+        :param stages: seconds spent in each stage of the pipeline
+        :type stages: dict
+        """
+        status = str(status)
+        self.observe(REQUEST_DURATION, duration, {'operation': operation_id, 'status': status})
+        for stage, stage_duration in stages.items():
+            self.observe(STAGE_DURATION, stage_duration,
+                         {'operation': operation_id, 'stage': stage, 'status': status})
+
+
+class Histogram(object):
+    """
+    Cumulative histogram of observed values, as in the Prometheus exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.merge(self)
+        return histogram
+
+    def merge(self, other):
+        """
+        Adds the values of a histogram with the same buckets.
+
+        :type other: Histogram
+        :raises ValueError: the buckets are not the same
+        """
+        if other.buckets != self.buckets:
+            raise ValueError('Histograms with different buckets cannot be merged')
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative_counts(self):
+        """
+        :return: (upper bound, number of values lower or equal), the last bound is +Inf
+        :rtype: list
+        """
+        bounds = [format_value(bucket) for bucket in self.buckets] + ['+Inf']
+        counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return list(zip(bounds, counts))
+
+
+class InMemoryMetrics(MetricsBackend):
+    """
+    Keeps the metrics as histograms in memory, rendered by the metrics endpoint
+    of the application in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms = collections.defaultdict(dict)  # name -> labels -> Histogram
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histograms = self.histograms[name]
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def get(self, name, **labels):
+        """
+        :return: the histogram of a metric with the given labels
+        :rtype: Histogram | None
+        """
+        return self.histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def collect(self):
+        """
+        :return: a copy of the histograms, map of metric name to labels to Histogram
+        :rtype: dict
+        """
+        with self._lock:
+            return {name: {labels: histogram.copy() for labels, histogram in histograms.items()}
+                    for name, histograms in self.histograms.items()}
+
+    def render_prometheus(self):
+        """
+        :return: the metrics in the Prometheus text exposition format
+        :rtype: str
+        """
+        return render_histograms(self.collect())
+
+
+def render_histograms(histograms):
+    """
+    :param histograms: map of metric name to labels to Histogram
+    :type histograms: dict
+    :return: the histograms in the Prometheus text exposition format
+    :rtype: str
+    """
+    lines = []
+    for name in sorted(histograms):
+        lines.append('# HELP {} {}'.format(name, METRIC_HELP.get(name, name)))
+        lines.append('# TYPE {} histogram'.format(name))
+        for key, histogram in sorted(histograms[name].items()):
+            labels = dict(key)
+            for bound, count in histogram.cumulative_counts():
+                lines.append('{}_bucket{} {}'.format(name, format_labels(labels, le=bound), count))
+            lines.append('{}_sum{} {}'.format(name, format_labels(labels), format_value(histogram.sum)))
+            lines.append('{}_count{} {}'.format(name, format_labels(labels), histogram.count))
+    return ''.join(line + '\n' for line in lines)
+
+
+def format_value(value):
+    """
+    :type value: float
+    :rtype: str
+
+    >>> format_value(0.5)
+    '0.5'
+    """
+    return repr(float(value))
+
+
+def format_labels(labels, **extra_labels):
+    """
+    :type labels: dict
+    :rtype: str
+
+    >>> format_labels({'status': '200'}, le='0.5')
+    '{status="200",le="0.5"}'
+    """
+    items = sorted(labels.items()) + sorted(extra_labels.items())
+    if not items:
+        return ''
+    escaped = ('{}="{}"'.format(name, six.text_type(value).replace('\\', '\\\\')
+                                .replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in items)
+    return '{' + ','.join(escaped) + '}'
+
+
+def format_server_timing(durations, total):
+    """
+    :param durations: seconds spent in each stage of the pipeline
+    :type durations: dict
+    :param total: seconds spent in the request
+    :type total: float
+    :return: value of the Server-Timing header, the durations in milliseconds
+    :rtype: str
+
+    >>> format_server_timing({'handler': 0.0015, 'serialization': 0.0005}, 0.003)
+    'handler;dur=1.500, serialize;dur=0.500, total;dur=3.000'
+    """
+    metrics = []
+    for name, stages in SERVER_TIMING_STAGES:
+        if any(stage in durations for stage in stages):
+            duration = sum(durations.get(stage, 0.0) for stage in stages)
+            metrics.append('{};dur={:.3f}'.format(name, duration * 1000))
+    metrics.append('total;dur={:.3f}'.format(total * 1000))
+    return ', '.join(metrics)
+
+
+_HEADER = struct.Struct('<Q')  # bytes used by the entries
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _read_entries(data):
+    """
+    Entries of a values file: the key length, the key, padding, the float value.
+
+    :type data: bytes | mmap.mmap
+    :return: key, value and offset of the value
+    :rtype: iter
+    """
+    if len(data) < _HEADER.size:
+        return
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    position = _HEADER.size
+    while position < used:
+        key_length = _KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + _KEY_LENGTH.size
+        offset = _align(start + key_length)
+        yield data[start:start + key_length].decode('utf-8'), _VALUE.unpack_from(data, offset)[0], offset
+        position = offset + _VALUE.size
+
+
+class _ValuesFile(object):
+    """
+    Memory mapped file of float values by key, written by a single thread. The
+    entries are appended, then the header is updated, so that the readers only
+    see complete entries.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        fd = os.open(path, _OPEN_FLAGS, 0o600)
+        try:
+            size = os.fstat(fd).st_size
+            if size < self.INITIAL_SIZE:
+                os.ftruncate(fd, self.INITIAL_SIZE)
+                size = self.INITIAL_SIZE
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._used = max(_HEADER.unpack_from(self._mmap, 0)[0], _HEADER.size)
+        self._offsets = {key: offset for key, _, offset in _read_entries(self._mmap)}
+
+    def add(self, key, amount):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._append(key)
+        _VALUE.pack_into(self._mmap, offset, _VALUE.unpack_from(self._mmap, offset)[0] + amount)
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        offset = _align(self._used + _KEY_LENGTH.size + len(encoded))
+        used = offset + _VALUE.size
+        if used > len(self._mmap):
+            size = len(self._mmap)
+            while size < used:
+                size *= 2
+            self._mmap.resize(size)
+        _KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        start = self._used + _KEY_LENGTH.size
+        self._mmap[start:start + len(encoded)] = encoded
+        _VALUE.pack_into(self._mmap, offset, 0.0)
+        _HEADER.pack_into(self._mmap, 0, used)
+        self._used = used
+        self._offsets[key] = offset
+        return offset
+
+    def close(self):
+        self._mmap.close()
+
+
+class MultiProcessMetrics(MetricsBackend):
+    """
+    Histograms shared by the worker processes of a host, e.g. the workers of the
+    prefork server or of gunicorn, through memory mapped files in a directory.
+
+    Each thread of a worker writes its values to its own file, so that the
+    observations do not take locks; the files of the finished threads are
+    reused by the next threads. The metrics endpoint of any worker sums the
+    files. The values of the dead workers are merged into an archive file and
+    their files are removed.
+
+    The default directory is created by the process creating the backend, it
+    is only shared by the workers forked after it. The servers importing the
+    application in each worker, e.g. gunicorn without --preload, need an
+    explicit directory.
+    """
+
+    ARCHIVE = 'archive.db'
+
+    def __init__(self, path=None, buckets=DEFAULT_BUCKETS):
+        """
+        :param path: directory of the values files, shared by the workers. By
+            default a private directory of the temporary directory, for the
+            workers forked from this process. An existing directory must be
+            owned by the current user.
+        :type path: str | None
+        :raises ValueError: the directory is owned by another user
+        """
+        if path is None:
+            path = tempfile.mkdtemp(prefix='specific-metrics-')
+        elif not os.path.isdir(path):
+            os.makedirs(path, 0o700)
+        elif hasattr(os, 'getuid') and os.stat(path).st_uid != os.getuid():
+            raise ValueError('The metrics directory {} is not owned by the current user'.format(path))
+        self.path = path
+        self.buckets = buckets
+        self._bounds = [format_value(bucket) for bucket in buckets] + ['+Inf']
+        self._keys = {}
+        self._local = threading.local()
+        self._slots_lock = threading.Lock()
+        self._slots_pid = None
+        self._free_slots = []
+        self._next_slot = 0
+        self._slot_refs = set()
+
+    def observe(self, name, value, labels):
+        labels = tuple(sorted(labels.items()))
+        keys = self._keys.get((name, labels))
+        if keys is None:
+            keys = self._keys[(name, labels)] = [
+                json.dumps([name, labels, field]) for field in self._bounds + ['sum', 'count']]
+        values = self._values()
+        values.add(keys[bisect.bisect_left(self.buckets, value)], 1)
+        values.add(keys[-2], value)
+        values.add(keys[-1], 1)
+
+    def _values(self):
+        values = getattr(self._local, 'values', None)
+        if values is None or values.pid != os.getpid():
+            slot, sentinel = self._acquire_slot()
+            self._local.sentinel = sentinel
+            values = self._local.values = _ValuesFile(os.path.join(self.path, '{}-{}.db'.format(os.getpid(), slot)))
+        return values
+
+    def _acquire_slot(self):
+        """
+        :return: a file number of the process not used by another thread, and an
+            object of the thread local storage which releases it when the thread ends
+        """
+        pid = os.getpid()
+        with self._slots_lock:
+            if self._slots_pid != pid:
+                # forked
+                self._slots_pid = pid
+                self._free_slots = []
+                self._next_slot = 0
+                self._slot_refs = set()
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = self._next_slot
+                self._next_slot += 1
+            sentinel = _SlotSentinel()
+            self._slot_refs.add(weakref.ref(sentinel, functools.partial(self._release_slot, slot, pid)))
+        return slot, sentinel
+
+    def _release_slot(self, slot, pid, ref):
+        with self._slots_lock:
+            self._slot_refs.discard(ref)
+            if pid == self._slots_pid:
+                self._free_slots.append(slot)
+
+    def collect(self):
+        """
+        Sums the values of the workers, after archiving those of the dead workers.
+
+        :return: map of metric name to labels to Histogram
+        :rtype: dict
+        """
+        self._archive_dead_workers()
+        values = collections.defaultdict(float)
+        for path in glob.glob(os.path.join(self.path, '*.db')):
+            try:
+                with open(path, 'rb') as values_file:
+                    data = values_file.read()
+            except (IOError, OSError):
+                # archived meanwhile
+                continue
+            for key, value, _ in _read_entries(data):
+                values[key] += value
+
+        indexes = {bound: index for index, bound in enumerate(self._bounds)}
+        histograms = collections.defaultdict(dict)
+        for key, value in values.items():
+            name, labels, field = json.loads(key)
+            labels = tuple(tuple(label) for label in labels)
+            histogram = histograms[name].get(labels)
+            if histogram is None:
+                histogram = histograms[name][labels] = Histogram(self.buckets)
+            if field == 'sum':
+                histogram.sum = value
+            elif field == 'count':
+                histogram.count = int(value)
+            elif field in indexes:
+                histogram.counts[indexes[field]] = int(value)
+        return histograms
+
+    def render_prometheus(self):
+        return render_histograms(self.collect())
+
+    def _archive_dead_workers(self):
+        import fcntl
+
+        with os.fdopen(os.open(os.path.join(self.path, 'archive.lock'), _OPEN_FLAGS, 0o600), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = None
+            try:
+                for path in glob.glob(os.path.join(self.path, '*-*.db')):
+                    pid = int(os.path.basename(path).split('-', 1)[0])
+                    if _is_alive(pid):
+                        continue
+                    if archive is None:
+                        archive = _ValuesFile(os.path.join(self.path, self.ARCHIVE))
+                    with open(path, 'rb') as values_file:
+                        for key, value, _ in _read_entries(values_file.read()):
+                            archive.add(key, value)
+                    os.remove(path)
+            finally:
+                if archive is not None:
+                    archive.close()
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def clear(self):
+        """
+        Removes the values of all the workers.
+        """
+        for path in glob.glob(os.path.join(self.path, '*.db')):
+            os.remove(path)
+
+
+class _SlotSentinel(object):
+    pass
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as exception:
+        return exception.errno == errno.EPERM
+    return True
+
+
+class StageTimer(object):
+    """
+    Times the stages of the pipeline of a request. The stages are sequential,
+    a stage started while another one is running is not counted in it.
+
+    The stage listeners (see `specific.tracing.StageListener`) are notified
+    of the start and end of the stages, with the durations including the
+    nested stages, like the spans enclosing them.
+    """
+
+    clock = staticmethod(timeit.default_timer)
+
+    def __init__(self, listeners=(), operation_id=None):
+        """
+        :type listeners: list
+        :type operation_id: str | None
+        """
+        self.start_time = self.clock()
+        self.durations = {}
+        self.listeners = listeners
+        self.operation_id = operation_id
+        # the SpecificRequest, once converted from the framework request
+        self.request = None
+        self._running = {}
+        # the start times not moved forward by the nested stages, for the listeners
+        self._started = {}
+        self._traces = {}
+
+    def start(self, stage):
+        self._running[stage] = self._started[stage] = self.clock()
+        if self.listeners:
+            self.trace_started(stage)
+
+    def stop(self, stage):
+        start = self._running.pop(stage, None)
+        if start is None:
+            return
+        now = self.clock()
+        elapsed = now - start
+        started = self._started.pop(stage, start)
+        if self.listeners:
+            self.trace_finished(stage, now - started)
+        for other in self._running:
+            # the enclosing stages do not include it
+            self._running[other] += elapsed
+        self.durations[stage] = self.durations.get(stage, 0.0) + elapsed
+
+    def trace_started(self, stage):
+        """
+        Notifies the listeners of the start of a stage.
+        """
+        started = []
+        for listener in self.listeners:
+            try:
+                started.append(listener.stage_started(stage, self.operation_id, self.request))
+            except Exception:
+                logger.exception('Stage listener %r failed', listener)
+                started.append(None)
+        self._traces[stage] = started
+
+    def trace_finished(self, stage, duration):
+        """
+        Notifies the listeners of the end of a stage.
+
+        :param duration: seconds spent in the stage, including the nested stages
+        :type duration: float
+        """
+        started = self._traces.pop(stage, None) or [None] * len(self.listeners)
+        for listener, value in zip(self.listeners, started):
+            try:
+                listener.stage_finished(stage, self.operation_id, self.request, duration, value)
+            except Exception:
+                logger.exception('Stage listener %r failed', listener)
+
+    def is_running(self, stage):
+        return stage in self._running
+
+    def elapsed(self):
+        return self.clock() - self.start_time
+
+
+_multiprocess_metrics = {}
+_multiprocess_metrics_lock = threading.Lock()
+
+
+def get_metrics_backend(options):
+    """
+    :param options: the `metrics` and `metrics_dir` options
+    :type options: specific.options.SpecificOptions
+    :rtype: MetricsBackend | None
+    """
+    metrics = options.metrics
+    if isinstance(metrics, MetricsBackend):
+        return metrics
+    if metrics == 'multiprocess':
+        # the APIs and the application share the backend of a directory
+        with _multiprocess_metrics_lock:
+            if options.metrics_dir not in _multiprocess_metrics:
+                _multiprocess_metrics[options.metrics_dir] = MultiProcessMetrics(options.metrics_dir)
+            return _multiprocess_metrics[options.metrics_dir]
+    if metrics:
+        # each application, or API created without application, has its own histograms
+        return InMemoryMetrics()
+    return None
+
+
+def render_prometheus(backends):
+    """
+    Renders the metrics of several backends, those of the backends with
+    `collect` are merged into a family per metric. The other backends with
+    `render_prometheus` are rendered after them, those without are ignored.
+
+    :param backends: the backends are rendered once
+    :type backends: list
+    :rtype: str
+    """
+    rendered = []
+    merged = collections.defaultdict(dict)
+    text = ''
+    for backend in backends:
+        if backend is None or any(backend is other for other in rendered):
+            continue
+        rendered.append(backend)
+        if hasattr(backend, 'collect'):
+            merge_histograms(merged, backend.collect())
+        elif hasattr(backend, 'render_prometheus'):
+            text += backend.render_prometheus()
+    return render_histograms(merged) + text
+
+
+def merge_histograms(merged, histograms):
+    """
+    :param merged: map of metric name to labels to Histogram, updated
+    :type merged: dict
+    :param histograms: map of metric name to labels to Histogram
+    :type histograms: dict
+    """
+    for name, series in histograms.items():
+        for labels, histogram in series.items():
+            existing = merged[name].get(labels)
+            if existing is None:
+                merged[name][labels] = histogram.copy()
+                continue
+            try:
+                existing.merge(histogram)
+            except ValueError:
+                logger.warning('Ignoring the %s histogram %s, its buckets differ from another backend',
+                               name, dict(labels))
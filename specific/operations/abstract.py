@@ -2,15 +2,25 @@ import abc
 import logging
 
 import six
+from werkzeug.datastructures import MultiDict
 
 from specific.operations.secure import SecureOperation
 
-from ..decorators.metrics import UWSGIMetricsCollector
+from ..allocations import AllocationTracker
+from ..decorators.metrics import (UWSGIMetricsCollector, time_stage,
+                                  time_stage_after, time_stage_before)
 from ..decorators.parameter import parameter_to_arg
-from ..decorators.produces import BaseSerializer, Produces
+from ..decorators.produces import BaseSerializer, NoContent, Produces
 from ..decorators.response import ResponseValidator
+from ..decorators.security import security_passthrough
 from ..decorators.validation import ParameterValidator, RequestBodyValidator
-from ..utils import all_json, is_nullable
+from ..examples import example_to_string, schema_example
+from ..lifecycle import SpecificRequest
+from ..options import SpecificOptions
+from ..profiler import track_operation
+from ..slow_requests import SlowRequestLog
+from ..traffic import TrafficRecorder
+from ..utils import all_json, is_form_mimetype, is_nullable
 
 logger = logging.getLogger(__name__)
 
@@ -367,39 +377,228 @@ class AbstractOperation(SecureOperation):
 
         :rtype: types.FunctionType
         """
+        function = self._decorate_handler(self._resolution.function)
+
+        # NOTE: the security decorator should be applied last to check auth before anything else :-)
+        security_decorator = self.security_decorator
+        logger.debug('... Adding security decorator (%r)', security_decorator)
+        if security_decorator is security_passthrough:
+            function = security_decorator(function)
+        else:
+            function = self._stage_decorator('security', security_decorator, function)
+
+        if self._profiled:
+            function = track_operation(self.operation_id, function)
+
+        allocation_tracker = self._api_attribute('allocation_tracker', AllocationTracker)
+        if allocation_tracker is not None:
+            function = allocation_tracker.wrap(self.operation_id, function)
+
+        traffic_recorder = self._api_attribute('traffic_recorder', TrafficRecorder)
+        if traffic_recorder is not None:
+            function = traffic_recorder.wrap(self.operation_id, function, self.api.base_path + self.path,
+                                             self._sensitive_parameters())
+
+        if UWSGIMetricsCollector.is_available():  # pragma: no cover
+            decorator = UWSGIMetricsCollector(self.path, self.method)
+            function = decorator(function)
+
+        function = self._request_response_decorator(function)
+
+        return function
+
+    def _decorate_handler(self, function):
+        """
+        Wraps the handler with the decorators converting a SpecificRequest to
+        the handler arguments, and its result to a validated response. The
+        security and the framework request/response conversion are not applied.
+
+        :rtype: types.FunctionType
+        """
+        if self.api.is_async():  # pragma: 2.7 no cover
+            from ..decorators.coroutine_wrappers import get_handler_wrapper
+            function = get_handler_wrapper(function, self.api)
+
         function = parameter_to_arg(
-            self, self._resolution.function, self.pythonic_params,
+            self, function, self.pythonic_params,
             self._pass_context_arg_name
         )
+        if self._timed:
+            function = time_stage('handler', function)
 
         if self.validate_responses:
             logger.debug('... Response validation enabled.')
             response_decorator = self.__response_validation_decorator
             logger.debug('... Adding response decorator (%r)', response_decorator)
-            function = response_decorator(function)
+            if self._timed:
+                function = time_stage_after('response_validation', response_decorator, function)
+            else:
+                function = response_decorator(function)
 
         produces_decorator = self.__content_type_decorator
         logger.debug('... Adding produces decorator (%r)', produces_decorator)
         function = produces_decorator(function)
 
-        for validation_decorator in self.__validation_decorators:
-            function = validation_decorator(function)
+        for stage, validation_decorator in self.__validation_decorators:
+            function = self._stage_decorator(stage, validation_decorator, function)
 
         array_parsing_decorator = self._array_parsing_decorator
-        function = array_parsing_decorator(function)
+        function = self._stage_decorator('array_parsing', array_parsing_decorator, function)
 
-        # NOTE: the security decorator should be applied last to check auth before anything else :-)
-        security_decorator = self.security_decorator
-        logger.debug('... Adding security decorator (%r)', security_decorator)
-        function = security_decorator(function)
+        if self.api.is_async():  # pragma: 2.7 no cover
+            from ..decorators.coroutine_wrappers import get_coroutine_wrapper
+            function = get_coroutine_wrapper(function)
 
-        if UWSGIMetricsCollector.is_available():  # pragma: no cover
-            decorator = UWSGIMetricsCollector(self.path, self.method)
-            function = decorator(function)
+        return function
 
-        function = self._request_response_decorator(function)
+    def _stage_decorator(self, stage, decorator, function):
+        """
+        Applies a decorator whose work before calling the decorated function is
+        timed as a stage, when the metrics or the stage listeners are enabled.
 
-        return function
+        :rtype: types.FunctionType
+        """
+        if not self._timed:
+            return decorator(function)
+        return time_stage_before(stage, decorator, function)
+
+    @property
+    def _profiled(self):
+        """
+        Whether the profiler tracks the requests of the operation. The requests
+        of the asynchronous APIs share the thread of the event loop, they are
+        not tracked.
+        """
+        options = self._api_attribute('options', SpecificOptions)
+        return options is not None and options.profiler and not self.api.is_async()
+
+    @property
+    def _slow_request_threshold(self):
+        options = self._api_attribute('options', SpecificOptions)
+        if options is None:
+            return None
+        return self._operation.get('x-slow-threshold-ms', options.slow_request_threshold_ms)
+
+    def _get_slow_request_log(self):
+        """
+        The log of the requests slower than the `slow_request_threshold_ms`
+        option, or the `x-slow-threshold-ms` extension of the operation.
+
+        :rtype: SlowRequestLog | None
+        """
+        threshold = self._slow_request_threshold
+        if threshold is None:
+            return None
+        options = self.api.options
+        header_parameters = [parameter['name'] for parameter in self.parameters if parameter['in'] == 'header']
+        return SlowRequestLog(self.operation_id, threshold,
+                              profile_count=options.slow_request_profile_count,
+                              profile_dir=options.slow_request_profile_dir,
+                              header_parameters=header_parameters,
+                              sensitive_parameters=self._sensitive_parameters())
+
+    def _sensitive_parameters(self):
+        """
+        :return: the names of the API keys of the operation, redacted from the logs and the recorded traffic
+        :rtype: list[str]
+        """
+        return [scheme['name'] for scheme in (self.security_schemes or {}).values()
+                if scheme.get('type') == 'apiKey']
+
+    def _warmup_handler(self, *args, **kwargs):
+        """
+        Replaces the handler during the warmup, returns the example response.
+        """
+        if not self.responses:
+            return NoContent, 200
+        body, status_code = self.example_response()
+        if body is None:
+            schema = self.response_schema(str(status_code), self.get_mimetype())
+            body = schema_example(schema) if schema else NoContent
+        return body, status_code
+
+    def warmup(self):
+        """
+        Runs an example request through the operation, from the request parsing and
+        validation to the response serialization and validation. The handler is not
+        called, the example response is returned instead.
+
+        Security is not applied, as there are no credentials to validate.
+
+        :return: the response of the framework
+        """
+        function = self._decorate_handler(self._warmup_handler)
+        response = function(self.example_request())
+        if self.api.is_async():  # pragma: 2.7 no cover
+            from ..decorators.coroutine_wrappers import run_until_complete
+            response = run_until_complete(response)
+        return self.api.get_response(response, self.get_mimetype())
+
+    def example_request(self):
+        """
+        Builds a request to the operation from the examples and schemas of its
+        parameters and body.
+
+        :rtype: SpecificRequest
+        """
+        path, path_params, headers = self.path, {}, {}
+        query, form, files = MultiDict(), MultiDict(), MultiDict()
+        for param in self.parameters:
+            location = param['in']
+            if location == 'body':
+                continue
+            if location == 'formData' and param.get('type') == 'file':
+                files.add(param['name'], schema_example(param))
+                continue
+            values = self._example_parameter(param)
+            if location == 'path':
+                path = path.replace('{' + param['name'] + '}', values[0])
+                path_params[param['name'].replace('-', '_')] = values[0]
+            elif location == 'query':
+                for value in values:
+                    query.add(param['name'], value)
+            elif location == 'header':
+                headers[param['name']] = ','.join(values)
+            elif location == 'formData':
+                for value in values:
+                    form.add(param['name'], value)
+
+        mimetype = self.consumes[0] if self.consumes else DEFAULT_MIMETYPE
+        body, json_body = b'', None
+        if self.body_schema:
+            example = schema_example(self.body_schema)
+            if is_form_mimetype(mimetype) and isinstance(example, dict):
+                for name, value in example.items():
+                    for item in (value if isinstance(value, list) else [value]):
+                        form.add(name, example_to_string(item))
+            else:
+                json_body = example
+                body = self.api.jsonifier.dumps(example).encode('utf-8')
+        if body or form or files:
+            headers['Content-Type'] = mimetype
+
+        return SpecificRequest(
+            url='http://localhost' + self.api.base_path + path,
+            method=self.method.upper(),
+            path_params=path_params,
+            query=query,
+            headers=headers,
+            form=form,
+            body=body,
+            json_getter=lambda: json_body,
+            files=files,
+            context={}
+        )
+
+    @abc.abstractmethod
+    def _example_parameter(self, param):
+        """
+        Example of a parameter, serialized as in a request.
+
+        :type param: dict
+        :return: the values of the parameter, several ones when repeated in the request
+        :rtype: list[str]
+        """
 
     @property
     def __content_type_decorator(self):
@@ -437,18 +636,19 @@ class AbstractOperation(SecureOperation):
     @property
     def __validation_decorators(self):
         """
-        :rtype: types.FunctionType
+        :return: the stage of the metrics and the validation decorator
+        :rtype: (str, types.FunctionType)
         """
         ParameterValidator = self.validator_map['parameter']
         RequestBodyValidator = self.validator_map['body']
         if self.parameters:
-            yield ParameterValidator(self.parameters,
-                                     self.api,
-                                     strict_validation=self.strict_validation)
+            yield 'parameter_validation', ParameterValidator(self.parameters,
+                                                             self.api,
+                                                             strict_validation=self.strict_validation)
         if self.body_schema:
-            yield RequestBodyValidator(self.body_schema, self.consumes, self.api,
-                                       is_nullable(self.body_definition),
-                                       strict_validation=self.strict_validation)
+            yield 'body_validation', RequestBodyValidator(self.body_schema, self.consumes, self.api,
+                                                          is_nullable(self.body_definition),
+                                                          strict_validation=self.strict_validation)
 
     @property
     def __response_validation_decorator(self):
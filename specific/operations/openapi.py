@@ -3,7 +3,9 @@ from copy import deepcopy
 
 from specific.operations.abstract import AbstractOperation
 
-from ..decorators.array_parsing import OpenAPIArrayParser
+from ..decorators.array_parsing import (QUERY_STRING_DELIMITERS,
+                                        OpenAPIArrayParser)
+from ..examples import example_to_string, schema_example
 from ..utils import deep_get, is_null, is_nullable, make_type
 
 logger = logging.getLogger(__name__)
@@ -261,6 +263,21 @@ class OpenAPIOperation(AbstractOperation):
             return {x_body_name: body_arg}
         return {}
 
+    def _example_parameter(self, param):
+        if 'example' in param:
+            value = param['example']
+        else:
+            value = schema_example(param.get('schema', {}))
+        if isinstance(value, dict):
+            value = [item for pair in value.items() for item in pair]
+        if not isinstance(value, list):
+            return [example_to_string(value)]
+        values = [example_to_string(item) for item in value]
+        style = param.get('style', OpenAPIArrayParser.style_defaults[param['in']])
+        if param.get('explode', style == 'form') and param['in'] in ('query', 'cookie'):
+            return values
+        return [QUERY_STRING_DELIMITERS.get(style, ',').join(values)]
+
     def _get_query_arguments(self, query, arguments, has_kwargs, sanitize):
         query_defns = {sanitize(p["name"]): p
                        for p in self.parameters
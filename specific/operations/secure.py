@@ -1,6 +1,8 @@
 import functools
 import logging
 
+import six
+
 from ..decorators.decorator import RequestResponseDecorator
 from ..decorators.security import (get_apikeyinfo_func, get_basicinfo_func,
                                    get_bearerinfo_func,
@@ -8,6 +10,9 @@ from ..decorators.security import (get_apikeyinfo_func, get_basicinfo_func,
                                    security_deny, security_passthrough,
                                    verify_apikey, verify_basic, verify_bearer,
                                    verify_oauth, verify_security)
+from ..metrics import MetricsBackend
+from ..token_cache import RejectedCredentials, TokenInfoCache
+from ..tracing import trace_auth_func
 
 logger = logging.getLogger(__name__)
 
@@ -76,8 +81,21 @@ class SecureOperation(object):
         if not self.security:
             return security_passthrough
 
+        # the operations with the same security requirements share their security decorator
+        security_pipelines = self._shared_cache('security_pipelines')
+        key = tuple(tuple(sorted((scheme_name, tuple(scopes)) for scheme_name, scopes in security_req.items()))
+                    for security_req in self.security)
+        if key not in security_pipelines:
+            security_pipelines[key] = self._compile_security()
+        return security_pipelines[key]
+
+    def _compile_security(self):
+        """
+        :rtype: types.FunctionType
+        """
         auth_funcs = []
         required_scopes = None
+        scheme_auth_funcs = self._shared_cache('auth_funcs')
         for security_req in self.security:
             if not security_req:
                 continue
@@ -87,66 +105,146 @@ class SecureOperation(object):
                 return security_deny
 
             scheme_name, scopes = next(iter(security_req.items()))
-            security_scheme = self.security_schemes[scheme_name]
-
-            if security_scheme['type'] == 'oauth2':
+            if self.security_schemes[scheme_name]['type'] == 'oauth2':
                 required_scopes = scopes
-                token_info_func = get_tokeninfo_func(security_scheme)
-                scope_validate_func = get_scope_validate_func(security_scheme)
-                if not token_info_func:
-                    logger.warning("... x-tokenInfoFunc missing", extra=vars(self))
-                    continue
+            if scheme_name not in scheme_auth_funcs:
+                auth_func = self._get_auth_func(scheme_name)
+                if auth_func is not None and self._stage_listeners:
+                    auth_func = trace_auth_func(scheme_name, auth_func)
+                scheme_auth_funcs[scheme_name] = auth_func
+            if scheme_auth_funcs[scheme_name] is not None:
+                auth_funcs.append(scheme_auth_funcs[scheme_name])
+
+        return functools.partial(verify_security, auth_funcs, required_scopes, api=self.api)
 
-                auth_funcs.append(verify_oauth(token_info_func, scope_validate_func))
+    def _get_auth_func(self, scheme_name):
+        """
+        The function verifying the credentials of a security scheme, shared by
+        the security requirements using the scheme.
 
-            # Swagger 2.0
-            elif security_scheme['type'] == 'basic':
+        :type scheme_name: str
+        :return: None when the scheme is not supported
+        :rtype: types.FunctionType | None
+        """
+        security_scheme = self.security_schemes[scheme_name]
+        rejected_credentials = self._rejected_credentials(scheme_name)
+
+        if security_scheme['type'] == 'oauth2':
+            token_info_func = get_tokeninfo_func(security_scheme, self._token_info_cache)
+            scope_validate_func = get_scope_validate_func(security_scheme)
+            if not token_info_func:
+                logger.warning("... x-tokenInfoFunc missing", extra=vars(self))
+                return None
+
+            return verify_oauth(token_info_func, scope_validate_func, rejected_credentials)
+
+        # Swagger 2.0
+        elif security_scheme['type'] == 'basic':
+            basic_info_func = get_basicinfo_func(security_scheme)
+            if not basic_info_func:
+                logger.warning("... x-basicInfoFunc missing", extra=vars(self))
+                return None
+
+            return verify_basic(basic_info_func, rejected_credentials)
+
+        # OpenAPI 3.0.0
+        elif security_scheme['type'] == 'http':
+            scheme = security_scheme['scheme'].lower()
+            if scheme == 'basic':
                 basic_info_func = get_basicinfo_func(security_scheme)
                 if not basic_info_func:
                     logger.warning("... x-basicInfoFunc missing", extra=vars(self))
-                    continue
-
-                auth_funcs.append(verify_basic(basic_info_func))
-
-            # OpenAPI 3.0.0
-            elif security_scheme['type'] == 'http':
-                scheme = security_scheme['scheme'].lower()
-                if scheme == 'basic':
-                    basic_info_func = get_basicinfo_func(security_scheme)
-                    if not basic_info_func:
-                        logger.warning("... x-basicInfoFunc missing", extra=vars(self))
-                        continue
-
-                    auth_funcs.append(verify_basic(basic_info_func))
-                elif scheme == 'bearer':
-                    bearer_info_func = get_bearerinfo_func(security_scheme)
-                    if not bearer_info_func:
-                        logger.warning("... x-bearerInfoFunc missing", extra=vars(self))
-                        continue
-                    auth_funcs.append(verify_bearer(bearer_info_func))
-                else:
-                    logger.warning("... Unsupported http authorization scheme %s" % scheme, extra=vars(self))
-
-            elif security_scheme['type'] == 'apiKey':
-                scheme = security_scheme.get('x-authentication-scheme', '').lower()
-                if scheme == 'bearer':
-                    bearer_info_func = get_bearerinfo_func(security_scheme)
-                    if not bearer_info_func:
-                        logger.warning("... x-bearerInfoFunc missing", extra=vars(self))
-                        continue
-                    auth_funcs.append(verify_bearer(bearer_info_func))
-                else:
-                    apikey_info_func = get_apikeyinfo_func(security_scheme)
-                    if not apikey_info_func:
-                        logger.warning("... x-apikeyInfoFunc missing", extra=vars(self))
-                        continue
-
-                    auth_funcs.append(verify_apikey(apikey_info_func, security_scheme['in'], security_scheme['name']))
-
+                    return None
+
+                return verify_basic(basic_info_func, rejected_credentials)
+            elif scheme == 'bearer':
+                bearer_info_func = get_bearerinfo_func(security_scheme)
+                if not bearer_info_func:
+                    logger.warning("... x-bearerInfoFunc missing", extra=vars(self))
+                    return None
+                return verify_bearer(bearer_info_func, rejected_credentials)
+            else:
+                logger.warning("... Unsupported http authorization scheme %s" % scheme, extra=vars(self))
+
+        elif security_scheme['type'] == 'apiKey':
+            scheme = security_scheme.get('x-authentication-scheme', '').lower()
+            if scheme == 'bearer':
+                bearer_info_func = get_bearerinfo_func(security_scheme)
+                if not bearer_info_func:
+                    logger.warning("... x-bearerInfoFunc missing", extra=vars(self))
+                    return None
+                return verify_bearer(bearer_info_func, rejected_credentials)
             else:
-                logger.warning("... Unsupported security scheme type %s" % security_scheme['type'], extra=vars(self))
+                apikey_info_func = get_apikeyinfo_func(security_scheme)
+                if not apikey_info_func:
+                    logger.warning("... x-apikeyInfoFunc missing", extra=vars(self))
+                    return None
+
+                return verify_apikey(apikey_info_func, security_scheme['in'], security_scheme['name'],
+                                     rejected_credentials)
+
+        else:
+            logger.warning("... Unsupported security scheme type %s" % security_scheme['type'], extra=vars(self))
+        return None
+
+    def _api_attribute(self, name, types, default=None):
+        """
+        :return: an attribute of the API, the default when it is missing or not
+            of the given types: the error handlers are given the API class, and
+            the tests a mock
+        """
+        value = getattr(self.api, name, None)
+        if isinstance(value, types):
+            return value
+        return default
+
+    @property
+    def _metrics(self):
+        return self._api_attribute('metrics', MetricsBackend)
+
+    @property
+    def _stage_listeners(self):
+        return self._api_attribute('stage_listeners', list, [])
+
+    @property
+    def _timed(self):
+        """
+        Whether the stages of the pipeline are timed, for the metrics, the
+        stage listeners or the Server-Timing header.
+        """
+        return (self._metrics is not None or bool(self._stage_listeners) or bool(self._server_timing) or
+                self._slow_request_threshold is not None)
+
+    @property
+    def _slow_request_threshold(self):
+        """
+        Milliseconds from which a request is logged as slow, None to disable.
+        """
+        return None
+
+    def _get_slow_request_log(self):
+        """
+        :rtype: specific.slow_requests.SlowRequestLog | None
+        """
+        return None
+
+    @property
+    def _server_timing(self):
+        return self._api_attribute('server_timing', (bool,) + six.string_types, False)
+
+    def _shared_cache(self, name):
+        # nothing is shared when the API has no cache
+        return self._api_attribute(name, dict, {})
+
+    @property
+    def _token_info_cache(self):
+        return self._api_attribute('token_info_cache', TokenInfoCache)
 
-        return functools.partial(verify_security, auth_funcs, required_scopes)
+    def _rejected_credentials(self, scheme_name):
+        rejected_credentials = self._api_attribute('rejected_credentials', RejectedCredentials)
+        if rejected_credentials is not None:
+            return rejected_credentials.for_namespace(scheme_name)
+        return None
 
     def get_mimetype(self):
         return DEFAULT_MIMETYPE
@@ -160,4 +258,7 @@ class SecureOperation(object):
         object is returned.
         :rtype: types.FunctionType
         """
-        return RequestResponseDecorator(self.api, self.get_mimetype())
+        if not self._timed:
+            return RequestResponseDecorator(self.api, self.get_mimetype())
+        return RequestResponseDecorator(self.api, self.get_mimetype(), self._metrics, self.operation_id,
+                                        self._stage_listeners, self._server_timing, self._get_slow_request_log())
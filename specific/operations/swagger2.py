@@ -4,11 +4,20 @@ from copy import deepcopy
 from specific.operations.abstract import AbstractOperation
 
 from ..decorators.array_parsing import Swagger2ArrayParser
+from ..examples import example_to_string, schema_example
 from ..exceptions import InvalidSpecification
 from ..utils import deep_get, is_null, is_nullable, make_type
 
 logger = logging.getLogger(__name__)
 
+# the separators of the array parameters, by collectionFormat ("multi" repeats the parameter)
+COLLECTION_SEPARATORS = {
+    'csv': ',',
+    'ssv': ' ',
+    'tsv': '\t',
+    'pipes': '|',
+}
+
 
 class Swagger2Operation(AbstractOperation):
 
@@ -221,6 +230,16 @@ class Swagger2Operation(AbstractOperation):
                     path=self.path))
         return body_parameters[0] if body_parameters else {}
 
+    def _example_parameter(self, param):
+        value = schema_example(param)
+        if not isinstance(value, list):
+            return [example_to_string(value)]
+        values = [example_to_string(item) for item in value]
+        collection_format = param.get('collectionFormat', 'csv')
+        if collection_format == 'multi':
+            return values
+        return [COLLECTION_SEPARATORS.get(collection_format, ',').join(values)]
+
     def _get_query_arguments(self, query, arguments, has_kwargs, sanitize):
         query_defns = {sanitize(p["name"]): p
                        for p in self.parameters
@@ -1,6 +1,7 @@
 import logging
+import os
 import pathlib
-from typing import Optional  # NOQA
+from typing import Optional, Union  # NOQA
 
 try:
     from swagger_ui_bundle import (swagger_ui_2_path,
@@ -120,6 +121,330 @@ class SpecificOptions(object):
         """
         return self._options.get('array_parser_class', None)
 
+    @property
+    def max_handler_threads(self):
+        # type: () -> Optional[int]
+        """
+        Maximum number of threads an asynchronous API uses to run blocking
+        operation handlers and security functions.
+
+        Default: None (the ThreadPoolExecutor default)
+        """
+        return self._options.get('max_handler_threads', None)
+
+    @property
+    def executor_body_size(self):
+        # type: () -> int
+        """
+        Request bodies larger than this number of bytes are parsed in the
+        thread pool by asynchronous APIs, to keep the event loop responsive.
+
+        Default: 65536
+        """
+        return self._options.get('executor_body_size', 65536)
+
+    @property
+    def tokeninfo_cache_size(self):
+        # type: () -> int
+        """
+        Maximum number of tokens whose info, from the `x-tokenInfoUrl` endpoint,
+        is cached, 0 to disable the cache. A revoked token is accepted until its
+        info expires from the cache, see `tokeninfo_cache_ttl`.
+
+        Default: 0
+        """
+        return self._options.get('tokeninfo_cache_size', 0)
+
+    @property
+    def tokeninfo_cache_ttl(self):
+        # type: () -> float
+        """
+        Maximum seconds a token info is cached, it is bounded by the `exp` and
+        `expires_in` fields of the token info.
+
+        Default: 60
+        """
+        return self._options.get('tokeninfo_cache_ttl', 60)
+
+    @property
+    def tokeninfo_refresh_ahead(self):
+        # type: () -> Optional[float]
+        """
+        Fraction of the cache lifetime of a token info after which it is refreshed
+        in the background when used. None disables the refresh.
+
+        Default: 0.8
+        """
+        return self._options.get('tokeninfo_refresh_ahead', 0.8)
+
+    @property
+    def tokeninfo_cache_backend(self):
+        # type: () -> Union[str, type]
+        """
+        Storage of the token info cache: 'memory' for a cache per process,
+        'sqlite' for a cache shared by the processes of the host (e.g. the
+        workers), or a `specific.token_cache.TokenInfoCache` subclass.
+
+        Default: memory
+        """
+        return self._options.get('tokeninfo_cache_backend', 'memory')
+
+    @property
+    def tokeninfo_cache_path(self):
+        # type: () -> Optional[str]
+        """
+        Database file of the 'sqlite' token info cache. The processes using the
+        same file share the cache. An existing file must be owned by the current
+        user.
+
+        Default: None (a file of a private temporary directory, shared by the
+        workers forked from the same process)
+        """
+        return self._options.get('tokeninfo_cache_path', None)
+
+    @property
+    def rejected_credentials_ttl(self):
+        # type: () -> float
+        """
+        Seconds the credentials rejected by the security functions are rejected
+        without calling them again. It doubles on every new rejection of the
+        same credential, 0 to disable the cache of the rejected credentials.
+
+        Default: 0
+        """
+        return self._options.get('rejected_credentials_ttl', 0)
+
+    @property
+    def rejected_credentials_max_ttl(self):
+        # type: () -> float
+        """
+        Maximum seconds a credential rejected repeatedly is rejected without
+        calling the security functions.
+
+        Default: 60
+        """
+        return self._options.get('rejected_credentials_max_ttl', 60)
+
+    @property
+    def rejected_credentials_size(self):
+        # type: () -> int
+        """
+        Maximum number of rejected credentials cached.
+
+        Default: 10000
+        """
+        return self._options.get('rejected_credentials_size', 10000)
+
+    @property
+    def warmup(self):
+        # type: () -> bool
+        """
+        Whether to run example requests through the operations before serving,
+        and to add the readiness endpoint to the application. When the
+        application is served by an external server, the warmup starts with
+        the first request or readiness probe, or with an explicit
+        `app.start_warmup()` once the application is loaded.
+
+        Default: False
+        """
+        return self._options.get('warmup', False)
+
+    @property
+    def metrics(self):
+        # type: () -> Union[bool, object]
+        """
+        Whether to record the latency of the requests and of each stage of their
+        pipeline, and to add the metrics endpoint to the application. A
+        `specific.metrics.MetricsBackend` receives the metrics, True keeps them
+        in memory, for each application, 'multiprocess' shares them between the
+        worker processes.
+
+        Default: False
+        """
+        return self._options.get('metrics', False)
+
+    @property
+    def metrics_dir(self):
+        # type: () -> Optional[str]
+        """
+        Directory of the 'multiprocess' metrics, shared by the worker processes
+        of the host. The SPECIFIC_METRICS_DIR environment variable sets it too.
+        It is required by the servers importing the application in each worker,
+        e.g. gunicorn without --preload, whose workers would otherwise each
+        have their own directory. An existing directory must be owned by the
+        current user.
+
+        Default: None (a private directory of the temporary directory, shared
+        by the workers forked from the same process)
+        """
+        return self._options.get('metrics_dir', os.environ.get('SPECIFIC_METRICS_DIR'))
+
+    @property
+    def server_timing(self):
+        # type: () -> Union[bool, str]
+        """
+        Whether to add the Server-Timing header to the responses of the
+        operations, with the milliseconds spent in the auth, validate, handler
+        and serialize stages. A header name adds it only to the responses of
+        the requests carrying this header, e.g. 'X-Debug-Timing'.
+
+        Default: False
+        """
+        return self._options.get('server_timing', False)
+
+    @property
+    def slow_request_threshold_ms(self):
+        # type: () -> Optional[float]
+        """
+        Milliseconds from which the requests are logged as slow, with the
+        breakdown of their stages. The `x-slow-threshold-ms` extension of an
+        operation overrides it.
+
+        Default: None (disabled)
+        """
+        return self._options.get('slow_request_threshold_ms')
+
+    @property
+    def slow_request_profile_count(self):
+        # type: () -> int
+        """
+        Number of requests of an operation run under cProfile after one of its
+        requests was slow.
+
+        Default: 0
+        """
+        return self._options.get('slow_request_profile_count', 0)
+
+    @property
+    def slow_request_profile_dir(self):
+        # type: () -> Optional[str]
+        """
+        Directory of the pstats files of the profiled requests.
+
+        Default: None (a private directory of the temporary directory, created
+        by each process on its first profile)
+        """
+        return self._options.get('slow_request_profile_dir')
+
+    @property
+    def profiler(self):
+        # type: () -> bool
+        """
+        Whether to add the sampling profiler endpoint to the APIs, guarded by
+        their security requirements, and to track the operation executed by
+        each request thread.
+
+        Default: False
+        """
+        return self._options.get('profiler', False)
+
+    @property
+    def profiler_path(self):
+        # type: () -> str
+        """
+        Path of the profiler endpoint, relative to the base path of the API.
+
+        Default: /_specific/profile
+        """
+        return self._options.get('profiler_path', '/_specific/profile')
+
+    @property
+    def profiler_max_seconds(self):
+        # type: () -> float
+        """
+        Maximum duration of a profile.
+
+        Default: 60
+        """
+        return self._options.get('profiler_max_seconds', 60)
+
+    @property
+    def allocation_tracking(self):
+        # type: () -> bool
+        """
+        Whether to trace the allocations with tracemalloc, to attribute the
+        allocations of a sample of the requests to their operation, and to add
+        the allocations endpoint to the APIs, guarded by their security
+        requirements.
+
+        Default: False
+        """
+        return self._options.get('allocation_tracking', False)
+
+    @property
+    def allocation_sample_rate(self):
+        # type: () -> float
+        """
+        Share of the requests whose allocations are attributed to their operation.
+
+        Default: 0.01
+        """
+        return self._options.get('allocation_sample_rate', 0.01)
+
+    @property
+    def allocations_path(self):
+        # type: () -> str
+        """
+        Path of the allocations endpoint, relative to the base path of the API.
+
+        Default: /_specific/allocations
+        """
+        return self._options.get('allocations_path', '/_specific/allocations')
+
+    @property
+    def traffic_record_path(self):
+        # type: () -> str
+        """
+        Path of the NDJSON file to which a sample of the requests is appended,
+        their sensitive values redacted, to replay them with `specific replay`.
+        The requests are not recorded when None.
+
+        Default: None
+        """
+        return self._options.get('traffic_record_path')
+
+    @property
+    def traffic_record_sample_rate(self):
+        # type: () -> float
+        """
+        Share of the requests recorded to the `traffic_record_path` file.
+
+        Default: 0.01
+        """
+        return self._options.get('traffic_record_sample_rate', 0.01)
+
+    @property
+    def stage_listeners(self):
+        # type: () -> list
+        """
+        Listeners of the start and end of each stage of the request pipeline,
+        see `specific.tracing.StageListener`.
+
+        Default: []
+        """
+        return self._options.get('stage_listeners', [])
+
+    @property
+    def metrics_path(self):
+        # type: () -> str
+        """
+        Path of the metrics endpoint, in the Prometheus text exposition format.
+
+        Default: /metrics
+        """
+        return self._options.get('metrics_path', '/metrics')
+
+    @property
+    def readiness_path(self):
+        # type: () -> str
+        """
+        Path of the readiness endpoint, which responds with 503 until the
+        warmup is done.
+
+        Default: /ready
+        """
+        return self._options.get('readiness_path', '/ready')
+
 
 def filter_values(dictionary):
     # type: (dict) -> dict
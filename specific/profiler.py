@@ -0,0 +1,114 @@
+"""
+Sampling profiler of the request threads, in pure Python: the stacks of the
+threads are sampled with `sys._current_frames` at a fixed rate and attributed
+to the operation each thread is executing. The samples are returned as
+collapsed stacks, the input of the flame graph tools, e.g.
+
+    curl -H 'X-Auth: ...' 'http://localhost:8080/_specific/profile?seconds=10' | flamegraph.pl > profile.svg
+"""
+import collections
+import functools
+import os
+import sys
+import time
+
+from six.moves import _thread
+
+# operation executed by each request thread, while the profiler is enabled
+_active_operations = {}
+
+NO_OPERATION = '[no operation]'
+
+
+def track_operation(operation_id, function):
+    """
+    Records the operation executed by the thread calling a function, for the
+    attribution of the samples.
+
+    :type operation_id: str
+    :type function: types.FunctionType
+    :rtype: types.FunctionType
+    """
+    @functools.wraps(function)
+    def wrapper(request):
+        thread_id = _thread.get_ident()
+        _active_operations[thread_id] = operation_id
+        try:
+            return function(request)
+        finally:
+            _active_operations.pop(thread_id, None)
+
+    return wrapper
+
+
+class SamplingProfiler(object):
+    """
+    Samples the stacks of the threads executing an operation. The sampling
+    thread holds the GIL while it walks the stacks, the cost for the request
+    threads grows with the rate and the depth of their stacks.
+    """
+
+    def __init__(self, rate=100, all_threads=False):
+        """
+        :param rate: samples per second
+        :type rate: int
+        :param all_threads: whether to also sample the threads not executing an operation
+        :type all_threads: bool
+        """
+        self.interval = 1.0 / rate
+        self.all_threads = all_threads
+        self._labels = {}
+
+    def sample(self, seconds):
+        """
+        Samples the other threads for a duration, in the calling thread.
+
+        :type seconds: float
+        :return: number of samples by collapsed stack, the operation first
+        :rtype: collections.Counter
+        """
+        stacks = collections.Counter()
+        own_thread_id = _thread.get_ident()
+        end = time.time() + seconds
+        while time.time() < end:
+            frames = sys._current_frames()
+            for thread_id, frame in frames.items():
+                if thread_id == own_thread_id:
+                    continue
+                operation_id = _active_operations.get(thread_id)
+                if operation_id is None:
+                    if not self.all_threads:
+                        continue
+                    operation_id = NO_OPERATION
+                stacks[self.collapse(operation_id, frame)] += 1
+            frames = frame = None
+            time.sleep(self.interval)
+        return stacks
+
+    def collapse(self, operation_id, frame):
+        """
+        :return: the operation and the functions of a stack from the outermost,
+            separated by semicolons
+        :rtype: str
+        """
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = '{} ({}:{})'.format(
+                    code.co_name, os.path.basename(code.co_filename), code.co_firstlineno).replace(';', ':')
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(operation_id)
+        return ';'.join(reversed(labels))
+
+
+def format_collapsed(stacks):
+    """
+    :param stacks: number of samples by collapsed stack
+    :type stacks: collections.Counter
+    :return: a line per stack with its number of samples, the most frequent first
+    :rtype: str
+    """
+    return ''.join('{} {}\n'.format(stack, count) for stack, count in stacks.most_common())
@@ -0,0 +1,194 @@
+"""
+Log of the requests slower than a threshold, with the breakdown of their
+stages, and profiling of the next requests of the slow operations.
+"""
+import cProfile
+import itertools
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# names of the parameters whose values are not logged
+SENSITIVE_PARAMETER = re.compile(r'pass|secret|token|key|auth|cookie|session|credential|signature', re.IGNORECASE)
+REDACTED = '<redacted>'
+
+_profile_numbers = itertools.count()
+_default_profile_dir = None
+_default_profile_dir_lock = threading.Lock()
+
+
+def default_profile_dir():
+    """
+    Private directory of the profiles of the process, created on the first
+    profile, so that the other users cannot read nor replace them.
+
+    :rtype: str
+    """
+    global _default_profile_dir
+    with _default_profile_dir_lock:
+        if _default_profile_dir is None:
+            _default_profile_dir = tempfile.mkdtemp(prefix='specific-profiles-')
+        return _default_profile_dir
+
+
+class SlowRequestLog(object):
+    """
+    Logs a warning with a structured record (the `slow_request` attribute of
+    the log record) for the requests of an operation slower than the threshold:
+    the status, the duration of each stage in milliseconds, the parameters with
+    the sensitive values redacted and the size of the payload.
+
+    After a slow request, the next `profile_count` requests of the operation
+    are run under cProfile and their stats are dumped to `profile_dir`, to be
+    read with `pstats`.
+    """
+
+    def __init__(self, operation_id, threshold_ms, profile_count=0, profile_dir=None,
+                 header_parameters=(), sensitive_parameters=()):
+        """
+        :type operation_id: str
+        :param threshold_ms: milliseconds from which a request is slow
+        :type threshold_ms: float
+        :param profile_count: number of requests profiled after a slow request
+        :type profile_count: int
+        :param profile_dir: directory of the profiles, by default a private
+            directory of the temporary directory, see `default_profile_dir`
+        :type profile_dir: str | None
+        :param header_parameters: names of the header parameters of the operation, which are logged
+        :type header_parameters: list
+        :param sensitive_parameters: names of other parameters which are not logged, e.g. API keys
+        :type sensitive_parameters: list
+        """
+        self.operation_id = operation_id
+        self.threshold = threshold_ms / 1000.0
+        self.threshold_ms = threshold_ms
+        self.profile_count = profile_count
+        self.profile_dir = profile_dir
+        self.header_parameters = list(header_parameters)
+        self.sensitive_parameters = {name.lower() for name in sensitive_parameters}
+        self._profiles_pending = 0
+        self._lock = threading.Lock()
+
+    def start_profile(self):
+        """
+        :return: an enabled profiler when the request is to be profiled
+        :rtype: cProfile.Profile | None
+        """
+        if not self._profiles_pending:
+            return None
+        with self._lock:
+            if not self._profiles_pending:
+                return None
+            self._profiles_pending -= 1
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, timer, request, status, profiler=None):
+        """
+        Logs the request when it is slow, and dumps its profile. It is called
+        once the response is built or the exception raised, its failures are
+        logged and do not replace them.
+
+        :type timer: specific.metrics.StageTimer
+        :param request: None when the framework request could not be converted
+        :type request: specific.lifecycle.SpecificRequest | None
+        :type status: int
+        :type profiler: cProfile.Profile | None
+        """
+        try:
+            self._finish(timer, request, status, profiler)
+        except Exception:
+            logger.exception('Failed to log a slow request to %s', self.operation_id)
+
+    def _finish(self, timer, request, status, profiler):
+        elapsed = timer.elapsed()
+        if profiler is not None:
+            profiler.disable()
+            self.dump_profile(profiler, elapsed)
+        if elapsed < self.threshold:
+            return
+
+        record = {
+            'operation_id': self.operation_id,
+            'status': status,
+            'duration_ms': round(elapsed * 1000, 3),
+            'threshold_ms': self.threshold_ms,
+            'stages_ms': {stage: round(duration * 1000, 3) for stage, duration in timer.durations.items()},
+        }
+        if request is not None:
+            record['method'] = request.method.upper()
+            record['parameters'] = self.parameters(request)
+            record['payload_size'] = payload_size(request)
+        logger.warning('Slow request to %s: %.1fms (threshold %sms)', self.operation_id,
+                       elapsed * 1000, self.threshold_ms, extra={'slow_request': record})
+
+        if self.profile_count:
+            with self._lock:
+                self._profiles_pending = self.profile_count
+
+    def parameters(self, request):
+        """
+        :return: the path, query and header parameters of a request, sensitive values redacted
+        :rtype: dict
+        """
+        headers = {name: request.headers[name] for name in self.header_parameters if name in request.headers}
+        return {
+            'path': self.redact(request.path_params),
+            'query': self.redact(request.query),
+            'header': self.redact(headers),
+        }
+
+    def redact(self, parameters):
+        """
+        :type parameters: dict
+        :rtype: dict
+        """
+        return {name: REDACTED if is_sensitive(name, self.sensitive_parameters) else value
+                for name, value in parameters.items()}
+
+    def dump_profile(self, profiler, elapsed):
+        """
+        :return: path of the pstats file, None when it could not be written
+        :rtype: str | None
+        """
+        try:
+            profile_dir = self.profile_dir or default_profile_dir()
+            if not os.path.isdir(profile_dir):
+                os.makedirs(profile_dir, 0o700)
+            path = os.path.join(profile_dir, '{}-{}-{}-{}ms.pstats'.format(
+                self.operation_id, int(time.time()), next(_profile_numbers), int(elapsed * 1000)))
+            profiler.dump_stats(path)
+        except EnvironmentError as exception:
+            logger.warning('Failed to write the profile of a request to %s: %s', self.operation_id, exception)
+            return None
+        logger.info('Profile of a request to %s written to %s', self.operation_id, path)
+        return path
+
+
+def is_sensitive(name, sensitive_parameters=()):
+    """
+    :param sensitive_parameters: lower case names of other sensitive parameters, e.g. API keys
+    :type sensitive_parameters: set
+    :return: whether the value of a parameter is not to be logged
+    :rtype: bool
+    """
+    return name.lower() in sensitive_parameters or bool(SENSITIVE_PARAMETER.search(name))
+
+
+def payload_size(request):
+    """
+    :return: the size in bytes of the body of a request
+    :rtype: int
+    """
+    if isinstance(request.body, bytes):
+        return len(request.body)
+    try:
+        return int(request.headers.get('Content-Length', 0))
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,600 @@
+"""
+Cache of the token info returned by the OAuth tokeninfo endpoints, so that
+the requests with the same bearer token do not each make a remote call, and
+cache of the rejected credentials.
+"""
+import atexit
+import collections
+import copy
+import errno
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CacheEntry = collections.namedtuple('CacheEntry', ['token_info', 'created', 'expires'])
+
+
+def hash_token(token, namespace=''):
+    """
+    Cache key of a token, so that the cache does not hold the credentials.
+
+    :type token: str
+    :param namespace: e.g. the tokeninfo url, as the same token may have a different info
+    :type namespace: str
+    :rtype: str
+    """
+    key = u'{}\0{}'.format(namespace, token)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def token_info_ttl(token_info, now, default_ttl):
+    """
+    Seconds the token info can be cached, bounded by the expiry of the token
+    given as a timestamp (`exp`) or a duration (`expires_in`).
+
+    :type token_info: dict
+    :type now: float
+    :type default_ttl: float
+    :rtype: float
+
+    >>> token_info_ttl({'expires_in': 10}, 0, 60)
+    10.0
+    """
+    ttl = float(default_ttl)
+    try:
+        if 'expires_in' in token_info:
+            ttl = min(ttl, float(token_info['expires_in']))
+        if 'exp' in token_info:
+            ttl = min(ttl, float(token_info['exp']) - now)
+    except (TypeError, ValueError):
+        pass
+    return ttl
+
+
+class _Lookup(object):
+    """
+    A lookup in flight, awaited by the concurrent lookups of the same token.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def set_result(self, result):
+        self._result = result
+        self._done.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class TokenInfoCache(object):
+    """
+    Bounded LRU cache of token info with expiry.
+
+    Concurrent lookups of the same token are coalesced into one call. Tokens used
+    after `refresh_ahead` of their cache lifetime are looked up again in a
+    background thread, so that hot tokens do not expire from the cache.
+    Invalid tokens (None token info) are not cached.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, refresh_ahead=0.8, clock=time.time):
+        """
+        :param maxsize: maximum number of cached tokens
+        :type maxsize: int
+        :param ttl: maximum seconds a token info is cached
+        :type ttl: float
+        :param refresh_ahead: fraction of the cache lifetime after which a used token is
+            refreshed in the background, None to disable
+        :type refresh_ahead: float | None
+        :param clock: current time in seconds, as `time.time`
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.clock = clock
+        self.counters = collections.Counter()
+        self.max_lookup_seconds = 0.0
+        self._entries = collections.OrderedDict()
+        self._lookups = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cached(self, fetch, namespace=''):
+        """
+        Wraps a token info function with the cache.
+
+        :param fetch: called with the token, returns the token info or None
+        :type fetch: types.FunctionType
+        :type namespace: str
+        :rtype: types.FunctionType
+        """
+        def wrapper(token):
+            return self.get(token, fetch, namespace)
+        return wrapper
+
+    def get(self, token, fetch, namespace=''):
+        """
+        Token info of a token, from the cache or from `fetch(token)`.
+
+        :type token: str
+        :type fetch: types.FunctionType
+        :type namespace: str
+        :rtype: dict | None
+        """
+        key = self._key(token, namespace)
+        with self._lock:
+            now = self.clock()
+            entry = self._get_entry(key, now)
+            if entry is not None:
+                self.counters['hits'] += 1
+                if self._should_refresh(key, entry, now):
+                    self._start_refresh(key, token, fetch)
+                return entry.token_info
+
+            in_flight = self._lookups.get(key)
+            if in_flight is not None:
+                self.counters['coalesced'] += 1
+            else:
+                self.counters['misses'] += 1
+                lookup = self._lookups[key] = _Lookup()
+
+        if in_flight is not None:
+            return in_flight.wait()
+        return self._lookup(key, token, fetch, lookup)
+
+    def invalidate(self, token, namespace=''):
+        with self._lock:
+            self._delete_entry(self._key(token, namespace))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _key(self, token, namespace):
+        return hash_token(token, namespace)
+
+    def _get_entry(self, key, now):
+        """
+        The entry of a key if it is not expired, the storage of the cache is
+        defined by `_get_entry`, `_set_entry`, `_delete_entry`, `clear` and `__len__`.
+
+        :rtype: CacheEntry | None
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None or entry.expires <= now:
+            return None
+        # the last used entries are at the end
+        self._entries[key] = entry
+        return entry
+
+    def _set_entry(self, key, entry):
+        self._entries[key] = entry
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _delete_entry(self, key):
+        self._entries.pop(key, None)
+
+    def stats(self):
+        """
+        :return: counters of the cache, with the hit rate and the mean and maximum
+            latency of the lookups in milliseconds
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats['size'] = len(self)
+        for counter in ('hits', 'misses', 'coalesced', 'refreshes', 'evictions', 'errors', 'lookups'):
+            stats.setdefault(counter, 0)
+        requests = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = float(stats['hits'] + stats['coalesced']) / requests if requests else 0.0
+        lookup_seconds = stats.pop('lookup_seconds', 0.0)
+        stats['lookup_ms_mean'] = lookup_seconds * 1000 / stats['lookups'] if stats['lookups'] else 0.0
+        stats['lookup_ms_max'] = self.max_lookup_seconds * 1000
+        return stats
+
+    def _should_refresh(self, key, entry, now):
+        if not self.refresh_ahead or key in self._lookups:
+            return False
+        return now - entry.created >= (entry.expires - entry.created) * self.refresh_ahead
+
+    def _start_refresh(self, key, token, fetch):
+        self.counters['refreshes'] += 1
+        lookup = self._lookups[key] = _Lookup()
+        thread = threading.Thread(target=self._refresh, args=(key, token, fetch, lookup),
+                                  name='specific-token-refresh')
+        thread.daemon = True
+        thread.start()
+
+    def _refresh(self, key, token, fetch, lookup):
+        try:
+            self._lookup(key, token, fetch, lookup)
+        except Exception:
+            # the cached token info is used until it expires
+            logger.warning('Failed to refresh the token info', exc_info=True)
+
+    def _lookup(self, key, token, fetch, lookup):
+        start = time.time()
+        try:
+            token_info = fetch(token)
+        except Exception as exception:
+            with self._lock:
+                self.counters['errors'] += 1
+                del self._lookups[key]
+            lookup.set_exception(exception)
+            raise
+        elapsed = time.time() - start
+
+        with self._lock:
+            self.counters['lookups'] += 1
+            self.counters['lookup_seconds'] += elapsed
+            self.max_lookup_seconds = max(self.max_lookup_seconds, elapsed)
+            del self._lookups[key]
+            if token_info is None:
+                self._delete_entry(key)
+            else:
+                self._store(key, token_info)
+        lookup.set_result(token_info)
+        return token_info
+
+    def _store(self, key, token_info):
+        now = self.clock()
+        ttl = token_info_ttl(token_info, now, self.ttl)
+        if ttl <= 0:
+            self._delete_entry(key)
+            return
+        self._set_entry(key, CacheEntry(token_info, now, now + ttl))
+
+
+class SqliteTokenInfoCache(TokenInfoCache):
+    """
+    Token info cache stored in a SQLite database in WAL mode, shared by the
+    processes of a host, e.g. the forked workers. A token introspected by a
+    worker is then a cache hit for the other ones.
+
+    The lookups are coalesced and refreshed within each process. When the cache
+    is full, the entries closest to their expiry are evicted.
+    """
+
+    def __init__(self, path=None, maxsize=1024, ttl=60.0, refresh_ahead=0.8,
+                 clock=time.time, timeout=1.0):
+        """
+        :param path: database file, by default a file of a private temporary
+            directory created by the process, so that the workers forked by it
+            share the cache. An existing file must be owned by the current user.
+        :type path: str | None
+        :param timeout: seconds to wait for the database lock of another process
+        :type timeout: float
+        """
+        super(SqliteTokenInfoCache, self).__init__(maxsize=maxsize, ttl=ttl,
+                                                   refresh_ahead=refresh_ahead, clock=clock)
+        if path is None:
+            # readable by the current user only, removed at the exit of the process creating it
+            directory = tempfile.mkdtemp(prefix='specific-tokeninfo-')
+            atexit.register(_remove_directory, directory, os.getpid())
+            path = os.path.join(directory, 'tokeninfo.sqlite')
+        self.path = str(path)
+        _create_private_file(self.path)
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS token_info ('
+                               'key TEXT PRIMARY KEY, token_info TEXT NOT NULL, '
+                               'created REAL NOT NULL, expires REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS token_info_expires '
+                               'ON token_info (expires)')
+
+    def _connection(self):
+        """
+        Connection of the current thread, the connections are not shared by
+        threads nor inherited by forked processes.
+
+        :rtype: sqlite3.Connection
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def __len__(self):
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM token_info WHERE expires > ?', (self.clock(),)).fetchone()
+        return row[0]
+
+    def clear(self):
+        with self._lock, self._connection() as connection:
+            connection.execute('DELETE FROM token_info')
+
+    def _get_entry(self, key, now):
+        row = self._connection().execute(
+            'SELECT token_info, created, expires FROM token_info WHERE key = ? AND expires > ?',
+            (key, now)).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def _set_entry(self, key, entry):
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO token_info VALUES (?, ?, ?, ?)',
+                               (key, json.dumps(entry.token_info), entry.created, entry.expires))
+            connection.execute('DELETE FROM token_info WHERE expires <= ?', (entry.created,))
+            evicted = connection.execute(
+                'DELETE FROM token_info WHERE key IN ('
+                'SELECT key FROM token_info ORDER BY expires LIMIT '
+                'MAX(0, (SELECT COUNT(*) FROM token_info) - ?))', (self.maxsize,)).rowcount
+        if evicted > 0:
+            self.counters['evictions'] += evicted
+
+    def _delete_entry(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM token_info WHERE key = ?', (key,))
+
+
+def _remove_directory(directory, pid):
+    # the forked workers inherit the exit handlers
+    if os.getpid() == pid:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _create_private_file(path):
+    """
+    Creates a file readable by the current user only, or checks that an existing
+    one is owned by the current user, so that another user cannot plant its
+    content, e.g. a token info accepting any token.
+
+    :type path: str
+    :raises ValueError: when the file is owned by another user, or is a symbolic link
+    """
+    flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0)
+    try:
+        os.close(os.open(path, flags, 0o600))
+        return
+    except OSError as exception:
+        if exception.errno != errno.EEXIST:
+            raise
+    if os.path.islink(path):
+        raise ValueError('{} is a symbolic link'.format(path))
+    if hasattr(os, 'getuid') and os.stat(path).st_uid != os.getuid():
+        raise ValueError('{} is not owned by the current user'.format(path))
+
+
+TOKEN_INFO_CACHES = {
+    'memory': TokenInfoCache,
+    'sqlite': SqliteTokenInfoCache,
+}
+
+
+def make_token_info_cache(options):
+    """
+    Creates the token info cache selected by the options of an API.
+
+    :type options: specific.options.SpecificOptions
+    :rtype: TokenInfoCache | None
+    """
+    if not options.tokeninfo_cache_size:
+        return None
+    kwargs = dict(maxsize=options.tokeninfo_cache_size,
+                  ttl=options.tokeninfo_cache_ttl,
+                  refresh_ahead=options.tokeninfo_refresh_ahead)
+    backend = options.tokeninfo_cache_backend
+    cache_class = TOKEN_INFO_CACHES.get(backend, backend)
+    if not isinstance(cache_class, type) or not issubclass(cache_class, TokenInfoCache):
+        raise ValueError('Unknown token info cache backend {!r}'.format(backend))
+    if issubclass(cache_class, SqliteTokenInfoCache):
+        kwargs['path'] = options.tokeninfo_cache_path
+    return cache_class(**kwargs)
+
+
+class InfoFuncCache(TokenInfoCache):
+    """
+    Memoization of a security function (`x-basicInfoFunc`, `x-apikeyInfoFunc`,
+    `x-bearerInfoFunc`), keyed on its credential arguments and required scopes.
+
+    The credentials are keyed with an HMAC of a random secret of the process, so
+    that the keys of low entropy credentials (passwords) cannot be brute forced.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.time):
+        """
+        :param maxsize: maximum number of cached credentials
+        :type maxsize: int
+        :param ttl: maximum seconds the result of the security function is cached
+        :type ttl: float
+        :param clock: current time in seconds, as `time.time`
+        """
+        super(InfoFuncCache, self).__init__(maxsize=maxsize, ttl=ttl, refresh_ahead=None,
+                                            clock=clock)
+        self._secret = os.urandom(32)
+
+    def memoize(self, func):
+        """
+        :param func: security function, called with the credential arguments and
+            the `required_scopes` keyword argument
+        :type func: types.FunctionType
+        :rtype: types.FunctionType
+        """
+        @functools.wraps(func)
+        def wrapper(*credential, **kwargs):
+            required_scopes = kwargs.get('required_scopes')
+            namespace = u' '.join(sorted(required_scopes)) if required_scopes else u''
+            return self.get(credential, lambda _: func(*credential, **kwargs), namespace)
+        wrapper.cache = self
+        return wrapper
+
+    def invalidate(self, *credential):
+        """
+        Removes the results cached for a credential, for all the required scopes.
+        The credential can be given partially: `invalidate(username)` removes the
+        results of the basic authentication of the user with any password.
+        """
+        prefix = self._key(credential, namespace=None)
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._delete_entry(key)
+
+    def _hmac(self, value):
+        return hmac.new(self._secret, value.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def _key(self, credential, namespace):
+        # the first argument (e.g. the username) is also hashed alone for `invalidate`
+        key = self._hmac(credential[0])
+        if len(credential) > 1:
+            key += u'\0' + self._hmac(u'\0'.join(credential))
+        if namespace is not None:
+            key += u'\0' + namespace
+        return key
+
+
+class RejectedCredentials(object):
+    """
+    Short-lived cache of the credentials (tokens, API keys, basic credentials)
+    rejected by the security functions, so that clients retrying invalid
+    credentials are rejected without calling the security functions again.
+
+    A credential rejected again after its cache expiry is cached twice as long,
+    up to `max_ttl`, which throttles the clients retrying in a loop.
+
+    The credentials are keyed with an HMAC of a random secret of the process,
+    as in `InfoFuncCache`, and with the scopes required from them: a credential
+    rejected for lacking scopes is still checked for the operations requiring
+    other scopes.
+    """
+
+    def __init__(self, ttl=5.0, max_ttl=60.0, maxsize=10000, clock=time.time, namespace=''):
+        """
+        :param ttl: seconds a credential is rejected after a first rejection
+        :type ttl: float
+        :param max_ttl: maximum seconds a credential is rejected after repeated rejections
+        :type max_ttl: float
+        :param maxsize: maximum number of rejected credentials
+        :type maxsize: int
+        :param clock: current time in seconds, as `time.time`
+        :param namespace: e.g. the security scheme, see `for_namespace`
+        :type namespace: str
+        """
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.namespace = namespace
+        self.counters = collections.Counter()
+        self._entries = collections.OrderedDict()  # key -> (rejections, expires)
+        self._lock = threading.Lock()
+        # shared by the copies of `for_namespace`
+        self._secret = os.urandom(32)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, credential, required_scopes):
+        key = u'{}\0{}'.format(self.namespace, credential)
+        key = hmac.new(self._secret, key.encode('utf-8'), hashlib.sha256).hexdigest()
+        if required_scopes:
+            key += u'\0' + u' '.join(sorted(required_scopes))
+        return key
+
+    def for_namespace(self, namespace):
+        """
+        The same cache, with keys in the given namespace.
+
+        :type namespace: str
+        :rtype: RejectedCredentials
+        """
+        scoped = copy.copy(self)
+        scoped.namespace = namespace
+        return scoped
+
+    def is_rejected(self, credential, required_scopes=None):
+        """
+        :type credential: str
+        :param required_scopes: given to the security function
+        :type required_scopes: list | None
+        :rtype: bool
+        """
+        key = self._key(credential, required_scopes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self.clock():
+                self.counters['hits'] += 1
+                return True
+            self.counters['misses'] += 1
+            return False
+
+    def reject(self, credential, required_scopes=None):
+        """
+        Caches a credential rejected by a security function.
+
+        :type credential: str
+        :param required_scopes: given to the security function
+        :type required_scopes: list | None
+        """
+        key = self._key(credential, required_scopes)
+        with self._lock:
+            now = self.clock()
+            rejections, expires = self._entries.pop(key, (0, now))
+            if now - expires > self.max_ttl:
+                # the client stopped retrying for a while
+                rejections = 0
+            rejections += 1
+            ttl = min(self.ttl * 2 ** (rejections - 1), self.max_ttl)
+            self._entries[key] = (rejections, now + ttl)
+            self.counters['rejections'] += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        :return: hits (credentials rejected from the cache), misses, rejections
+            and evictions counters, and the number of cached credentials
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats['size'] = len(self._entries)
+        for counter in ('hits', 'misses', 'rejections', 'evictions'):
+            stats.setdefault(counter, 0)
+        return stats
+
+
+def make_rejected_credentials(options):
+    """
+    :type options: specific.options.SpecificOptions
+    :return: None when the cache of the rejected credentials is disabled
+    :rtype: RejectedCredentials | None
+    """
+    if not options.rejected_credentials_ttl or not options.rejected_credentials_size:
+        return None
+    return RejectedCredentials(ttl=options.rejected_credentials_ttl,
+                               max_ttl=options.rejected_credentials_max_ttl,
+                               maxsize=options.rejected_credentials_size)
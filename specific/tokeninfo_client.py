@@ -0,0 +1,292 @@
+"""
+HTTP client of the OAuth tokeninfo endpoints (`x-tokenInfoUrl`), configured per
+security scheme with `x-tokenInfoClient`, with retries and a circuit breaker
+which fails fast while the authorization server is failing.
+"""
+import collections
+import json
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from .exceptions import TokenInfoUnavailable
+
+logger = logging.getLogger(__name__)
+
+# status codes of the tokeninfo responses which are retried and count as failures
+RETRY_STATUS_CODES = frozenset([500, 502, 503, 504])
+# client errors which do not tell that the token is not valid
+TRANSIENT_STATUS_CODES = frozenset([408, 429])
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class CircuitBreaker(object):
+    """
+    Opens when the failure rate of the last `window` seconds reaches
+    `failure_threshold`. While open, the calls are rejected; after
+    `reset_timeout` seconds one trial call is allowed (half open), whose
+    success closes the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=0.5, minimum_requests=20, window=10.0,
+                 reset_timeout=30.0, clock=time.time):
+        """
+        :param failure_threshold: failure rate opening the circuit
+        :type failure_threshold: float
+        :param minimum_requests: number of calls in the window before the circuit can open
+        :type minimum_requests: int
+        :param window: seconds of calls considered for the failure rate
+        :type window: float
+        :param reset_timeout: seconds the circuit stays open
+        :type reset_timeout: float
+        :param clock: current time in seconds, as `time.time`
+        """
+        self.failure_threshold = failure_threshold
+        self.minimum_requests = minimum_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.counters = collections.Counter()
+        self._calls = collections.deque()  # (time, failed)
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        :return: whether a call can be made
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    self.counters['rejected'] += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN:
+                if self._trial:
+                    self.counters['rejected'] += 1
+                    return False
+                self._trial = True
+            return True
+
+    def record(self, failed):
+        """
+        :param failed: whether the call failed
+        :type failed: bool
+        """
+        with self._lock:
+            now = self.clock()
+            if self.state == self.HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                return
+
+            self._calls.append((now, failed))
+            while self._calls and self._calls[0][0] <= now - self.window:
+                self._calls.popleft()
+            failures = sum(1 for _, call_failed in self._calls if call_failed)
+            if (self.state == self.CLOSED and len(self._calls) >= self.minimum_requests and
+                    failures >= self.failure_threshold * len(self._calls)):
+                self._open(now)
+
+    def _open(self, now):
+        logger.warning('Opening the circuit of the tokeninfo endpoint for %ss', self.reset_timeout)
+        self.state = self.OPEN
+        self.opened_at = now
+        self.counters['opened'] += 1
+        self._calls.clear()
+
+
+class TokenInfoClient(object):
+    """
+    Retrieves the token info of a tokeninfo endpoint, e.g.
+
+        x-tokenInfoUrl: https://auth.example.com/tokeninfo
+        x-tokenInfoClient:
+          poolSize: 20
+          connectTimeout: 0.5
+          readTimeout: 2
+          retries: 2
+          failureThreshold: 0.5
+
+    The connection errors, timeouts and 5xx responses are retried with an
+    exponential backoff with full jitter, and count as failures of the circuit
+    breaker. A failed lookup, or a lookup rejected by the open circuit, raises
+    `TokenInfoUnavailable` (503), while the tokens in the token info cache are
+    still accepted.
+    """
+
+    def __init__(self, url, pool_size=100, connect_timeout=5.0, read_timeout=5.0,
+                 keep_alive=True, retries=0, retry_backoff=0.1, circuit_breaker=None):
+        """
+        :type url: str
+        :param pool_size: maximum number of connections kept to the endpoint
+        :type pool_size: int
+        :type connect_timeout: float
+        :type read_timeout: float
+        :param keep_alive: whether the connections are reused
+        :type keep_alive: bool
+        :param retries: number of retries of the failed lookups
+        :type retries: int
+        :param retry_backoff: seconds before the first retry, doubled for each retry
+        :type retry_backoff: float
+        :param circuit_breaker: None to disable
+        :type circuit_breaker: CircuitBreaker | None
+        """
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.circuit_breaker = circuit_breaker
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        self.counters = collections.Counter()
+        self.max_latency_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_security_definition(cls, url, security_definition):
+        """
+        :type url: str
+        :type security_definition: dict
+        :rtype: TokenInfoClient
+        """
+        config = security_definition.get('x-tokenInfoClient') or {}
+        circuit_breaker = None
+        if config.get('failureThreshold'):
+            circuit_breaker = CircuitBreaker(failure_threshold=config['failureThreshold'],
+                                             minimum_requests=config.get('minimumRequests', 20),
+                                             window=config.get('failureWindow', 10.0),
+                                             reset_timeout=config.get('resetTimeout', 30.0))
+        return cls(url,
+                   pool_size=config.get('poolSize', 100),
+                   connect_timeout=config.get('connectTimeout', 5.0),
+                   read_timeout=config.get('readTimeout', 5.0),
+                   keep_alive=config.get('keepAlive', True),
+                   retries=config.get('retries', 0),
+                   retry_backoff=config.get('retryBackoff', 0.1),
+                   circuit_breaker=circuit_breaker)
+
+    def __call__(self, token):
+        """
+        :type token: str
+        :return: the token info, None when the token is not valid
+        :rtype: dict | None
+        :raises TokenInfoUnavailable: the endpoint failed or the circuit is open
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retries')
+                time.sleep(random.uniform(0, self.retry_backoff * 2 ** (attempt - 1)))
+            # the failed attempts, or the concurrent lookups, may open the circuit
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow():
+                self._count('rejected')
+                raise TokenInfoUnavailable()
+            start = time.time()
+            try:
+                response = self.session.get(self.url, headers={'Authorization': 'Bearer {}'.format(token)},
+                                            timeout=self.timeout)
+            except requests.RequestException as exception:
+                logger.warning('... Tokeninfo request to %s failed: %s', self.url, exception)
+                self._record(start, failed=True)
+                continue
+            if response.status_code in RETRY_STATUS_CODES:
+                logger.warning('... Tokeninfo request to %s failed with %s', self.url, response.status_code)
+                self._record(start, failed=True)
+                continue
+            self._record(start, failed=False)
+            if is_rejection(response.status_code):
+                return None
+            if not response.ok:
+                logger.warning('... Tokeninfo request to %s failed with %s', self.url, response.status_code)
+                raise TokenInfoUnavailable()
+            return response.json()
+
+        raise TokenInfoUnavailable()
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _record(self, start, failed):
+        latency = time.time() - start
+        with self._lock:
+            self.counters['requests'] += 1
+            self.counters['failures'] += int(failed)
+            self.counters['latency_seconds'] += latency
+            self.max_latency_seconds = max(self.max_latency_seconds, latency)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(failed)
+
+    def stats(self):
+        """
+        :return: counters of the requests, failures, retries and rejected lookups,
+            the mean and maximum latency of the requests in milliseconds, and the
+            state of the circuit
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self.counters)
+        for counter in ('requests', 'failures', 'retries', 'rejected'):
+            stats.setdefault(counter, 0)
+        latency_seconds = stats.pop('latency_seconds', 0.0)
+        stats['latency_ms_mean'] = latency_seconds * 1000 / stats['requests'] if stats['requests'] else 0.0
+        stats['latency_ms_max'] = self.max_latency_seconds * 1000
+        if self.circuit_breaker is not None:
+            stats['circuit'] = self.circuit_breaker.state
+            stats['circuit_opened'] = self.circuit_breaker.counters['opened']
+        return stats
+
+
+def is_rejection(status_code):
+    """
+    Whether a tokeninfo response tells that the token is not valid, which can
+    be cached, rather than that the endpoint failed.
+
+    :type status_code: int
+    :rtype: bool
+    """
+    return 400 <= status_code < 500 and status_code not in TRANSIENT_STATUS_CODES
+
+
+def get_tokeninfo_client(url, security_definition):
+    """
+    Tokeninfo client of a security scheme, shared by the operations using it.
+
+    :type url: str
+    :type security_definition: dict
+    :rtype: TokenInfoClient
+    """
+    config = (url, json.dumps(security_definition.get('x-tokenInfoClient'), sort_keys=True))
+    with _clients_lock:
+        if config not in _clients:
+            _clients[config] = TokenInfoClient.from_security_definition(url, security_definition)
+        return _clients[config]
+
+
+def get_tokeninfo_clients():
+    """
+    :return: the tokeninfo clients, e.g. to export their `stats`
+    :rtype: list
+    """
+    with _clients_lock:
+        return list(_clients.values())
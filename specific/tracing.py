@@ -0,0 +1,106 @@
+"""
+Hooks of the tracing: listeners notified of the start and end of each stage of
+the request pipeline (see `specific.metrics.StageTimer`) and of each security
+scheme verifying the credentials, e.g. to attribute the latency to spans.
+
+The stages are only instrumented when the metrics or the listeners are
+enabled, the pipeline of the other operations is unchanged.
+"""
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StageListener(object):
+    """
+    Receives the events of the stages, in the thread or task of the request.
+    The stages are "request", "security", "auth.<security scheme>",
+    "array_parsing", "parameter_validation", "body_validation", "handler",
+    "response_validation" and "serialization".
+    """
+
+    def stage_started(self, stage, operation_id, request):
+        """
+        :type stage: str
+        :type operation_id: str
+        :param request: None while the request is converted (the "request" stage)
+        :type request: specific.lifecycle.SpecificRequest | None
+        :return: any value, given back to `stage_finished`, e.g. a span
+        """
+
+    def stage_finished(self, stage, operation_id, request, duration, started):
+        """
+        :param duration: seconds spent in the stage, including the nested stages
+        :type duration: float
+        :param started: the value returned by `stage_started`
+        """
+
+
+class OpenTelemetryListener(StageListener):
+    """
+    Records the stages as spans of a tracer with the interface of OpenTelemetry
+    (`tracer.start_span(name, attributes=...)`, `span.end()`), without depending
+    on it, e.g.
+
+        from opentelemetry import trace
+        app = specific.FlaskApp(__name__, options={
+            'stage_listeners': [OpenTelemetryListener(trace.get_tracer('specific'))]})
+
+    The spans are children of the current span of the tracer.
+    """
+
+    def __init__(self, tracer, prefix='specific.'):
+        """
+        :param prefix: of the span names, followed by the stage
+        :type prefix: str
+        """
+        self.tracer = tracer
+        self.prefix = prefix
+
+    def stage_started(self, stage, operation_id, request):
+        return self.tracer.start_span(self.prefix + stage, attributes=request_attributes(operation_id, request))
+
+    def stage_finished(self, stage, operation_id, request, duration, started):
+        if started is not None:
+            started.end()
+
+
+def request_attributes(operation_id, request):
+    """
+    :return: the attributes of the spans, in the OpenTelemetry semantic conventions
+    :rtype: dict
+    """
+    attributes = {'specific.operation_id': operation_id}
+    if request is not None:
+        attributes['http.method'] = request.method.upper()
+        attributes['http.url'] = request.url
+    return attributes
+
+
+def trace_auth_func(scheme_name, auth_func):
+    """
+    Notifies the listeners of the stage timer of the request around the calls
+    of the function verifying the credentials of a security scheme, as the
+    stage "auth.<scheme_name>". The stage is not timed in the metrics, it is
+    part of the "security" stage.
+
+    :type scheme_name: str
+    :type auth_func: types.FunctionType
+    :rtype: types.FunctionType
+    """
+    stage = 'auth.{}'.format(scheme_name)
+
+    @functools.wraps(auth_func)
+    def wrapper(credentials, required_scopes, scope_set=None):
+        timer = getattr(credentials.request, 'stage_timer', None)
+        if timer is None or not timer.listeners:
+            return auth_func(credentials, required_scopes, scope_set)
+        start = timer.clock()
+        timer.trace_started(stage)
+        try:
+            return auth_func(credentials, required_scopes, scope_set)
+        finally:
+            timer.trace_finished(stage, timer.clock() - start)
+
+    return wrapper
@@ -0,0 +1,427 @@
+"""
+Recording of a sample of the requests to an NDJSON file, a JSON object per
+line, and their replay against an app in process or over HTTP, to benchmark
+with the shape of the production traffic.
+
+The values of the sensitive headers and parameters (credentials, API keys,
+see `specific.slow_requests.SENSITIVE_PARAMETER`) are redacted, the replayed
+requests are sent without them, or with the headers given to the replay. The
+path is recorded as the template of the operation with the values of its
+parameters, e.g. /reset/{token}, so that the redacted path parameters do not
+remain in the path.
+"""
+import base64
+import collections
+import json
+import os
+import random
+import re
+import threading
+import time
+import timeit
+
+import six
+from six.moves import queue
+from six.moves.urllib.parse import unquote, urlsplit
+from werkzeug.datastructures import MultiDict
+
+from .loadtest import (ALL, NO_RESPONSE, TOTAL, build_template, connect, send,
+                       summarize)
+from .slow_requests import REDACTED, is_sensitive
+from .utils import is_form_mimetype, is_json_mimetype
+
+# headers of the connection, not of the request
+IGNORED_HEADERS = {'host', 'content-length', 'connection', 'keep-alive', 'transfer-encoding'}
+
+
+class TrafficRecorder(object):
+    """
+    Appends a line per sampled request to a file: the time, the operation, the
+    method, the path, the path and query parameters, the headers and the body.
+    Each line is written with a single `write` in append mode, the processes of
+    a prefork server can share the file.
+    """
+
+    def __init__(self, path, sample_rate=0.01, random=random.random):
+        """
+        :param path: of the NDJSON file
+        :type path: str
+        :param sample_rate: share of the requests recorded
+        :type sample_rate: float
+        :param random: returns a float in [0, 1), as `random.random`
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.random = random
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def wrap(self, operation_id, function, path_template, sensitive_parameters=()):
+        """
+        Records a sample of the requests given to a function taking the
+        SpecificRequest, before calling it.
+
+        :type operation_id: str
+        :type function: types.FunctionType
+        :param path_template: path of the operation with the base path of its API, e.g. /v1/reset/{token}
+        :type path_template: str
+        :param sensitive_parameters: names of other parameters which are redacted, e.g. API keys
+        :type sensitive_parameters: list
+        :rtype: types.FunctionType
+        """
+        sensitive_parameters = {name.lower() for name in sensitive_parameters}
+        path_template = PathTemplate(path_template)
+
+        def wrapper(request):
+            if self.random() < self.sample_rate:
+                self.record(operation_id, request, path_template, sensitive_parameters)
+            return function(request)
+
+        wrapper.__name__ = getattr(function, '__name__', 'wrapper')
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def record(self, operation_id, request, path_template, sensitive_parameters=()):
+        """
+        :type operation_id: str
+        :type request: specific.lifecycle.SpecificRequest
+        :type path_template: PathTemplate
+        :type sensitive_parameters: set
+        """
+        entry = request_entry(operation_id, request, path_template, sensitive_parameters)
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True, default=str) + '\n'
+        os.write(self._fd, line.encode('utf-8'))
+
+    def close(self):
+        os.close(self._fd)
+
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def get_traffic_recorder(path, sample_rate):
+    """
+    Traffic recorder shared by the APIs recording to the same file.
+
+    :type path: str
+    :type sample_rate: float
+    :rtype: TrafficRecorder
+    """
+    path = os.path.abspath(path)
+    with _recorders_lock:
+        if path not in _recorders:
+            _recorders[path] = TrafficRecorder(path, sample_rate)
+        return _recorders[path]
+
+
+class PathTemplate(object):
+    """
+    Path of an operation with its parameters between braces, e.g. /reset/{token}.
+    """
+
+    PARAMETER = re.compile(r'{([^}/]+)}')
+
+    def __init__(self, template):
+        """
+        :type template: str
+        """
+        self.template = template
+        self.names = []
+        pattern = ''
+        position = 0
+        for match in self.PARAMETER.finditer(template):
+            # the names of the parameters are not always valid group names
+            pattern += re.escape(template[position:match.start()]) + '(?P<p{}>[^/]+)'.format(len(self.names))
+            self.names.append(match.group(1))
+            position = match.end()
+        self._pattern = re.compile(pattern + re.escape(template[position:]) + '$')
+
+    def values(self, path):
+        """
+        :param path: path of a request of the operation
+        :type path: str
+        :return: the values of the parameters in the path, by name, None when it does not match
+        :rtype: dict | None
+        """
+        match = self._pattern.match(path)
+        if match is None:
+            return None
+        return {name: unquote(match.group('p{}'.format(index))) for index, name in enumerate(self.names)}
+
+    @classmethod
+    def expand(cls, template, values):
+        """
+        :return: the path of a template with the values of its parameters
+        :rtype: str
+        """
+        return cls.PARAMETER.sub(lambda match: six.text_type(values.get(match.group(1), match.group(0))), template)
+
+
+def _multi_items(values):
+    """
+    :return: the pairs of a multi dict of werkzeug or aiohttp
+    :rtype: list
+    """
+    try:
+        return list(values.items(multi=True))
+    except TypeError:
+        return list(values.items())
+
+
+def redact_value(value, sensitive_parameters=()):
+    """
+    :return: a JSON value with the values of the sensitive keys of its objects redacted
+    """
+    if isinstance(value, dict):
+        return {key: REDACTED if is_sensitive(key, sensitive_parameters) else redact_value(item, sensitive_parameters)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact_value(item, sensitive_parameters) for item in value]
+    return value
+
+
+def request_entry(operation_id, request, path_template, sensitive_parameters=()):
+    """
+    :type operation_id: str
+    :type request: specific.lifecycle.SpecificRequest
+    :param path_template: of the operation, the path is recorded as the template
+    :type path_template: PathTemplate
+    :type sensitive_parameters: set
+    :return: the record of a request, sensitive values redacted
+    :rtype: dict
+    """
+    def redact_pairs(pairs):
+        return [[name, REDACTED if is_sensitive(name, sensitive_parameters) else value] for name, value in pairs]
+
+    # the values as they are in the path, rather than converted to their type
+    path_params = path_template.values(urlsplit(request.url).path)
+    if path_params is None:
+        path_params = request.path_params
+    entry = {
+        't': round(time.time(), 6),
+        'operation_id': operation_id,
+        'method': request.method.upper(),
+        'path': path_template.template,
+        'path_params': dict(redact_pairs(path_params.items())),
+        'query': redact_pairs(_multi_items(request.query)),
+        'headers': dict(redact_pairs((name, value) for name, value in request.headers.items()
+                                     if name.lower() not in IGNORED_HEADERS)),
+    }
+    content_type = request.content_type or ''
+    # the body of the forms is consumed by their parsing, the uploaded files are not recorded
+    if is_form_mimetype(content_type) and request.form and not request.files:
+        entry['form'] = redact_pairs(_multi_items(request.form))
+        # encoded again on replay
+        entry['headers'].pop('Content-Type', None)
+        entry['content_type'] = content_type.split(';')[0]
+        return entry
+    body = request.body
+    if not body:
+        return entry
+    if is_json_mimetype(content_type):
+        try:
+            entry['json'] = redact_value(json.loads(body.decode('utf-8')), sensitive_parameters)
+            return entry
+        except ValueError:
+            pass
+    try:
+        entry['body'] = body.decode('utf-8')
+    except UnicodeDecodeError:
+        entry['body_base64'] = base64.b64encode(body).decode('ascii')
+    return entry
+
+
+def load_traffic(path):
+    """
+    :return: the recorded requests, in the order of their time
+    :rtype: list[dict]
+    """
+    with open(path) as traffic:
+        entries = [json.loads(line) for line in traffic if line.strip()]
+    entries.sort(key=lambda entry: entry.get('t', 0))
+    return entries
+
+
+def entry_arguments(entry, headers=None):
+    """
+    :type entry: dict
+    :param headers: sent on top of the recorded headers, e.g. credentials
+    :type headers: dict | None
+    :return: the arguments of `werkzeug.test.Client.open` of a recorded request,
+        the redacted path parameters are sent redacted
+    :rtype: dict
+    """
+    request_headers = {name: value for name, value in entry.get('headers', {}).items() if value != REDACTED}
+    request_headers.update(headers or {})
+    content_type = None
+    for name in list(request_headers):
+        if name.lower() == 'content-type':
+            content_type = request_headers.pop(name)
+    arguments = {
+        'path': PathTemplate.expand(entry['path'], entry.get('path_params', {})),
+        'method': entry['method'],
+        'query_string': MultiDict([tuple(pair) for pair in entry.get('query', [])]),
+        'headers': request_headers,
+        'content_type': content_type,
+    }
+    if 'json' in entry:
+        arguments['data'] = json.dumps(entry['json'])
+    elif 'form' in entry:
+        arguments['data'] = MultiDict([tuple(pair) for pair in entry['form']])
+        arguments['content_type'] = entry.get('content_type')
+    elif 'body' in entry:
+        arguments['data'] = entry['body'].encode('utf-8')
+    elif 'body_base64' in entry:
+        arguments['data'] = base64.b64decode(entry['body_base64'])
+    return arguments
+
+
+class HttpTarget(object):
+    """
+    Sends the requests to a server, over a keep-alive connection per worker.
+    """
+
+    def __init__(self, url, timeout=10.0):
+        """
+        :param url: of the server, its path is prefixed to the recorded paths
+        :type url: str
+        :param timeout: seconds to connect and to wait for a response
+        :type timeout: float
+        """
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+
+    def prepare(self, arguments):
+        return build_template(arguments)
+
+    def connect(self):
+        return connect(self.scheme, self.netloc, self.timeout)
+
+    def send(self, connection, request):
+        return send(connection, request, self.base_path)
+
+    def close(self, connection):
+        connection.close()
+
+
+class AppTarget(object):
+    """
+    Sends the requests to a Flask app in process, with the werkzeug test client.
+    """
+
+    def __init__(self, app):
+        """
+        :type app: specific.apps.flask_app.FlaskApp
+        """
+        self.app = app
+
+    def prepare(self, arguments):
+        return arguments
+
+    def connect(self):
+        return self.app.app.test_client()
+
+    def send(self, client, arguments):
+        response = client.open(**arguments)
+        response.close()
+        return response.status_code
+
+    def close(self, client):
+        pass
+
+
+def is_expected(status):
+    """
+    :return: whether a replayed request got a response without a server error
+    :rtype: bool
+    """
+    return status != NO_RESPONSE and status < 500
+
+
+class Replay(object):
+    """
+    Sends recorded requests to a target, at the recorded rate multiplied by a
+    speed, by concurrent workers. The requests due while all the workers are
+    busy are delayed, the delay is reported as the lag.
+    """
+
+    def __init__(self, entries, target, speed=1.0, concurrency=8, headers=None):
+        """
+        :param entries: recorded requests, see `load_traffic`
+        :type entries: list[dict]
+        :type target: HttpTarget | AppTarget
+        :param speed: factor of the recorded rate, 0 to send the requests as fast as possible
+        :type speed: float
+        :param concurrency: number of workers
+        :type concurrency: int
+        :param headers: sent on top of the recorded headers, e.g. credentials
+        :type headers: dict | None
+        """
+        self.entries = entries
+        self.target = target
+        self.speed = speed
+        self.concurrency = concurrency
+        self.requests = [target.prepare(entry_arguments(entry, headers)) for entry in entries]
+
+    def worker(self, requests, samples, lags):
+        clock = timeit.default_timer
+        connection = self.target.connect()
+        try:
+            while True:
+                item = requests.get()
+                if item is None:
+                    return
+                due, operation_id, request = item
+                start = clock()
+                status = self.target.send(connection, request)
+                samples[operation_id].append((clock() - start, status, is_expected(status)))
+                lags.append(start - due)
+        finally:
+            self.target.close(connection)
+
+    def run(self):
+        """
+        :return: the results per operation, then of all the requests, see
+            `specific.loadtest.summarize`. The result of all the requests has
+            the maximum lag in milliseconds.
+        :rtype: list[dict]
+        """
+        clock = timeit.default_timer
+        requests = queue.Queue()
+        samples = [collections.defaultdict(list) for _ in range(self.concurrency)]
+        lags = [[] for _ in range(self.concurrency)]
+        workers = [threading.Thread(target=self.worker, args=(requests, worker_samples, worker_lags))
+                   for worker_samples, worker_lags in zip(samples, lags)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        start = clock()
+        first_time = self.entries[0].get('t', 0) if self.entries else 0
+        for entry, request in zip(self.entries, self.requests):
+            due = clock()
+            if self.speed:
+                due = start + (entry.get('t', first_time) - first_time) / self.speed
+                delay = due - clock()
+                if delay > 0:
+                    time.sleep(delay)
+            requests.put((due, entry['operation_id'], request))
+        for _ in workers:
+            requests.put(None)
+        for worker in workers:
+            worker.join()
+        elapsed = clock() - start
+
+        merged = collections.defaultdict(list)
+        for worker_samples in samples:
+            for operation_id, values in worker_samples.items():
+                merged[operation_id].extend(values)
+        results = [summarize(operation_id, None, merged[operation_id], elapsed) for operation_id in sorted(merged)]
+        if merged:
+            total = summarize(TOTAL, ALL, [sample for values in merged.values() for sample in values], elapsed)
+            total['max_lag_ms'] = max(lag for worker_lags in lags for lag in worker_lags) * 1000
+            results.append(total)
+        return results
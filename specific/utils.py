@@ -152,6 +152,20 @@ def all_json(mimetypes):
     return all(is_json_mimetype(mimetype) for mimetype in mimetypes)
 
 
+def has_coroutine(function):
+    """
+    Checks if function is a coroutine function.
+    Always False on Python 2, where coroutines are not supported.
+
+    :type function: Callable
+    :rtype: bool
+    """
+    if six.PY3:  # pragma: 2.7 no cover
+        import asyncio
+        return asyncio.iscoroutinefunction(function)
+    return False  # pragma: 3 no cover
+
+
 def is_nullable(param_def):
     return (
         param_def.get('schema', param_def).get('nullable', False) or
@@ -0,0 +1,75 @@
+import base64
+import json
+
+import pytest
+from specific import AioHttpApp
+
+
+@pytest.fixture
+def secure_app(aiohttp_api_spec_dir):
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True, auth_all_paths=True)
+    app.add_api('openapi_secure.yaml')
+    return app
+
+
+async def test_auth_all_paths(oauth_requests, secure_app, aiohttp_client):
+    app_client = await aiohttp_client(secure_app.app)
+
+    headers = {'Authorization': 'Bearer 100'}
+    get_inexistent_endpoint = await app_client.get(
+        '/v1.0/does-not-exist-valid-token',
+        headers=headers
+    )
+    assert get_inexistent_endpoint.status == 404
+    assert get_inexistent_endpoint.content_type == 'application/problem+json'
+
+    get_inexistent_endpoint = await app_client.get(
+        '/v1.0/does-not-exist-no-token'
+    )
+    assert get_inexistent_endpoint.status == 401
+    assert get_inexistent_endpoint.content_type == 'application/problem+json'
+
+
+async def test_secure_app(oauth_requests, secure_app, aiohttp_client):
+    app_client = await aiohttp_client(secure_app.app)
+
+    post_hello = await app_client.post('/v1.0/greeting/jsantos')
+    assert post_hello.status == 401
+
+    headers = {'Authorization': 'Bearer 100'}
+    post_hello = await app_client.post(
+        '/v1.0/greeting/jsantos',
+        headers=headers
+    )
+    assert post_hello.status == 200
+    assert json.loads((await post_hello.read())) == {'greeting': 'Hello jsantos'}
+
+    headers = {'Authorization': 'Bearer 200'}
+    post_hello = await app_client.post(
+        '/v1.0/greeting/jsantos',
+        headers=headers
+    )
+    assert post_hello.status == 403
+
+    headers = {'Authorization': 'Bearer 300'}
+    post_hello = await app_client.post(
+        '/v1.0/greeting/jsantos',
+        headers=headers
+    )
+    assert post_hello.status == 401
+
+
+async def test_basic_auth(secure_app, aiohttp_client):
+    app_client = await aiohttp_client(secure_app.app)
+
+    credentials = base64.b64encode(b'username:username').decode()
+    headers = {'Authorization': 'Basic {}'.format(credentials)}
+    post_hello = await app_client.post('/v1.0/greeting/jsantos', headers=headers)
+    assert post_hello.status == 200
+
+    credentials = base64.b64encode(b'username:wrong').decode()
+    headers = {'Authorization': 'Basic {}'.format(credentials)}
+    post_hello = await app_client.post('/v1.0/greeting/jsantos', headers=headers)
+    assert post_hello.status == 401
@@ -0,0 +1,137 @@
+import json
+import pathlib
+
+import mock
+import pytest
+from conftest import TEST_FOLDER
+from specific import AioHttpApp
+from specific.exceptions import ProblemException
+from specific.metrics import STAGE_DURATION, InMemoryMetrics
+
+
+@pytest.fixture
+def web_run_app_mock(monkeypatch):
+    mock_ = mock.MagicMock()
+    monkeypatch.setattr('specific.apps.aiohttp_app.web.run_app', mock_)
+    return mock_
+
+
+def test_app_run(web_run_app_mock, aiohttp_api_spec_dir):
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    app.run()
+    assert web_run_app_mock.call_args_list == [
+        mock.call(app.app, port=5001, host='0.0.0.0')
+    ]
+
+
+def test_app_run_server_error(web_run_app_mock, aiohttp_api_spec_dir):
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir)
+
+    with pytest.raises(Exception) as exc_info:
+        app.run(server='other')
+
+    assert exc_info.value.args == ('Server other not recognized',)
+
+
+def test_app_get_root_path(aiohttp_api_spec_dir):
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir)
+    assert app.get_root_path() == pathlib.Path(__file__).parent
+
+
+def test_app_get_root_path_not_in_sys_modules(sys_modules_mock, aiohttp_api_spec_dir):
+    app = AioHttpApp('specific', port=5001,
+                     specification_dir=aiohttp_api_spec_dir)
+    assert app.get_root_path() == pathlib.Path(TEST_FOLDER).parent / 'specific'
+
+
+def test_app_get_root_path_invalid(sys_modules_mock, aiohttp_api_spec_dir):
+    with pytest.raises(RuntimeError) as exc_info:
+        AioHttpApp('error__', port=5001,
+                   specification_dir=aiohttp_api_spec_dir)
+
+    assert exc_info.value.args == ("Invalid import name 'error__'",)
+
+
+@pytest.fixture
+def sys_modules_mock(monkeypatch):
+    monkeypatch.setattr('specific.apps.aiohttp_app.sys.modules', {})
+
+
+async def test_app_error_handler(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir)
+
+    def teapot(exception):
+        return {'detail': exception.detail}, 418
+
+    async def raise_problem(request):
+        raise ProblemException(status=400, detail='short and stout')
+
+    app.add_error_handler(ProblemException, teapot)
+    app.app.router.add_get('/teapot', raise_problem)
+
+    app_client = await aiohttp_client(app.app)
+    response = await app_client.get('/teapot')
+    assert response.status == 418
+    assert json.loads(await response.read()) == {'detail': 'short and stout'}
+
+
+async def test_app_unhandled_exception(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir)
+
+    async def raise_error(request):
+        raise ValueError()
+
+    app.app.router.add_get('/error', raise_error)
+
+    app_client = await aiohttp_client(app.app)
+    response = await app_client.get('/error')
+    assert response.status == 500
+    assert response.content_type == 'application/problem+json'
+
+
+async def test_app_metrics(aiohttp_api_spec_dir, aiohttp_client):
+    metrics = InMemoryMetrics()
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir,
+                     options={'metrics': metrics})
+    app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    response = await app_client.get('/v1.0/bye/jsantos')
+    assert response.status == 200
+
+    stages = {dict(key)['stage'] for key in metrics.histograms[STAGE_DURATION]}
+    assert stages == {'request', 'array_parsing', 'parameter_validation', 'handler', 'serialization'}
+
+    response = await app_client.get('/metrics')
+    assert response.status == 200
+    assert 'stage="handler",status="200"' in await response.text()
+
+
+async def test_app_server_timing(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir,
+                     options={'server_timing': True})
+    app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    response = await app_client.get('/v1.0/bye/jsantos')
+    assert response.status == 200
+    assert response.headers['Server-Timing'].startswith('validate;dur=')
+
+
+async def test_app_readiness(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, specification_dir=aiohttp_api_spec_dir,
+                     options={'warmup': True})
+    app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    response = await app_client.get('/ready')
+    assert response.status == 503
+    assert json.loads(await response.read()) == {'status': 'warming up'}
+
+    app.start_warmup().join()
+
+    response = await app_client.get('/ready')
+    assert response.status == 200
+    assert json.loads(await response.read()) == {'status': 'ready'}
@@ -0,0 +1,283 @@
+import yaml
+
+import pytest
+from conftest import TEST_FOLDER
+from specific import AioHttpApp
+from specific.apis.aiohttp_api import aiohttpify_path
+
+
+@pytest.fixture
+def aiohttp_app(aiohttp_api_spec_dir):
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    app.add_api('swagger_simple.yaml', validate_responses=True,
+                pass_context_arg_name='request_ctx')
+    return app
+
+
+def test_aiohttpify_path():
+    assert aiohttpify_path('/foo-bar/{my-param}') == '/foo-bar/{my_param}'
+    assert aiohttpify_path('/foo/{id}', {'id': 'integer'}) == r'/foo/{id:\d+}'
+    assert aiohttpify_path('/foo/{id}', {'id': 'path'}) == '/foo/{id:[^/].*}'
+
+
+async def test_app(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    get_bye = await app_client.get('/v1.0/bye/jsantos')
+    assert get_bye.status == 200
+    assert (await get_bye.read()) == b'Goodbye jsantos'
+
+
+async def test_app_with_relative_path(aiohttp_api_spec_dir, aiohttp_client):
+    # Create the app with a relative path and run the test_app testcase below.
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir='..' / aiohttp_api_spec_dir.relative_to(TEST_FOLDER),
+                     debug=True)
+    app.add_api('swagger_simple.yaml')
+    app_client = await aiohttp_client(app.app)
+    get_bye = await app_client.get('/v1.0/bye/jsantos')
+    assert get_bye.status == 200
+    assert (await get_bye.read()) == b'Goodbye jsantos'
+
+
+async def test_swagger_json(aiohttp_api_spec_dir, aiohttp_client):
+    """ Verify the swagger.json file is returned for default setting passed to app. """
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    api = app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    swagger_json = await app_client.get('/v1.0/swagger.json')
+    assert swagger_json.status == 200
+    json_ = await swagger_json.json()
+    assert api.specification.raw == json_
+
+
+async def test_swagger_yaml(aiohttp_api_spec_dir, aiohttp_client):
+    """ Verify the swagger.yaml file is returned for default setting passed to app. """
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    api = app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    spec_response = await app_client.get('/v1.0/swagger.yaml')
+    assert spec_response.status == 200
+    assert spec_response.content_type == 'text/yaml'
+    data_ = await spec_response.read()
+    assert api.specification.raw == yaml.safe_load(data_)
+
+
+async def test_no_swagger_json(aiohttp_api_spec_dir, aiohttp_client):
+    """ Verify the swagger.json file is not returned when set to False when creating app. """
+    options = {"swagger_json": False}
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     options=options,
+                     debug=True)
+    app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    swagger_json = await app_client.get('/v1.0/swagger.json')
+    assert swagger_json.status == 404
+
+
+async def test_swagger_ui(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    app.add_api('swagger_simple.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    swagger_ui = await app_client.get('/v1.0/ui/')
+    assert swagger_ui.status == 200
+    assert swagger_ui.content_type == 'text/html'
+    assert b'/v1.0/swagger.json' in (await swagger_ui.read())
+
+    swagger_ui_static = await app_client.get('/v1.0/ui/swagger-ui.js')
+    assert swagger_ui_static.status == 200
+
+    no_traversal = await app_client.get('/v1.0/ui/..%2F..%2Fsetup.py')
+    assert no_traversal.status in (403, 404)
+
+
+async def test_swagger_ui_behind_proxy(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    swagger_ui = await app_client.get('/v1.0/ui/')
+    assert b'/v1.0/swagger.json' in (await swagger_ui.read())
+
+
+async def test_empty_base_path(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    app.add_api('openapi_empty_base_path.yaml')
+
+    app_client = await aiohttp_client(app.app)
+    get_bye = await app_client.get('/bye/jsantos')
+    assert get_bye.status == 200
+    assert (await get_bye.read()) == b'Goodbye jsantos'
+
+    openapi_json = await app_client.get('/openapi.json')
+    assert openapi_json.status == 200
+
+
+async def test_str_response(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    response = await app_client.get('/v1.0/aiohttp_str_response')
+    assert response.status == 200
+    assert response.content_type == 'text/plain'
+    assert (await response.read()) == b'str response'
+
+
+async def test_non_str_non_json_response(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    response = await app_client.get('/v1.0/aiohttp_non_str_non_json_response')
+    assert response.status == 200
+    assert (await response.read()) == b'1234\n'
+
+
+async def test_bytes_response(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    response = await app_client.get('/v1.0/aiohttp_bytes_response')
+    assert response.status == 200
+    assert (await response.read()) == b'bytes response'
+
+
+async def test_streamed_response(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    response = await app_client.get('/v1.0/aiohttp_streamed_response/3')
+    assert response.status == 200
+    assert response.headers.get('Transfer-Encoding') == 'chunked'
+    assert (await response.read()) == b'chunk 0\nchunk 1\nchunk 2\n'
+
+    response = await app_client.get('/v1.0/aiohttp_streamed_response/three')
+    assert response.status == 404
+
+
+async def test_stream_response(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    response = await app_client.get('/v1.0/aiohttp_stream_response')
+    assert response.status == 200
+    assert (await response.read()) == b'streamed response'
+
+
+async def test_validate_responses(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    get_bye = await app_client.get('/v1.0/aiohttp_validate_responses')
+    assert get_bye.status == 200
+    assert (await get_bye.json()) == {"validate": True}
+
+
+async def test_validate_responses_async_def(aiohttp_api_spec_dir, aiohttp_client):
+    app = AioHttpApp(__name__, port=5001,
+                     specification_dir=aiohttp_api_spec_dir,
+                     debug=True)
+    app.add_api('swagger_simple_async_def.yaml', validate_responses=True)
+    app_client = await aiohttp_client(app.app)
+    get_bye = await app_client.get('/v1.0/aiohttp_validate_responses')
+    assert get_bye.status == 200
+    assert (await get_bye.json()) == {"validate": True}
+
+
+async def test_access_request_context(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.post('/v1.0/aiohttp_access_request_context')
+    assert resp.status == 200
+
+
+async def test_query_parsing_simple(aiohttp_app, aiohttp_client):
+    expected_query = 'query'
+
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.get(
+        '/v1.0/aiohttp_query_parsing_str',
+        params={
+            'query': expected_query,
+        },
+    )
+    assert resp.status == 200
+
+    json_resp = await resp.json()
+    assert json_resp.get('query') == expected_query
+
+
+async def test_query_parsing_array(aiohttp_app, aiohttp_client):
+    expected_query = ['queryA', 'queryB']
+
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.get(
+        '/v1.0/aiohttp_query_parsing_array',
+        params={
+            'query': ','.join(expected_query),
+        },
+    )
+    assert resp.status == 200
+
+    json_resp = await resp.json()
+    assert json_resp.get('query') == expected_query
+
+
+async def test_query_parsing_array_multi(aiohttp_app, aiohttp_client):
+    expected_query = ['queryA', 'queryB', 'queryC']
+    query_str = '&'.join(['query=%s' % q for q in expected_query])
+
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.get(
+        '/v1.0/aiohttp_query_parsing_array_multi?%s' % query_str,
+    )
+    assert resp.status == 200
+
+    json_resp = await resp.json()
+    assert json_resp.get('query') == expected_query
+
+
+async def test_query_parsing_missing(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.get('/v1.0/aiohttp_query_parsing_str')
+    assert resp.status == 400
+    assert resp.content_type == 'application/problem+json'
+
+
+async def test_users(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.get('/v1.0/users')
+    assert resp.status == 200
+
+    json_data = await resp.json()
+    assert json_data == \
+        [{'name': 'John Doe', 'id': 1}, {'name': 'Nick Carlson', 'id': 2}]
+
+
+async def test_create_user(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    user = {'name': 'Maksim'}
+    resp = await app_client.post('/v1.0/users', json=user)
+    assert resp.status == 201
+
+    json_data = await resp.json()
+    assert json_data['name'] == 'Maksim'
+
+
+async def test_create_user_invalid_body(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.post('/v1.0/users', data='{"name":',
+                                 headers={'Content-Type': 'application/json'})
+    assert resp.status == 400
+
+
+async def test_not_found(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.get('/v1.0/does_not_exist')
+    assert resp.status == 404
+    assert resp.content_type == 'application/problem+json'
+    assert (await resp.json())['title'] == 'Not Found'
+
+
+async def test_method_not_allowed(aiohttp_app, aiohttp_client):
+    app_client = await aiohttp_client(aiohttp_app.app)
+    resp = await app_client.delete('/v1.0/users')
+    assert resp.status == 405
+    assert resp.content_type == 'application/problem+json'
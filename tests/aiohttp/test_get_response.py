@@ -0,0 +1,118 @@
+from aiohttp import web
+from aiohttp.payload import AsyncIterablePayload
+
+import pytest
+from specific.apis.aiohttp_api import AioHttpApi
+from specific.lifecycle import SpecificResponse
+
+
+@pytest.fixture
+def api(aiohttp_api_spec_dir):
+    yield AioHttpApi(specification=aiohttp_api_spec_dir / 'swagger_secure.yaml')
+
+
+def test_get_response_from_aiohttp_response(api):
+    response = api.get_response(web.Response(text='foo', status=201, headers={'X-header': 'value'}))
+    assert isinstance(response, web.Response)
+    assert response.status == 201
+    assert response.body == b'foo'
+    assert response.content_type == 'text/plain'
+    assert dict(response.headers) == {'Content-Type': 'text/plain; charset=utf-8', 'X-header': 'value'}
+
+
+def test_get_response_from_aiohttp_stream_response(api):
+    response = api.get_response(web.StreamResponse(status=201, headers={'X-header': 'value'}))
+    assert isinstance(response, web.StreamResponse)
+    assert response.status == 201
+    assert response.content_type == 'application/octet-stream'
+    assert dict(response.headers) == {'X-header': 'value'}
+
+
+def test_get_response_from_specific_response(api):
+    response = api.get_response(SpecificResponse(status_code=201, mimetype='text/plain', body='foo',
+                                                 headers={'X-header': 'value'}))
+    assert isinstance(response, web.Response)
+    assert response.status == 201
+    assert response.body == b'foo'
+    assert response.content_type == 'text/plain'
+    assert dict(response.headers) == {'Content-Type': 'text/plain; charset=utf-8', 'X-header': 'value'}
+
+
+def test_get_response_from_string(api):
+    response = api.get_response('foo')
+    assert isinstance(response, web.Response)
+    assert response.status == 200
+    assert response.body == b'foo'
+    assert response.content_type == 'application/octet-stream'
+
+
+def test_get_response_from_string_tuple(api):
+    response = api.get_response(('foo',))
+    assert isinstance(response, web.Response)
+    assert response.status == 200
+    assert response.body == b'[\n  "foo"\n]\n'
+
+
+def test_get_response_from_string_status(api):
+    response = api.get_response(('foo', 201))
+    assert isinstance(response, web.Response)
+    assert response.status == 201
+    assert response.body == b'foo'
+
+
+def test_get_response_from_string_headers_status(api):
+    response = api.get_response(('foo', 201, {'X-header': 'value'}))
+    assert isinstance(response, web.Response)
+    assert response.status == 201
+    assert response.body == b'foo'
+    assert dict(response.headers) == {'X-header': 'value'}
+
+
+def test_get_response_from_dict(api):
+    response = api.get_response({'foo': 'bar'})
+    assert isinstance(response, web.Response)
+    assert response.status == 200
+    assert response.body == b'{\n  "foo": "bar"\n}\n'
+
+
+def test_get_response_from_dict_json(api):
+    response = api.get_response({'foo': 'bar'}, mimetype='application/json')
+    assert isinstance(response, web.Response)
+    assert response.status == 200
+    assert response.content_type == 'application/json'
+    assert response.body == b'{\n  "foo": "bar"\n}\n'
+
+
+def test_get_response_no_data(api):
+    response = api.get_response(None, mimetype='application/json')
+    assert isinstance(response, web.Response)
+    assert response.status == 200
+    assert response.body is None
+
+
+def test_get_response_streamed_body(api):
+    async def chunks():
+        yield b'foo'
+
+    response = api.get_response(chunks(), mimetype='text/plain')
+    assert isinstance(response, web.Response)
+    assert response.content_type == 'text/plain'
+    assert isinstance(response.body, AsyncIterablePayload)
+
+
+def test_get_specific_response_streamed_body(api):
+    async def chunks():
+        yield b'foo'
+
+    response = api.get_specific_response(chunks(), mimetype='text/plain')
+    assert isinstance(response, SpecificResponse)
+    assert response.status_code == 200
+    assert response.body is None
+
+
+def test_get_specific_response(api):
+    response = api.get_specific_response({'foo': 'bar'}, mimetype='application/json')
+    assert isinstance(response, SpecificResponse)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.body == b'{\n  "foo": "bar"\n}\n'
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import pathlib
+
+from werkzeug.datastructures import Headers
+
+import pytest
+from specific import AsgiApp
+
+FIXTURES_FOLDER = pathlib.Path(__file__).parent.parent / 'fixtures'
+
+
+class AsgiTestResponse(object):
+    def __init__(self, status_code, headers, data):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type')
+
+    def json(self):
+        return json.loads(self.data.decode())
+
+
+class AsgiTestClient(object):
+    """
+    Drives an ASGI application in-process.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, query_string='', headers=None, data=b'', json_data=None):
+        headers = Headers(headers)
+        if json_data is not None:
+            data = json.dumps(json_data)
+            headers.setdefault('Content-Type', 'application/json')
+        if isinstance(data, str):
+            data = data.encode()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'root_path': '',
+            'query_string': query_string.encode(),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            'server': ('testserver', 80),
+        }
+        # deliver the body in two chunks to exercise streaming reads
+        chunks = [data[:len(data) // 2], data[len(data) // 2:]]
+
+        async def receive():
+            body = chunks.pop(0)
+            return {'type': 'http.request', 'body': body, 'more_body': bool(chunks)}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send)
+        start, body = messages
+        response_headers = Headers([(k.decode(), v.decode()) for k, v in start['headers']])
+        return AsgiTestResponse(start['status'], response_headers, body['body'])
+
+    def open(self, method, path, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.request(method, path, **kwargs))
+        finally:
+            loop.close()
+
+    def get(self, path, **kwargs):
+        return self.open('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open('POST', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.open('DELETE', path, **kwargs)
+
+
+def build_asgi_app(spec_file='openapi.yaml', options=None, **kwargs):
+    app = AsgiApp(__name__, specification_dir=FIXTURES_FOLDER / 'asgi', options=options)
+    app.add_api(spec_file, **kwargs)
+    return app
+
+
+@pytest.fixture(scope='session')
+def asgi_app():
+    return build_asgi_app(validate_responses=True)
+
+
+@pytest.fixture
+def asgi_client(asgi_app):
+    return AsgiTestClient(asgi_app)
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import time
+
+from asgi.conftest import AsgiTestClient, build_asgi_app
+from specific.apis.asgi_utils import asgify_path
+from specific.metrics import STAGE_DURATION, InMemoryMetrics
+
+
+def test_asgify_path():
+    regex, parameters = asgify_path('/foo/{a}/{b-c}', {'a': 'integer'})
+    assert parameters == [('a', int), ('b_c', None)]
+    assert regex.match('/foo/12/bar').groups() == ('12', 'bar')
+    assert regex.match('/foo/bar/bar') is None
+
+    regex, parameters = asgify_path('/files/{filename}', {'filename': 'path'})
+    assert regex.match('/files/some/file.txt').groups() == ('some/file.txt',)
+
+
+def test_sync_handler(asgi_client):
+    response = asgi_client.post('/v1.0/greeting/jsantos')
+    assert response.status_code == 200
+    assert response.content_type == 'application/json'
+    assert response.json() == {'greeting': 'Hello jsantos'}
+
+
+def test_sync_handler_runs_in_thread_pool(asgi_client):
+    response = asgi_client.get('/v1.0/thread')
+    assert response.json()['thread'] != 'MainThread'
+
+    response = asgi_client.get('/v1.0/async-thread')
+    assert response.json()['thread'] == 'MainThread'
+
+
+def test_async_handler(asgi_client):
+    response = asgi_client.get('/v1.0/async-greeting/jsantos', query_string='count=2')
+    assert response.status_code == 200
+    assert response.json() == {'greeting': 'Hello jsantos Hello jsantos'}
+
+    response = asgi_client.get('/v1.0/async-greeting/jsantos')
+    assert response.json() == {'greeting': 'Hello jsantos'}
+
+    response = asgi_client.get('/v1.0/async-greeting/jsantos', query_string='count=foo')
+    assert response.status_code == 400
+    assert response.content_type == 'application/problem+json'
+
+
+def test_concurrent_async_handlers(asgi_app):
+    client = AsgiTestClient(asgi_app)
+
+    async def run_requests():
+        requests = [client.request('GET', '/v1.0/sleep', query_string='seconds=0.2')
+                    for _ in range(100)]
+        return await asyncio.gather(*requests)
+
+    loop = asyncio.new_event_loop()
+    start = time.time()
+    try:
+        responses = loop.run_until_complete(run_requests())
+    finally:
+        loop.close()
+    assert time.time() - start < 2
+    assert all(response.status_code == 200 for response in responses)
+    assert responses[0].data == b'slept 0.2'
+
+
+def test_path_parameter_types(asgi_client):
+    response = asgi_client.get('/v1.0/items/42')
+    assert response.json() == {'item_id': 42}
+
+    response = asgi_client.get('/v1.0/items/101')
+    assert response.status_code == 404
+    assert response.json()['detail'] == 'Item 101 does not exist'
+
+    response = asgi_client.get('/v1.0/items/foo')
+    assert response.status_code == 404
+
+
+def test_request_body(asgi_client):
+    response = asgi_client.post('/v1.0/users', json_data={'name': 'jdoe', 'tags': ['a']})
+    assert response.status_code == 201
+    assert response.json() == {'name': 'jdoe', 'tags': ['a']}
+
+    response = asgi_client.post('/v1.0/users', json_data={'tags': ['a']})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "'name' is a required property"
+
+    response = asgi_client.post('/v1.0/users', data='{"name"',
+                                headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+
+
+def test_large_request_body_parsed_in_executor():
+    app = build_asgi_app(options={'executor_body_size': 16})
+    client = AsgiTestClient(app)
+    tags = ['tag{}'.format(i) for i in range(1000)]
+    response = client.post('/v1.0/users', json_data={'name': 'jdoe', 'tags': tags})
+    assert response.status_code == 201
+    assert response.json()['tags'] == tags
+
+
+def test_form_data(asgi_client):
+    response = asgi_client.post('/v1.0/form', data='name=jdoe&age=42',
+                                headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    assert response.status_code == 200
+    assert response.json() == {'name': 'jdoe', 'age': 42}
+
+
+def test_async_response_validation(asgi_client):
+    response = asgi_client.get('/v1.0/invalid-response')
+    assert response.status_code == 500
+    assert response.json()['title'] == 'Response body does not conform to specification'
+
+
+def test_no_content(asgi_client):
+    response = asgi_client.delete('/v1.0/no-content')
+    assert response.status_code == 204
+    assert response.data == b''
+
+
+def test_security(asgi_client):
+    response = asgi_client.get('/v1.0/secure/bearer')
+    assert response.status_code == 401
+    assert response.content_type == 'application/problem+json'
+
+    response = asgi_client.get('/v1.0/secure/bearer', headers={'Authorization': 'Bearer invalid'})
+    assert response.status_code == 401
+
+    response = asgi_client.get('/v1.0/secure/bearer', headers={'Authorization': 'Bearer valid'})
+    assert response.status_code == 200
+    assert response.json() == {'user': 'bearer-user'}
+
+    response = asgi_client.get('/v1.0/secure/apikey', headers={'X-Auth': 'valid'})
+    assert response.status_code == 200
+    assert response.json()['user'] == 'apikey-user'
+    # blocking info functions do not run on the event loop
+    assert response.json()['thread'] != 'MainThread'
+
+
+def test_not_found_and_method_not_allowed(asgi_client):
+    response = asgi_client.get('/v1.0/does-not-exist')
+    assert response.status_code == 404
+    assert response.content_type == 'application/problem+json'
+
+    response = asgi_client.get('/v1.0/users')
+    assert response.status_code == 405
+    assert response.json()['title'] == 'Method Not Allowed'
+
+
+def test_auth_all_paths():
+    app = build_asgi_app('openapi_secure.yaml', auth_all_paths=True)
+    client = AsgiTestClient(app)
+    response = client.get('/v1.0/thread', headers={'Authorization': 'Bearer valid'})
+    assert response.status_code == 200
+
+    response = client.get('/v1.0/does-not-exist')
+    assert response.status_code == 401
+
+    response = client.get('/v1.0/does-not-exist', headers={'Authorization': 'Bearer valid'})
+    assert response.status_code == 404
+
+
+def test_openapi_json(asgi_client):
+    response = asgi_client.get('/v1.0/openapi.json')
+    assert response.status_code == 200
+    spec = response.json()
+    assert spec['servers'] == [{'url': '/v1.0'}]
+    assert '/greeting/{name}' in spec['paths']
+
+    response = asgi_client.get('/v1.0/openapi.yaml')
+    assert response.status_code == 200
+    assert response.content_type == 'text/yaml'
+
+
+def test_swagger_ui(asgi_client):
+    response = asgi_client.get('/v1.0/ui/')
+    assert response.status_code == 200
+    assert b'/v1.0/openapi.json' in response.data
+
+    response = asgi_client.get('/v1.0/ui/swagger-ui.css')
+    assert response.status_code == 200
+    assert response.content_type == 'text/css'
+
+    response = asgi_client.get('/v1.0/ui/../../../etc/passwd')
+    assert response.status_code == 404
+
+
+def test_add_url_rule(asgi_app):
+    async def index(scope, receive):
+        return json.dumps({'path': scope['path']})
+
+    asgi_app.add_url_rule('/index', 'index', index)
+    response = AsgiTestClient(asgi_app).get('/index')
+    assert response.status_code == 200
+    assert response.data == b'{"path": "/index"}'
+
+
+def test_head_request(asgi_client):
+    response = asgi_client.open('HEAD', '/v1.0/items/42')
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['Content-Length'] == str(len('{\n  "item_id": 42\n}\n'))
+
+
+def test_warmup_and_readiness():
+    app = build_asgi_app(options={'warmup': True}, validate_responses=True)
+    client = AsgiTestClient(app)
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.json() == {'status': 'warming up'}
+
+    assert app.apis[0].warmup() == 0
+    app.warmup()
+
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json() == {'status': 'ready'}
+
+
+def test_stage_metrics():
+    metrics = InMemoryMetrics()
+    app = build_asgi_app(options={'metrics': metrics}, validate_responses=True)
+    client = AsgiTestClient(app)
+
+    assert client.get('/v1.0/async-greeting/jsantos', query_string='count=2').status_code == 200
+    assert client.post('/v1.0/users', json_data={'name': 'jdoe', 'tags': ['a']}).status_code == 201
+    assert client.get('/v1.0/invalid-response').status_code == 500
+
+    def stages(operation, status):
+        return {dict(key)['stage']: histogram.count for key, histogram in metrics.histograms[STAGE_DURATION].items()
+                if dict(key)['operation'] == operation and dict(key)['status'] == status}
+
+    assert stages('fakeapi.asgi_handlers.get_async_greeting', '200') == {
+        'request': 1, 'array_parsing': 1, 'parameter_validation': 1, 'handler': 1,
+        'response_validation': 1, 'serialization': 1}
+    assert stages('fakeapi.asgi_handlers.post_user', '201')['body_validation'] == 1
+    assert stages('fakeapi.asgi_handlers.get_invalid_response', '500')['response_validation'] == 1
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'stage="handler",status="201"' in response.data
@@ -4,12 +4,18 @@ import requests
 
 import pytest
 from mock import MagicMock
-from specific.decorators.security import (get_tokeninfo_func,
-                                          get_tokeninfo_remote, validate_scope,
-                                          verify_apikey, verify_basic,
-                                          verify_oauth)
+from specific.decorators.security import (RequestCredentials,
+                                          get_authorization_info,
+                                          get_basicinfo_func,
+                                          get_tokeninfo_func,
+                                          get_tokeninfo_remote,
+                                          invalidate_info_func_cache,
+                                          validate_scope, verify_apikey,
+                                          verify_basic, verify_bearer,
+                                          verify_oauth, verify_security)
 from specific.exceptions import (OAuthProblem, OAuthResponseProblem,
-                                 OAuthScopeProblem)
+                                 OAuthScopeProblem, TokenInfoUnavailable)
+from specific.token_cache import RejectedCredentials
 
 
 def test_get_tokeninfo_url(monkeypatch):
@@ -168,3 +174,170 @@ def test_verify_apikey_header():
     request.headers = {"X-Auth": 'foobar'}
 
     assert wrapped_func(request, ['admin']) is not None
+
+
+def test_verify_rejected_credentials():
+    basic_info = MagicMock(return_value=None)
+    apikey_info = MagicMock(return_value=None)
+    rejected_credentials = RejectedCredentials()
+    verify_basic_func = verify_basic(basic_info, rejected_credentials.for_namespace('basic'))
+    verify_apikey_func = verify_apikey(apikey_info, 'header', 'X-Auth',
+                                       rejected_credentials.for_namespace('apikey'))
+
+    request = MagicMock()
+    request.headers = {"Authorization": 'Basic Zm9vOmJhcg==', "X-Auth": 'foobar'}
+
+    for _ in range(2):
+        with pytest.raises(OAuthResponseProblem):
+            verify_basic_func(request, ['admin'])
+        with pytest.raises(OAuthResponseProblem):
+            verify_apikey_func(request, ['admin'])
+    basic_info.assert_called_once_with('foo', 'bar', required_scopes=['admin'])
+    apikey_info.assert_called_once_with('foobar', required_scopes=['admin'])
+    assert rejected_credentials.stats()['hits'] == 2
+
+
+def test_verify_security_passes_the_required_scopes_list():
+    basic_info = MagicMock(return_value={'sub': 'foo'})
+    scope_validate = MagicMock(return_value=True)
+    auth_funcs = [verify_oauth(lambda token: {'sub': 'bar', 'scope': 'admin'}, scope_validate),
+                  verify_basic(basic_info)]
+    function = verify_security(auth_funcs, ['admin'], lambda request: request.context['user'])
+
+    request = MagicMock()
+    request.context = {}
+    request.headers = {"Authorization": 'Basic Zm9vOmJhcg=='}
+    assert function(request) == 'foo'
+    basic_info.assert_called_once_with('foo', 'bar', required_scopes=['admin'])
+    assert type(basic_info.call_args[1]['required_scopes']) is list
+
+    request.headers = {"Authorization": 'Bearer 123'}
+    assert function(request) == 'bar'
+    scope_validate.assert_called_once_with(['admin'], 'admin')
+    assert type(scope_validate.call_args[0][0]) is list
+
+
+def test_verify_security_precomputes_the_required_scopes(monkeypatch):
+    validated = []
+
+    def validate(required_scopes, token_scopes):
+        validated.append(required_scopes)
+        return validate_scope(required_scopes, token_scopes)
+
+    monkeypatch.setattr('specific.decorators.security.validate_scope', validate)
+    auth_funcs = [verify_oauth(lambda token: {'sub': 'bar', 'scope': 'admin'}, validate)]
+    function = verify_security(auth_funcs, ['admin'], lambda request: request.context['user'])
+
+    request = MagicMock()
+    request.context = {}
+    request.headers = {"Authorization": 'Bearer 123'}
+    assert function(request) == 'bar'
+    assert function(request) == 'bar'
+    assert validated[0] == frozenset(['admin'])
+    assert validated[0] is validated[1]
+
+
+def test_unavailable_tokeninfo_is_not_rejected(monkeypatch):
+    responses = []
+
+    def get_tokeninfo_response(*args, **kwargs):
+        status_code = responses.pop(0)
+        if status_code is None:
+            raise requests.ConnectionError('Connection refused')
+        tokeninfo_response = requests.Response()
+        tokeninfo_response.status_code = status_code
+        tokeninfo_response._content = b'{"uid": "foo", "scope": "admin"}'
+        return tokeninfo_response
+
+    session = MagicMock()
+    session.get = get_tokeninfo_response
+    monkeypatch.setattr('specific.decorators.security.session', session)
+    rejected_credentials = RejectedCredentials()
+    token_info_func = get_tokeninfo_func({'x-tokenInfoUrl': 'https://example.org/tokeninfo'})
+    wrapped_func = verify_oauth(token_info_func, validate_scope, rejected_credentials.for_namespace('oauth'))
+
+    request = MagicMock()
+    request.headers = {"Authorization": "Bearer 123"}
+
+    responses[:] = [503, None, 429, 200]
+    for _ in range(3):
+        with pytest.raises(TokenInfoUnavailable):
+            wrapped_func(request, ['admin'])
+    assert wrapped_func(request, ['admin']) == {'uid': 'foo', 'scope': 'admin'}
+
+    responses[:] = [401]
+    request.headers = {"Authorization": "Bearer 456"}
+    for _ in range(2):
+        with pytest.raises(OAuthResponseProblem):
+            wrapped_func(request, ['admin'])
+    assert rejected_credentials.stats()['rejections'] == 1
+
+
+def test_memoized_basic_info_func(monkeypatch):
+    basic_info = MagicMock(side_effect=lambda username, password, required_scopes=None:
+                           {'sub': username} if password == 'bar' else None)
+    monkeypatch.setattr('specific.decorators.security.get_function_from_name',
+                        lambda function_name: basic_info)
+    security_definition = {'x-basicInfoFunc': 'app.basic_info', 'x-infoFuncCacheTtl': 30}
+    wrapped_func = verify_basic(get_basicinfo_func(security_definition))
+    other_func = verify_basic(get_basicinfo_func(security_definition))
+
+    request = MagicMock()
+    request.headers = {"Authorization": 'Basic Zm9vOmJhcg=='}
+
+    assert wrapped_func(request, ['admin']) == {'sub': 'foo'}
+    assert other_func(request, ['admin']) == {'sub': 'foo'}
+    assert basic_info.call_count == 1
+    wrapped_func(request, ['other'])
+    assert basic_info.call_count == 2
+
+    invalidate_info_func_cache('app.basic_info', 'foo')
+    wrapped_func(request, ['admin'])
+    assert basic_info.call_count == 3
+
+    request.headers = {"Authorization": 'Basic Zm9vOmJheg=='}
+    for _ in range(2):
+        with pytest.raises(OAuthResponseProblem):
+            wrapped_func(request, ['admin'])
+    assert basic_info.call_count == 5
+    invalidate_info_func_cache('app.basic_info')
+
+
+def test_basic_info_func_not_memoized_by_default(monkeypatch):
+    basic_info = MagicMock()
+    monkeypatch.setattr('specific.decorators.security.get_function_from_name',
+                        lambda function_name: basic_info)
+    assert get_basicinfo_func({'x-basicInfoFunc': 'app.basic_info'}) is basic_info
+
+
+def test_credentials_are_extracted_once():
+    headers = MagicMock()
+    headers.get.side_effect = {'Authorization': 'Basic Zm9vOmJhcg==',
+                               'Cookie': 'a=1; session=foobar'}.get
+    request = MagicMock()
+    request.headers = headers
+    bearer_info = MagicMock()
+    apikey_info = MagicMock(side_effect=lambda apikey, required_scopes: {'sub': apikey})
+    auth_funcs = [verify_bearer(bearer_info),
+                  verify_apikey(apikey_info, 'cookie', 'other'),
+                  verify_apikey(apikey_info, 'header', 'X-Auth'),
+                  verify_apikey(apikey_info, 'cookie', 'session')]
+
+    assert get_authorization_info(auth_funcs, request, frozenset()) == {'sub': 'foobar'}
+    assert sorted(call[0][0] for call in headers.get.call_args_list) == ['Authorization', 'Cookie', 'X-Auth']
+    bearer_info.assert_not_called()
+
+
+def test_invalid_authorization_header():
+    request = MagicMock()
+    request.headers = {'Authorization': 'Bearer'}
+    credentials = RequestCredentials(request)
+    for _ in range(2):
+        with pytest.raises(OAuthProblem):
+            credentials.bearer_token()
+
+    request.headers = {'Authorization': 'Basic not-base64'}
+    with pytest.raises(OAuthProblem):
+        RequestCredentials(request).basic_credentials
+    request.headers = {}
+    assert RequestCredentials(request).basic_credentials is None
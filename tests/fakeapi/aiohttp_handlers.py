@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import aiohttp.web
+from specific.lifecycle import SpecificResponse
+
+
+def get_bye(name):
+    return aiohttp.web.Response(text='Goodbye {}'.format(name))
+
+
+async def aiohttp_str_response():
+    return 'str response'
+
+
+async def aiohttp_non_str_non_json_response():
+    return 1234
+
+
+async def aiohttp_bytes_response():
+    return b'bytes response'
+
+
+async def aiohttp_validate_responses():
+    return {"validate": True}
+
+
+async def aiohttp_post_greeting(name, **kwargs):
+    data = {'greeting': 'Hello {name}'.format(name=name)}
+    return data
+
+
+async def aiohttp_access_request_context(request_ctx):
+    assert request_ctx is not None
+    assert isinstance(request_ctx, aiohttp.web.Request)
+    return None
+
+
+async def aiohttp_query_parsing_str(query):
+    return {'query': query}
+
+
+async def aiohttp_query_parsing_array(query):
+    return {'query': query}
+
+
+async def aiohttp_query_parsing_array_multi(query):
+    return {'query': query}
+
+
+async def aiohttp_streamed_response(count):
+    async def chunks():
+        for i in range(count):
+            yield 'chunk {}\n'.format(i).encode()
+
+    return chunks()
+
+
+async def aiohttp_stream_response(request_ctx):
+    response = aiohttp.web.StreamResponse(headers={'Content-Type': 'text/plain'})
+    await response.prepare(request_ctx)
+    await response.write(b'streamed ')
+    await response.write(b'response')
+    await response.write_eof()
+    return response
+
+
+USERS = [
+    {"id": 1, "name": "John Doe"},
+    {"id": 2, "name": "Nick Carlson"}
+]
+
+
+async def aiohttp_users_get(*args):
+    return aiohttp.web.json_response(data=USERS, status=200)
+
+
+async def aiohttp_users_post(user):
+    if "name" not in user:
+        return SpecificResponse(body={"error": "name is undefined"},
+                                status_code=400,
+                                content_type='application/json')
+    user['id'] = len(USERS) + 1
+    USERS.append(user)
+    return aiohttp.web.json_response(data=USERS[-1], status=201)
@@ -0,0 +1,2 @@
+async def aiohttp_validate_responses():
+    return {"validate": True}
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+from specific import NoContent, problem
+
+
+def post_greeting(name):
+    return {'greeting': 'Hello {name}'.format(name=name)}
+
+
+async def get_async_greeting(name, count):
+    await asyncio.sleep(0)
+    return {'greeting': ' '.join(['Hello {name}'.format(name=name)] * count)}
+
+
+def get_item(item_id):
+    if item_id > 100:
+        return problem(404, 'Not Found', 'Item {} does not exist'.format(item_id))
+    return {'item_id': item_id}
+
+
+def get_thread_name():
+    return {'thread': threading.current_thread().name}
+
+
+async def get_async_thread_name():
+    return {'thread': threading.current_thread().name}
+
+
+async def sleep(seconds):
+    await asyncio.sleep(seconds)
+    return 'slept {}'.format(seconds)
+
+
+async def post_user(body):
+    return body, 201
+
+
+def post_form(body):
+    return body
+
+
+async def get_invalid_response():
+    return {'bar': 1}
+
+
+def delete_no_content():
+    return NoContent, 204
+
+
+def get_user(user):
+    return {'user': user}
+
+
+async def get_async_user(user, token_info):
+    return {'user': user, 'thread': token_info['thread']}
+
+
+async def bearer_info(token):
+    await asyncio.sleep(0)
+    if token == 'valid':
+        return {'sub': 'bearer-user'}
+    return None
+
+
+def apikey_info(apikey, required_scopes=None):
+    if apikey == 'valid':
+        return {'sub': 'apikey-user', 'thread': threading.current_thread().name}
+    return None
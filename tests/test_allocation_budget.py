@@ -0,0 +1,198 @@
+"""
+Memory budgets of canonical requests: the memory blocks and bytes allocated
+by a request, the peak of its allocated bytes traced by tracemalloc, and the
+memory blocks still allocated after it. A change allocating more per request,
+e.g. a copy of the parameters or of the specification, fails these tests.
+
+The budgets depend on the Python version and on the versions of the
+dependencies. The versions without recorded budgets are compared to the
+budgets of the nearest recorded version, with a larger tolerance. Python 2
+and PyPy have no tracemalloc, the tests are skipped there. The budgets of
+a version are recorded with
+
+    $ SPECIFIC_RECORD_ALLOCATION_BUDGETS=1 pytest tests/test_allocation_budget.py
+"""
+import gc
+import json
+import os
+import platform
+import sys
+
+import pytest
+from conftest import TEST_FOLDER
+
+tracemalloc = pytest.importorskip('tracemalloc')
+
+# sys.getallocatedblocks counts the blocks of the CPython allocator
+pytestmark = pytest.mark.skipif(platform.python_implementation() != 'CPython',
+                                reason='The allocation budgets are measured on CPython')
+
+BUDGETS_FILE = TEST_FOLDER / 'allocation_budgets.json'
+RECORD = bool(os.environ.get('SPECIFIC_RECORD_ALLOCATION_BUDGETS'))
+PYTHON_VERSION = '{}.{}'.format(*sys.version_info)
+
+# share of the recorded budgets a request may allocate on top of them
+TOLERANCE = 0.05
+# the same, with the budgets of another Python version
+FALLBACK_TOLERANCE = 0.25
+WARMUP_REQUESTS = 5
+REQUESTS = 20
+
+CASES = {
+    'path_parameter': ('post', '/v1.0/greeting/jsantos', {}),
+    'query_parameters': ('get', '/v1.0/test_parameter_validation',
+                         {'query_string': {'date': '2015-08-26', 'int': '123', 'bool': 'true'}}),
+    'array_query_parameter': ('get', '/v1.0/test_array_csv_query_param',
+                              {'query_string': 'items=' + ','.join(str(index) for index in range(50))}),
+    'json_body': ('post', '/v1.0/body-sanitization-additional-properties-defined',
+                  {'data': json.dumps({'body{}'.format(index): 'value' for index in range(50)}),
+                   'content_type': 'application/json'}),
+    'form_data': ('post', '/v1.0/test-formData-param',
+                  {'data': {'formData': 'test'}, 'content_type': 'multipart/form-data'}),
+}
+
+
+def load_budgets():
+    if not BUDGETS_FILE.exists():
+        return {}
+    with BUDGETS_FILE.open() as budgets_file:
+        return json.load(budgets_file)
+
+
+def nearest_version(versions, version):
+    """
+    :param versions: the recorded Python versions, e.g. ["3.6", "3.7"]
+    :param version: e.g. "3.8"
+    :return: the nearest of the versions, the older one between two as near
+    :rtype: str | None
+    """
+    def parse(value):
+        return tuple(int(part) for part in value.split('.'))
+
+    major, minor = parse(version)
+    candidates = [candidate for candidate in versions if parse(candidate)[0] == major]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: (abs(parse(candidate)[1] - minor), parse(candidate)))
+
+
+@pytest.fixture(scope='module')
+def budgets():
+    """
+    :return: the budgets of the Python version and their tolerance
+    :rtype: (dict, float)
+    """
+    budgets = load_budgets()
+    if RECORD or PYTHON_VERSION in budgets:
+        yield budgets.setdefault(PYTHON_VERSION, {}), TOLERANCE
+    else:
+        version = nearest_version(budgets, PYTHON_VERSION)
+        yield budgets.get(version, {}), FALLBACK_TOLERANCE
+    if RECORD:
+        with BUDGETS_FILE.open('w') as budgets_file:
+            json.dump(budgets, budgets_file, indent=2, sort_keys=True)
+            budgets_file.write('\n')
+
+
+class AllocationCounter(object):
+    """
+    Profile function summing the growth of the allocated memory between the
+    calls and the returns of the functions, the allocations freed within a
+    single call are not seen.
+    """
+
+    def __init__(self):
+        self.blocks = self.bytes = 0
+        self._last_blocks = sys.getallocatedblocks()
+        self._last_bytes = tracemalloc.get_traced_memory()[0]
+
+    def __call__(self, frame, event, arg):
+        blocks = sys.getallocatedblocks()
+        traced = tracemalloc.get_traced_memory()[0]
+        self.blocks += max(blocks - self._last_blocks, 0)
+        self.bytes += max(traced - self._last_bytes, 0)
+        self._last_blocks = blocks
+        self._last_bytes = traced
+
+
+def reset_peak():
+    """
+    Resets the peak of the traced memory to the current size, tracemalloc.reset_peak
+    is only available from Python 3.9.
+    """
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        frames = tracemalloc.get_traceback_limit()
+        tracemalloc.stop()
+        tracemalloc.start(frames)
+
+
+def measure(send):
+    """
+    :param send: sends the request and asserts its response
+    :return: the memory blocks and bytes allocated by a request, the peak of
+        its allocated bytes and the number of memory blocks it retains
+    :rtype: dict
+    """
+    for _ in range(WARMUP_REQUESTS):
+        send()
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for _ in range(REQUESTS):
+        send()
+    gc.collect()
+    retained_blocks = (sys.getallocatedblocks() - blocks) // REQUESTS
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        reset_peak()
+        traced = tracemalloc.get_traced_memory()[0]
+        send()
+        peak = tracemalloc.get_traced_memory()[1] - traced
+
+        counter = AllocationCounter()
+        sys.setprofile(counter)
+        try:
+            send()
+        finally:
+            sys.setprofile(None)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {'allocated_blocks': counter.blocks, 'allocated_bytes': counter.bytes, 'peak_bytes': peak,
+            'retained_blocks': retained_blocks}
+
+
+def test_nearest_version():
+    assert nearest_version(['3.7'], '3.7') == '3.7'
+    assert nearest_version(['3.5', '3.7'], '3.6') == '3.5'
+    assert nearest_version(['3.5', '3.7'], '3.8') == '3.7'
+    assert nearest_version(['3.7'], '3.4') == '3.7'
+    assert nearest_version(['3.7'], '2.7') is None
+
+
+@pytest.mark.parametrize('case', sorted(CASES))
+def test_request_allocation_budget(simple_app, budgets, case):
+    method, path, kwargs = CASES[case]
+    open_request = getattr(simple_app.app.test_client(), method)
+
+    def send():
+        response = open_request(path, **kwargs)
+        assert response.status_code == 200, response.data
+
+    measured = measure(send)
+    budgets, tolerance = budgets
+    key = '{}:{}'.format(simple_app._spec_file, case)
+    if RECORD:
+        budgets[key] = measured
+        return
+    assert key in budgets, 'No allocation budget recorded for {}, see the docstring of the module'.format(key)
+
+    budget = budgets[key]
+    for metric in ('allocated_blocks', 'allocated_bytes', 'peak_bytes'):
+        assert measured[metric] <= budget[metric] * (1 + tolerance), (metric, measured)
+    assert measured['retained_blocks'] <= budget['retained_blocks'], measured
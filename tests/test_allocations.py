@@ -0,0 +1,81 @@
+import pytest
+import specific
+from specific import allocations
+from specific.allocations import AllocationTracker
+
+tracemalloc = pytest.importorskip('tracemalloc')
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'allocations', 'version': '1.0'},
+    'security': [{'apikey': []}],
+    'components': {'securitySchemes': {'apikey': {
+        'type': 'apiKey', 'in': 'header', 'name': 'X-Auth',
+        'x-apikeyInfoFunc': 'test_allocations.apikey_info',
+    }}},
+    'paths': {
+        '/leak': {'post': {'operationId': 'leak', 'responses': {'200': {'description': 'ok'}}}},
+        '/noop': {'get': {'operationId': 'noop', 'responses': {'200': {'description': 'ok'}}}},
+    },
+}
+
+HEADERS = {'X-Auth': 'valid'}
+
+leaked = []
+
+
+def apikey_info(apikey, required_scopes=None):
+    return {'sub': 'user'} if apikey == 'valid' else None
+
+
+def leak():
+    leaked.append(bytearray(100000))
+    return {}
+
+
+def noop():
+    return {}
+
+
+@pytest.fixture
+def tracing():
+    yield
+    # tracing every allocation slows down the other tests
+    tracemalloc.stop()
+    allocations._trackers.clear()
+    del leaked[:]
+
+
+def test_allocations_endpoint(tracing):
+    app = specific.FlaskApp(__name__, options={'allocation_tracking': True, 'allocation_sample_rate': 1.0})
+    app.add_api(SPEC, resolver=lambda operation_id: globals()[operation_id])
+    client = app.app.test_client()
+
+    for _ in range(3):
+        assert client.post('/leak', headers=HEADERS).status_code == 200
+        assert client.get('/noop', headers=HEADERS).status_code == 200
+
+    assert client.get('/_specific/allocations').status_code == 401
+    response = client.get('/_specific/allocations?limit=5', headers=HEADERS)
+    assert response.status_code == 200
+    report = response.json
+    assert report['sample_rate'] == 1.0
+    assert report['operations']['leak']['requests'] == 3
+    assert report['operations']['leak']['retained_bytes_per_request'] >= 100000
+    assert report['operations']['noop']['retained_bytes_per_request'] < 100000
+    site = report['retained_sites'][0]
+    assert site['operation_id'] == 'leak'
+    assert site['site'].endswith('test_allocations.py:{}'.format(leak.__code__.co_firstlineno + 1))
+    assert len(report['top_sites']) == 5
+    assert report['traced_memory']['current_bytes'] > 300000
+
+
+def test_allocation_tracker_sampling(tracing):
+    tracker = AllocationTracker(sample_rate=0.5, random=iter([0.7, 0.2]).__next__)
+    function = tracker.wrap('leak', lambda request: leak())
+    function(None)
+    function(None)
+    assert tracker.operations['leak']['requests'] == 1
+
+    tracker.clear()
+    assert tracker.report()['operations'] == {}
@@ -1,10 +1,11 @@
+import json
 import logging
 
 from click.testing import CliRunner
 
 import pytest
 import specific
-from conftest import FIXTURES_FOLDER
+from conftest import FIXTURES_FOLDER, TEST_FOLDER
 from mock import MagicMock
 from mock import call as mock_call
 from specific.cli import main
@@ -42,6 +43,7 @@ def expected_arguments():
             "swagger_ui": True,
             "swagger_path": None,
             "swagger_url": None,
+            "warmup": False,
         },
         "auth_all_paths": False,
         "debug": False
@@ -74,7 +76,10 @@ def test_run_simple_spec(mock_app_run, spec_file):
     app_instance.run.assert_called_with(
         port=default_port,
         host=None,
-        debug=False)
+        debug=False,
+        workers=1,
+        max_worker_memory=None,
+        reuse_port=False)
 
 
 def test_run_spec_with_host(mock_app_run, spec_file):
@@ -86,7 +91,10 @@ def test_run_spec_with_host(mock_app_run, spec_file):
     app_instance.run.assert_called_with(
         port=default_port,
         host='custom.host',
-        debug=False)
+        debug=False,
+        workers=1,
+        max_worker_memory=None,
+        reuse_port=False)
 
 
 def test_run_no_options_all_default(mock_app_run, expected_arguments, spec_file):
@@ -115,6 +123,15 @@ def test_run_using_option_hide_console_ui(mock_app_run, expected_arguments,
     mock_app_run.assert_called_with('specific.cli', **expected_arguments)
 
 
+def test_run_using_option_warmup(mock_app_run, expected_arguments, spec_file):
+    runner = CliRunner()
+    runner.invoke(main, ['run', spec_file, '--warmup'],
+                  catch_exceptions=False)
+
+    expected_arguments['options']['warmup'] = True
+    mock_app_run.assert_called_with('specific.cli', **expected_arguments)
+
+
 def test_run_using_option_console_ui_from(mock_app_run, expected_arguments,
                                            spec_file):
     user_path = '/some/path/here'
@@ -232,3 +249,59 @@ def test_run_unimplemented_operations_and_mock(mock_app_run):
     # yet can be run with --mock option
     result = runner.invoke(main, ['run', spec_file, '--mock=all'], catch_exceptions=False)
     assert result.exit_code == 0
+
+
+def test_run_using_option_app_framework(mock_app_run, mock_get_function_from_name, spec_file):
+    runner = CliRunner()
+    runner.invoke(main, ['run', spec_file, '--app-framework', 'asgi'], catch_exceptions=False)
+
+    mock_get_function_from_name.assert_called_once_with('specific.apps.asgi_app.AsgiApp')
+
+
+def test_run_with_workers(mock_app_run, spec_file):
+    runner = CliRunner()
+    runner.invoke(main, ['run', spec_file, '--workers', '4', '--max-worker-memory', '512', '--reuse-port'],
+                  catch_exceptions=False)
+
+    app_instance = mock_app_run()
+    app_instance.run.assert_called_with(
+        port=5000,
+        host=None,
+        debug=False,
+        workers=4,
+        max_worker_memory=512,
+        reuse_port=True)
+
+
+def test_bench(spec_file):
+    runner = CliRunner()
+    result = runner.invoke(main, ['bench', spec_file, str(TEST_FOLDER), '-n', '5', '--json',
+                                  '-o', 'fakeapi.hello.post_greeting',
+                                  '-o', 'fakeapi.hello.test_array_csv_query_param'],
+                           catch_exceptions=False)
+    assert result.exit_code == 0
+    results = json.loads(result.output)
+    assert [(result['method'], result['path']) for result in results] == [
+        ('POST', '/v1.0/greeting/{name}'), ('GET', '/v1.0/test_array_csv_query_param')]
+    for result in results:
+        assert result['requests'] == 5
+        assert result['errors'] == {}
+        assert 0 < result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+        assert 0 < result['handler_share'] < 1
+        assert result['overhead_dominates'] == (result['handler_share'] < 0.5)
+
+
+def test_bench_mock_and_headers():
+    runner = CliRunner()
+    spec_file = str(FIXTURES_FOLDER / 'missing_implementation/swagger.yaml')
+    result = runner.invoke(main, ['bench', spec_file, '--mock=all', '-n', '3', '-H', 'X-Trace: 1',
+                                  '--overhead-threshold', '0'], catch_exceptions=False)
+    assert result.exit_code == 0
+    header, row = result.output.splitlines()
+    assert header.split()[:2] == ['operation', 'req/s']
+    assert row.startswith('GET /testing/operation-not-implemented ')
+    assert row.endswith('*')
+
+    result = runner.invoke(main, ['bench', spec_file, '--mock=all', '-H', 'X-Trace'])
+    assert result.exit_code == 2
+    assert 'is not of the form "Name: value"' in result.output
@@ -0,0 +1,166 @@
+import time
+
+import pytest
+from conftest import FIXTURES_FOLDER
+from specific import FlaskApp
+from specific.exceptions import SpecificException
+from specific.jwt_verifier import JWTVerifier, get_jwt_verifier
+
+jwt = pytest.importorskip('jwt')
+
+JWT_FOLDER = FIXTURES_FOLDER / 'jwt'
+JWKS_FILE = str(JWT_FOLDER / 'jwks.json')
+SECRET = 'not-a-secret'
+SECRET_ENV = 'SPECIFIC_TEST_JWT_SECRET'
+
+
+@pytest.fixture
+def secret_env(monkeypatch):
+    monkeypatch.setenv(SECRET_ENV, SECRET)
+
+
+def private_key(name):
+    return (JWT_FOLDER / '{}_private_key.pem'.format(name)).read_text()
+
+
+def make_token(claims=None, key=SECRET, algorithm='HS256', kid=None, **extra_claims):
+    payload = {'sub': 'jdoe', 'scope': 'myscope other', 'exp': int(time.time()) + 60}
+    payload.update(claims or {})
+    payload.update(extra_claims)
+    headers = {'kid': kid} if kid else None
+    token = jwt.encode(payload, key, algorithm=algorithm, headers=headers)
+    return token.decode() if isinstance(token, bytes) else token
+
+
+def build_app(security_scheme):
+    spec = {
+        'openapi': '3.0.0',
+        'info': {'title': 'jwt', 'version': '1.0'},
+        'components': {'securitySchemes': {
+            'oauth': dict({
+                'type': 'oauth2',
+                'flows': {'password': {'tokenUrl': 'https://example.com/token',
+                                       'scopes': {'myscope': ''}}},
+            }, **security_scheme),
+            'bearer': dict({'type': 'http', 'scheme': 'bearer'}, **security_scheme),
+        }},
+        'paths': {
+            '/oauth': {'get': {
+                'operationId': 'oauth',
+                'security': [{'oauth': ['myscope']}],
+                'responses': {'200': {'description': 'user'}},
+            }},
+            '/bearer': {'get': {
+                'operationId': 'bearer',
+                'security': [{'bearer': []}],
+                'responses': {'200': {'description': 'user'}},
+            }},
+        },
+    }
+    app = FlaskApp(__name__)
+    app.add_api(spec, resolver=lambda operation_id: lambda user: user)
+    return app.app.test_client()
+
+
+def get(client, path, token):
+    return client.get(path, headers={'Authorization': 'Bearer {}'.format(token)})
+
+
+@pytest.mark.parametrize('path', ['/oauth', '/bearer'])
+def test_jwt_secret(secret_env, path):
+    client = build_app({'x-jwt-secret-env': SECRET_ENV})
+
+    response = get(client, path, make_token())
+    assert response.status_code == 200
+    assert response.data == b'"jdoe"\n'
+
+    assert get(client, path, make_token(key='other-secret')).status_code == 401
+    assert get(client, path, make_token(exp=int(time.time()) - 10)).status_code == 401
+    assert get(client, path, 'not-a-jwt').status_code == 401
+
+
+def test_jwt_secret_is_not_served(secret_env):
+    client = build_app({'x-jwt-secret-env': SECRET_ENV})
+    response = client.get('/openapi.json')
+    assert response.status_code == 200
+    assert SECRET not in response.data.decode()
+
+    with pytest.raises(SpecificException):
+        build_app({'x-jwt-secret': SECRET})
+
+
+def test_jwt_secret_env_not_set(monkeypatch):
+    monkeypatch.delenv(SECRET_ENV, raising=False)
+    with pytest.raises(SpecificException):
+        get_jwt_verifier({'x-jwt-secret-env': SECRET_ENV})
+
+
+def test_jwt_scopes(secret_env):
+    client = build_app({'x-jwt-secret-env': SECRET_ENV})
+    assert get(client, '/oauth', make_token(scope='other')).status_code == 403
+    assert get(client, '/bearer', make_token(scope='other')).status_code == 200
+
+
+def test_jwt_audience_and_issuer(secret_env):
+    client = build_app({'x-jwt-secret-env': SECRET_ENV, 'x-jwt-audience': 'api',
+                        'x-jwt-issuer': 'https://issuer.example.com'})
+    claims = {'aud': 'api', 'iss': 'https://issuer.example.com'}
+    assert get(client, '/bearer', make_token(claims)).status_code == 200
+    assert get(client, '/bearer', make_token(dict(claims, aud='other'))).status_code == 401
+    assert get(client, '/bearer', make_token(dict(claims, iss='https://evil.example.com'))).status_code == 401
+
+
+@pytest.mark.parametrize('name, algorithm, kid', [
+    ('rsa', 'RS256', 'rsa-key'),
+    ('ec', 'ES256', 'ec-key'),
+])
+def test_jwks_file(name, algorithm, kid):
+    verifier = JWTVerifier(jwks_file=JWKS_FILE)
+    assert verifier.algorithms == ['ES256', 'RS256']
+
+    token_info = verifier(make_token(key=private_key(name), algorithm=algorithm, kid=kid))
+    assert token_info['sub'] == 'jdoe'
+
+    assert verifier(make_token(key=private_key(name), algorithm=algorithm, kid='unknown')) is None
+    assert verifier(make_token(key=private_key(name), algorithm=algorithm)) is None
+    # a token signed with the other key under the id of this one
+    other = 'ec' if name == 'rsa' else 'rsa'
+    other_algorithm = 'ES256' if name == 'rsa' else 'RS256'
+    assert verifier(make_token(key=private_key(other), algorithm=other_algorithm, kid=kid)) is None
+
+
+def test_jwks_file_rejects_hmac_with_public_key():
+    verifier = JWTVerifier(jwks_file=JWKS_FILE, secret=SECRET)
+    assert verifier(make_token(key=SECRET, algorithm='HS256', kid='rsa-key')) is None
+    assert verifier(make_token(key=SECRET, algorithm='HS256'))['sub'] == 'jdoe'
+
+
+def test_jwt_verifier_scp_claim():
+    verifier = JWTVerifier(secret=SECRET)
+    token_info = verifier(make_token(scope=None, scp=['myscope']))
+    assert token_info['scope'] is None
+
+    token = jwt.encode({'sub': 'jdoe', 'scp': ['myscope']}, SECRET, algorithm='HS256')
+    token = token.decode() if isinstance(token, bytes) else token
+    assert verifier(token)['scope'] == ['myscope']
+
+
+def test_jwt_verifier_cache(monkeypatch):
+    verifier = JWTVerifier(secret=SECRET)
+    token = make_token()
+    assert verifier(token)['sub'] == 'jdoe'
+
+    monkeypatch.setattr(verifier, 'verify', lambda token: pytest.fail('The token is verified again'))
+    assert verifier(token)['sub'] == 'jdoe'
+    assert verifier.cache.stats()['hits'] == 1
+
+
+def test_get_jwt_verifier():
+    assert get_jwt_verifier({'type': 'oauth2'}) is None
+
+    verifier = get_jwt_verifier({'x-jwks-file': JWKS_FILE, 'x-jwt-algorithms': ['RS256']})
+    assert verifier.algorithms == ['RS256']
+    assert get_jwt_verifier({'x-jwks-file': JWKS_FILE, 'x-jwt-algorithms': ['RS256']}) is verifier
+
+    with pytest.raises(SpecificException):
+        JWTVerifier()
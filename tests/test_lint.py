@@ -0,0 +1,95 @@
+import json
+
+from click.testing import CliRunner
+
+import pytest
+from conftest import FIXTURES_FOLDER
+from specific.cli import main
+from specific.lint import (HIGH, LOW, MEDIUM, Problem, is_catastrophic_pattern,
+                           json_pointer, lint_performance)
+from specific.spec import Specification
+
+SPEC_FILE = str(FIXTURES_FOLDER / 'perf_hazards' / 'openapi.yaml')
+
+
+@pytest.fixture(scope='module')
+def specification():
+    return Specification.load(SPEC_FILE)
+
+
+def test_lint_performance(specification):
+    problems = lint_performance(specification)
+    assert [(problem.severity, problem.rule, problem.path) for problem in problems] == [
+        (HIGH, 'deep-composition', '#/components/schemas/Shape'),
+        (HIGH, 'catastrophic-regex', '#/paths/~1items~1{id}/post/parameters/0/schema/pattern'),
+        (MEDIUM, 'unbounded-additional-properties',
+         '#/components/schemas/Item/properties/metadata/additionalProperties'),
+        (MEDIUM, 'unbounded-array', '#/components/schemas/Circle/properties/radii'),
+        (MEDIUM, 'large-enum', '#/paths/~1items~1{id}/post/parameters/1/schema/enum'),
+        (LOW, 'unbounded-string', '#/components/schemas/Item/properties/names/items'),
+        (LOW, 'large-example', '#/paths/~1items~1{id}/post/requestBody/content/application~1json/example'),
+    ]
+
+
+def test_lint_performance_thresholds(specification):
+    problems = lint_performance(specification, max_enum=200, max_composition_depth=4, max_example_size=20000)
+    rules = {problem.rule for problem in problems}
+    assert not rules & {'deep-composition', 'large-enum', 'large-example'}
+
+
+def test_lint_swagger():
+    problems = lint_performance(Specification.load(FIXTURES_FOLDER / 'simple' / 'swagger.yaml'))
+    assert Problem(MEDIUM, 'unbounded-array', '#/paths/~1test_array_csv_query_param/get/parameters/0',
+                   'array without maxItems, its items are all validated and converted') in problems
+    # the path parameters and the responses are bounded
+    assert not [problem for problem in problems
+                if problem.path.startswith('#/paths/~1test-array-in-path~1{names}/get/parameters/0/')]
+    assert not [problem for problem in problems if '/responses/' in problem.path]
+
+
+@pytest.mark.parametrize('pattern, catastrophic', [
+    ('^(a+)+$', True),
+    (r'^(\w+\s?)*$', True),
+    (r'^((ab)*c)*$', True),
+    (r'^(\d+|x)+$', True),
+    (r'^[a-z]+$', False),
+    (r'^(\d{1,3}\.){3}\d{1,3}$', False),
+    (r'^(ab)+c*$', False),
+    ('(invalid', False),
+])
+def test_is_catastrophic_pattern(pattern, catastrophic):
+    assert is_catastrophic_pattern(pattern) is catastrophic
+
+
+def test_json_pointer():
+    assert json_pointer(('paths', '/pets/{id}', 'get', 'parameters', 0)) == '#/paths/~1pets~1{id}/get/parameters/0'
+    assert json_pointer(('components', 'schemas', 'a~b')) == '#/components/schemas/a~0b'
+
+
+def test_lint_command():
+    runner = CliRunner()
+    result = runner.invoke(main, ['lint', SPEC_FILE], catch_exceptions=False)
+    assert result.exit_code == 0
+    assert 'is valid' in result.output
+
+    result = runner.invoke(main, ['lint', '--perf', SPEC_FILE], catch_exceptions=False)
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0] == 'HIGH    deep-composition  #/components/schemas/Shape'
+    assert lines[-1] == '7 problems: 2 high, 3 medium, 2 low'
+
+    result = runner.invoke(main, ['lint', '--perf', '--json', '--max-enum', '500', SPEC_FILE],
+                           catch_exceptions=False)
+    problems = json.loads(result.output)
+    assert len(problems) == 6
+    assert set(problems[0]) == {'severity', 'rule', 'path', 'message'}
+
+    result = runner.invoke(main, ['lint', '--perf', '--fail-on', 'high', SPEC_FILE])
+    assert result.exit_code == 1
+
+
+def test_lint_command_invalid_spec():
+    spec_file = str(FIXTURES_FOLDER / 'bad_specs' / 'swagger.yaml')
+    result = CliRunner().invoke(main, ['lint', '--perf', spec_file])
+    assert result.exit_code == 1
+    assert 'Invalid specification' in result.output
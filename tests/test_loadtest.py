@@ -0,0 +1,97 @@
+import json
+import threading
+
+from click.testing import CliRunner
+from werkzeug.serving import make_server
+
+import pytest
+from conftest import FIXTURES_FOLDER, TEST_FOLDER
+from specific.cli import main
+from specific.loadtest import INVALID, VALID, LoadTest, operation_templates
+
+
+@pytest.fixture
+def server_url(simple_app):
+    server = make_server('127.0.0.1', 0, simple_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_port)
+    server.shutdown()
+    thread.join()
+
+
+def get_operation(app, operation_id):
+    return next(operation for operation in app.apis[0].operations if operation.operation_id == operation_id)
+
+
+def test_loadtest(simple_app, server_url):
+    spec_file = str(FIXTURES_FOLDER / 'simple' / simple_app._spec_file)
+    runner = CliRunner()
+    result = runner.invoke(main, ['loadtest', spec_file, str(TEST_FOLDER), '--url', server_url, '--json',
+                                  '-d', '300ms', '-c', '2', '--invalid-ratio', '0.5',
+                                  '-o', 'fakeapi.hello.test_parameter_validation', '-o', 'fakeapi.hello.post_greeting',
+                                  '-w', 'fakeapi.hello.post_greeting=0.5'],
+                           catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    results = {(result['operation_id'], result['kind']): result for result in json.loads(result.output)}
+    assert set(results) == {('fakeapi.hello.post_greeting', 'valid'),
+                            ('fakeapi.hello.test_parameter_validation', 'valid'),
+                            ('fakeapi.hello.test_parameter_validation', 'invalid'),
+                            ('total', 'all')}
+    assert set(results[('fakeapi.hello.test_parameter_validation', 'valid')]['statuses']) == {'200'}
+    assert set(results[('fakeapi.hello.test_parameter_validation', 'invalid')]['statuses']) == {'400'}
+    total = results[('total', 'all')]
+    assert total['requests'] == sum(result['requests'] for key, result in results.items() if key[0] != 'total')
+    assert total['error_rate'] == 0
+    assert 0 < total['p50_ms'] <= total['p95_ms'] <= total['p99_ms']
+
+
+def test_loadtest_unexpected_statuses(simple_app, server_url):
+    operation = get_operation(simple_app, 'fakeapi.hello.test_parameter_validation')
+    valid, invalid = operation_templates(operation)
+    # the valid request is sent as the invalid one and conversely
+    load_test = LoadTest(server_url + '/', [('swapped', 1, invalid, valid)], concurrency=1, duration=0.1,
+                         invalid_ratio=0.5)
+    results = load_test.run()
+    assert [(result['kind'], result['error_rate']) for result in results] == [
+        (VALID, 1.0), (INVALID, 1.0), ('all', 1.0)]
+
+    result = LoadTest('http://127.0.0.1:1', [('refused', 1, valid, None)], concurrency=1, duration=0.1).run()[0]
+    assert result['statuses'] == {'no response': result['requests']}
+
+
+def test_invalid_requests(simple_app):
+    templates = {operation.operation_id: operation_templates(operation) for operation in simple_app.apis[0].operations}
+
+    valid, invalid = templates['fakeapi.hello.test_parameter_validation']
+    assert 'int=invalid' not in valid.target
+    assert 'int=invalid' in invalid.target
+    assert 'n=invalid' in templates['fakeapi.hello.test_required_query_param'][1].target
+    valid, invalid = templates['fakeapi.hello.test_body_sanitization']
+    assert json.loads(valid.body.decode())
+    assert invalid.body == b'{"malformed": '
+    assert invalid.headers['Content-Type'] == 'application/json'
+    # no parameter nor body to invalidate
+    assert templates['fakeapi.hello.get_empty_dict'][1] is None
+
+
+def test_operation_weights():
+    load_test = LoadTest('http://localhost', [('a', 1, 'a', None), ('b', 3, 'b', 'b-invalid')], invalid_ratio=0.5,
+                         random=iter([0.1, 0.3, 0.6, 0.99, 0.2]).__next__)
+    assert load_test.choose() == ('a', VALID, 'a')
+    assert load_test.choose() == ('b', VALID, 'b')
+    assert load_test.choose() == ('b', INVALID, 'b-invalid')
+
+
+@pytest.mark.parametrize('arguments, error', [
+    (['-d', '1x'], "'1x' is not a duration"),
+    (['-d', '0s'], "'0s' is not a positive duration"),
+    (['-w', 'operation'], '"OPERATION_ID=WEIGHT"'),
+    (['-w', 'operation=-1'], '"OPERATION_ID=WEIGHT"'),
+    (['-o', 'unknown'], 'No operation to load'),
+])
+def test_loadtest_arguments(arguments, error):
+    spec_file = str(FIXTURES_FOLDER / 'missing_implementation/swagger.yaml')
+    result = CliRunner().invoke(main, ['loadtest', spec_file] + arguments)
+    assert result.exit_code == 2
+    assert error in result.output
@@ -1,9 +1,19 @@
 
+import os
+import threading
+
 import flask
 
+import pytest
 import specific
 from mock import MagicMock
+from specific.apps.abstract import AbstractApp
 from specific.decorators.metrics import UWSGIMetricsCollector
+from specific.exceptions import SpecificException
+from specific.metrics import (PROMETHEUS_CONTENT_TYPE, REQUEST_DURATION,
+                              STAGE_DURATION, Histogram, InMemoryMetrics,
+                              MetricsBackend, MultiProcessMetrics,
+                              format_labels)
 
 
 def test_timer(monkeypatch):
@@ -20,3 +30,279 @@ def test_timer(monkeypatch):
     op(MagicMock())
     assert metrics.timer.call_args[0][:2] == ('specific.response',
                                               '418.GET.foo.bar.{param}')
+
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'metrics', 'version': '1.0'},
+    'components': {'securitySchemes': {'apikey': {
+        'type': 'apiKey', 'in': 'header', 'name': 'X-Auth',
+        'x-apikeyInfoFunc': 'test_metrics.apikey_info',
+    }}},
+    'paths': {'/items/{item_id}': {'post': {
+        'operationId': 'post_item',
+        'security': [{'apikey': []}],
+        'parameters': [
+            {'name': 'item_id', 'in': 'path', 'required': True, 'schema': {'type': 'integer'}},
+            {'name': 'tags', 'in': 'query', 'schema': {'type': 'array', 'items': {'type': 'string'}}},
+        ],
+        'requestBody': {'content': {'application/json': {'schema': {
+            'type': 'object', 'required': ['name'], 'properties': {'name': {'type': 'string'}},
+        }}}},
+        'responses': {'201': {'description': 'created', 'content': {'application/json': {'schema': {
+            'type': 'object', 'properties': {'id': {'type': 'integer'}},
+        }}}}},
+    }}},
+}
+
+STAGES = ['array_parsing', 'body_validation', 'handler', 'parameter_validation', 'request',
+          'response_validation', 'security', 'serialization']
+
+
+def apikey_info(apikey, required_scopes=None):
+    return {'sub': 'user'} if apikey == 'valid' else None
+
+
+def post_item(item_id, body, tags=None):
+    return {'id': item_id}, 201
+
+
+def build_client(metrics):
+    app = specific.FlaskApp(__name__, options={'metrics': metrics, 'metrics_path': '/internal/metrics'})
+    app.add_api(SPEC, resolver=lambda operation_id: post_item, validate_responses=True)
+    return app, app.app.test_client()
+
+
+def test_stage_metrics():
+    metrics = InMemoryMetrics()
+    app, client = build_client(metrics)
+    headers = {'X-Auth': 'valid'}
+
+    response = client.post('/items/1?tags=a,b', json={'name': 'a'}, headers=headers)
+    assert response.status_code == 201
+    assert client.post('/items/1', json={}, headers=headers).status_code == 400
+    assert client.post('/items/1', json={'name': 'a'}).status_code == 401
+
+    stages = {dict(key)['stage']: histogram for key, histogram in metrics.histograms[STAGE_DURATION].items()
+              if dict(key)['status'] == '201'}
+    assert sorted(stages) == STAGES
+    assert all(histogram.count == 1 for histogram in stages.values())
+    assert metrics.get(REQUEST_DURATION, operation='post_item', status='201').sum >= \
+        sum(histogram.sum for histogram in stages.values())
+
+    invalid = {dict(key)['stage'] for key in metrics.histograms[STAGE_DURATION] if dict(key)['status'] == '400'}
+    assert 'handler' not in invalid and 'body_validation' in invalid
+    assert metrics.get(REQUEST_DURATION, operation='post_item', status='401').count == 1
+
+
+def test_metrics_endpoint():
+    metrics = InMemoryMetrics()
+    app, client = build_client(metrics)
+    client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+
+    response = client.get('/internal/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == PROMETHEUS_CONTENT_TYPE
+    text = response.data.decode()
+    assert '# TYPE specific_stage_duration_seconds histogram' in text
+    assert 'specific_stage_duration_seconds_count{operation="post_item",stage="handler",status="201"} 1' in text
+    assert 'specific_request_duration_seconds_bucket{operation="post_item",status="201",le="+Inf"} 1' in text
+
+
+def test_metrics_disabled():
+    app = specific.FlaskApp(__name__)
+    app.add_api(SPEC, resolver=lambda operation_id: post_item)
+    assert app.apis[0].metrics is None
+    assert app.app.test_client().get('/metrics').status_code == 404
+
+
+def test_metrics_per_application():
+    apps = [specific.FlaskApp(__name__, options={'metrics': True}) for _ in range(2)]
+    for app in apps:
+        app.add_api(SPEC, resolver=lambda operation_id: post_item)
+        app.add_api(SPEC, base_path='/other', resolver=lambda operation_id: post_item,
+                    options={'metrics': InMemoryMetrics()})
+    assert apps[0].metrics is not apps[1].metrics
+    assert apps[0].apis[0].metrics is apps[0].metrics
+
+    client = apps[0].app.test_client()
+    client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+    client.post('/other/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+    text = client.get('/metrics').data.decode()
+    # the histograms of the backends are merged in a family per metric
+    assert text.count('# TYPE specific_request_duration_seconds histogram') == 1
+    assert 'specific_request_duration_seconds_count{operation="post_item",status="201"} 2' in text
+    assert 'status="201"' not in apps[1].app.test_client().get('/metrics').data.decode()
+
+
+def test_metrics_endpoint_not_supported():
+    class App(specific.FlaskApp):
+        add_metrics_endpoint = AbstractApp.add_metrics_endpoint
+
+    with pytest.raises(SpecificException) as exc_info:
+        App(__name__, options={'metrics': True})
+    assert 'The metrics option requires a metrics endpoint' in str(exc_info.value)
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [('0.1', 2), ('1.0', 3), ('+Inf', 4)]
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_custom_backend():
+    class ListMetrics(MetricsBackend):
+        def __init__(self):
+            self.observations = []
+
+        def observe(self, name, value, labels):
+            self.observations.append((name, labels))
+
+    metrics = ListMetrics()
+    app, client = build_client(metrics)
+    client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+    assert (REQUEST_DURATION, {'operation': 'post_item', 'status': '201'}) in metrics.observations
+    assert len(metrics.observations) == len(STAGES) + 1
+    # only the in memory metrics are rendered
+    assert client.get('/internal/metrics').data == b''
+    assert format_labels({'path': 'a"b\\'}) == '{path="a\\"b\\\\"}'
+
+
+def fork(function):
+    pid = os.fork()
+    if not pid:  # pragma: no cover
+        try:
+            function()
+        finally:
+            os._exit(0)
+    return pid
+
+
+def test_multiprocess_metrics(tmpdir):
+    metrics = MultiProcessMetrics(str(tmpdir), buckets=(0.1, 1))
+    metrics.observe(REQUEST_DURATION, 0.05, {'operation': 'a'})
+
+    ready, done = os.pipe(), os.pipe()
+
+    def worker():
+        metrics.observe(REQUEST_DURATION, 0.5, {'operation': 'a'})
+        metrics.observe(REQUEST_DURATION, 2, {'operation': 'b'})
+        os.write(ready[1], b'.')
+        os.read(done[0], 1)
+
+    pid = fork(worker)
+    os.read(ready[0], 1)
+    assert len(tmpdir.listdir()) == 2
+    histograms = metrics.collect()[REQUEST_DURATION]
+    assert histograms[(('operation', 'a'),)].cumulative_counts() == [('0.1', 1), ('1.0', 2), ('+Inf', 2)]
+    assert histograms[(('operation', 'a'),)].sum == pytest.approx(0.55)
+    assert histograms[(('operation', 'b'),)].count == 1
+
+    # the values of the dead workers are archived
+    os.write(done[1], b'.')
+    os.waitpid(pid, 0)
+    text = metrics.render_prometheus()
+    assert sorted(path.basename for path in tmpdir.listdir(lambda path: path.ext == '.db')) == \
+        ['{}-0.db'.format(os.getpid()), 'archive.db']
+    assert 'specific_request_duration_seconds_count{operation="a"} 2' in text
+    assert 'specific_request_duration_seconds_bucket{operation="b",le="+Inf"} 1' in text
+
+    pid = fork(lambda: metrics.observe(REQUEST_DURATION, 2, {'operation': 'b'}))
+    os.waitpid(pid, 0)
+    assert metrics.collect()[REQUEST_DURATION][(('operation', 'b'),)].count == 2
+
+
+def test_multiprocess_metrics_threads(tmpdir):
+    metrics = MultiProcessMetrics(str(tmpdir))
+    barrier = threading.Barrier(4)
+
+    def observe():
+        barrier.wait()
+        for _ in range(100):
+            metrics.observe(REQUEST_DURATION, 0.01, {'operation': 'a'})
+        # the threads have their own file while they run
+        barrier.wait()
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(tmpdir.listdir(lambda path: path.ext == '.db')) == 4
+    assert metrics.collect()[REQUEST_DURATION][(('operation', 'a'),)].count == 400
+
+    # the files of the finished threads are reused
+    thread = threading.Thread(target=metrics.observe, args=(REQUEST_DURATION, 0.01, {'operation': 'a'}))
+    thread.start()
+    thread.join()
+    assert len(tmpdir.listdir(lambda path: path.ext == '.db')) == 4
+    assert metrics.collect()[REQUEST_DURATION][(('operation', 'a'),)].count == 401
+
+
+def test_multiprocess_metrics_file_growth(tmpdir):
+    metrics = MultiProcessMetrics(str(tmpdir))
+    for index in range(2000):
+        metrics.observe(REQUEST_DURATION, 0.01, {'operation': str(index)})
+    histograms = metrics.collect()[REQUEST_DURATION]
+    assert len(histograms) == 2000
+    assert histograms[(('operation', '1999'),)].count == 1
+
+
+def test_multiprocess_metrics_directory(tmpdir, monkeypatch):
+    metrics = MultiProcessMetrics()
+    assert os.stat(metrics.path).st_mode & 0o777 == 0o700
+    assert MultiProcessMetrics().path != metrics.path
+
+    path = tmpdir.join('metrics')
+    MultiProcessMetrics(str(path))
+    assert path.stat().mode & 0o777 == 0o700
+
+    monkeypatch.setattr(os, 'getuid', lambda: path.stat().uid + 1)
+    with pytest.raises(ValueError):
+        MultiProcessMetrics(str(path))
+
+
+def test_multiprocess_metrics_symlinks(tmpdir):
+    target = tmpdir.join('target')
+    target.write('')
+    tmpdir.join('{}-0.db'.format(os.getpid())).mksymlinkto(target)
+    metrics = MultiProcessMetrics(str(tmpdir))
+    with pytest.raises(OSError):
+        metrics.observe(REQUEST_DURATION, 0.01, {'operation': 'a'})
+    assert target.size() == 0
+
+
+def test_multiprocess_metrics_endpoint(tmpdir):
+    app = specific.FlaskApp(__name__, options={'metrics': 'multiprocess', 'metrics_dir': str(tmpdir)})
+    app.add_api(SPEC, resolver=lambda operation_id: post_item)
+    assert isinstance(app.apis[0].metrics, MultiProcessMetrics)
+    client = app.app.test_client()
+    client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+
+    text = client.get('/metrics').data.decode()
+    assert 'specific_request_duration_seconds_count{operation="post_item",status="201"} 1' in text
+
+
+def test_server_timing():
+    app = specific.FlaskApp(__name__, options={'server_timing': True})
+    app.add_api(SPEC, resolver=lambda operation_id: post_item)
+    client = app.app.test_client()
+
+    response = client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+    assert response.status_code == 201
+    metrics = [metric.split(';dur=')[0] for metric in response.headers['Server-Timing'].split(', ')]
+    assert metrics == ['auth', 'validate', 'handler', 'serialize', 'total']
+    assert app.apis[0].metrics is None
+
+
+def test_server_timing_header():
+    app = specific.FlaskApp(__name__, options={'server_timing': 'X-Debug-Timing'})
+    app.add_api(SPEC, resolver=lambda operation_id: post_item)
+    client = app.app.test_client()
+
+    response = client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+    assert 'Server-Timing' not in response.headers
+    response = client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid', 'X-Debug-Timing': '1'})
+    assert response.headers['Server-Timing'].startswith('auth;dur=')
@@ -0,0 +1,162 @@
+import gc
+import os
+import signal
+import socket
+import time
+
+import mock
+import pytest
+import requests
+from conftest import build_app_from_fixture
+from specific import FlaskApp
+from specific.apps import prefork
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def wait_for(url, timeout=10.0):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return requests.get(url, timeout=1)
+        except requests.ConnectionError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def test_get_rss():
+    assert prefork.get_rss(os.getpid()) > 0
+    assert prefork.get_rss(-1) is None
+
+
+@pytest.mark.skipif(not hasattr(socket, 'SO_REUSEPORT'), reason='SO_REUSEPORT is not supported')
+def test_bind_socket_reuse_port():
+    port = free_port()
+    first = prefork.bind_socket('127.0.0.1', port, reuse_port=True)
+    second = prefork.bind_socket('127.0.0.1', port, reuse_port=True)
+    assert first.getsockname() == second.getsockname()
+    first.close()
+    second.close()
+
+
+def test_spawn_and_reap_workers():
+    server = prefork.PreforkServer(lambda sock: None, '127.0.0.1', 0, workers=2)
+    pids = [server.spawn_worker() for _ in range(2)]
+    assert server.worker_pids == set(pids)
+
+    deadline = time.time() + 10
+    while server.worker_pids and time.time() < deadline:
+        server.reap_workers()
+        time.sleep(0.05)
+    assert server.worker_pids == set()
+
+
+def test_workers_failing_to_start():
+    server = prefork.PreforkServer(lambda sock: None, '127.0.0.1', 0, workers=2, poll_interval=0.01,
+                                   max_failed_starts=3)
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    try:
+        with pytest.raises(RuntimeError) as exc_info:
+            server.run()
+    finally:
+        gc.enable()
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+    # both workers can exit before the check
+    assert server.failed_starts >= 3
+    assert str(exc_info.value) == '{} workers in a row exited right after their start'.format(server.failed_starts)
+    assert server.worker_pids == set()
+
+
+def test_worker_start_backoff(monkeypatch):
+    server = prefork.PreforkServer(None, '127.0.0.1', 0, workers=1, poll_interval=1.0)
+    monkeypatch.setattr(prefork.time, 'time', lambda: 100.0)
+    server._check_worker_start(0.1)
+    server._check_worker_start(0.1)
+    assert (server.failed_starts, server.next_spawn) == (2, 104.0)
+    for _ in range(10):
+        server._check_worker_start(0.1)
+    assert server.next_spawn == 100.0 + prefork.MAX_SPAWN_DELAY
+    server._check_worker_start(prefork.MIN_WORKER_LIFETIME)
+    assert (server.failed_starts, server.next_spawn) == (0, 0)
+
+
+def test_check_workers_memory(monkeypatch):
+    server = prefork.PreforkServer(None, '127.0.0.1', 0, workers=2, max_worker_memory=100)
+    server.worker_pids = {1, 2}
+    monkeypatch.setattr(prefork, 'get_rss', {1: 50, 2: 150}.get)
+    server.kill_worker = mock.MagicMock()
+
+    server.check_workers_memory()
+
+    server.kill_worker.assert_called_once_with(2, signal.SIGTERM)
+
+
+def test_check_workers_memory_no_limit(monkeypatch):
+    server = prefork.PreforkServer(None, '127.0.0.1', 0, workers=2)
+    server.worker_pids = {1, 2}
+    server.kill_worker = mock.MagicMock()
+
+    server.check_workers_memory()
+
+    server.kill_worker.assert_not_called()
+
+
+@pytest.mark.parametrize('reuse_port', [False, True])
+def test_run_workers(simple_api_spec_dir, reuse_port):
+    if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+        pytest.skip('SO_REUSEPORT is not supported')
+    app = build_app_from_fixture('simple', 'openapi.yaml')
+    app.host = '127.0.0.1'
+    app.port = free_port()
+
+    master_pid = os.fork()
+    if not master_pid:
+        exit_code = 0
+        try:
+            app.run_workers(2, reuse_port=reuse_port)
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    try:
+        response = wait_for('http://127.0.0.1:{}/v1.0/bye/jsantos'.format(app.port))
+        assert response.status_code == 200
+        assert response.text == 'Goodbye jsantos'
+    finally:
+        os.kill(master_pid, signal.SIGTERM)
+        _, status = os.waitpid(master_pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_serve_worker_not_supported(simple_api_spec_dir, monkeypatch):
+    app = build_app_from_fixture('simple', 'openapi.yaml')
+    app.server = 'gevent'
+    with pytest.raises(Exception) as exc_info:
+        app.serve_worker(None)
+    assert exc_info.value.args == ('Server gevent does not support workers',)
+
+    # no worker is forked
+    monkeypatch.setattr(os, 'fork', mock.MagicMock(side_effect=AssertionError))
+    with pytest.raises(Exception) as exc_info:
+        app.run_workers(2)
+    assert exc_info.value.args == ('Server gevent does not support workers',)
+
+
+def test_worker_warmup_before_serving(simple_api_spec_dir):
+    app = FlaskApp(__name__, specification_dir=simple_api_spec_dir, options={'warmup': True})
+    app.add_api('openapi.yaml')
+    assert not app.ready
+    calls = []
+    app.serve_worker = lambda sock, **options: calls.append(('serve', app.ready, options))
+
+    app._serve_worker(None, threaded=True)
+    assert calls == [('serve', True, {'threaded': True})]
@@ -0,0 +1,106 @@
+import threading
+
+import specific
+from specific.profiler import SamplingProfiler, track_operation
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'profiler', 'version': '1.0'},
+    'security': [{'apikey': []}],
+    'components': {'securitySchemes': {'apikey': {
+        'type': 'apiKey', 'in': 'header', 'name': 'X-Auth',
+        'x-apikeyInfoFunc': 'test_profiler.apikey_info',
+    }}},
+    'paths': {'/busy': {'get': {
+        'operationId': 'get_busy',
+        'responses': {'200': {'description': 'ok'}},
+    }}},
+}
+
+busy = threading.Event()
+stop = threading.Event()
+
+
+def apikey_info(apikey, required_scopes=None):
+    return {'sub': 'user'} if apikey == 'valid' else None
+
+
+def spin():
+    busy.set()
+    while not stop.is_set():
+        sum(range(100))
+
+
+def get_busy():
+    spin()
+    return {}
+
+
+def build_app(spec=SPEC):
+    app = specific.FlaskApp(__name__, options={'profiler': True})
+    app.add_api(spec, resolver=lambda operation_id: get_busy)
+    return app
+
+
+def test_profiler_endpoint():
+    app = build_app()
+    busy.clear()
+    stop.clear()
+    request = threading.Thread(target=app.app.test_client().get, args=('/busy',),
+                               kwargs={'headers': {'X-Auth': 'valid'}})
+    request.start()
+    try:
+        busy.wait(5)
+        client = app.app.test_client()
+        assert client.get('/_specific/profile?seconds=0.1').status_code == 401
+        response = client.get('/_specific/profile?seconds=0.2&rate=200', headers={'X-Auth': 'valid'})
+    finally:
+        stop.set()
+        request.join()
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; charset=utf-8'
+    lines = response.data.decode().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    frames = stack.split(';')
+    assert frames[0] == 'get_busy'
+    assert frames[-1].startswith('spin (test_profiler.py:')
+    assert int(count) > 0
+
+
+def test_profiler_endpoint_parameters():
+    client = build_app().app.test_client()
+    headers = {'X-Auth': 'valid'}
+    assert client.get('/_specific/profile?seconds=61', headers=headers).status_code == 400
+    assert client.get('/_specific/profile?seconds=a', headers=headers).status_code == 400
+    assert client.get('/_specific/profile?seconds=0.01', headers=headers).data == b''
+
+
+def test_profiler_endpoint_requires_security():
+    spec = dict(SPEC, security=[])
+    assert build_app(spec).app.test_client().get('/_specific/profile?seconds=0.01').status_code == 404
+
+
+def test_sampling_profiler_all_threads():
+    stop.clear()
+    busy.clear()
+    thread = threading.Thread(target=spin)
+    thread.start()
+    try:
+        busy.wait(5)
+        assert not SamplingProfiler().sample(0.05)
+        stacks = SamplingProfiler(rate=500, all_threads=True).sample(0.05)
+    finally:
+        stop.set()
+        thread.join()
+    assert any(stack.startswith('[no operation];') and stack.endswith(';spin (test_profiler.py:{})'.format(
+        spin.__code__.co_firstlineno)) for stack in stacks)
+
+
+def test_track_operation():
+    from specific.profiler import _active_operations
+
+    function = track_operation('op', lambda request: dict(_active_operations))
+    assert list(function(None).values()) == ['op']
+    assert _active_operations == {}
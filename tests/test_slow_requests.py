@@ -0,0 +1,126 @@
+import cProfile
+import logging
+import os
+import pstats
+import time
+
+import specific
+from specific.slow_requests import REDACTED, SlowRequestLog
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'slow', 'version': '1.0'},
+    'components': {'securitySchemes': {'apikey': {
+        'type': 'apiKey', 'in': 'query', 'name': 'code',
+        'x-apikeyInfoFunc': 'test_slow_requests.apikey_info',
+    }}},
+    'paths': {
+        '/items/{item_id}': {'post': {
+            'operationId': 'post_item',
+            'security': [{'apikey': []}],
+            'parameters': [
+                {'name': 'item_id', 'in': 'path', 'required': True, 'schema': {'type': 'integer'}},
+                {'name': 'sleep', 'in': 'query', 'schema': {'type': 'number'}},
+                {'name': 'X-Trace', 'in': 'header', 'schema': {'type': 'string'}},
+                {'name': 'X-Session-Id', 'in': 'header', 'schema': {'type': 'string'}},
+            ],
+            'requestBody': {'content': {'application/json': {'schema': {'type': 'object'}}}},
+            'responses': {'201': {'description': 'created'}},
+        }},
+        '/fast': {'get': {
+            'operationId': 'get_fast',
+            'x-slow-threshold-ms': 60000,
+            'responses': {'200': {'description': 'ok'}},
+        }},
+    },
+}
+
+
+def apikey_info(apikey, required_scopes=None):
+    return {'sub': 'user'} if apikey == 'valid' else None
+
+
+def post_item(item_id, body, sleep=0):
+    time.sleep(sleep)
+    return {'id': item_id}, 201
+
+
+def get_fast():
+    return {}
+
+
+def build_client(options):
+    app = specific.FlaskApp(__name__, options=options)
+    app.add_api(SPEC, resolver=lambda operation_id: globals()[operation_id])
+    return app.app.test_client()
+
+
+def slow_records(caplog):
+    return [record.slow_request for record in caplog.records if hasattr(record, 'slow_request')]
+
+
+def test_slow_request_log(caplog):
+    caplog.set_level(logging.WARNING, logger='specific.slow_requests')
+    client = build_client({'slow_request_threshold_ms': 50})
+    headers = {'X-Trace': 'abc', 'X-Session-Id': 'secret', 'Authorization': 'Bearer secret'}
+
+    response = client.post('/items/1?code=valid', json={'name': 'a'}, headers=headers)
+    assert response.status_code == 201
+    assert slow_records(caplog) == []
+
+    client.post('/items/1?code=valid&sleep=0.06', json={'name': 'a'}, headers=headers)
+    client.get('/fast')
+    record, = slow_records(caplog)
+    assert record['operation_id'] == 'post_item'
+    assert record['status'] == 201
+    assert record['duration_ms'] >= 50
+    assert record['stages_ms']['handler'] >= 50
+    assert {'request', 'security', 'body_validation', 'serialization'} <= set(record['stages_ms'])
+    assert record['parameters'] == {
+        'path': {'item_id': 1},
+        'query': {'code': REDACTED, 'sleep': '0.06'},
+        'header': {'X-Trace': 'abc', 'X-Session-Id': REDACTED},
+    }
+    assert record['payload_size'] == len(b'{"name": "a"}')
+
+
+def test_slow_request_profile(tmpdir):
+    client = build_client({'slow_request_threshold_ms': 50, 'slow_request_profile_count': 2,
+                           'slow_request_profile_dir': str(tmpdir)})
+    client.post('/items/1?code=valid', json={})
+    assert tmpdir.listdir() == []
+
+    client.post('/items/1?code=valid&sleep=0.06', json={})
+    assert tmpdir.listdir() == []
+    for _ in range(3):
+        client.post('/items/1?code=valid', json={})
+    profiles = tmpdir.listdir()
+    assert len(profiles) == 2
+    assert all(profile.basename.startswith('post_item-') for profile in profiles)
+    stats = pstats.Stats(str(profiles[0]))
+    assert any(function == 'post_item' for _, _, function in stats.stats)
+
+
+def test_slow_request_default_profile_dir():
+    profiler = cProfile.Profile()
+    path = SlowRequestLog('post_item', 50).dump_profile(profiler, 0.06)
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+    assert os.path.basename(path).startswith('post_item-')
+
+
+def test_slow_request_log_failures(tmpdir, caplog, monkeypatch):
+    # the profiles cannot be written under a file
+    profile_dir = tmpdir.join('file')
+    profile_dir.write('')
+    client = build_client({'slow_request_threshold_ms': 50, 'slow_request_profile_count': 1,
+                           'slow_request_profile_dir': str(profile_dir.join('profiles'))})
+    assert client.post('/items/1?code=valid&sleep=0.06', json={}).status_code == 201
+    assert client.post('/items/1?code=valid', json={}).status_code == 201
+    assert 'Failed to write the profile of a request to post_item' in caplog.text
+
+    def fail(self, request):
+        raise ValueError('parameters')
+
+    monkeypatch.setattr(SlowRequestLog, 'parameters', fail)
+    assert client.post('/items/1?code=valid&sleep=0.06', json={}).status_code == 201
+    assert 'Failed to log a slow request to post_item' in caplog.text
@@ -0,0 +1,433 @@
+import json
+import os
+import threading
+
+from six.moves import BaseHTTPServer
+
+import pytest
+from specific import FlaskApp
+from specific.options import SpecificOptions
+from specific.token_cache import (InfoFuncCache, RejectedCredentials,
+                                  SqliteTokenInfoCache, TokenInfoCache,
+                                  hash_token, make_rejected_credentials,
+                                  make_token_info_cache)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetch(object):
+    def __init__(self, token_info=None, event=None):
+        self.token_info = token_info if token_info is not None else {'sub': 'user', 'scope': ['a']}
+        self.event = event
+        self.calls = []
+
+    def __call__(self, token):
+        self.calls.append(token)
+        if self.event is not None:
+            self.event.wait(5)
+        if token == 'invalid':
+            return None
+        if token == 'error':
+            raise ValueError('tokeninfo is down')
+        return dict(self.token_info, token=token)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_cache_hit_and_expiry(clock):
+    cache = TokenInfoCache(ttl=60, refresh_ahead=None, clock=clock)
+    fetch = CountingFetch()
+
+    assert cache.get('abc', fetch)['token'] == 'abc'
+    assert cache.get('abc', fetch)['token'] == 'abc'
+    assert fetch.calls == ['abc']
+
+    clock.now += 61
+    cache.get('abc', fetch)
+    assert fetch.calls == ['abc', 'abc']
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['lookups'], stats['size']) == (1, 2, 2, 1)
+    assert stats['hit_rate'] == pytest.approx(1 / 3.0)
+
+
+@pytest.mark.parametrize('token_info', [{'expires_in': 10}, {'exp': 1010}])
+def test_cache_honors_token_expiry(clock, token_info):
+    cache = TokenInfoCache(ttl=60, refresh_ahead=None, clock=clock)
+    fetch = CountingFetch(token_info)
+
+    cache.get('abc', fetch)
+    clock.now += 9
+    cache.get('abc', fetch)
+    assert len(fetch.calls) == 1
+    clock.now += 2
+    cache.get('abc', fetch)
+    assert len(fetch.calls) == 2
+
+
+def test_cache_does_not_store_expired_or_invalid_tokens(clock):
+    cache = TokenInfoCache(clock=clock)
+    assert cache.get('abc', CountingFetch({'exp': 900})) is not None
+    assert cache.get('invalid', CountingFetch()) is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = TokenInfoCache(maxsize=2, refresh_ahead=None, clock=clock)
+    fetch = CountingFetch()
+    for token in ('a', 'b', 'a', 'c'):
+        cache.get(token, fetch)
+
+    fetch.calls = []
+    cache.get('a', fetch)
+    cache.get('b', fetch)
+    assert fetch.calls == ['b']
+    assert cache.stats()['evictions'] == 2
+
+
+def test_cache_namespaces(clock):
+    cache = TokenInfoCache(clock=clock)
+    fetch = CountingFetch()
+    cache.get('abc', fetch, namespace='https://a.example.com')
+    cache.get('abc', fetch, namespace='https://b.example.com')
+    assert len(fetch.calls) == 2
+
+
+def test_concurrent_lookups_are_coalesced(clock):
+    cache = TokenInfoCache(clock=clock)
+    fetch = CountingFetch(event=threading.Event())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('abc', fetch)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < 7:
+        pass
+    fetch.event.set()
+    for thread in threads:
+        thread.join()
+
+    assert fetch.calls == ['abc']
+    assert len(results) == 8 and all(result['token'] == 'abc' for result in results)
+
+
+def test_coalesced_lookups_share_errors(clock):
+    cache = TokenInfoCache(clock=clock)
+    fetch = CountingFetch(event=threading.Event())
+    errors = []
+
+    def lookup():
+        try:
+            cache.get('error', fetch)
+        except ValueError as exception:
+            errors.append(exception)
+
+    threads = [threading.Thread(target=lookup) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < 1:
+        pass
+    fetch.event.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetch.calls) == 1
+    assert len(errors) == 2
+    assert cache.stats()['errors'] == 1
+    assert len(cache) == 0
+
+
+def test_refresh_ahead(clock):
+    cache = TokenInfoCache(ttl=100, refresh_ahead=0.8, clock=clock)
+    fetch = CountingFetch()
+    cache.get('abc', fetch)
+
+    clock.now += 50
+    cache.get('abc', fetch)
+    assert len(fetch.calls) == 1
+
+    clock.now += 35
+    fetch.token_info = {'sub': 'refreshed'}
+    # the cached token info is returned while it is refreshed in the background
+    assert cache.get('abc', fetch)['sub'] == 'user'
+    while cache._lookups:
+        pass
+    assert len(fetch.calls) == 2
+    assert cache.get('abc', fetch)['sub'] == 'refreshed'
+    assert cache.stats()['refreshes'] == 1
+
+    clock.now += 99
+    assert cache.get('abc', fetch)['sub'] == 'refreshed'
+    while cache._lookups:
+        pass
+    assert len(fetch.calls) == 3
+    assert cache.stats()['misses'] == 1
+
+
+def test_refresh_of_revoked_token(clock):
+    cache = TokenInfoCache(ttl=100, refresh_ahead=0.5, clock=clock)
+    cache.get('abc', CountingFetch())
+    clock.now += 60
+
+    fetch = CountingFetch()
+    cache.get('abc', lambda token: fetch('invalid'))
+    while cache._lookups:
+        pass
+    assert len(cache) == 0
+
+
+def test_info_func_cache(clock):
+    cache = InfoFuncCache(ttl=60, clock=clock)
+    calls = []
+
+    def basic_info(username, password, required_scopes=None):
+        calls.append((username, password, required_scopes))
+        return {'sub': username}
+
+    memoized = cache.memoize(basic_info)
+    for password in ('a', 'a', 'b'):
+        assert memoized('jdoe', password, required_scopes=['x', 'y']) == {'sub': 'jdoe'}
+    memoized('jdoe', 'a', required_scopes=['y', 'x'])
+    memoized('other', 'a')
+    assert len(calls) == 3
+    assert not any('jdoe' in key or 'other' in key for key in cache._entries)
+
+    cache.invalidate('jdoe', 'a')
+    assert len(cache) == 2
+    cache.invalidate('jdoe')
+    assert len(cache) == 1
+
+    clock.now += 61
+    memoized('other', 'a')
+    assert len(calls) == 4
+
+
+class TokenInfoHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.calls.append(self.headers.get('Authorization'))
+        if self.headers.get('Authorization') != 'Bearer 100':
+            self.send_response(401)
+            self.end_headers()
+            return
+        body = json.dumps({'uid': 'test-user', 'scope': ['myscope'], 'expires_in': 30}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def tokeninfo_server():
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), TokenInfoHandler)
+    server.calls = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def build_secure_app(token_info_url, **options):
+    spec = {
+        'swagger': '2.0',
+        'info': {'title': 'secure', 'version': '1.0'},
+        'securityDefinitions': {'oauth': {
+            'type': 'oauth2', 'flow': 'password', 'tokenUrl': 'https://example.com/token',
+            'x-tokenInfoUrl': token_info_url, 'scopes': {'myscope': ''},
+        }},
+        'paths': {'/greeting': {'get': {
+            'operationId': 'greeting',
+            'security': [{'oauth': ['myscope']}],
+            'responses': {'200': {'description': 'greeting'}},
+        }}},
+    }
+    app = FlaskApp(__name__)
+    app.add_api(spec, resolver=lambda operation_id: lambda: 'hello', options=options)
+    return app
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_tokeninfo_url_is_cached(tokeninfo_server, tmpdir, backend):
+    app = build_secure_app('http://127.0.0.1:{}/tokeninfo'.format(tokeninfo_server.server_port),
+                           tokeninfo_cache_size=1024, tokeninfo_cache_backend=backend,
+                           tokeninfo_cache_path=str(tmpdir.join('tokeninfo.sqlite')))
+    client = app.app.test_client()
+
+    for _ in range(3):
+        assert client.get('/greeting', headers={'Authorization': 'Bearer 100'}).status_code == 200
+    for _ in range(2):
+        assert client.get('/greeting', headers={'Authorization': 'Bearer 200'}).status_code == 401
+    assert tokeninfo_server.calls == ['Bearer 100', 'Bearer 200', 'Bearer 200']
+
+    stats = app.apis[0].token_info_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['lookups']) == (2, 3, 3)
+
+
+def test_tokeninfo_cache_disabled(tokeninfo_server):
+    app = build_secure_app('http://127.0.0.1:{}/tokeninfo'.format(tokeninfo_server.server_port))
+    client = app.app.test_client()
+
+    for _ in range(2):
+        assert client.get('/greeting', headers={'Authorization': 'Bearer 100'}).status_code == 200
+    assert len(tokeninfo_server.calls) == 2
+    assert app.apis[0].token_info_cache is None
+
+
+def test_rejected_tokens_are_cached(tokeninfo_server):
+    app = build_secure_app('http://127.0.0.1:{}/tokeninfo'.format(tokeninfo_server.server_port),
+                           rejected_credentials_ttl=5)
+    client = app.app.test_client()
+
+    for _ in range(3):
+        assert client.get('/greeting', headers={'Authorization': 'Bearer 200'}).status_code == 401
+    assert tokeninfo_server.calls == ['Bearer 200']
+    stats = app.apis[0].rejected_credentials.stats()
+    assert (stats['hits'], stats['misses'], stats['rejections'], stats['size']) == (2, 1, 1, 1)
+
+
+def test_rejected_credentials_backoff(clock):
+    rejected = RejectedCredentials(ttl=5, max_ttl=12, clock=clock)
+    assert not rejected.is_rejected('abc')
+
+    rejected.reject('abc')
+    assert rejected.is_rejected('abc')
+    assert not rejected.for_namespace('other').is_rejected('abc')
+    clock.now += 5
+    assert not rejected.is_rejected('abc')
+
+    # rejected again: cached twice as long, up to max_ttl
+    for ttl in (10, 12):
+        rejected.reject('abc')
+        clock.now += ttl - 1
+        assert rejected.is_rejected('abc')
+        clock.now += 1
+        assert not rejected.is_rejected('abc')
+
+    # the backoff restarts when the client stopped retrying
+    clock.now += 13
+    rejected.reject('abc')
+    clock.now += 5
+    assert not rejected.is_rejected('abc')
+    assert 'abc' not in repr(rejected._entries)
+
+
+def test_rejected_credentials_keys(clock):
+    rejected = RejectedCredentials(clock=clock)
+    rejected.reject('user:password')
+    # keyed with a secret of the process, not a plain hash of the password
+    assert hash_token('user:password') not in repr(rejected._entries)
+    assert RejectedCredentials(clock=clock)._key('user:password', None) != rejected._key('user:password', None)
+    assert rejected.for_namespace('').is_rejected('user:password')
+
+    # rejected for lacking scopes, it is checked again for the other scopes
+    rejected.reject('apikey', ['admin', 'read'])
+    assert rejected.is_rejected('apikey', ['read', 'admin'])
+    assert not rejected.is_rejected('apikey', ['read'])
+    assert not rejected.is_rejected('apikey')
+
+
+def test_rejected_credentials_are_bounded(clock):
+    rejected = RejectedCredentials(maxsize=2, clock=clock)
+    for credential in ('a', 'b', 'c'):
+        rejected.reject(credential)
+    assert len(rejected) == 2
+    assert not rejected.is_rejected('a')
+    assert rejected.stats()['evictions'] == 1
+
+    assert make_rejected_credentials(SpecificOptions({})) is None
+    assert make_rejected_credentials(SpecificOptions({'rejected_credentials_ttl': 5})).max_ttl == 60
+
+
+def test_sqlite_cache_is_shared(clock, tmpdir):
+    path = str(tmpdir.join('tokeninfo.sqlite'))
+    cache = SqliteTokenInfoCache(path, clock=clock)
+    fetch = CountingFetch()
+
+    pid = os.fork()
+    if not pid:
+        # another worker introspects the token
+        exit_code = 0
+        try:
+            SqliteTokenInfoCache(path, clock=clock).get('abc', fetch)
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+
+    assert cache.get('abc', fetch) == {'sub': 'user', 'scope': ['a'], 'token': 'abc'}
+    assert fetch.calls == []
+    assert cache.stats()['hits'] == 1
+
+    clock.now += 61
+    cache.get('abc', fetch)
+    assert fetch.calls == ['abc']
+
+
+def test_sqlite_cache_is_bounded(clock, tmpdir):
+    cache = SqliteTokenInfoCache(str(tmpdir.join('tokeninfo.sqlite')), maxsize=2,
+                                 refresh_ahead=None, clock=clock)
+    fetch = CountingFetch()
+    for token in ('a', 'b', 'c'):
+        cache.get(token, fetch)
+        clock.now += 1
+    assert len(cache) == 2
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate('c')
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_default_path():
+    cache = SqliteTokenInfoCache()
+    directory = os.path.dirname(cache.path)
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+    assert os.stat(cache.path).st_mode & 0o777 == 0o600
+    assert SqliteTokenInfoCache().path != cache.path
+
+
+def test_sqlite_cache_refuses_foreign_files(tmpdir, monkeypatch):
+    path = tmpdir.join('tokeninfo.sqlite')
+    path.write('')
+    link = tmpdir.join('link.sqlite')
+    link.mksymlinkto(path)
+    with pytest.raises(ValueError):
+        SqliteTokenInfoCache(str(link))
+
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(str(path)).st_uid + 1)
+    with pytest.raises(ValueError):
+        SqliteTokenInfoCache(str(path))
+
+
+def test_make_token_info_cache(tmpdir):
+    cache = make_token_info_cache(SpecificOptions({'tokeninfo_cache_size': 1024, 'tokeninfo_cache_ttl': 5}))
+    assert type(cache) is TokenInfoCache
+    assert cache.ttl == 5
+
+    path = str(tmpdir.join('tokeninfo.sqlite'))
+    cache = make_token_info_cache(SpecificOptions({'tokeninfo_cache_size': 1024, 'tokeninfo_cache_backend': 'sqlite',
+                                                   'tokeninfo_cache_path': path}))
+    assert isinstance(cache, SqliteTokenInfoCache)
+    assert cache.path == path
+
+    assert make_token_info_cache(SpecificOptions({})) is None
+    assert make_token_info_cache(SpecificOptions({'tokeninfo_cache_size': 0})) is None
+    with pytest.raises(ValueError):
+        make_token_info_cache(SpecificOptions({'tokeninfo_cache_size': 1024, 'tokeninfo_cache_backend': 'redis'}))
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+
+from six.moves import BaseHTTPServer
+
+import pytest
+from specific import FlaskApp
+from specific.exceptions import TokenInfoUnavailable
+from specific.tokeninfo_client import (CircuitBreaker, TokenInfoClient,
+                                       get_tokeninfo_client)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenInfoHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.calls.append(self.headers.get('Authorization'))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if status == 200 and self.headers.get('Authorization') != 'Bearer 100':
+            status = 401
+        body = json.dumps({'uid': 'test-user', 'scope': ['myscope']}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def tokeninfo_server():
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), TokenInfoHandler)
+    server.calls = []
+    server.statuses = []
+    server.delay = 0
+    server.url = 'http://127.0.0.1:{}/tokeninfo'.format(server.server_port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_retries(tokeninfo_server):
+    client = TokenInfoClient(tokeninfo_server.url, retries=2, retry_backoff=0.01)
+    tokeninfo_server.statuses = [503, 502]
+    assert client('100') == {'uid': 'test-user', 'scope': ['myscope']}
+    assert len(tokeninfo_server.calls) == 3
+    assert client('200') is None
+
+    stats = client.stats()
+    assert (stats['requests'], stats['failures'], stats['retries']) == (4, 2, 2)
+    assert stats['latency_ms_max'] >= stats['latency_ms_mean'] > 0
+
+    tokeninfo_server.statuses = [500, 500, 500]
+    with pytest.raises(TokenInfoUnavailable):
+        client('100')
+
+    # neither retried nor a rejection of the token
+    for status in (429, 501):
+        tokeninfo_server.statuses = [status]
+        with pytest.raises(TokenInfoUnavailable):
+            client('100')
+
+
+def test_client_timeout(tokeninfo_server):
+    tokeninfo_server.delay = 0.5
+    client = TokenInfoClient(tokeninfo_server.url, read_timeout=0.05)
+    start = time.time()
+    with pytest.raises(TokenInfoUnavailable):
+        client('100')
+    assert time.time() - start < 0.5
+    assert client.stats()['failures'] == 1
+
+
+def test_circuit_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=0.5, minimum_requests=4, window=10,
+                             reset_timeout=30, clock=clock)
+    for failed in (True, False, True):
+        assert breaker.allow()
+        breaker.record(failed)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # the failures out of the window are forgotten
+    clock.now += 11
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    for failed in (False, True, True):
+        breaker.record(failed)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.counters == {'opened': 2, 'rejected': 2}
+
+
+def test_client_circuit_breaker(tokeninfo_server):
+    client = TokenInfoClient(tokeninfo_server.url,
+                             circuit_breaker=CircuitBreaker(minimum_requests=2))
+    tokeninfo_server.statuses = [503, 503, 503]
+    for _ in range(3):
+        with pytest.raises(TokenInfoUnavailable):
+            client('100')
+    assert len(tokeninfo_server.calls) == 2
+
+    stats = client.stats()
+    assert (stats['rejected'], stats['circuit'], stats['circuit_opened']) == (1, 'open', 1)
+
+
+def test_client_stops_retrying_once_the_circuit_is_open(tokeninfo_server):
+    client = TokenInfoClient(tokeninfo_server.url, retries=3, retry_backoff=0.01,
+                             circuit_breaker=CircuitBreaker(minimum_requests=2))
+    tokeninfo_server.statuses = [503, 503, 503, 503]
+    with pytest.raises(TokenInfoUnavailable):
+        client('100')
+    assert len(tokeninfo_server.calls) == 2
+
+    stats = client.stats()
+    assert (stats['requests'], stats['rejected'], stats['circuit']) == (2, 1, 'open')
+
+
+def test_get_tokeninfo_client():
+    security_definition = {'x-tokenInfoClient': {'poolSize': 4, 'connectTimeout': 1, 'readTimeout': 2,
+                                                 'keepAlive': False, 'failureThreshold': 0.2}}
+    client = get_tokeninfo_client('https://example.com/tokeninfo', security_definition)
+    assert client.timeout == (1, 2)
+    assert client.session.headers['Connection'] == 'close'
+    assert client.circuit_breaker.failure_threshold == 0.2
+    assert get_tokeninfo_client('https://example.com/tokeninfo', dict(security_definition)) is client
+    assert get_tokeninfo_client('https://example.com/tokeninfo', {}).circuit_breaker is None
+
+
+def test_cached_tokens_are_accepted_while_the_circuit_is_open(tokeninfo_server):
+    spec = {
+        'swagger': '2.0',
+        'info': {'title': 'secure', 'version': '1.0'},
+        'securityDefinitions': {'oauth': {
+            'type': 'oauth2', 'flow': 'password', 'tokenUrl': 'https://example.com/token',
+            'x-tokenInfoUrl': tokeninfo_server.url, 'scopes': {'myscope': ''},
+            'x-tokenInfoClient': {'failureThreshold': 0.5, 'minimumRequests': 1},
+        }},
+        'paths': {'/greeting': {'get': {
+            'operationId': 'greeting',
+            'security': [{'oauth': ['myscope']}],
+            'responses': {'200': {'description': 'greeting'}},
+        }}},
+    }
+    app = FlaskApp(__name__)
+    app.add_api(spec, resolver=lambda operation_id: lambda: 'hello', options={'tokeninfo_cache_size': 1024})
+    client = app.app.test_client()
+
+    assert client.get('/greeting', headers={'Authorization': 'Bearer 100'}).status_code == 200
+    tokeninfo_server.statuses = [503]
+    response = client.get('/greeting', headers={'Authorization': 'Bearer 300'})
+    assert response.status_code == 503
+    assert json.loads(response.data.decode())['detail'] == 'The authorization server is not available'
+    assert client.get('/greeting', headers={'Authorization': 'Bearer 400'}).status_code == 503
+    assert client.get('/greeting', headers={'Authorization': 'Bearer 100'}).status_code == 200
+    assert len(tokeninfo_server.calls) == 2
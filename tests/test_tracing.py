@@ -0,0 +1,147 @@
+import pytest
+import specific
+from specific.metrics import StageTimer
+from specific.tracing import OpenTelemetryListener, StageListener
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'tracing', 'version': '1.0'},
+    'components': {'securitySchemes': {'apikey': {
+        'type': 'apiKey', 'in': 'header', 'name': 'X-Auth',
+        'x-apikeyInfoFunc': 'test_tracing.apikey_info',
+    }}},
+    'paths': {'/items/{item_id}': {'post': {
+        'operationId': 'post_item',
+        'security': [{'apikey': []}],
+        'parameters': [{'name': 'item_id', 'in': 'path', 'required': True, 'schema': {'type': 'integer'}}],
+        'requestBody': {'content': {'application/json': {'schema': {
+            'type': 'object', 'required': ['name'], 'properties': {'name': {'type': 'string'}},
+        }}}},
+        'responses': {'201': {'description': 'created'}},
+    }}},
+}
+
+
+def apikey_info(apikey, required_scopes=None):
+    return {'sub': 'user'} if apikey == 'valid' else None
+
+
+def post_item(item_id, body):
+    return {'id': item_id}, 201
+
+
+class RecordingListener(StageListener):
+    def __init__(self):
+        self.events = []
+
+    def stage_started(self, stage, operation_id, request):
+        self.events.append(('start', stage, operation_id, request is not None))
+        return stage
+
+    def stage_finished(self, stage, operation_id, request, duration, started):
+        assert started == stage and duration >= 0
+        self.events.append(('end', stage, operation_id, request is not None))
+
+
+def build_client(options=None, listener=None):
+    app = specific.FlaskApp(__name__, options=options)
+    if listener is not None:
+        app.add_stage_listener(listener)
+    app.add_api(SPEC, resolver=lambda operation_id: post_item)
+    return app.app.test_client()
+
+
+def test_stage_listener():
+    listener = RecordingListener()
+    client = build_client(listener=listener)
+    response = client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+    assert response.status_code == 201
+
+    assert [event[:2] for event in listener.events] == [
+        ('start', 'request'), ('end', 'request'),
+        ('start', 'security'), ('start', 'auth.apikey'), ('end', 'auth.apikey'), ('end', 'security'),
+        ('start', 'array_parsing'), ('end', 'array_parsing'),
+        ('start', 'body_validation'), ('end', 'body_validation'),
+        ('start', 'parameter_validation'), ('end', 'parameter_validation'),
+        ('start', 'handler'), ('end', 'handler'),
+        ('start', 'serialization'), ('end', 'serialization'),
+    ]
+    assert all(operation_id == 'post_item' for _, _, operation_id, _ in listener.events)
+    # the request is converted during the "request" stage
+    assert [has_request for _, _, _, has_request in listener.events][:3] == [False, True, True]
+
+    del listener.events[:]
+    assert client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'invalid'}).status_code == 401
+    assert ('end', 'auth.apikey', 'post_item', True) in listener.events
+    assert ('start', 'handler', 'post_item', True) not in listener.events
+
+
+def test_stage_listener_errors_are_ignored():
+    class FailingListener(StageListener):
+        def stage_started(self, stage, operation_id, request):
+            raise ValueError()
+
+    client = build_client(options={'stage_listeners': [FailingListener()]})
+    assert client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'}).status_code == 201
+
+
+def test_stage_listener_durations_include_nested_stages(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(StageTimer, 'clock', staticmethod(lambda: now[0]))
+    durations = {}
+
+    class DurationListener(StageListener):
+        def stage_finished(self, stage, operation_id, request, duration, started):
+            durations[stage] = duration
+
+    timer = StageTimer([DurationListener()])
+    timer.start('security')
+    now[0] = 1.0
+    timer.start('auth.apikey')
+    now[0] = 3.0
+    timer.stop('auth.apikey')
+    now[0] = 4.0
+    timer.stop('security')
+
+    assert durations == {'auth.apikey': 2.0, 'security': 4.0}
+    # the metrics count each second once
+    assert timer.durations == {'auth.apikey': 2.0, 'security': 2.0}
+
+
+def test_opentelemetry_listener():
+    class Span(object):
+        def __init__(self, name, attributes):
+            self.name = name
+            self.attributes = attributes
+            self.ended = False
+
+        def end(self):
+            self.ended = True
+
+    class Tracer(object):
+        def __init__(self):
+            self.spans = []
+
+        def start_span(self, name, attributes=None):
+            self.spans.append(Span(name, attributes))
+            return self.spans[-1]
+
+    tracer = Tracer()
+    client = build_client(options={'stage_listeners': [OpenTelemetryListener(tracer)]})
+    client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'})
+
+    spans = {span.name: span for span in tracer.spans}
+    assert 'specific.auth.apikey' in spans and 'specific.handler' in spans
+    assert all(span.ended for span in tracer.spans)
+    assert spans['specific.handler'].attributes == {
+        'specific.operation_id': 'post_item', 'http.method': 'POST', 'http.url': 'http://localhost/items/1'}
+
+
+def test_no_stage_listener(monkeypatch):
+    # without metrics and listeners the stages are not instrumented at all
+    monkeypatch.setattr('specific.decorators.decorator.StageTimer',
+                        lambda *args: pytest.fail('The stages are timed'))
+    monkeypatch.setattr('specific.operations.abstract.time_stage_before',
+                        lambda *args: pytest.fail('The stages are timed'))
+    client = build_client()
+    assert client.post('/items/1', json={'name': 'a'}, headers={'X-Auth': 'valid'}).status_code == 201
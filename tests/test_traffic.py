@@ -0,0 +1,162 @@
+import json
+import threading
+
+from click.testing import CliRunner
+from werkzeug.serving import make_server
+
+import pytest
+from conftest import FIXTURES_FOLDER, build_app_from_fixture
+from specific import FlaskApp
+from specific.cli import main
+from specific.slow_requests import REDACTED
+from specific.traffic import (AppTarget, PathTemplate, Replay, TrafficRecorder,
+                              entry_arguments, load_traffic)
+
+
+@pytest.fixture
+def recorded_traffic(tmpdir):
+    traffic_file = str(tmpdir.join('traffic.ndjson'))
+    app = build_app_from_fixture('simple', options={'traffic_record_path': traffic_file,
+                                                    'traffic_record_sample_rate': 1.0})
+    client = app.app.test_client()
+    response = client.get('/v1.0/test_parameter_validation', query_string={'int': '123', 'bool': 'true'},
+                          headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    response = client.post('/v1.0/body-sanitization-additional-properties-defined',
+                           data=json.dumps({'name': 'value', 'password': 'secret'}),
+                           content_type='application/json')
+    assert response.status_code == 200
+    response = client.post('/v1.0/test_array_csv_form_param', data={'items': 'a,b'})
+    assert response.status_code == 200
+    return traffic_file
+
+
+def test_record(recorded_traffic):
+    with open(recorded_traffic) as traffic_file:
+        lines = traffic_file.read().splitlines()
+    assert len(lines) == 3
+    assert 'secret' not in ''.join(lines)
+
+    query, body, form = [json.loads(line) for line in lines]
+    assert query['operation_id'] == 'fakeapi.hello.test_parameter_validation'
+    assert query['method'] == 'GET'
+    assert query['path'] == '/v1.0/test_parameter_validation'
+    assert sorted(query['query']) == [['bool', 'true'], ['int', '123']]
+    assert query['headers']['Authorization'] == REDACTED
+    assert 'Host' not in query['headers']
+    assert body['json'] == {'name': 'value', 'password': REDACTED}
+    assert form['form'] == [['items', 'a,b']]
+
+
+def test_sample_rate(tmpdir):
+    traffic_file = str(tmpdir.join('traffic.ndjson'))
+    recorder = TrafficRecorder(traffic_file, sample_rate=0.5, random=iter([0.7, 0.2]).__next__)
+    function = recorder.wrap('operation', lambda request: request, '/path/{id}', sensitive_parameters=['X-Key'])
+    assert function.__wrapped__ is not None
+    request = type('Request', (), {'method': 'get', 'url': 'http://localhost/path/1?a=1', 'path_params': {'id': 1},
+                                   'query': {'a': '1'}, 'headers': {'x-key': 'secret', 'Content-Length': '0'},
+                                   'body': b'', 'content_type': None})
+    assert function(request) is request
+    assert function(request) is request
+    recorder.close()
+    entries = load_traffic(traffic_file)
+    assert len(entries) == 1
+    assert entries[0]['headers'] == {'x-key': REDACTED}
+    assert entries[0]['path'] == '/path/{id}'
+    assert entries[0]['path_params'] == {'id': '1'}
+
+
+def test_sensitive_path_parameter(tmpdir):
+    traffic_file = str(tmpdir.join('traffic.ndjson'))
+    spec = {
+        'openapi': '3.0.0',
+        'info': {'title': 'reset', 'version': '1.0'},
+        'paths': {'/users/{user_id}/reset/{token}': {'post': {
+            'operationId': 'reset',
+            'parameters': [{'name': 'user_id', 'in': 'path', 'required': True, 'schema': {'type': 'integer'}},
+                           {'name': 'token', 'in': 'path', 'required': True, 'schema': {'type': 'string'}}],
+            'responses': {'200': {'description': 'reset'}},
+        }}},
+    }
+    app = FlaskApp(__name__, options={'traffic_record_path': traffic_file, 'traffic_record_sample_rate': 1.0})
+    app.add_api(spec, base_path='/v1', resolver=lambda operation_id: lambda user_id, token: token)
+    response = app.app.test_client().post('/v1/users/007/reset/SUPER%20SECRET')
+    assert response.status_code == 200
+
+    with open(traffic_file) as traffic:
+        assert 'SECRET' not in traffic.read()
+    entry, = load_traffic(traffic_file)
+    assert entry['path'] == '/v1/users/{user_id}/reset/{token}'
+    assert entry['path_params'] == {'user_id': '007', 'token': REDACTED}
+    assert entry_arguments(entry)['path'] == '/v1/users/007/reset/<redacted>'
+
+
+def test_path_template():
+    template = PathTemplate('/v1/items/{item-id}/{name}.json')
+    assert template.values('/v1/items/1/a%20b.json') == {'item-id': '1', 'name': 'a b'}
+    assert template.values('/v1/items/1/a/b.json') is None
+    assert PathTemplate.expand(template.template, {'item-id': 1}) == '/v1/items/1/{name}.json'
+
+
+def test_entry_arguments():
+    entry = {'path': '/v1.0/path', 'method': 'POST', 'query': [['a', '1'], ['a', '2']],
+             'headers': {'Authorization': REDACTED, 'Content-Type': 'application/json', 'X-Id': '1'},
+             'json': {'name': 'value'}}
+    arguments = entry_arguments(entry, headers={'Authorization': 'Bearer token'})
+    assert arguments['query_string'].getlist('a') == ['1', '2']
+    assert arguments['headers'] == {'Authorization': 'Bearer token', 'X-Id': '1'}
+    assert arguments['content_type'] == 'application/json'
+    assert json.loads(arguments['data']) == {'name': 'value'}
+    assert entry_arguments(entry)['headers'] == {'X-Id': '1'}
+
+
+def test_replay_in_process(simple_app, recorded_traffic):
+    entries = load_traffic(recorded_traffic)
+    results = Replay(entries, AppTarget(simple_app), speed=0, concurrency=2).run()
+    total = results.pop()
+    assert total['requests'] == 3
+    assert total['error_rate'] == 0
+    assert total['max_lag_ms'] >= 0
+    assert len(results) == 3
+    assert all(result['statuses'] == {'200': 1} for result in results)
+
+
+def test_replay_rate(simple_app, recorded_traffic):
+    entries = load_traffic(recorded_traffic)
+    for index, entry in enumerate(entries):
+        entry['t'] = index * 0.1
+    # 0.2s of traffic replayed twice as fast
+    replay = Replay(entries, AppTarget(simple_app), speed=2, concurrency=1)
+    results = replay.run()
+    assert results[-1]['requests'] == 3
+    assert results[-1]['rps'] < 3 / 0.1
+
+
+def test_replay_command(simple_app, recorded_traffic):
+    server = make_server('127.0.0.1', 0, simple_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        url = 'http://127.0.0.1:{}'.format(server.server_port)
+        result = CliRunner().invoke(main, ['replay', recorded_traffic, '--url', url, '--speed', '0', '--json'],
+                                    catch_exceptions=False)
+    finally:
+        server.shutdown()
+        thread.join()
+    assert result.exit_code == 0, result.output
+    total = json.loads(result.output)[-1]
+    assert total['requests'] == 3
+    assert total['statuses'] == {'200': 3}
+
+
+def test_replay_command_in_process(simple_app, recorded_traffic):
+    spec_file = str(FIXTURES_FOLDER / 'simple' / simple_app._spec_file)
+    result = CliRunner().invoke(main, ['replay', recorded_traffic, spec_file, '--mock', 'all', '-s', '0'],
+                                catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert 'fakeapi.hello.test_parameter_validation' in result.output
+    assert 'max lag ms' in result.output
+
+    result = CliRunner().invoke(main, ['replay', recorded_traffic])
+    assert result.exit_code == 2
+    assert 'Either --url or SPEC_FILE is required' in result.output
@@ -0,0 +1,231 @@
+import json
+
+from werkzeug.datastructures import FileStorage
+
+import pytest
+from specific import FlaskApp
+from specific.apps.abstract import AbstractApp
+from specific.examples import example_to_string, schema_example
+from specific.exceptions import SpecificException
+
+SWAGGER_SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'warmup', 'version': '1.0'},
+    'basePath': '/v1',
+    'paths': {
+        '/items/{item-id}': {
+            'post': {
+                'operationId': 'post_item',
+                'parameters': [
+                    {'name': 'item-id', 'in': 'path', 'type': 'integer',
+                     'required': True, 'minimum': 10},
+                    {'name': 'tags', 'in': 'query', 'type': 'array',
+                     'items': {'type': 'string'}, 'collectionFormat': 'pipes',
+                     'required': True},
+                    {'name': 'ids', 'in': 'query', 'type': 'array',
+                     'items': {'type': 'integer'}, 'collectionFormat': 'multi',
+                     'minItems': 2},
+                    {'name': 'X-Trace', 'in': 'header', 'type': 'string',
+                     'x-example': 'abc'},
+                    {'name': 'item', 'in': 'body', 'required': True, 'schema': {
+                        'type': 'object',
+                        'required': ['name', 'code'],
+                        'properties': {
+                            'name': {'type': 'string', 'minLength': 10},
+                            'code': {'type': 'string', 'pattern': '^[a-z]+$',
+                                     'example': 'abc'},
+                            'ignored': {'type': 'string'},
+                        },
+                    }},
+                ],
+                'responses': {'201': {'description': 'created', 'schema': {
+                    'type': 'object',
+                    'required': ['id'],
+                    'properties': {'id': {'type': 'integer'}},
+                }}},
+            },
+        },
+    },
+}
+
+OPENAPI_SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'warmup', 'version': '1.0'},
+    'servers': [{'url': '/v1'}],
+    'paths': {
+        '/search': {
+            'get': {
+                'operationId': 'search',
+                'parameters': [
+                    {'name': 'terms', 'in': 'query', 'required': True,
+                     'schema': {'type': 'array', 'items': {'type': 'string'}},
+                     'example': ['a', 'b']},
+                    {'name': 'flags', 'in': 'query', 'explode': False,
+                     'schema': {'type': 'array', 'items': {'type': 'boolean'}}},
+                ],
+                'responses': {'200': {'description': 'results', 'content': {
+                    'application/json': {'schema': {'type': 'array', 'items': {'type': 'string'}}}
+                }}},
+            },
+        },
+    },
+}
+
+
+def failing_handler(*args, **kwargs):
+    raise AssertionError('The handler must not be called by the warmup')
+
+
+def build_app(spec, **options):
+    app = FlaskApp(__name__, options=options)
+    app.add_api(spec, resolver=lambda operation_id: failing_handler, validate_responses=True)
+    return app
+
+
+def test_schema_example():
+    assert schema_example({'type': 'integer', 'minimum': 3, 'exclusiveMinimum': True}) == 4
+    assert schema_example({'type': 'integer', 'minimum': 3, 'multipleOf': 5}) == 5
+    assert schema_example({'type': 'number', 'maximum': 0.5}) == 0.5
+    assert schema_example({'type': 'string', 'format': 'date'}) == '2019-01-01'
+    assert schema_example({'type': 'string', 'maxLength': 3}) == 'str'
+    assert schema_example({'type': 'string', 'enum': ['b', 'a']}) == 'b'
+    assert schema_example({'type': 'string', 'default': 'x', 'example': 'y'}) == 'y'
+    assert schema_example({'type': 'array', 'items': {'type': 'boolean'}, 'minItems': 2}) == [True, True]
+    assert schema_example({'allOf': [
+        {'properties': {'a': {'type': 'integer'}}},
+        {'properties': {'b': {'type': 'boolean'}}},
+    ]}) == {'a': 1, 'b': True}
+    assert isinstance(schema_example({'type': 'file'}), FileStorage)
+
+
+def test_schema_example_recursive():
+    schema = {'type': 'object', 'properties': {}}
+    schema['properties']['child'] = schema
+    assert schema_example(schema) == {'child': {'child': {'child': {'child': {
+        'child': {'child': {'child': {'child': {}}}}}}}}}
+
+
+def test_example_to_string():
+    assert example_to_string(False) == 'false'
+    assert example_to_string(1.5) == '1.5'
+
+
+def test_example_request_swagger2():
+    app = build_app(SWAGGER_SPEC)
+    operation, = app.apis[0].operations
+    request = operation.example_request()
+
+    assert request.url == 'http://localhost/v1/items/10'
+    assert request.method == 'POST'
+    assert request.path_params == {'item_id': '10'}
+    assert request.query.getlist('tags') == ['string']
+    assert request.query.getlist('ids') == ['1', '1']
+    assert request.headers == {'X-Trace': 'abc', 'Content-Type': 'application/json'}
+    assert request.json == {'name': 'stringxxxx', 'code': 'abc'}
+    assert json.loads(request.body.decode()) == request.json
+
+
+@pytest.mark.parametrize('collection_format, expected', [
+    ('csv', ['1,1']),
+    ('ssv', ['1 1']),
+    ('tsv', ['1\t1']),
+    ('pipes', ['1|1']),
+    ('multi', ['1', '1']),
+])
+def test_example_parameter_collection_formats(collection_format, expected):
+    app = build_app(SWAGGER_SPEC)
+    operation, = app.apis[0].operations
+    param = {'name': 'ids', 'in': 'query', 'type': 'array', 'items': {'type': 'integer'},
+             'collectionFormat': collection_format, 'minItems': 2}
+    assert operation._example_parameter(param) == expected
+
+
+def test_example_request_openapi():
+    app = build_app(OPENAPI_SPEC)
+    operation, = app.apis[0].operations
+    request = operation.example_request()
+
+    assert request.query.getlist('terms') == ['a', 'b']
+    assert request.query.getlist('flags') == ['true']
+    assert request.body == b''
+    assert 'Content-Type' not in request.headers
+
+
+@pytest.mark.parametrize('spec', [SWAGGER_SPEC, OPENAPI_SPEC])
+def test_warmup(spec):
+    app = build_app(spec, warmup=True)
+    assert not app.ready
+
+    operation, = app.apis[0].operations
+    with app._warmup_context():
+        response = operation.warmup()
+    assert response.status_code in (200, 201)
+
+    app.warmup()
+    assert app.ready
+
+
+def test_warmup_failures_are_logged(caplog):
+    app = build_app(SWAGGER_SPEC)
+    operation, = app.apis[0].operations
+    operation.example_request = failing_handler
+
+    assert app.apis[0].warmup() == 1
+    assert 'Failed to warm up POST /v1/items/{item-id}' in caplog.text
+
+
+def test_readiness_endpoint():
+    app = build_app(SWAGGER_SPEC, warmup=True, readiness_path='/health/ready')
+    client = app.app.test_client()
+
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert json.loads(response.data.decode()) == {'status': 'warming up'}
+
+    app.start_warmup().join()
+
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    assert json.loads(response.data.decode()) == {'status': 'ready'}
+
+
+def test_readiness_endpoint_without_warmup():
+    app = build_app(SWAGGER_SPEC)
+    assert app.ready
+    assert app.app.test_client().get('/ready').status_code == 404
+
+
+def test_warmup_under_external_server():
+    app = build_app(SWAGGER_SPEC, warmup=True)
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/ready', 'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+               'wsgi.url_scheme': 'http', 'wsgi.input': None}
+    # the WSGI callable, as served by gunicorn or uwsgi
+    app(environ, lambda status, headers: None)
+    thread = app.start_warmup()
+    assert thread is not None
+    thread.join()
+    assert app.ready
+    assert app.start_warmup() is thread
+
+
+def test_readiness_probe_starts_warmup():
+    app = build_app(SWAGGER_SPEC, warmup=True)
+    client = app.app.test_client()
+    assert client.get('/ready').status_code == 503
+    app.start_warmup().join()
+    assert client.get('/ready').status_code == 200
+
+
+def test_no_background_warmup_after_foreground_warmup():
+    app = build_app(SWAGGER_SPEC, warmup=True)
+    app.warmup()
+    assert app.start_warmup() is None
+
+
+def test_readiness_endpoint_not_supported():
+    class App(FlaskApp):
+        add_readiness_endpoint = AbstractApp.add_readiness_endpoint
+
+    with pytest.raises(SpecificException) as exc_info:
+        App(__name__, options={'warmup': True})
+    assert 'The warmup option requires a readiness endpoint' in str(exc_info.value)